@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import AnalyticsEvent, AnalyticsMetric, AnalyticsReport
+from .models import (
+    AnalyticsEvent, AnalyticsMetric, AnalyticsReport,
+    EventHourlyRollup, BookingHourlyRollup, RollupWatermark, AnalyticsSketch, AnalyticsArchive,
+    DeveloperDashboardSnapshot
+)
 
 
 @admin.register(AnalyticsEvent)
@@ -93,3 +97,44 @@ class AnalyticsReportAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at')
         }),
     )
+
+
+@admin.register(EventHourlyRollup)
+class EventHourlyRollupAdmin(admin.ModelAdmin):
+    list_display = ['hour', 'event_type', 'developer', 'project', 'event_count']
+    list_filter = ['event_type', 'hour']
+    raw_id_fields = ['developer', 'project']
+
+
+@admin.register(BookingHourlyRollup)
+class BookingHourlyRollupAdmin(admin.ModelAdmin):
+    list_display = ['hour', 'status', 'developer', 'project', 'booking_count', 'total_amount']
+    list_filter = ['status', 'hour']
+    raw_id_fields = ['developer', 'project']
+
+
+@admin.register(RollupWatermark)
+class RollupWatermarkAdmin(admin.ModelAdmin):
+    list_display = ['name', 'position', 'hours_refreshed', 'last_run_at']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(AnalyticsSketch)
+class AnalyticsSketchAdmin(admin.ModelAdmin):
+    list_display = ['day', 'metric', 'project', 'precision', 'updated_at']
+    list_filter = ['metric', 'day']
+    raw_id_fields = ['project']
+    exclude = ['registers']
+
+
+@admin.register(AnalyticsArchive)
+class AnalyticsArchiveAdmin(admin.ModelAdmin):
+    list_display = ['month', 'format', 'row_count', 'size_bytes', 'archived_at', 'dropped_at']
+    readonly_fields = ['archived_at']
+
+
+@admin.register(DeveloperDashboardSnapshot)
+class DeveloperDashboardSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['developer', 'projects_total', 'bookings_total', 'revenue_total', 'computed_at', 'updated_at']
+    raw_id_fields = ['developer', 'user']
+    readonly_fields = ['updated_at']
@@ -9,7 +9,13 @@ from decimal import Decimal
 from projects.models import Project, Property, Booking
 from payments.models import Payment
 from users.models import CustomUser
-from .models import AnalyticsEvent, AnalyticsMetric
+from .models import AnalyticsEvent, AnalyticsMetric, BookingHourlyRollup
+from .rollup_service import aggregate_with_rollups, rollup_scope
+from .sketch_service import estimate_distinct
+from .snapshot_service import get_builder_dashboard
+from .timeseries_service import (
+    PENDING_STATUSES, REVENUE_STATUSES, booking_scope, payment_scope, get_time_series
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -44,316 +50,260 @@ class AnalyticsService:
             return None
     
     @staticmethod
-    def calculate_daily_metrics(date=None):
-        """Calculate daily analytics metrics for a specific date"""
-        if date is None:
-            date = timezone.now().date()
-        
-        # Start and end of day
+    def compute_daily_metric_values(date):
+        """
+        Compute the daily metric fields for a date
+
+        Each source table is scanned once with conditional aggregates, so a day
+        costs six queries regardless of how many metrics are derived from it.
+        Active users and unique visitors come from the daily HyperLogLog sketches.
+        Running totals are counted as of the end of the day; unit status counts
+        are a snapshot of the current inventory.
+        """
         start_datetime = timezone.make_aware(datetime.combine(date, datetime.min.time()))
         end_datetime = start_datetime + timedelta(days=1)
-        
-        # User Metrics
-        total_users = CustomUser.objects.count()
-        new_users = CustomUser.objects.filter(created_at__gte=start_datetime, created_at__lt=end_datetime).count()
-        active_users = AnalyticsEvent.objects.filter(
-            created_at__gte=start_datetime,
-            created_at__lt=end_datetime
-        ).values('user').distinct().count()
-        
-        # Project Metrics
-        total_projects = Project.objects.count()
-        new_projects = Project.objects.filter(created_at__gte=start_datetime, created_at__lt=end_datetime).count()
-        project_views = AnalyticsEvent.objects.filter(
-            event_type='project_view',
-            created_at__gte=start_datetime,
-            created_at__lt=end_datetime
-        ).count()
-        
-        # Property Metrics
-        total_properties = Property.objects.count()
-        available_properties = Property.objects.filter(status='available').count()
-        booked_properties = Property.objects.filter(status='booked').count()
-        sold_properties = Property.objects.filter(status='sold').count()
-        property_views = AnalyticsEvent.objects.filter(
-            event_type='property_view',
-            created_at__gte=start_datetime,
-            created_at__lt=end_datetime
-        ).count()
-        
-        # Booking Metrics
-        total_bookings = Booking.objects.count()
-        new_bookings = Booking.objects.filter(created_at__gte=start_datetime, created_at__lt=end_datetime).count()
-        confirmed_bookings = Booking.objects.filter(status='confirmed', created_at__gte=start_datetime, created_at__lt=end_datetime).count()
-        cancelled_bookings = Booking.objects.filter(status='cancelled', created_at__gte=start_datetime, created_at__lt=end_datetime).count()
-        completed_bookings = Booking.objects.filter(status='completed', created_at__gte=start_datetime, created_at__lt=end_datetime).count()
-        
-        # Revenue Metrics
-        revenue_data = Payment.objects.filter(
-            status='completed',
-            created_at__gte=start_datetime,
-            created_at__lt=end_datetime
-        ).aggregate(
-            total=Sum('amount', default=Decimal('0'))
+        in_day = Q(created_at__gte=start_datetime, created_at__lt=end_datetime)
+        zero = Decimal('0')
+
+        users = CustomUser.objects.aggregate(
+            total=Count('id', filter=Q(created_at__lt=end_datetime)),
+            new=Count('id', filter=in_day),
         )
-        payment_amount = revenue_data['total'] or Decimal('0')
-        
-        booking_revenue = Booking.objects.filter(
-            status__in=['confirmed', 'token_paid', 'payment_in_progress', 'completed'],
-            created_at__gte=start_datetime,
-            created_at__lt=end_datetime
-        ).aggregate(
-            total=Sum('total_amount', default=Decimal('0'))
-        )['total'] or Decimal('0')
-        
-        token_revenue = Booking.objects.filter(
-            status__in=['token_paid', 'confirmed', 'payment_in_progress', 'completed'],
-            created_at__gte=start_datetime,
-            created_at__lt=end_datetime
-        ).aggregate(
-            total=Sum('token_amount', default=Decimal('0'))
-        )['total'] or Decimal('0')
-        
-        pending_revenue = Booking.objects.filter(
-            status__in=['pending', 'token_paid', 'confirmed'],
-            created_at__gte=start_datetime,
-            created_at__lt=end_datetime
-        ).aggregate(
-            total=Sum('amount_due', default=Decimal('0'))
-        )['total'] or Decimal('0')
-        
-        total_revenue = booking_revenue
-        
-        # Payment Metrics
-        total_payments = Payment.objects.filter(created_at__gte=start_datetime, created_at__lt=end_datetime).count()
-        completed_payments = Payment.objects.filter(status='completed', created_at__gte=start_datetime, created_at__lt=end_datetime).count()
-        failed_payments = Payment.objects.filter(status='failed', created_at__gte=start_datetime, created_at__lt=end_datetime).count()
-        
+        projects = Project.objects.aggregate(
+            total=Count('id', filter=Q(created_at__lt=end_datetime)),
+            new=Count('id', filter=in_day),
+        )
+        properties = Property.objects.aggregate(
+            total=Count('id'),
+            available=Count('id', filter=Q(status='available')),
+            booked=Count('id', filter=Q(status='booked')),
+            sold=Count('id', filter=Q(status='sold')),
+        )
+        bookings = Booking.objects.aggregate(
+            total=Count('id', filter=Q(created_at__lt=end_datetime)),
+            new=Count('id', filter=in_day),
+            confirmed=Count('id', filter=in_day & Q(status='confirmed')),
+            cancelled=Count('id', filter=in_day & Q(status='cancelled')),
+            completed=Count('id', filter=in_day & Q(status='completed')),
+            booking_revenue=Sum('total_amount', default=zero, filter=in_day & Q(
+                status__in=['confirmed', 'token_paid', 'payment_in_progress', 'completed']
+            )),
+            token_revenue=Sum('token_amount', default=zero, filter=in_day & Q(
+                status__in=['token_paid', 'confirmed', 'payment_in_progress', 'completed']
+            )),
+            pending_revenue=Sum('amount_due', default=zero, filter=in_day & Q(
+                status__in=['pending', 'token_paid', 'confirmed']
+            )),
+        )
+        payments = Payment.objects.filter(in_day).aggregate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(status='completed')),
+            failed=Count('id', filter=Q(status='failed')),
+            amount=Sum('amount', default=zero, filter=Q(status='completed')),
+        )
+        events = AnalyticsEvent.objects.filter(in_day).aggregate(
+            project_views=Count('id', filter=Q(event_type='project_view')),
+            property_views=Count('id', filter=Q(event_type='property_view')),
+            page_views=Count('id', filter=Q(event_type='page_view')),
+        )
+
         # Conversion Metrics
-        property_views_count = property_views
-        booking_conversion_rate = Decimal('0')
-        if property_views_count > 0:
-            booking_conversion_rate = (Decimal(str(new_bookings)) / Decimal(str(property_views_count))) * Decimal('100')
-        
-        booking_count = new_bookings
-        payment_conversion_rate = Decimal('0')
-        if booking_count > 0:
-            payment_conversion_rate = (Decimal(str(completed_payments)) / Decimal(str(booking_count))) * Decimal('100')
-        
-        # Engagement Metrics
-        page_views = AnalyticsEvent.objects.filter(
-            event_type='page_view',
-            created_at__gte=start_datetime,
-            created_at__lt=end_datetime
-        ).count()
-        
-        unique_visitors = AnalyticsEvent.objects.filter(
-            created_at__gte=start_datetime,
-            created_at__lt=end_datetime
-        ).values('session_id').distinct().count()
-        
-        # Create or update metric
+        booking_conversion_rate = zero
+        if events['property_views'] > 0:
+            booking_conversion_rate = (Decimal(str(bookings['new'])) / Decimal(str(events['property_views']))) * Decimal('100')
+
+        payment_conversion_rate = zero
+        if bookings['new'] > 0:
+            payment_conversion_rate = (Decimal(str(payments['completed'])) / Decimal(str(bookings['new']))) * Decimal('100')
+
+        return {
+            'total_users': users['total'],
+            'new_users': users['new'],
+            'active_users': estimate_distinct('users', date, date),
+            'total_projects': projects['total'],
+            'new_projects': projects['new'],
+            'project_views': events['project_views'],
+            'total_properties': properties['total'],
+            'available_properties': properties['available'],
+            'booked_properties': properties['booked'],
+            'sold_properties': properties['sold'],
+            'property_views': events['property_views'],
+            'total_bookings': bookings['total'],
+            'new_bookings': bookings['new'],
+            'confirmed_bookings': bookings['confirmed'],
+            'cancelled_bookings': bookings['cancelled'],
+            'completed_bookings': bookings['completed'],
+            'total_revenue': bookings['booking_revenue'],
+            'booking_revenue': bookings['booking_revenue'],
+            'token_revenue': bookings['token_revenue'],
+            'pending_revenue': bookings['pending_revenue'],
+            'total_payments': payments['total'],
+            'completed_payments': payments['completed'],
+            'failed_payments': payments['failed'],
+            'payment_amount': payments['amount'],
+            'booking_conversion_rate': booking_conversion_rate,
+            'payment_conversion_rate': payment_conversion_rate,
+            'page_views': events['page_views'],
+            'unique_visitors': estimate_distinct('visitors', date, date),
+        }
+
+    @staticmethod
+    def calculate_daily_metrics(date=None):
+        """Calculate daily analytics metrics for a specific date"""
+        if date is None:
+            date = timezone.now().date()
+
         metric, created = AnalyticsMetric.objects.update_or_create(
             metric_type='daily',
             date=date,
-            defaults={
-                'total_users': total_users,
-                'new_users': new_users,
-                'active_users': active_users,
-                'total_projects': total_projects,
-                'new_projects': new_projects,
-                'project_views': project_views,
-                'total_properties': total_properties,
-                'available_properties': available_properties,
-                'booked_properties': booked_properties,
-                'sold_properties': sold_properties,
-                'property_views': property_views,
-                'total_bookings': total_bookings,
-                'new_bookings': new_bookings,
-                'confirmed_bookings': confirmed_bookings,
-                'cancelled_bookings': cancelled_bookings,
-                'completed_bookings': completed_bookings,
-                'total_revenue': total_revenue,
-                'booking_revenue': booking_revenue,
-                'token_revenue': token_revenue,
-                'pending_revenue': pending_revenue,
-                'total_payments': total_payments,
-                'completed_payments': completed_payments,
-                'failed_payments': failed_payments,
-                'payment_amount': payment_amount,
-                'booking_conversion_rate': booking_conversion_rate,
-                'payment_conversion_rate': payment_conversion_rate,
-                'page_views': page_views,
-                'unique_visitors': unique_visitors,
-            }
+            defaults=AnalyticsService.compute_daily_metric_values(date)
         )
-        
+
         return metric
+
+    @staticmethod
+    def upsert_daily_metrics(values_by_date):
+        """Insert or update many daily metric rows in one statement per batch"""
+        if not values_by_date:
+            return 0
+        metrics = [
+            AnalyticsMetric(metric_type='daily', date=date, **values)
+            for date, values in values_by_date.items()
+        ]
+        update_fields = list(next(iter(values_by_date.values())).keys()) + ['updated_at']
+        AnalyticsMetric.objects.bulk_create(
+            metrics,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['metric_type', 'date'],
+            update_fields=update_fields,
+        )
+        return len(metrics)
     
     @staticmethod
     def get_dashboard_stats(user=None, date_from=None, date_to=None):
-        """Get dashboard statistics"""
+        """
+        Get dashboard statistics
+
+        Booking counts and revenue come from the hourly booking rollups plus the
+        raw rows after the rollup watermark (buyers read their own rows directly);
+        active users are estimated from HyperLogLog sketches. Builders read their
+        precomputed dashboard snapshot when the range fits its per-day window.
+        """
         if date_from is None:
             date_from = timezone.now().date() - timedelta(days=30)
         if date_to is None:
             date_to = timezone.now().date()
         
-        start_datetime = timezone.make_aware(datetime.combine(date_from, datetime.min.time()))
-        end_datetime = timezone.make_aware(datetime.combine(date_to, datetime.max.time())) + timedelta(days=1)
+        is_admin = user is None or user.is_staff
+        if not is_admin and user.role == 'builder':
+            stats = get_builder_dashboard(user, date_from, date_to)
+            if stats is not None:
+                return stats
         
-        # Filter by user if provided (for builder/buyer dashboards)
-        user_filter = Q()
-        if user:
-            if user.role == 'builder':
-                # Builder can see their own projects' analytics
-                user_filter = Q(project__developer__user=user) | Q(booking__property__project__developer__user=user)
-            elif user.role == 'buyer':
-                # Buyer can see their own bookings
-                user_filter = Q(booking__buyer=user)
+        start_datetime = timezone.make_aware(datetime.combine(date_from, datetime.min.time()))
+        end_datetime = timezone.make_aware(datetime.combine(date_to, datetime.min.time())) + timedelta(days=1)
         
-        # Base queries
+        # Base queries, scoped for builder/buyer dashboards
         bookings_query = Booking.objects.all()
         payments_query = Payment.objects.all()
         projects_query = Project.objects.all()
         properties_query = Property.objects.all()
+        rollup_filter = rollup_scope(user)
         
-        # Apply user filter if provided
-        if user_filter:
-            bookings_query = bookings_query.filter(user_filter)
-            # For payments, filter by booking or user
-            if user and user.role == 'builder':
-                payments_query = payments_query.filter(booking__property__project__developer__user=user)
-            elif user and user.role == 'buyer':
-                payments_query = payments_query.filter(user=user)
-            if user and user.role == 'builder':
+        if not is_admin:
+            bookings_query = bookings_query.filter(booking_scope(user))
+            payments_query = payments_query.filter(payment_scope(user))
+            if user.role == 'builder':
                 projects_query = projects_query.filter(developer__user=user)
                 properties_query = properties_query.filter(project__developer__user=user)
         
+        booking_rollups = BookingHourlyRollup.objects.filter(rollup_filter) if rollup_filter is not None else None
+        zero = Decimal('0')
+        booking_totals = aggregate_with_rollups('booking', bookings_query, booking_rollups, {
+            'total': (Count('id'), Sum('booking_count')),
+            'revenue': (
+                Sum('total_amount', default=zero, filter=Q(status__in=REVENUE_STATUSES)),
+                Sum('total_amount', default=zero, filter=Q(status__in=REVENUE_STATUSES)),
+            ),
+            'pending': (
+                Sum('amount_due', default=zero, filter=Q(status__in=PENDING_STATUSES)),
+                Sum('amount_due', default=zero, filter=Q(status__in=PENDING_STATUSES)),
+            ),
+        })[None]
+        booking_period = aggregate_with_rollups('booking', bookings_query, booking_rollups, {
+            'new': (Count('id'), Sum('booking_count')),
+            'confirmed': (Count('id', filter=Q(status='confirmed')), Sum('booking_count', filter=Q(status='confirmed'))),
+        }, start=start_datetime, end=end_datetime)[None]
+        
+        users = CustomUser.objects.aggregate(
+            total=Count('id'),
+            new=Count('id', filter=Q(created_at__gte=start_datetime, created_at__lt=end_datetime)),
+        ) if is_admin else {'total': 1, 'new': 0}
+        projects = projects_query.aggregate(
+            total=Count('id'),
+            new=Count('id', filter=Q(created_at__gte=start_datetime, created_at__lt=end_datetime)),
+        )
+        properties = properties_query.aggregate(
+            total=Count('id'),
+            available=Count('id', filter=Q(status='available')),
+            booked=Count('id', filter=Q(status='booked')),
+            sold=Count('id', filter=Q(status='sold')),
+        )
+        payments = payments_query.filter(created_at__gte=start_datetime, created_at__lt=end_datetime).aggregate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(status='completed')),
+        )
+        
+        # Distinct users are estimated by merging daily sketches (per project for builders)
+        if is_admin:
+            active_users = estimate_distinct('users', date_from, date_to)
+        elif user.role == 'builder':
+            active_users = estimate_distinct(
+                'users', date_from, date_to, project_ids=list(projects_query.values_list('id', flat=True))
+            )
+        else:
+            active_users = 1
+        
         # Overall Stats
         stats = {
             'users': {
-                'total': CustomUser.objects.count() if not user or user.is_staff else 1,
-                'new': CustomUser.objects.filter(created_at__gte=start_datetime, created_at__lt=end_datetime).count() if not user or user.is_staff else 0,
-                'active': AnalyticsEvent.objects.filter(
-                    created_at__gte=start_datetime,
-                    created_at__lt=end_datetime
-                ).values('user').distinct().count() if not user or user.is_staff else 1,
-            },
-            'projects': {
-                'total': projects_query.count(),
-                'new': projects_query.filter(created_at__gte=start_datetime, created_at__lt=end_datetime).count(),
-            },
-            'properties': {
-                'total': properties_query.count(),
-                'available': properties_query.filter(status='available').count(),
-                'booked': properties_query.filter(status='booked').count(),
-                'sold': properties_query.filter(status='sold').count(),
+                'total': users['total'],
+                'new': users['new'],
+                'active': active_users,
             },
+            'projects': projects,
+            'properties': properties,
             'bookings': {
-                'total': bookings_query.count(),
-                'new': bookings_query.filter(created_at__gte=start_datetime, created_at__lt=end_datetime).count(),
-                'confirmed': bookings_query.filter(
-                    status='confirmed',
-                    created_at__gte=start_datetime,
-                    created_at__lt=end_datetime
-                ).count(),
+                'total': booking_totals['total'],
+                'new': booking_period['new'],
+                'confirmed': booking_period['confirmed'],
             },
             'revenue': {
-                'total': float(bookings_query.filter(
-                    status__in=['confirmed', 'token_paid', 'payment_in_progress', 'completed']
-                ).aggregate(total=Sum('total_amount', default=Decimal('0')))['total'] or Decimal('0')),
-                'pending': float(bookings_query.filter(
-                    status__in=['pending', 'token_paid', 'confirmed']
-                ).aggregate(total=Sum('amount_due', default=Decimal('0')))['total'] or Decimal('0')),
-            },
-            'payments': {
-                'total': payments_query.filter(
-                    created_at__gte=start_datetime,
-                    created_at__lt=end_datetime
-                ).count(),
-                'completed': payments_query.filter(
-                    status='completed',
-                    created_at__gte=start_datetime,
-                    created_at__lt=end_datetime
-                ).count(),
+                'total': float(booking_totals['revenue']),
+                'pending': float(booking_totals['pending']),
             },
+            'payments': payments,
         }
         
         return stats
     
     @staticmethod
-    def get_revenue_chart_data(user=None, days=30):
+    def get_revenue_chart_data(user=None, days=30, granularity='day'):
         """Get revenue chart data for the last N days"""
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=days)
-        
-        dates = []
-        revenue = []
-        
-        current_date = start_date
-        while current_date <= end_date:
-            dates.append(current_date.isoformat())
-            
-            # Calculate revenue for this date
-            start_datetime = timezone.make_aware(datetime.combine(current_date, datetime.min.time()))
-            end_datetime = start_datetime + timedelta(days=1)
-            
-            user_filter = Q()
-            if user and user.role == 'builder':
-                user_filter = Q(property__project__developer__user=user)
-            elif user and user.role == 'buyer':
-                user_filter = Q(buyer=user)
-            
-            daily_revenue = Booking.objects.filter(
-                user_filter,
-                status__in=['confirmed', 'token_paid', 'payment_in_progress', 'completed'],
-                created_at__gte=start_datetime,
-                created_at__lt=end_datetime
-            ).aggregate(total=Sum('total_amount', default=Decimal('0')))['total'] or Decimal('0')
-            
-            revenue.append(float(daily_revenue))
-            
-            current_date += timedelta(days=1)
-        
+        end_date = timezone.localdate()
+        data = get_time_series(['revenue'], granularity, end_date - timedelta(days=days), end_date, user=user)
         return {
-            'dates': dates,
-            'revenue': revenue,
+            'dates': data['dates'],
+            'revenue': data['series']['revenue'],
         }
     
     @staticmethod
-    def get_booking_chart_data(user=None, days=30):
+    def get_booking_chart_data(user=None, days=30, granularity='day'):
         """Get booking chart data for the last N days"""
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=days)
-        
-        dates = []
-        bookings = []
-        
-        current_date = start_date
-        while current_date <= end_date:
-            dates.append(current_date.isoformat())
-            
-            start_datetime = timezone.make_aware(datetime.combine(current_date, datetime.min.time()))
-            end_datetime = start_datetime + timedelta(days=1)
-            
-            user_filter = Q()
-            if user and user.role == 'builder':
-                user_filter = Q(property__project__developer__user=user)
-            elif user and user.role == 'buyer':
-                user_filter = Q(buyer=user)
-            
-            daily_bookings = Booking.objects.filter(
-                user_filter,
-                created_at__gte=start_datetime,
-                created_at__lt=end_datetime
-            ).count()
-            
-            bookings.append(daily_bookings)
-            
-            current_date += timedelta(days=1)
-        
+        end_date = timezone.localdate()
+        data = get_time_series(['bookings'], granularity, end_date - timedelta(days=days), end_date, user=user)
         return {
-            'dates': dates,
-            'bookings': bookings,
+            'dates': data['dates'],
+            'bookings': data['series']['bookings'],
         }
-
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AnalyticsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'analytics'
+    
+    def ready(self):
+        """Import signals when app is ready"""
+        import analytics.signals  # noqa
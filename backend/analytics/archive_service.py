@@ -0,0 +1,353 @@
+"""
+Event Archive Service for ApnaGhar analytics
+Exports months of AnalyticsEvent rows past the retention window to compressed
+files and drops them from the database. Files are laid out by month and event
+type, so readers skip whole files on date and event_type predicates:
+
+    <ANALYTICS_ARCHIVE_DIR>/month=2025-01/event_type=page_view.parquet
+    <ANALYTICS_ARCHIVE_DIR>/month=2025-01/manifest.json
+
+Parquet (via pyarrow, when installed) keeps rows sorted by created_at in
+row groups with min/max statistics; without pyarrow each file is gzipped NDJSON.
+"""
+
+import gzip
+import json
+import logging
+import os
+import shutil
+import uuid
+from datetime import date, datetime, timezone as dt_timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+from django.conf import settings
+from django.utils import timezone
+
+from .models import AnalyticsArchive, AnalyticsEvent
+from .partition_service import add_months, drop_partition, ensure_partitions, list_partitions, month_bounds, month_start
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
+    pq = None
+
+ANALYTICS_ARCHIVE_DIR = getattr(
+    settings, 'ANALYTICS_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'analytics_archive')
+)
+# Months of events kept in the database, counting the current month
+ANALYTICS_EVENT_RETENTION_MONTHS = getattr(settings, 'ANALYTICS_EVENT_RETENTION_MONTHS', 13)
+# 'parquet', 'ndjson' or 'auto' (parquet when pyarrow is installed)
+ANALYTICS_ARCHIVE_FORMAT = getattr(settings, 'ANALYTICS_ARCHIVE_FORMAT', 'auto')
+ANALYTICS_ARCHIVE_ROW_GROUP_SIZE = getattr(settings, 'ANALYTICS_ARCHIVE_ROW_GROUP_SIZE', 50000)
+
+COLUMNS = [
+    'id', 'event_type', 'user_id', 'session_id', 'ip_address', 'user_agent',
+    'related_object_type', 'related_object_id', 'metadata', 'properties',
+    'country', 'region', 'city', 'created_at',
+]
+EXTENSIONS = {'parquet': '.parquet', 'ndjson': '.ndjson.gz'}
+
+
+class ArchiveError(Exception):
+    """Raised when a month cannot be archived safely"""
+    pass
+
+
+def resolve_format(archive_format: Optional[str] = None) -> str:
+    archive_format = archive_format or ANALYTICS_ARCHIVE_FORMAT
+    if archive_format == 'auto':
+        return 'parquet' if pq is not None else 'ndjson'
+    if archive_format == 'parquet' and pq is None:
+        raise ArchiveError('Parquet archives need pyarrow (pip install pyarrow)')
+    if archive_format not in EXTENSIONS:
+        raise ArchiveError(f"Unknown archive format: {archive_format}")
+    return archive_format
+
+
+def month_dir(month: date, root: Optional[str] = None) -> str:
+    return os.path.join(root or ANALYTICS_ARCHIVE_DIR, f"month={month:%Y-%m}")
+
+
+def _serialize(row: tuple) -> Dict:
+    record = dict(zip(COLUMNS, row))
+    for key in ('id', 'user_id', 'related_object_id'):
+        if record[key] is not None:
+            record[key] = str(record[key])
+    # JSON columns stay JSON text so the columnar schema is fixed
+    record['metadata'] = json.dumps(record['metadata'] or {}, sort_keys=True)
+    record['properties'] = json.dumps(record['properties'] or {}, sort_keys=True)
+    record['created_at'] = record['created_at'].astimezone(dt_timezone.utc)
+    return record
+
+
+def _parquet_schema():
+    string = pyarrow.string()
+    return pyarrow.schema(
+        [(name, string) for name in COLUMNS if name != 'created_at']
+        + [('created_at', pyarrow.timestamp('us', tz='UTC'))]
+    )
+
+
+class _ParquetSink:
+    def __init__(self, path: str):
+        self.schema = _parquet_schema()
+        self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+        self.buffer: List[Dict] = []
+
+    def write(self, record: Dict) -> None:
+        self.buffer.append(record)
+        if len(self.buffer) >= ANALYTICS_ARCHIVE_ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.buffer:
+            self.writer.write_table(pyarrow.Table.from_pylist(self.buffer, schema=self.schema))
+            self.buffer = []
+
+    def close(self) -> None:
+        self.flush()
+        self.writer.close()
+
+
+class _NDJSONSink:
+    def __init__(self, path: str):
+        self.file = gzip.open(path, 'wt', encoding='utf-8')
+
+    def write(self, record: Dict) -> None:
+        self.file.write(json.dumps({**record, 'created_at': record['created_at'].isoformat()}) + '\n')
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def export_month(month: date, archive_format: Optional[str] = None, root: Optional[str] = None) -> Dict:
+    """
+    Write one month of events to the archive and return its manifest
+
+    Rows stream from the database ordered by (event_type, created_at), so only
+    one file is open at a time. Files are written to a temporary directory that
+    is renamed into place once the manifest is complete.
+    """
+    archive_format = resolve_format(archive_format)
+    target = month_dir(month, root)
+    staging = f"{target}.tmp-{uuid.uuid4().hex[:8]}"
+    os.makedirs(staging)
+
+    start, end = month_bounds(month)
+    rows = (
+        AnalyticsEvent.objects
+        .filter(created_at__gte=start, created_at__lt=end)
+        .order_by('event_type', 'created_at')
+        .values_list(*COLUMNS)
+        .iterator(chunk_size=5000)
+    )
+
+    event_types: Dict[str, int] = {}
+    sink, current = None, None
+    try:
+        for row in rows:
+            record = _serialize(row)
+            if record['event_type'] != current:
+                if sink:
+                    sink.close()
+                current = record['event_type']
+                filename = f"event_type={current}{EXTENSIONS[archive_format]}"
+                path = os.path.join(staging, filename)
+                sink = _ParquetSink(path) if archive_format == 'parquet' else _NDJSONSink(path)
+                event_types[current] = 0
+            sink.write(record)
+            event_types[current] += 1
+        if sink:
+            sink.close()
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    manifest = {
+        'month': month.isoformat(),
+        'format': archive_format,
+        'columns': COLUMNS,
+        'row_count': sum(event_types.values()),
+        'event_types': event_types,
+        'min_created_at': start.isoformat(),
+        'max_created_at': end.isoformat(),
+        'exported_at': timezone.now().isoformat(),
+    }
+    with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    if os.path.exists(target):
+        shutil.rmtree(target)
+    os.rename(staging, target)
+    manifest['path'] = target
+    manifest['size_bytes'] = sum(
+        os.path.getsize(os.path.join(target, name)) for name in os.listdir(target)
+    )
+    return manifest
+
+
+def archive_month(month: date, archive_format: Optional[str] = None, drop: bool = True) -> AnalyticsArchive:
+    """
+    Export a month, check the row count and drop the month from the database
+
+    Rollups and distinct-count sketches are refreshed first: once the rows are
+    gone they can no longer be rebuilt for that month.
+    """
+    from .rollup_service import refresh_rollups
+    if AnalyticsArchive.objects.filter(month=month, dropped_at__isnull=False).exists():
+        # Re-exporting would overwrite the files holding the rows already dropped
+        raise ArchiveError(f"{month:%Y-%m} was already archived and dropped; new rows for it need a manual export")
+    refresh_rollups()
+
+    manifest = export_month(month, archive_format)
+    start, end = month_bounds(month)
+    in_database = AnalyticsEvent.objects.filter(created_at__gte=start, created_at__lt=end).count()
+    if in_database != manifest['row_count']:
+        raise ArchiveError(
+            f"{month:%Y-%m}: exported {manifest['row_count']} rows but {in_database} are in the database; "
+            f"not dropping (events still arriving for this month?)"
+        )
+
+    archive, _ = AnalyticsArchive.objects.update_or_create(
+        month=month,
+        defaults={
+            'format': manifest['format'],
+            'path': manifest['path'],
+            'row_count': manifest['row_count'],
+            'size_bytes': manifest['size_bytes'],
+            'event_types': manifest['event_types'],
+        }
+    )
+    if drop:
+        drop_partition(month)
+        archive.dropped_at = timezone.now()
+        archive.save(update_fields=['dropped_at'])
+        logger.info(f"Archived and dropped {manifest['row_count']} analytics events for {month:%Y-%m}")
+    return archive
+
+
+def retention_cutoff(retention_months: Optional[int] = None) -> date:
+    """First month still kept in the database"""
+    retention_months = retention_months or ANALYTICS_EVENT_RETENTION_MONTHS
+    return add_months(month_start(timezone.now()), -(retention_months - 1))
+
+
+def expired_months(retention_months: Optional[int] = None) -> List[date]:
+    cutoff = retention_cutoff(retention_months)
+    return [partition['month'] for partition in list_partitions() if partition['month'] < cutoff]
+
+
+def archive_expired(
+    retention_months: Optional[int] = None,
+    archive_format: Optional[str] = None,
+    drop: bool = True
+) -> Tuple[List[AnalyticsArchive], List[str]]:
+    """
+    Create upcoming partitions, then archive every month past the retention window
+
+    Returns:
+        (archives written, error messages for months that were skipped)
+    """
+    ensure_partitions()
+    archives, errors = [], []
+    for month in expired_months(retention_months):
+        try:
+            archives.append(archive_month(month, archive_format, drop=drop))
+        except ArchiveError as e:
+            logger.error(f"Analytics archive skipped: {str(e)}")
+            errors.append(str(e))
+    return archives, errors
+
+
+def archived_months_between(start: datetime, end: datetime) -> List[date]:
+    """Months in [start, end) whose events have been dropped from the database"""
+    return list(
+        AnalyticsArchive.objects
+        .filter(dropped_at__isnull=False, month__gte=month_start(start), month__lt=end.date())
+        .values_list('month', flat=True)
+    )
+
+
+def _parse_row(record: Dict) -> Dict:
+    record['metadata'] = json.loads(record['metadata']) if record.get('metadata') else {}
+    record['properties'] = json.loads(record['properties']) if record.get('properties') else {}
+    if isinstance(record.get('created_at'), str):
+        record['created_at'] = datetime.fromisoformat(record['created_at'])
+    return record
+
+
+def scan_archive(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    event_types: Optional[List[str]] = None,
+    columns: Optional[List[str]] = None,
+    root: Optional[str] = None
+) -> Iterator[Dict]:
+    """
+    Iterate archived events matching the predicates
+
+    Months outside [date_from, date_to] and files for other event types are
+    never opened; Parquet files are further pruned by row-group statistics on
+    created_at. Rows come back as dicts with metadata/properties decoded.
+
+    Args:
+        date_from / date_to: Inclusive UTC dates (None for open-ended)
+        event_types: Only these event types (None for all)
+        columns: Subset of COLUMNS to return (None for all)
+    """
+    root = root or ANALYTICS_ARCHIVE_DIR
+    if not os.path.isdir(root):
+        return
+    start = datetime.combine(date_from, datetime.min.time(), dt_timezone.utc) if date_from else None
+    end = datetime.combine(date_to, datetime.max.time(), dt_timezone.utc) if date_to else None
+    wanted = set(event_types) if event_types else None
+    selected = columns or COLUMNS
+    read_columns = list(dict.fromkeys(list(selected) + ['created_at']))
+
+    for name in sorted(os.listdir(root)):
+        if not name.startswith('month=') or '.tmp-' in name:
+            continue
+        month = datetime.strptime(name[len('month='):], '%Y-%m').date()
+        if date_from and add_months(month, 1) <= month_start(date_from):
+            continue
+        if date_to and month > date_to:
+            continue
+
+        manifest_path = os.path.join(root, name, 'manifest.json')
+        if not os.path.exists(manifest_path):
+            continue
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+        for event_type in sorted(manifest['event_types']):
+            if wanted is not None and event_type not in wanted:
+                continue
+            path = os.path.join(root, name, f"event_type={event_type}{EXTENSIONS[manifest['format']]}")
+            yield from _read_file(path, manifest['format'], read_columns, selected, start, end)
+
+
+def _read_file(path: str, archive_format: str, read_columns, selected, start, end) -> Iterator[Dict]:
+    if archive_format == 'parquet':
+        if pq is None:
+            raise ArchiveError('Reading Parquet archives needs pyarrow (pip install pyarrow)')
+        filters = []
+        if start:
+            filters.append(('created_at', '>=', start))
+        if end:
+            filters.append(('created_at', '<=', end))
+        table = pq.read_table(path, columns=read_columns, filters=filters or None)
+        for record in table.to_pylist():
+            record = _parse_row(record)
+            yield {key: record[key] for key in selected}
+        return
+
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            record = _parse_row(json.loads(line))
+            created_at = record['created_at']
+            if (start and created_at < start) or (end and created_at > end):
+                continue
+            yield {key: record[key] for key in selected}
@@ -0,0 +1,88 @@
+"""
+Metrics Backfill Service for ApnaGhar
+Recomputes daily AnalyticsMetric rows for a date range, splitting the range
+into chunks that worker processes compute in parallel; the parent process
+upserts each finished chunk in bulk
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_BACKFILL_CHUNK_DAYS = getattr(settings, 'ANALYTICS_BACKFILL_CHUNK_DAYS', 14)
+
+
+def _worker_init() -> None:
+    # Spawned workers start from a clean interpreter and need their own Django setup
+    import django
+    django.setup()
+
+
+def _compute_chunk(dates: List[date]) -> Dict[date, Dict]:
+    """Worker entry point: metric values for each date in the chunk"""
+    from .analytics_service import AnalyticsService
+    try:
+        return {day: AnalyticsService.compute_daily_metric_values(day) for day in dates}
+    finally:
+        connections.close_all()
+
+
+def date_chunks(date_from: date, date_to: date, chunk_days: int) -> List[List[date]]:
+    """Split an inclusive date range into lists of at most chunk_days dates"""
+    days = [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+    return [days[i:i + chunk_days] for i in range(0, len(days), chunk_days)]
+
+
+def backfill_daily_metrics(
+    date_from: date,
+    date_to: date,
+    workers: Optional[int] = None,
+    chunk_days: Optional[int] = None,
+    on_chunk: Optional[Callable[[List[date]], None]] = None
+) -> int:
+    """
+    Recompute daily metrics for every date in [date_from, date_to]
+
+    Args:
+        workers: Worker processes (default: CPU count); 1 computes in-process
+        chunk_days: Dates handed to a worker at a time
+        on_chunk: Called with each chunk's dates after it is written
+
+    Returns:
+        Number of metric rows written
+    """
+    from .analytics_service import AnalyticsService
+
+    if date_to < date_from:
+        raise ValueError('date_to must not be before date_from')
+    chunks = date_chunks(date_from, date_to, chunk_days or ANALYTICS_BACKFILL_CHUNK_DAYS)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chunks)))
+
+    written = 0
+    if workers == 1:
+        for chunk in chunks:
+            values = {day: AnalyticsService.compute_daily_metric_values(day) for day in chunk}
+            written += AnalyticsService.upsert_daily_metrics(values)
+            if on_chunk:
+                on_chunk(chunk)
+        return written
+
+    # Connections must not be shared with the children
+    connections.close_all()
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_worker_init) as pool:
+        futures = {pool.submit(_compute_chunk, chunk): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            written += AnalyticsService.upsert_daily_metrics(future.result())
+            if on_chunk:
+                on_chunk(futures[future])
+
+    logger.info(f"Backfilled {written} daily metrics from {date_from} to {date_to} with {workers} workers")
+    return written
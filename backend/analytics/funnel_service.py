@@ -0,0 +1,391 @@
+"""
+Funnel & Cohort Service for ApnaGhar analytics
+Computes the view -> booking -> payment funnel and weekly signup cohorts on
+NumPy columns streamed from values_list iterators, so large reports never
+build model instances or loop in Python per user. Results are cached on the
+AnalyticsReport they were requested for.
+"""
+
+import hashlib
+import json
+import logging
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from projects.models import Booking, Project, Property
+from payments.models import Payment
+from users.models import CustomUser
+from .models import AnalyticsEvent, AnalyticsReport
+from .archive_service import archived_months_between, scan_archive
+from .rollup_service import event_project_ref
+from .timeseries_service import booking_scope, payment_scope
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_FUNNEL_CHUNK_SIZE = getattr(settings, 'ANALYTICS_FUNNEL_CHUNK_SIZE', 20000)
+# Reports whose range reaches today are recomputed after this many seconds
+ANALYTICS_FUNNEL_CACHE_TTL = getattr(settings, 'ANALYTICS_FUNNEL_CACHE_TTL', 900)
+ANALYTICS_FUNNEL_WINDOW_DAYS = getattr(settings, 'ANALYTICS_FUNNEL_WINDOW_DAYS', 30)
+ANALYTICS_COHORT_MAX_WEEKS = getattr(settings, 'ANALYTICS_COHORT_MAX_WEEKS', 52)
+FUNNEL_MAX_WINDOW_DAYS = 365
+
+VIEW_EVENT_TYPES = ['property_view', 'project_view']
+COHORT_ACTIVITIES = ('event', 'booking', 'payment')
+PERCENTILES = (50, 75, 90)
+
+DAY = 86400.0
+WEEK = 7 * DAY
+# 1970-01-01 was a Thursday; shifting by 3 days puts week boundaries on Monday
+WEEK_EPOCH_SHIFT = 3 * DAY
+
+
+class UserIndex:
+    """Maps user ids to dense integer codes shared by every loaded column"""
+
+    def __init__(self):
+        self.codes: Dict[uuid.UUID, int] = {}
+
+    def encode(self, values: Iterable) -> np.ndarray:
+        codes = self.codes
+        return np.fromiter((codes.setdefault(value, len(codes)) for value in values), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.codes)
+
+
+def _epoch(value) -> float:
+    return value.timestamp() if value is not None else np.nan
+
+
+def load_columns(queryset, user_field: str, time_field: str, index: UserIndex,
+                 chunk_size: int = ANALYTICS_FUNNEL_CHUNK_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stream (user, timestamp) pairs into NumPy arrays
+
+    Returns user codes (int64) and epoch seconds (float64, NaN when null).
+    Rows are read with a server-side cursor in chunks of chunk_size.
+    """
+    rows = queryset.exclude(**{f'{user_field}__isnull': True}).values_list(user_field, time_field).order_by()
+    return _to_arrays(rows.iterator(chunk_size=chunk_size), index, chunk_size)
+
+
+def _to_arrays(rows: Iterable[tuple], index: UserIndex, chunk_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    users, times = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.float64)]
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            users.append(index.encode(row[0] for row in chunk))
+            times.append(np.fromiter((_epoch(row[1]) for row in chunk), dtype=np.float64, count=len(chunk)))
+            chunk = []
+    if chunk:
+        users.append(index.encode(row[0] for row in chunk))
+        times.append(np.fromiter((_epoch(row[1]) for row in chunk), dtype=np.float64, count=len(chunk)))
+    return np.concatenate(users), np.concatenate(times)
+
+
+def first_per_user(users: np.ndarray, times: np.ndarray, size: int, after: Optional[np.ndarray] = None,
+                   window: Optional[float] = None) -> np.ndarray:
+    """
+    Earliest timestamp per user code, NaN for users without one
+
+    With after, only timestamps at or after after[user] (and, with window,
+    no more than window seconds later) count.
+    """
+    first = np.full(size, np.nan)
+    if not len(users):
+        return first
+    keep = ~np.isnan(times)
+    if after is not None:
+        start = after[users]
+        keep &= times >= start
+        if window is not None:
+            keep &= times <= start + window
+    users, times = users[keep], times[keep]
+    order = np.lexsort((times, users))
+    unique_users, first_index = np.unique(users[order], return_index=True)
+    first[unique_users] = times[order][first_index]
+    return first
+
+
+def _duration_stats(seconds: np.ndarray) -> Optional[Dict]:
+    if not len(seconds):
+        return None
+    hours = seconds / 3600.0
+    stats = {f'p{p}_hours': round(float(value), 2) for p, value in zip(PERCENTILES, np.percentile(hours, PERCENTILES))}
+    stats['mean_hours'] = round(float(hours.mean()), 2)
+    return stats
+
+
+def _rate(part: int, whole: int) -> float:
+    return round(part / whole * 100, 2) if whole else 0.0
+
+
+def _day_bounds(date_from: date, date_to: date) -> Tuple[datetime, datetime]:
+    start = timezone.make_aware(datetime.combine(date_from, datetime.min.time()))
+    end = timezone.make_aware(datetime.combine(date_to, datetime.min.time())) + timedelta(days=1)
+    return start, end
+
+
+def _builder_project_ids(user) -> Optional[List]:
+    if user is None or user.role != 'builder':
+        return None
+    return list(Project.objects.filter(developer__user=user).values_list('id', flat=True))
+
+
+def _view_columns(start: datetime, end: datetime, index: UserIndex, project_ids: Optional[List]):
+    """View events in [start, end), including months already moved to the archive"""
+    views = AnalyticsEvent.objects.filter(event_type__in=VIEW_EVENT_TYPES, created_at__gte=start, created_at__lt=end)
+    if project_ids is not None:
+        views = views.annotate(project_ref=event_project_ref()).filter(project_ref__in=project_ids)
+    users, times = load_columns(views, 'user_id', 'created_at', index)
+
+    if not archived_months_between(start, end):
+        return users, times
+
+    property_ids = None
+    if project_ids is not None:
+        project_ids = {str(pk) for pk in project_ids}
+        property_ids = {str(pk) for pk in Property.objects.filter(project_id__in=project_ids).values_list('id', flat=True)}
+
+    def archived_rows():
+        for record in scan_archive(
+            start.astimezone(dt_timezone.utc).date(), end.astimezone(dt_timezone.utc).date(),
+            event_types=VIEW_EVENT_TYPES,
+            columns=['user_id', 'related_object_type', 'related_object_id', 'created_at']
+        ):
+            if not record.get('user_id') or not start <= record['created_at'] < end:
+                continue
+            if project_ids is not None:
+                related = str(record.get('related_object_id') or '')
+                kind = record.get('related_object_type')
+                if not ((kind == 'project' and related in project_ids) or
+                        (kind == 'property' and related in property_ids)):
+                    continue
+            yield uuid.UUID(str(record['user_id'])), record['created_at']
+
+    archived_users, archived_times = _to_arrays(archived_rows(), index, ANALYTICS_FUNNEL_CHUNK_SIZE)
+    return np.concatenate([users, archived_users]), np.concatenate([times, archived_times])
+
+
+def compute_funnel(date_from: date, date_to: date, user=None,
+                   window_days: int = ANALYTICS_FUNNEL_WINDOW_DAYS) -> Dict:
+    """
+    View -> booking -> payment funnel for users whose first view falls in [date_from, date_to]
+
+    A user converts to a booking when they book within window_days of their
+    first view, and to a payment when a payment completes within window_days
+    of that booking. Builders only see views, bookings and payments on their
+    own projects.
+    """
+    if not isinstance(window_days, int) or not 1 <= window_days <= FUNNEL_MAX_WINDOW_DAYS:
+        raise ValueError(f"window_days must be an integer between 1 and {FUNNEL_MAX_WINDOW_DAYS}")
+    if date_from > date_to:
+        raise ValueError('date_from must not be after date_to')
+    if user is not None and user.role == 'buyer':
+        raise ValueError('Funnel reports are not available for your account')
+
+    start, end = _day_bounds(date_from, date_to)
+    # Conversions of users who viewed near date_to may land after it
+    conversion_end = end + timedelta(days=window_days)
+    window = window_days * DAY
+    project_ids = _builder_project_ids(user)
+    index = UserIndex()
+
+    view_users, view_times = _view_columns(start, end, index, project_ids)
+
+    bookings = Booking.objects.filter(created_at__gte=start, created_at__lt=conversion_end)
+    payments = Payment.objects.filter(status='completed', completed_at__gte=start, completed_at__lt=conversion_end)
+    if user is not None:
+        bookings = bookings.filter(booking_scope(user))
+        payments = payments.filter(payment_scope(user))
+    booking_users, booking_times = load_columns(bookings, 'buyer_id', 'created_at', index)
+    payment_users, payment_times = load_columns(payments, 'user_id', 'completed_at', index)
+
+    size = len(index)
+    first_view = first_per_user(view_users, view_times, size)
+    first_booking = first_per_user(booking_users, booking_times, size, after=first_view, window=window)
+    first_payment = first_per_user(payment_users, payment_times, size, after=first_booking, window=window)
+
+    viewed = ~np.isnan(first_view)
+    booked = ~np.isnan(first_booking)
+    paid = ~np.isnan(first_payment)
+    counts = [int(viewed.sum()), int(booked.sum()), int(paid.sum())]
+
+    steps = []
+    for position, (name, count) in enumerate(zip(('view', 'booking', 'payment'), counts)):
+        steps.append({
+            'step': name,
+            'users': count,
+            'conversion_rate': _rate(count, counts[position - 1]) if position else 100.0,
+            'overall_rate': _rate(count, counts[0]),
+        })
+
+    return {
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'window_days': window_days,
+        'steps': steps,
+        'time_to_convert': {
+            'view_to_booking': _duration_stats(first_booking[booked] - first_view[booked]),
+            'booking_to_payment': _duration_stats(first_payment[paid] - first_booking[paid]),
+            'view_to_payment': _duration_stats(first_payment[paid] - first_view[paid]),
+        },
+        'rows_scanned': {
+            'views': int(len(view_users)),
+            'bookings': int(len(booking_users)),
+            'payments': int(len(payment_users)),
+        },
+    }
+
+
+def _week_index(times: np.ndarray) -> np.ndarray:
+    offset = timezone.localtime().utcoffset().total_seconds()
+    return np.floor((times + offset + WEEK_EPOCH_SHIFT) / WEEK).astype(np.int64)
+
+
+def _week_start(index: int) -> date:
+    return date(1970, 1, 1) + timedelta(days=int(index) * 7 - 3)
+
+
+def compute_cohorts(date_from: date, date_to: date, activity: str = 'event',
+                    weeks: int = 12) -> Dict:
+    """
+    Weekly signup cohorts over [date_from, date_to] and their activity by week since signup
+
+    activity is 'event' (any tracked event), 'booking' or 'payment' (completed).
+    Each cohort reports its size and, for week offsets 0..weeks-1, the number
+    and share of its users active in that week. Site-wide only.
+    """
+    if activity not in COHORT_ACTIVITIES:
+        raise ValueError(f"Unknown cohort activity '{activity}', use one of: {', '.join(COHORT_ACTIVITIES)}")
+    if not isinstance(weeks, int) or not 1 <= weeks <= ANALYTICS_COHORT_MAX_WEEKS:
+        raise ValueError(f"weeks must be an integer between 1 and {ANALYTICS_COHORT_MAX_WEEKS}")
+    if date_from > date_to:
+        raise ValueError('date_from must not be after date_to')
+
+    start, end = _day_bounds(date_from, date_to)
+    activity_end = min(end + timedelta(weeks=weeks), timezone.now() + timedelta(days=1))
+    index = UserIndex()
+
+    signup_users, signup_times = load_columns(
+        CustomUser.objects.filter(created_at__gte=start, created_at__lt=end), 'id', 'created_at', index
+    )
+    cohort_size = len(index)
+
+    if activity == 'event':
+        activities = AnalyticsEvent.objects.filter(created_at__gte=start, created_at__lt=activity_end)
+        user_field, time_field = 'user_id', 'created_at'
+    elif activity == 'booking':
+        activities = Booking.objects.filter(created_at__gte=start, created_at__lt=activity_end)
+        user_field, time_field = 'buyer_id', 'created_at'
+    else:
+        activities = Payment.objects.filter(status='completed', completed_at__gte=start, completed_at__lt=activity_end)
+        user_field, time_field = 'user_id', 'completed_at'
+    activity_users, activity_times = load_columns(activities, user_field, time_field, index)
+
+    # Users first seen in the activity table did not sign up in range
+    in_cohort = activity_users < cohort_size
+    activity_users, activity_times = activity_users[in_cohort], activity_times[in_cohort]
+
+    first_cohort = int(_week_index(np.array([start.timestamp()]))[0])
+    last_cohort = int(_week_index(np.array([end.timestamp() - 1]))[0])
+    cohort_count = last_cohort - first_cohort + 1
+    signup_week = np.zeros(cohort_size, dtype=np.int64)
+    signup_week[signup_users] = _week_index(signup_times)
+
+    offsets = _week_index(activity_times) - signup_week[activity_users]
+    keep = (offsets >= 0) & (offsets < weeks)
+    # One hit per (user, offset) so a user counts once per week
+    cells = np.unique(activity_users[keep] * weeks + offsets[keep])
+    cell_users, cell_offsets = cells // weeks, cells % weeks
+
+    sizes = np.bincount(signup_week - first_cohort, minlength=cohort_count)
+    active = np.zeros((cohort_count, weeks), dtype=np.int64)
+    np.add.at(active, (signup_week[cell_users] - first_cohort, cell_offsets), 1)
+
+    # Offsets that have not happened yet are reported as null
+    current_week = _week_index(np.array([timezone.now().timestamp()]))[0]
+    cohorts = []
+    for row in range(cohort_count):
+        size = int(sizes[row])
+        elapsed = min(weeks, int(current_week - (first_cohort + row)) + 1)
+        cohorts.append({
+            'week': _week_start(first_cohort + row).isoformat(),
+            'users': size,
+            'active': [int(value) if offset < elapsed else None for offset, value in enumerate(active[row])],
+            'retention': [_rate(int(value), size) if offset < elapsed else None for offset, value in enumerate(active[row])],
+        })
+
+    return {
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'activity': activity,
+        'weeks': weeks,
+        'cohorts': cohorts,
+    }
+
+
+REPORT_BUILDERS = {
+    'funnel': compute_funnel,
+    'cohorts': compute_cohorts,
+}
+# Parameters a report's filters[kind] (or the request) may set for each builder
+REPORT_PARAMETERS = {
+    'funnel': ('window_days',),
+    'cohorts': ('activity', 'weeks'),
+}
+
+
+def _params_key(params: Dict) -> str:
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def run_report(report: AnalyticsReport, kind: str, user=None, refresh: bool = False, **options) -> Dict:
+    """
+    Compute a funnel or cohort table for a report, reusing its cached result
+
+    The result is stored in report.data[kind] together with the parameters it
+    was computed for. It is reused while the parameters match, and forever
+    once the report range lies entirely in the past.
+    """
+    if kind not in REPORT_BUILDERS:
+        raise ValueError(f"Unknown report kind: {kind}")
+    date_to = report.date_to or timezone.localdate()
+    date_from = report.date_from or date_to - timedelta(days=30)
+
+    stored = (report.filters.get(kind) if isinstance(report.filters, dict) else None) or {}
+    if not isinstance(stored, dict):
+        raise ValueError(f"Report filters for {kind} must be an object")
+    unknown = sorted(set(stored) - set(REPORT_PARAMETERS[kind])) + sorted(set(options) - set(REPORT_PARAMETERS[kind]))
+    if unknown:
+        raise ValueError(
+            f"Unknown {kind} parameter(s): {', '.join(unknown)}; "
+            f"allowed: {', '.join(REPORT_PARAMETERS[kind])}"
+        )
+    params = {'date_from': date_from, 'date_to': date_to, **stored, **options}
+    if kind == 'funnel':
+        params['scope'] = f"{user.role}:{user.pk}" if user is not None and user.role == 'builder' else 'all'
+    key = _params_key(params)
+
+    cached = (report.data or {}).get(kind)
+    if cached and not refresh and cached.get('params_key') == key:
+        computed_at = datetime.fromisoformat(cached['computed_at'])
+        if date_to < timezone.localdate() or timezone.now() - computed_at < timedelta(seconds=ANALYTICS_FUNNEL_CACHE_TTL):
+            return cached
+
+    build_options = {name: value for name, value in params.items() if name not in ('date_from', 'date_to', 'scope')}
+    if kind == 'funnel':
+        build_options['user'] = user
+    result = REPORT_BUILDERS[kind](date_from, date_to, **build_options)
+    result['params_key'] = key
+    result['computed_at'] = timezone.now().isoformat()
+
+    report.data = {**(report.data or {}), kind: result}
+    AnalyticsReport.objects.filter(pk=report.pk).update(data=report.data, updated_at=timezone.now())
+    return result
@@ -0,0 +1,221 @@
+"""
+Analytics Event Ingestion Service for ApnaGhar
+Buffers tracked events in memory and writes them with bulk_create in chunks,
+flushing when the buffer reaches the batch size or the flush interval elapses
+"""
+
+import atexit
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Tuple
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from .models import AnalyticsEvent
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT; the flusher also wakes as soon as this many events are waiting
+ANALYTICS_INGEST_BATCH_SIZE = getattr(settings, 'ANALYTICS_INGEST_BATCH_SIZE', 500)
+ANALYTICS_INGEST_FLUSH_INTERVAL = getattr(settings, 'ANALYTICS_INGEST_FLUSH_INTERVAL', 2.0)  # seconds
+ANALYTICS_INGEST_MAX_BUFFER = getattr(settings, 'ANALYTICS_INGEST_MAX_BUFFER', 20000)
+# 'drop' rejects events once the buffer is full; 'sample' starts keeping only a
+# fraction of events once it is past the high-water mark, then drops when full
+ANALYTICS_INGEST_BACKPRESSURE = getattr(settings, 'ANALYTICS_INGEST_BACKPRESSURE', 'sample')
+ANALYTICS_INGEST_HIGH_WATER = getattr(settings, 'ANALYTICS_INGEST_HIGH_WATER', 0.8)
+ANALYTICS_INGEST_SAMPLE_RATE = getattr(settings, 'ANALYTICS_INGEST_SAMPLE_RATE', 0.1)
+# Set to False to write each submitted batch inline (management commands, tests)
+ANALYTICS_INGEST_ASYNC = getattr(settings, 'ANALYTICS_INGEST_ASYNC', True)
+
+
+class EventIngestionBuffer:
+    """Bounded, thread-safe in-process event buffer with a background flusher"""
+
+    def __init__(
+        self,
+        batch_size: int = ANALYTICS_INGEST_BATCH_SIZE,
+        flush_interval: float = ANALYTICS_INGEST_FLUSH_INTERVAL,
+        max_size: int = ANALYTICS_INGEST_MAX_BUFFER,
+        policy: str = ANALYTICS_INGEST_BACKPRESSURE,
+        sample_rate: float = ANALYTICS_INGEST_SAMPLE_RATE,
+        high_water: float = ANALYTICS_INGEST_HIGH_WATER
+    ):
+        if policy not in ('drop', 'sample'):
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self.policy = policy
+        self.sample_rate = sample_rate
+        self.high_water_mark = int(max_size * high_water)
+
+        self._events = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+        self._counters = {
+            'accepted': 0,
+            'sampled_out': 0,
+            'dropped': 0,
+            'written': 0,
+            'failed': 0,
+            'flushes': 0,
+        }
+        self._last_flush_at = None
+
+    def _admit(self) -> Tuple[bool, float]:
+        """Backpressure decision for one event. Caller holds the lock."""
+        size = len(self._events)
+        if size >= self.max_size:
+            return False, 1.0
+        if self.policy == 'sample' and size >= self.high_water_mark:
+            return random.random() < self.sample_rate, self.sample_rate
+        return True, 1.0
+
+    def submit(self, events: List[Dict]) -> Dict:
+        """
+        Queue event dicts (AnalyticsEvent field values) for the next flush
+
+        Sampled events carry metadata['sample_rate'] so counts can be reweighted.
+
+        Returns:
+            {'accepted': n, 'sampled_out': n, 'dropped': n}
+        """
+        accepted = sampled_out = dropped = 0
+        with self._lock:
+            for event in events:
+                admitted, rate = self._admit()
+                if not admitted:
+                    if rate < 1.0:
+                        sampled_out += 1
+                    else:
+                        dropped += 1
+                    continue
+                if rate < 1.0:
+                    event['metadata'] = {**(event.get('metadata') or {}), 'sample_rate': rate}
+                self._events.append(AnalyticsEvent(**event))
+                accepted += 1
+
+            self._counters['accepted'] += accepted
+            self._counters['sampled_out'] += sampled_out
+            self._counters['dropped'] += dropped
+            if len(self._events) >= self.batch_size:
+                self._wakeup.notify()
+
+        if dropped or sampled_out:
+            logger.warning(
+                f"Analytics ingestion buffer under pressure: {dropped} dropped, {sampled_out} sampled out"
+            )
+        self._ensure_flusher()
+        return {'accepted': accepted, 'sampled_out': sampled_out, 'dropped': dropped}
+
+    def _drain(self) -> List[AnalyticsEvent]:
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+    def flush(self) -> int:
+        """Write everything buffered so far. Returns the number of rows written."""
+        with self._flush_lock:
+            events = self._drain()
+            written = 0
+            for start in range(0, len(events), self.batch_size):
+                chunk = events[start:start + self.batch_size]
+                try:
+                    AnalyticsEvent.objects.bulk_create(chunk, batch_size=self.batch_size)
+                    written += len(chunk)
+                except Exception as e:
+                    # Analytics is best effort: a failed chunk is counted and discarded
+                    logger.error(f"Failed to write {len(chunk)} analytics events: {str(e)}")
+                    with self._lock:
+                        self._counters['failed'] += len(chunk)
+
+            with self._lock:
+                self._counters['written'] += written
+                if events:
+                    self._counters['flushes'] += 1
+                    self._last_flush_at = time.time()
+            return written
+
+    def _ensure_flusher(self) -> None:
+        if not ANALYTICS_INGEST_ASYNC:
+            self.flush()
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped = False
+                self._thread = threading.Thread(
+                    target=self._run, name='analytics-ingestion-flusher', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            while True:
+                with self._lock:
+                    if not self._stopped and len(self._events) < self.batch_size:
+                        self._wakeup.wait(self.flush_interval)
+                    stopped = self._stopped
+                try:
+                    close_old_connections()
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"Analytics ingestion flush failed: {str(e)}", exc_info=True)
+                if stopped:
+                    break
+        finally:
+            connection.close()
+
+    def stop(self) -> None:
+        """Stop the flusher after a final flush"""
+        thread = self._thread
+        with self._lock:
+            self._stopped = True
+            self._wakeup.notify()
+        if thread is not None and thread.is_alive():
+            thread.join(timeout=self.flush_interval + 5)
+        else:
+            self.flush()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self._counters,
+                'buffered': len(self._events),
+                'max_size': self.max_size,
+                'batch_size': self.batch_size,
+                'flush_interval': self.flush_interval,
+                'policy': self.policy,
+                'sample_rate': self.sample_rate,
+                'high_water_mark': self.high_water_mark,
+                'last_flush_at': self._last_flush_at,
+                'flusher_running': self._thread is not None and self._thread.is_alive(),
+            }
+
+
+# Singleton instance (one buffer per worker process)
+_ingestion_buffer = None
+_ingestion_buffer_lock = threading.Lock()
+
+
+def get_ingestion_buffer() -> EventIngestionBuffer:
+    global _ingestion_buffer
+    if _ingestion_buffer is None:
+        with _ingestion_buffer_lock:
+            if _ingestion_buffer is None:
+                _ingestion_buffer = EventIngestionBuffer()
+                atexit.register(_ingestion_buffer.stop)
+    return _ingestion_buffer
+
+
+def ingest_events(events: List[Dict]) -> Dict:
+    """Queue a batch of event dicts on this process's ingestion buffer"""
+    return get_ingestion_buffer().submit(events)
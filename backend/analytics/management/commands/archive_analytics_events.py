@@ -0,0 +1,85 @@
+"""
+Management command to archive analytics events past the retention window
+Creates upcoming monthly partitions, exports expired months to Parquet or
+gzipped NDJSON and drops them from the database. Run monthly from cron.
+"""
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from analytics.archive_service import (
+    ANALYTICS_EVENT_RETENTION_MONTHS, ArchiveError, archive_expired, archive_month,
+    expired_months, resolve_format, retention_cutoff
+)
+from analytics.partition_service import ensure_partitions, list_partitions
+
+
+class Command(BaseCommand):
+    help = 'Archive analytics events older than the retention window and drop them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-months',
+            type=int,
+            default=ANALYTICS_EVENT_RETENTION_MONTHS,
+            help=f'Months kept in the database, including the current one (default: {ANALYTICS_EVENT_RETENTION_MONTHS})'
+        )
+        parser.add_argument(
+            '--month',
+            default=None,
+            help='Archive just this month (YYYY-MM) regardless of retention'
+        )
+        parser.add_argument(
+            '--format',
+            choices=['auto', 'parquet', 'ndjson'],
+            default=None,
+            help='Archive format (default: ANALYTICS_ARCHIVE_FORMAT)'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Export only; leave the rows in the database'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List partitions and what would be archived'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            archive_format = resolve_format(options['format'])
+        except ArchiveError as e:
+            raise CommandError(str(e))
+        if options['retention_months'] < 1:
+            raise CommandError('--retention-months must be at least 1')
+
+        if options['dry_run']:
+            cutoff = retention_cutoff(options['retention_months'])
+            self.stdout.write(self.style.WARNING(f"Keeping events from {cutoff:%Y-%m} on ({archive_format} archives)"))
+            for partition in list_partitions():
+                marker = 'archive' if partition['month'] < cutoff else 'keep'
+                self.stdout.write(f"  {partition['name']}: {partition['rows']} rows [{marker}]")
+            return
+
+        if options['month']:
+            try:
+                month = datetime.strptime(options['month'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError(f"Invalid month '{options['month']}', expected YYYY-MM")
+            ensure_partitions()
+            try:
+                archives, errors = [archive_month(month, archive_format, drop=not options['keep'])], []
+            except ArchiveError as e:
+                raise CommandError(str(e))
+        else:
+            months = expired_months(options['retention_months'])
+            self.stdout.write(self.style.WARNING(f"Archiving {len(months)} expired month(s)..."))
+            archives, errors = archive_expired(options['retention_months'], archive_format, drop=not options['keep'])
+
+        for archive in archives:
+            action = 'archived and dropped' if archive.dropped_at else 'archived'
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ {archive.month:%Y-%m}: {archive.row_count} events {action} "
+                f"({archive.size_bytes / 1024:.1f} KB {archive.format}) → {archive.path}"
+            ))
+        for error in errors:
+            self.stdout.write(self.style.ERROR(f"✗ {error}"))
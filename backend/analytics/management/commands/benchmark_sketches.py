@@ -0,0 +1,103 @@
+"""
+Management command to benchmark HyperLogLog distinct counts
+Compares sketch estimates with exact COUNT(DISTINCT) over the event table for
+a date range (accuracy and latency), or checks estimator accuracy on
+synthetic cardinalities without touching the database.
+"""
+import time
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.utils import timezone
+from analytics.hll import HyperLogLog
+from analytics.models import AnalyticsEvent
+from analytics.sketch_service import ANALYTICS_HLL_PRECISION, SKETCH_METRICS, distinct_sketch
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = 'Benchmark HyperLogLog estimates against exact distinct counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from',
+            dest='date_from',
+            default=None,
+            help='First date of the range (YYYY-MM-DD, default: 30 days ago)'
+        )
+        parser.add_argument(
+            '--to',
+            dest='date_to',
+            default=None,
+            help='Last date of the range, inclusive (YYYY-MM-DD, default: today)'
+        )
+        parser.add_argument(
+            '--synthetic',
+            type=int,
+            nargs='*',
+            default=None,
+            help='Check accuracy on synthetic cardinalities instead (default: 1000 10000 100000 1000000)'
+        )
+        parser.add_argument(
+            '--precision',
+            type=int,
+            default=ANALYTICS_HLL_PRECISION,
+            help=f'Sketch precision for --synthetic (default: {ANALYTICS_HLL_PRECISION})'
+        )
+
+    def handle(self, *args, **options):
+        if options['synthetic'] is not None:
+            self._synthetic(options['synthetic'] or [1000, 10000, 100000, 1000000], options['precision'])
+            return
+
+        date_to = _parse_date(options['date_to']) if options['date_to'] else timezone.localdate()
+        date_from = _parse_date(options['date_from']) if options['date_from'] else date_to - timedelta(days=30)
+        if date_from > date_to:
+            raise CommandError('--from must not be after --to')
+        start = timezone.make_aware(datetime.combine(date_from, datetime.min.time()))
+        end = timezone.make_aware(datetime.combine(date_to, datetime.min.time())) + timedelta(days=1)
+
+        self.stdout.write(self.style.WARNING(f"Distinct counts from {date_from} to {date_to}"))
+        self.stdout.write(f"  {'metric':<10} {'exact':>10} {'estimate':>10} {'error':>8} {'exact ms':>10} {'sketch ms':>10}")
+        for metric, column in SKETCH_METRICS.items():
+            started = time.perf_counter()
+            exact = AnalyticsEvent.objects.filter(
+                created_at__gte=start, created_at__lt=end
+            ).aggregate(n=Count(column, distinct=True))['n']
+            exact_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            estimate = distinct_sketch(metric, date_from, date_to).count()
+            sketch_ms = (time.perf_counter() - started) * 1000
+
+            error = abs(estimate - exact) / exact * 100 if exact else 0.0
+            self.stdout.write(
+                f"  {metric:<10} {exact:>10} {estimate:>10} {error:>7.2f}% {exact_ms:>10.1f} {sketch_ms:>10.1f}"
+            )
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark complete (run refresh_rollups first so sketches are current)'))
+
+    def _synthetic(self, cardinalities, precision):
+        expected = 1.04 / (1 << precision) ** 0.5 * 100
+        self.stdout.write(self.style.WARNING(
+            f"Synthetic accuracy at precision {precision} (expected standard error {expected:.2f}%)"
+        ))
+        self.stdout.write(f"  {'actual':>10} {'estimate':>10} {'error':>8} {'add ms':>10} {'count ms':>10} {'bytes':>7}")
+        for n in cardinalities:
+            sketch = HyperLogLog(precision)
+            started = time.perf_counter()
+            sketch.update(f"session-{i}" for i in range(n))
+            add_ms = (time.perf_counter() - started) * 1000
+            started = time.perf_counter()
+            estimate = sketch.count()
+            count_ms = (time.perf_counter() - started) * 1000
+            error = abs(estimate - n) / n * 100 if n else 0.0
+            self.stdout.write(
+                f"  {n:>10} {estimate:>10} {error:>7.2f}% {add_ms:>10.1f} {count_ms:>10.2f} {len(sketch.to_bytes()):>7}"
+            )
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark complete'))
@@ -0,0 +1,65 @@
+"""
+Management command to generate queued analytics reports
+Claims pending AnalyticsReports and writes their gzipped CSV/NDJSON exports.
+Run once (e.g. from cron) or with --loop as a long-running worker; several
+workers can run side by side.
+"""
+import time
+from django.core.management.base import BaseCommand, CommandError
+from analytics.models import AnalyticsReport
+from analytics.report_service import generate_report, process_pending_reports
+
+
+class Command(BaseCommand):
+    help = 'Generate queued analytics report exports'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and poll for queued reports every --interval'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=5,
+            help='Seconds between polls when --loop is set (default: 5)'
+        )
+        parser.add_argument(
+            '--report',
+            default=None,
+            help='Generate this report id now, whatever its status'
+        )
+
+    def handle(self, *args, **options):
+        if options['report']:
+            try:
+                report = AnalyticsReport.objects.get(pk=options['report'])
+            except (AnalyticsReport.DoesNotExist, ValueError):
+                raise CommandError(f"Report {options['report']} not found")
+            self._report(generate_report(report))
+            return
+
+        if not options['loop']:
+            self._process_once()
+            return
+
+        self.stdout.write(self.style.WARNING(f"Polling for queued reports every {options['interval']}s (Ctrl+C to stop)..."))
+        try:
+            while True:
+                self._process_once()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\nReport worker stopped'))
+
+    def _process_once(self):
+        for report in process_pending_reports():
+            self._report(report)
+
+    def _report(self, report):
+        if report.status == 'completed':
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ {report.name} ({report.report_type}): {report.row_count} rows, {report.file_size} bytes"
+            ))
+        else:
+            self.stdout.write(self.style.ERROR(f"✗ {report.name} ({report.report_type}): {report.error}"))
@@ -0,0 +1,24 @@
+"""
+Management command to recompute builder dashboard snapshots
+Signals keep snapshots current between runs; run this nightly (e.g. from cron)
+to correct drift from bulk updates that bypass signals.
+"""
+from django.core.management.base import BaseCommand
+from analytics.snapshot_service import recompute_all_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Recompute builder dashboard snapshots from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--developer',
+            type=int,
+            action='append',
+            default=None,
+            help='Only recompute this developer id (repeatable)'
+        )
+
+    def handle(self, *args, **options):
+        count = recompute_all_snapshots(options['developer'])
+        self.stdout.write(self.style.SUCCESS(f"✓ Recomputed {count} dashboard snapshots"))
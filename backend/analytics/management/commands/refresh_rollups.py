@@ -0,0 +1,76 @@
+"""
+Management command to refresh the hourly analytics rollups
+Folds events and booking changes past each watermark into the rollup tables.
+Run once (e.g. from cron) or with --loop as a long-running worker.
+"""
+import time
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from analytics.rollup_service import refresh_rollups, rebuild_rollups
+
+
+def _parse_date(value):
+    try:
+        return timezone.make_aware(datetime.strptime(value, '%Y-%m-%d'))
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = 'Refresh hourly analytics rollups from events and bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and refresh once per --interval'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=60,
+            help='Seconds between refreshes when --loop is set (default: 60)'
+        )
+        parser.add_argument(
+            '--rebuild-from',
+            default=None,
+            help='Recompute every rollup hour from this date (YYYY-MM-DD) instead of refreshing'
+        )
+        parser.add_argument(
+            '--rebuild-to',
+            default=None,
+            help='Last date to recompute with --rebuild-from, inclusive (default: today)'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild_from']:
+            start = _parse_date(options['rebuild_from'])
+            end = _parse_date(options['rebuild_to']) if options['rebuild_to'] else timezone.now()
+            end = end.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+            try:
+                results = rebuild_rollups(start, end)
+            except ValueError as e:
+                raise CommandError(str(e))
+            for result in results:
+                self.stdout.write(self.style.SUCCESS(f"✓ Rebuilt {result['source']} rollups: {result['rows']} rows"))
+            return
+
+        if not options['loop']:
+            self._refresh_once()
+            return
+
+        self.stdout.write(self.style.WARNING(f"Refreshing rollups every {options['interval']}s (Ctrl+C to stop)..."))
+        try:
+            while True:
+                self._refresh_once()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\nRollup refresh stopped'))
+
+    def _refresh_once(self):
+        for result in refresh_rollups():
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ {result['source']}: refreshed {result['hours']} hours ({result['rows']} rollup rows), "
+                f"watermark {result['watermark']:%Y-%m-%d %H:%M:%S}"
+            ))
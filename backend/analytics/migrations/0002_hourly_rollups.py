@@ -0,0 +1,70 @@
+# Generated by Django 5.2.6 on 2026-10-18 23:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_create_analytics_models'),
+        ('projects', '0013_booking_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('position', models.DateTimeField(blank=True, null=True)),
+                ('hours_refreshed', models.BigIntegerField(default=0)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Rollup Watermark',
+                'verbose_name_plural': 'Rollup Watermarks',
+                'db_table': 'analytics_rollup_watermarks',
+            },
+        ),
+        migrations.CreateModel(
+            name='BookingHourlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('status', models.CharField(max_length=30)),
+                ('booking_count', models.IntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('token_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('amount_due', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('developer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='projects.developer')),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='projects.project')),
+            ],
+            options={
+                'verbose_name': 'Booking Hourly Rollup',
+                'verbose_name_plural': 'Booking Hourly Rollups',
+                'db_table': 'analytics_booking_hourly_rollups',
+                'ordering': ['-hour'],
+                'indexes': [models.Index(fields=['hour', 'status'], name='analytics_b_hour_b65807_idx'), models.Index(fields=['developer', 'hour'], name='analytics_b_develop_ab7163_idx'), models.Index(fields=['project', 'hour'], name='analytics_b_project_701b78_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EventHourlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('event_type', models.CharField(max_length=50)),
+                ('event_count', models.IntegerField(default=0)),
+                ('developer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='projects.developer')),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='projects.project')),
+            ],
+            options={
+                'verbose_name': 'Event Hourly Rollup',
+                'verbose_name_plural': 'Event Hourly Rollups',
+                'db_table': 'analytics_event_hourly_rollups',
+                'ordering': ['-hour'],
+                'indexes': [models.Index(fields=['hour', 'event_type'], name='analytics_e_hour_7b7163_idx'), models.Index(fields=['developer', 'hour'], name='analytics_e_develop_3b41fe_idx'), models.Index(fields=['project', 'hour'], name='analytics_e_project_045d73_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 23:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_hourly_rollups'),
+        ('projects', '0013_booking_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('metric', models.CharField(choices=[('visitors', 'Unique Visitors (session_id)'), ('users', 'Active Users (user)')], max_length=20)),
+                ('precision', models.PositiveSmallIntegerField()),
+                ('registers', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='projects.project')),
+            ],
+            options={
+                'verbose_name': 'Analytics Sketch',
+                'verbose_name_plural': 'Analytics Sketches',
+                'db_table': 'analytics_sketches',
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['metric', 'day'], name='analytics_s_metric_217a9a_idx'), models.Index(fields=['project', 'metric', 'day'], name='analytics_s_project_2e9113_idx')],
+            },
+        ),
+    ]
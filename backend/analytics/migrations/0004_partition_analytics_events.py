@@ -0,0 +1,126 @@
+# Converts analytics_events into a table range-partitioned by month on created_at.
+# PostgreSQL only; on other backends partitions are emulated by
+# analytics/partition_service.py and this migration does nothing.
+
+from datetime import date
+
+from django.db import migrations
+
+TABLE = 'analytics_events'
+LEGACY = 'analytics_events_unpartitioned'
+MONTHS_AHEAD = 3
+
+
+def _add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_events(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [TABLE])
+        if cursor.fetchone()[0] == 'p':
+            return
+
+        # Keep the index and foreign key definitions to recreate them on the new parent
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s",
+            [TABLE, f'{TABLE}_pkey']
+        )
+        index_defs = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE]
+        )
+        foreign_keys = cursor.fetchall()
+
+        cursor.execute(
+            f"SELECT date_trunc('month', MIN(created_at) AT TIME ZONE 'UTC'), "
+            f"date_trunc('month', now() AT TIME ZONE 'UTC') FROM {TABLE}"
+        )
+        first, current = cursor.fetchone()
+        current = current.date()
+        first = first.date() if first else current
+
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{LEGACY}"')
+        cursor.execute(f'ALTER INDEX "{TABLE}_pkey" RENAME TO "{LEGACY}_pkey"')
+        for name, _ in foreign_keys:
+            cursor.execute(f'ALTER TABLE "{LEGACY}" RENAME CONSTRAINT "{name}" TO "{name}_legacy"')
+
+        # Unique constraints on a partitioned table must include the partition key
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}" (LIKE "{LEGACY}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE (created_at)'
+        )
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_pkey" PRIMARY KEY (id, created_at)')
+
+        month = first
+        last = _add_months(current, MONTHS_AHEAD)
+        while month <= last:
+            following = _add_months(month, 1)
+            cursor.execute(
+                f'CREATE TABLE "{TABLE}_y{month.year}m{month.month:02d}" PARTITION OF "{TABLE}" '
+                f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{following.isoformat()} 00:00:00+00')"
+            )
+            month = following
+        cursor.execute(f'CREATE TABLE "{TABLE}_default" PARTITION OF "{TABLE}" DEFAULT')
+
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{LEGACY}"')
+        cursor.execute(f'DROP TABLE "{LEGACY}"')
+
+        for index_def in index_defs:
+            cursor.execute(index_def)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" {definition}')
+
+
+def unpartition_events(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [TABLE])
+        if cursor.fetchone()[0] != 'p':
+            return
+
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s",
+            [TABLE, f'{TABLE}_pkey']
+        )
+        index_defs = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE]
+        )
+        foreign_keys = cursor.fetchall()
+
+        cursor.execute(
+            f'CREATE TABLE "{LEGACY}" (LIKE "{TABLE}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+        )
+        cursor.execute(f'INSERT INTO "{LEGACY}" SELECT * FROM "{TABLE}"')
+        # Dropping the parent drops every partition with it
+        cursor.execute(f'DROP TABLE "{TABLE}"')
+        cursor.execute(f'ALTER TABLE "{LEGACY}" RENAME TO "{TABLE}"')
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_pkey" PRIMARY KEY (id)')
+        for index_def in index_defs:
+            cursor.execute(index_def.replace(' ON ONLY ', ' ON '))
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" {definition}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_distinct_sketches'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_events, unpartition_events),
+    ]
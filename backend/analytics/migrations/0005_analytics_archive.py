@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_partition_analytics_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True)),
+                ('format', models.CharField(choices=[('parquet', 'Parquet'), ('ndjson', 'Gzipped NDJSON')], max_length=20)),
+                ('path', models.CharField(max_length=500)),
+                ('row_count', models.BigIntegerField(default=0)),
+                ('size_bytes', models.BigIntegerField(default=0)),
+                ('event_types', models.JSONField(blank=True, default=dict)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('dropped_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Analytics Archive',
+                'verbose_name_plural': 'Analytics Archives',
+                'db_table': 'analytics_archives',
+                'ordering': ['-month'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_analytics_archive'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='analyticsreport',
+            name='report_type',
+            field=models.CharField(choices=[('user_report', 'User Report'), ('project_report', 'Project Report'), ('booking_report', 'Booking Report'), ('revenue_report', 'Revenue Report'), ('performance_report', 'Performance Report'), ('funnel_report', 'Funnel Report'), ('cohort_report', 'Cohort Report'), ('custom', 'Custom Report')], max_length=50),
+        ),
+    ]
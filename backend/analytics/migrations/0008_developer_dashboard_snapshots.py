@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0007_report_generation'),
+        ('projects', '0013_booking_updated_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeveloperDashboardSnapshot',
+            fields=[
+                ('developer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='dashboard_snapshot', serialize=False, to='projects.developer')),
+                ('projects_total', models.IntegerField(default=0)),
+                ('properties_total', models.IntegerField(default=0)),
+                ('properties_available', models.IntegerField(default=0)),
+                ('properties_booked', models.IntegerField(default=0)),
+                ('properties_sold', models.IntegerField(default=0)),
+                ('bookings_total', models.IntegerField(default=0)),
+                ('revenue_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('pending_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('projects', models.JSONField(blank=True, default=dict)),
+                ('daily', models.JSONField(blank=True, default=dict)),
+                ('daily_from', models.DateField(blank=True, null=True)),
+                ('active_users', models.IntegerField(default=0)),
+                ('active_from', models.DateField(blank=True, null=True)),
+                ('active_to', models.DateField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_snapshot', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Developer Dashboard Snapshot',
+                'verbose_name_plural': 'Developer Dashboard Snapshots',
+                'db_table': 'analytics_developer_snapshots',
+            },
+        ),
+    ]
@@ -156,9 +156,23 @@ class AnalyticsReport(models.Model):
         ('booking_report', 'Booking Report'),
         ('revenue_report', 'Revenue Report'),
         ('performance_report', 'Performance Report'),
+        ('funnel_report', 'Funnel Report'),
+        ('cohort_report', 'Cohort Report'),
         ('custom', 'Custom Report'),
     ]
     
+    STATUS = [
+        ('pending', 'Pending'),  # Queued for the report worker
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    EXPORT_FORMAT = [
+        ('csv', 'CSV'),
+        ('ndjson', 'NDJSON'),
+    ]
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     report_type = models.CharField(max_length=50, choices=REPORT_TYPE)
     name = models.CharField(max_length=255)
@@ -180,6 +194,17 @@ class AnalyticsReport(models.Model):
     # Status
     is_archived = models.BooleanField(default=False)
     
+    # Generation
+    status = models.CharField(max_length=20, choices=STATUS, default='pending')
+    progress = models.PositiveSmallIntegerField(default=0)  # Percent of rows written
+    export_format = models.CharField(max_length=10, choices=EXPORT_FORMAT, default='csv')
+    file_path = models.CharField(max_length=500, blank=True)  # Gzipped export
+    file_size = models.BigIntegerField(default=0)
+    row_count = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -192,7 +217,173 @@ class AnalyticsReport(models.Model):
             models.Index(fields=['report_type', 'created_at']),
             models.Index(fields=['generated_by', 'created_at']),
             models.Index(fields=['is_archived', 'created_at']),
+            models.Index(fields=['status', 'created_at']),
         ]
     
     def __str__(self):
         return f"{self.name} - {self.report_type}"
+
+
+class EventHourlyRollup(models.Model):
+    """Hourly event counts per (hour, event_type, developer, project), maintained by refresh_rollups"""
+    hour = models.DateTimeField()
+    event_type = models.CharField(max_length=50)
+    developer = models.ForeignKey('projects.Developer', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    project = models.ForeignKey('projects.Project', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    event_count = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'analytics_event_hourly_rollups'
+        verbose_name = 'Event Hourly Rollup'
+        verbose_name_plural = 'Event Hourly Rollups'
+        ordering = ['-hour']
+        indexes = [
+            models.Index(fields=['hour', 'event_type']),
+            models.Index(fields=['developer', 'hour']),
+            models.Index(fields=['project', 'hour']),
+        ]
+    
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H:00} {self.event_type}: {self.event_count}"
+
+
+class BookingHourlyRollup(models.Model):
+    """Hourly booking counts and amounts per (hour, status, developer, project), by booking creation hour"""
+    hour = models.DateTimeField()
+    status = models.CharField(max_length=30)
+    developer = models.ForeignKey('projects.Developer', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    project = models.ForeignKey('projects.Project', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    booking_count = models.IntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    token_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    amount_due = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    
+    class Meta:
+        db_table = 'analytics_booking_hourly_rollups'
+        verbose_name = 'Booking Hourly Rollup'
+        verbose_name_plural = 'Booking Hourly Rollups'
+        ordering = ['-hour']
+        indexes = [
+            models.Index(fields=['hour', 'status']),
+            models.Index(fields=['developer', 'hour']),
+            models.Index(fields=['project', 'hour']),
+        ]
+    
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H:00} {self.status}: {self.booking_count}"
+
+
+class AnalyticsSketch(models.Model):
+    """
+    Daily HyperLogLog sketch of distinct sessions or users
+    project is null for the site-wide sketch; sketches merge across days and projects
+    """
+    METRIC = [
+        ('visitors', 'Unique Visitors (session_id)'),
+        ('users', 'Active Users (user)'),
+    ]
+    
+    day = models.DateField()
+    metric = models.CharField(max_length=20, choices=METRIC)
+    project = models.ForeignKey('projects.Project', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    precision = models.PositiveSmallIntegerField()
+    registers = models.BinaryField()  # HyperLogLog.to_bytes()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'analytics_sketches'
+        verbose_name = 'Analytics Sketch'
+        verbose_name_plural = 'Analytics Sketches'
+        ordering = ['-day']
+        indexes = [
+            models.Index(fields=['metric', 'day']),
+            models.Index(fields=['project', 'metric', 'day']),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} {self.metric} ({self.project_id or 'all'})"
+
+class RollupWatermark(models.Model):
+    """
+    How far a rollup job has read its source table
+    Rows changed after position are folded into the rollups on the next run
+    """
+    name = models.CharField(max_length=100, unique=True)
+    position = models.DateTimeField(blank=True, null=True)
+    hours_refreshed = models.BigIntegerField(default=0)
+    last_run_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'analytics_rollup_watermarks'
+        verbose_name = 'Rollup Watermark'
+        verbose_name_plural = 'Rollup Watermarks'
+    
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+
+class AnalyticsArchive(models.Model):
+    """One month of AnalyticsEvent rows exported to columnar/compressed files"""
+    FORMAT = [
+        ('parquet', 'Parquet'),
+        ('ndjson', 'Gzipped NDJSON'),
+    ]
+    
+    month = models.DateField(unique=True)  # First day of the month
+    format = models.CharField(max_length=20, choices=FORMAT)
+    path = models.CharField(max_length=500)
+    row_count = models.BigIntegerField(default=0)
+    size_bytes = models.BigIntegerField(default=0)
+    event_types = models.JSONField(default=dict, blank=True)  # {event_type: rows}
+    archived_at = models.DateTimeField(auto_now_add=True)
+    dropped_at = models.DateTimeField(blank=True, null=True)  # When the month's rows left the database
+    
+    class Meta:
+        db_table = 'analytics_archives'
+        verbose_name = 'Analytics Archive'
+        verbose_name_plural = 'Analytics Archives'
+        ordering = ['-month']
+    
+    def __str__(self):
+        return f"{self.month:%Y-%m} ({self.format}, {self.row_count} rows)"
+
+
+class DeveloperDashboardSnapshot(models.Model):
+    """Precomputed builder dashboard figures, kept current by signals and recomputed nightly"""
+    developer = models.OneToOneField(
+        'projects.Developer', on_delete=models.CASCADE, primary_key=True, related_name='dashboard_snapshot'
+    )
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='dashboard_snapshot')
+    
+    # All-time totals
+    projects_total = models.IntegerField(default=0)
+    properties_total = models.IntegerField(default=0)
+    properties_available = models.IntegerField(default=0)
+    properties_booked = models.IntegerField(default=0)
+    properties_sold = models.IntegerField(default=0)
+    bookings_total = models.IntegerField(default=0)
+    revenue_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    pending_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    # {project_id: {name, properties: {status: n}, bookings, revenue, pending}}
+    projects = models.JSONField(default=dict, blank=True)
+    # {YYYY-MM-DD: {bookings, confirmed, payments, payments_completed, projects}}, complete from daily_from
+    daily = models.JSONField(default=dict, blank=True)
+    daily_from = models.DateField(null=True, blank=True)
+    
+    # Distinct active users over [active_from, active_to] as of the last recompute
+    active_users = models.IntegerField(default=0)
+    active_from = models.DateField(null=True, blank=True)
+    active_to = models.DateField(null=True, blank=True)
+    
+    computed_at = models.DateTimeField(null=True, blank=True)  # Last full recompute
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'analytics_developer_snapshots'
+        verbose_name = 'Developer Dashboard Snapshot'
+        verbose_name_plural = 'Developer Dashboard Snapshots'
+    
+    def __str__(self):
+        return f"Dashboard snapshot for developer {self.developer_id}"
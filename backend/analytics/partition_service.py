@@ -0,0 +1,129 @@
+"""
+Event Partition Service for ApnaGhar analytics
+On PostgreSQL analytics_events is range-partitioned by month on created_at
+(see migration 0004). Other backends keep a single table and treat each
+calendar month of rows as a partition, so retention and archival work the
+same way everywhere.
+"""
+
+import logging
+from datetime import date, datetime, timezone as dt_timezone
+from typing import Dict, List
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import AnalyticsEvent
+
+logger = logging.getLogger(__name__)
+
+EVENT_TABLE = AnalyticsEvent._meta.db_table
+ANALYTICS_PARTITION_MONTHS_AHEAD = getattr(settings, 'ANALYTICS_PARTITION_MONTHS_AHEAD', 3)
+# Rows deleted per statement when dropping an emulated partition
+ANALYTICS_PARTITION_DELETE_BATCH = getattr(settings, 'ANALYTICS_PARTITION_DELETE_BATCH', 10000)
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_bounds(month: date):
+    """Aware [start, end) datetimes of a month, matching the partition bounds"""
+    start = timezone.make_aware(datetime.combine(month, datetime.min.time()), dt_timezone.utc)
+    end = timezone.make_aware(datetime.combine(add_months(month, 1), datetime.min.time()), dt_timezone.utc)
+    return start, end
+
+
+def partition_name(month: date) -> str:
+    return f"{EVENT_TABLE}_y{month.year}m{month.month:02d}"
+
+
+def is_partitioned() -> bool:
+    """True when analytics_events is a native partitioned table"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [EVENT_TABLE])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def create_partition_sql(month: date) -> str:
+    start, end = month_bounds(month)
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(month)}" PARTITION OF "{EVENT_TABLE}" '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def ensure_partitions(months_ahead: int = ANALYTICS_PARTITION_MONTHS_AHEAD) -> List[str]:
+    """Create monthly partitions from the current month through months_ahead; no-op when emulated"""
+    if not is_partitioned():
+        return []
+    current = month_start(timezone.now())
+    created = []
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            cursor.execute("SELECT 1 FROM pg_class WHERE relname = %s", [partition_name(month)])
+            if cursor.fetchone():
+                continue
+            cursor.execute(create_partition_sql(month))
+            created.append(partition_name(month))
+    for name in created:
+        logger.info(f"Created analytics event partition {name}")
+    return created
+
+
+def list_partitions() -> List[Dict]:
+    """Months that currently hold event rows, oldest first: [{'month', 'name', 'rows'}]"""
+    counts = (
+        AnalyticsEvent.objects
+        .annotate(month=TruncMonth('created_at', tzinfo=dt_timezone.utc))
+        .values('month')
+        .order_by('month')
+        .annotate(rows=Count('id'))
+    )
+    return [
+        {'month': month_start(row['month']), 'name': partition_name(month_start(row['month'])), 'rows': row['rows']}
+        for row in counts
+    ]
+
+
+def drop_partition(month: date) -> int:
+    """
+    Remove one month of events from the database
+
+    Native partitions are detached and dropped, which is instant and leaves no
+    dead tuples; emulated partitions are deleted in batches.
+    """
+    start, end = month_bounds(month)
+    rows = AnalyticsEvent.objects.filter(created_at__gte=start, created_at__lt=end).count()
+
+    if is_partitioned():
+        name = partition_name(month)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_class WHERE relname = %s", [name])
+            if cursor.fetchone():
+                cursor.execute(f'ALTER TABLE "{EVENT_TABLE}" DETACH PARTITION "{name}"')
+                cursor.execute(f'DROP TABLE "{name}"')
+                return rows
+        # Rows that landed in the default partition are deleted like emulated ones
+
+    while True:
+        with transaction.atomic():
+            ids = list(
+                AnalyticsEvent.objects.filter(created_at__gte=start, created_at__lt=end)
+                .values_list('id', flat=True)[:ANALYTICS_PARTITION_DELETE_BATCH]
+            )
+            if not ids:
+                break
+            AnalyticsEvent.objects.filter(id__in=ids).delete()
+    return rows
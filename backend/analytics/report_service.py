@@ -0,0 +1,384 @@
+"""
+Report Generation Service for ApnaGhar analytics
+Creating an AnalyticsReport queues it (status 'pending'); the
+generate_analytics_reports worker claims queued reports and streams their
+rows from server-side cursors into a gzipped CSV or NDJSON file, recording
+progress as it goes. Finished files are served in byte ranges so large
+downloads can be resumed.
+"""
+
+import csv
+import gzip
+import json
+import logging
+import os
+import re
+import tempfile
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from projects.models import Booking, Project
+from payments.models import Payment
+from users.models import CustomUser
+from .models import AnalyticsEvent, AnalyticsReport
+from .funnel_service import run_report
+from .rollup_service import event_project_ref
+from .timeseries_service import booking_scope, payment_scope
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_REPORT_DIR = getattr(
+    settings, 'ANALYTICS_REPORT_DIR',
+    os.path.join(settings.BASE_DIR, 'analytics_reports')
+)
+ANALYTICS_REPORT_CHUNK_SIZE = getattr(settings, 'ANALYTICS_REPORT_CHUNK_SIZE', 2000)
+# Rows written between progress updates
+ANALYTICS_REPORT_PROGRESS_EVERY = getattr(settings, 'ANALYTICS_REPORT_PROGRESS_EVERY', 10000)
+# Running reports not updated for this long belong to a dead worker and are requeued
+ANALYTICS_REPORT_STALE_AFTER = getattr(settings, 'ANALYTICS_REPORT_STALE_AFTER', 1800)  # seconds
+DOWNLOAD_BLOCK_SIZE = 64 * 1024
+
+EXTENSIONS = {'csv': '.csv.gz', 'ndjson': '.ndjson.gz'}
+
+
+class ReportError(Exception):
+    """Raised when a report cannot be generated for its type, filters or owner"""
+
+
+# A report source returns (columns, rows, total rows or None)
+ReportRows = Tuple[List[str], Iterable[tuple], Optional[int]]
+
+
+def _report_range(report: AnalyticsReport) -> Tuple[datetime, datetime]:
+    date_to = report.date_to or timezone.localdate()
+    date_from = report.date_from or date_to - timedelta(days=30)
+    start = timezone.make_aware(datetime.combine(date_from, datetime.min.time()))
+    end = timezone.make_aware(datetime.combine(date_to, datetime.min.time())) + timedelta(days=1)
+    return start, end
+
+
+def _report_user(report: AnalyticsReport):
+    """Owner the report is scoped to, None for staff (site-wide)"""
+    user = report.generated_by
+    if user is None or user.is_staff:
+        return None
+    return user
+
+
+def _apply_filters(queryset, report: AnalyticsReport, allowed: Dict[str, str]):
+    """Apply report.filters keys listed in allowed ({filter name: lookup}); lists match any value"""
+    for name, lookup in allowed.items():
+        value = report.filters.get(name)
+        if value in (None, '', []):
+            continue
+        if isinstance(value, list):
+            queryset = queryset.filter(**{f'{lookup}__in': value})
+        else:
+            queryset = queryset.filter(**{lookup: value})
+    return queryset
+
+
+def _stream(queryset, columns: List[str], order_by: str = 'created_at') -> ReportRows:
+    queryset = queryset.order_by(order_by)
+    return columns, queryset.values_list(*columns).iterator(chunk_size=ANALYTICS_REPORT_CHUNK_SIZE), queryset.count()
+
+
+def booking_rows(report: AnalyticsReport) -> ReportRows:
+    start, end = _report_range(report)
+    user = _report_user(report)
+    bookings = Booking.objects.filter(created_at__gte=start, created_at__lt=end)
+    if user is not None:
+        bookings = bookings.filter(booking_scope(user))
+    bookings = _apply_filters(bookings, report, {'status': 'status', 'project': 'property__project_id'})
+    return _stream(bookings, [
+        'booking_number', 'status', 'property__project__name', 'property__unit_number', 'buyer__email',
+        'total_amount', 'token_amount', 'amount_paid', 'amount_due', 'created_at',
+    ])
+
+
+def revenue_rows(report: AnalyticsReport) -> ReportRows:
+    start, end = _report_range(report)
+    user = _report_user(report)
+    payments = Payment.objects.filter(status='completed', completed_at__gte=start, completed_at__lt=end)
+    if user is not None:
+        payments = payments.filter(payment_scope(user))
+    payments = _apply_filters(payments, report, {
+        'payment_method': 'payment_method',
+        'payment_type': 'payment_type',
+        'project': 'booking__property__project_id',
+    })
+    return _stream(payments, [
+        'transaction_id', 'booking__booking_number', 'user__email', 'amount', 'currency',
+        'payment_method', 'payment_type', 'completed_at',
+    ], order_by='completed_at')
+
+
+def user_rows(report: AnalyticsReport) -> ReportRows:
+    if _report_user(report) is not None:
+        raise ReportError('User reports are only available to staff')
+    start, end = _report_range(report)
+    users = _apply_filters(
+        CustomUser.objects.filter(created_at__gte=start, created_at__lt=end),
+        report, {'role': 'role', 'is_active': 'is_active'}
+    )
+    return _stream(users, ['id', 'email', 'username', 'role', 'is_active', 'created_at'])
+
+
+def project_rows(report: AnalyticsReport) -> ReportRows:
+    start, end = _report_range(report)
+    user = _report_user(report)
+    projects = Project.objects.all()
+    if user is not None:
+        if user.role != 'builder':
+            raise ReportError('Project reports are only available to builders and staff')
+        projects = projects.filter(developer__user=user)
+    projects = _apply_filters(projects, report, {'status': 'status', 'city': 'city'}).annotate(
+        bookings_in_range=Count(
+            'properties__bookings',
+            filter=Q(properties__bookings__created_at__gte=start, properties__bookings__created_at__lt=end)
+        )
+    )
+    return _stream(projects, [
+        'id', 'name', 'city', 'status', 'total_units', 'available_units', 'starting_price',
+        'views_count', 'interested_count', 'bookings_in_range', 'created_at',
+    ])
+
+
+def event_rows(report: AnalyticsReport) -> ReportRows:
+    start, end = _report_range(report)
+    user = _report_user(report)
+    events = AnalyticsEvent.objects.filter(created_at__gte=start, created_at__lt=end)
+    if user is not None and user.role == 'builder':
+        project_ids = list(Project.objects.filter(developer__user=user).values_list('id', flat=True))
+        events = events.annotate(project_ref=event_project_ref()).filter(project_ref__in=project_ids)
+    elif user is not None:
+        events = events.filter(user=user)
+    events = _apply_filters(events, report, {'event_type': 'event_type'})
+    return _stream(events, [
+        'id', 'event_type', 'user_id', 'session_id', 'related_object_type', 'related_object_id',
+        'country', 'city', 'created_at',
+    ])
+
+
+def funnel_rows(report: AnalyticsReport) -> ReportRows:
+    result = run_report(report, 'funnel', user=_report_user(report))
+    timings = result['time_to_convert']
+    rows = []
+    for step, timing in zip(result['steps'], (None, timings['view_to_booking'], timings['booking_to_payment'])):
+        timing = timing or {}
+        rows.append((
+            step['step'], step['users'], step['conversion_rate'], step['overall_rate'],
+            timing.get('p50_hours'), timing.get('p90_hours'),
+        ))
+    columns = ['step', 'users', 'conversion_rate', 'overall_rate', 'p50_hours_from_previous', 'p90_hours_from_previous']
+    return columns, rows, len(rows)
+
+
+def cohort_rows(report: AnalyticsReport) -> ReportRows:
+    if _report_user(report) is not None:
+        raise ReportError('Cohort reports are only available to staff')
+    result = run_report(report, 'cohorts')
+    columns = ['week', 'users'] + [f'week_{offset}' for offset in range(result['weeks'])]
+    rows = [(cohort['week'], cohort['users'], *cohort['retention']) for cohort in result['cohorts']]
+    return columns, rows, len(rows)
+
+
+REPORT_SOURCES: Dict[str, Callable[[AnalyticsReport], ReportRows]] = {
+    'booking_report': booking_rows,
+    'revenue_report': revenue_rows,
+    'user_report': user_rows,
+    'project_report': project_rows,
+    'performance_report': event_rows,
+    'custom': event_rows,
+    'funnel_report': funnel_rows,
+    'cohort_report': cohort_rows,
+}
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _json_value(value):
+    # Decimals and UUIDs as strings so amounts keep their exact value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+class _CSVWriter:
+    def __init__(self, file, columns: List[str]):
+        self.writer = csv.writer(file)
+        self.writer.writerow(columns)
+
+    def write(self, row: tuple) -> None:
+        self.writer.writerow([_cell(value) for value in row])
+
+
+class _NDJSONWriter:
+    def __init__(self, file, columns: List[str]):
+        self.file = file
+        self.columns = columns
+
+    def write(self, row: tuple) -> None:
+        self.file.write(json.dumps(dict(zip(self.columns, row)), default=_json_value) + '\n')
+
+
+WRITERS = {'csv': _CSVWriter, 'ndjson': _NDJSONWriter}
+
+
+def report_path(report: AnalyticsReport) -> str:
+    return os.path.join(ANALYTICS_REPORT_DIR, f"{report.id}{EXTENSIONS[report.export_format]}")
+
+
+def _set_progress(report: AnalyticsReport, **fields) -> None:
+    for name, value in fields.items():
+        setattr(report, name, value)
+    AnalyticsReport.objects.filter(pk=report.pk).update(updated_at=timezone.now(), **fields)
+
+
+def generate_report(report: AnalyticsReport) -> AnalyticsReport:
+    """
+    Write a report's rows to its gzipped export file
+
+    The file is written next to its final path and renamed into place, so a
+    completed report always points at a whole file. Failures are recorded on
+    the report rather than raised.
+    """
+    if report.status != 'running':
+        _set_progress(report, status='running', progress=0, error='', started_at=timezone.now())
+    source = REPORT_SOURCES.get(report.report_type)
+    os.makedirs(ANALYTICS_REPORT_DIR, exist_ok=True)
+    path = report_path(report)
+    staging = None
+    written = 0
+
+    try:
+        if source is None:
+            raise ReportError(f"No generator for report type '{report.report_type}'")
+        columns, rows, total = source(report)
+        # A unique staging file, so a requeued run and the original never write the same file
+        with tempfile.NamedTemporaryFile(dir=ANALYTICS_REPORT_DIR, prefix=f"{report.id}.", suffix='.tmp', delete=False) as staged:
+            staging = staged.name
+            with gzip.open(staged, 'wt', encoding='utf-8', newline='') as file:
+                writer = WRITERS[report.export_format](file, columns)
+                for row in rows:
+                    writer.write(row)
+                    written += 1
+                    if written % ANALYTICS_REPORT_PROGRESS_EVERY == 0:
+                        progress = min(99, written * 100 // total) if total else 0
+                        _set_progress(report, progress=progress, row_count=written)
+        os.replace(staging, path)
+    except Exception as e:
+        if staging and os.path.exists(staging):
+            os.remove(staging)
+        if not isinstance(e, (ReportError, ValueError)):
+            logger.exception(f"Failed to generate report {report.id}")
+        _set_progress(report, status='failed', error=str(e), row_count=written, completed_at=timezone.now())
+        return report
+
+    _set_progress(
+        report,
+        status='completed', progress=100, row_count=written, error='',
+        file_path=path, file_size=os.path.getsize(path), completed_at=timezone.now(),
+    )
+    logger.info(f"Generated report {report.id}: {written} rows, {report.file_size} bytes")
+    return report
+
+
+def enqueue_report(report: AnalyticsReport) -> None:
+    """Queue a report for (re)generation"""
+    _set_progress(report, status='pending', progress=0, error='', started_at=None, completed_at=None)
+
+
+def requeue_stale_reports() -> int:
+    cutoff = timezone.now() - timedelta(seconds=ANALYTICS_REPORT_STALE_AFTER)
+    return AnalyticsReport.objects.filter(status='running', updated_at__lt=cutoff).update(
+        status='pending', progress=0, updated_at=timezone.now()
+    )
+
+
+def claim_next_report() -> Optional[AnalyticsReport]:
+    """
+    Atomically move the oldest pending report to 'running' and return it
+
+    The status check in the UPDATE makes the claim safe with several workers.
+    """
+    for pk in AnalyticsReport.objects.filter(status='pending').order_by('created_at').values_list('pk', flat=True)[:10]:
+        claimed = AnalyticsReport.objects.filter(pk=pk, status='pending').update(
+            status='running', progress=0, started_at=timezone.now(), updated_at=timezone.now()
+        )
+        if claimed:
+            return AnalyticsReport.objects.select_related('generated_by').get(pk=pk)
+    return None
+
+
+def process_pending_reports(limit: Optional[int] = None) -> List[AnalyticsReport]:
+    """Generate queued reports until the queue is empty or limit reports are done"""
+    requeue_stale_reports()
+    done = []
+    while limit is None or len(done) < limit:
+        report = claim_next_report()
+        if report is None:
+            break
+        done.append(generate_report(report))
+    return done
+
+
+def delete_report_file(report: AnalyticsReport) -> None:
+    if report.file_path and os.path.exists(report.file_path):
+        os.remove(report.file_path)
+
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range Range header into inclusive (first, last) byte offsets
+
+    Returns None when there is no usable header (serve the whole file) and
+    raises ValueError when the range cannot be satisfied.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        # Multiple or malformed ranges: ignore, as RFC 9110 allows
+        return None
+    first, last = match.groups()
+    if first == '':
+        length = int(last)
+        if length == 0:
+            raise ValueError('Empty suffix range')
+        return max(0, size - length), size - 1
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first >= size or first > last:
+        raise ValueError('Range not satisfiable')
+    return first, last
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    """Strong validator for one generated file (a regenerated export is a new inode with a new mtime)"""
+    return f'"{stat_result.st_ino:x}-{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def read_file(file, first: int, last: int) -> Iterator[bytes]:
+    """Yield bytes first..last (inclusive) of an open binary file in blocks, then close it"""
+    with file:
+        file.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            block = file.read(min(DOWNLOAD_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
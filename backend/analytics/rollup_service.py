@@ -0,0 +1,287 @@
+"""
+Hourly Rollup Service for ApnaGhar analytics
+Keeps EventHourlyRollup and BookingHourlyRollup in step with their source
+tables. Each run reads only rows changed past a stored watermark, finds the
+hours they fall in and recomputes those hours whole, so late rows and booking
+status changes land in the right hour. Readers combine the rollups with a
+raw-table tail for the hours the job has not reached yet.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Sum, UUIDField, When
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from projects.models import Booking, Project, Property
+from .models import AnalyticsEvent, BookingHourlyRollup, EventHourlyRollup, RollupWatermark
+
+logger = logging.getLogger(__name__)
+
+# Rows committed up to this long after their timestamp are still picked up
+ANALYTICS_ROLLUP_LATENESS = getattr(settings, 'ANALYTICS_ROLLUP_LATENESS', 600)  # seconds
+ANALYTICS_ROLLUP_HOURS_PER_BATCH = getattr(settings, 'ANALYTICS_ROLLUP_HOURS_PER_BATCH', 168)
+
+HOUR = timedelta(hours=1)
+
+
+def floor_hour(value: datetime) -> datetime:
+    return value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _hour_expr(field: str):
+    # Rollup hours are UTC so they stay hour-aligned whatever TIME_ZONE is
+    return TruncHour(field, tzinfo=dt_timezone.utc)
+
+
+def event_project_ref():
+    """Project an event belongs to, resolved from its related project or property"""
+    return Case(
+        When(related_object_type='project', then=F('related_object_id')),
+        When(related_object_type='property', then=Subquery(
+            Property.objects.filter(id=OuterRef('related_object_id')).values('project_id')[:1]
+        )),
+        default=None,
+        output_field=UUIDField(),
+    )
+
+
+def _event_rows(queryset) -> List[EventHourlyRollup]:
+    grouped = list(
+        queryset
+        .annotate(rollup_hour=_hour_expr('created_at'), project_ref=event_project_ref())
+        .values('rollup_hour', 'event_type', 'project_ref')
+        .order_by()
+        .annotate(event_count=Count('id'))
+    )
+    project_ids = {row['project_ref'] for row in grouped if row['project_ref']}
+    developers = dict(Project.objects.filter(id__in=project_ids).values_list('id', 'developer_id'))
+
+    # Events pointing at deleted projects fold into the unattributed row
+    merged: Dict[tuple, int] = {}
+    for row in grouped:
+        project_id = row['project_ref'] if row['project_ref'] in developers else None
+        key = (row['rollup_hour'], row['event_type'], project_id)
+        merged[key] = merged.get(key, 0) + row['event_count']
+    return [
+        EventHourlyRollup(
+            hour=hour, event_type=event_type, project_id=project_id,
+            developer_id=developers.get(project_id), event_count=count
+        )
+        for (hour, event_type, project_id), count in merged.items()
+    ]
+
+
+def _booking_rows(queryset) -> List[BookingHourlyRollup]:
+    zero = Decimal('0')
+    grouped = (
+        queryset
+        .annotate(
+            rollup_hour=_hour_expr('created_at'),
+            project_ref=F('property__project_id'),
+            developer_ref=F('property__project__developer_id'),
+        )
+        .values('rollup_hour', 'status', 'project_ref', 'developer_ref')
+        .order_by()
+        .annotate(
+            booking_count=Count('id'),
+            total=Sum('total_amount', default=zero),
+            token=Sum('token_amount', default=zero),
+            due=Sum('amount_due', default=zero),
+        )
+    )
+    return [
+        BookingHourlyRollup(
+            hour=row['rollup_hour'], status=row['status'],
+            project_id=row['project_ref'], developer_id=row['developer_ref'],
+            booking_count=row['booking_count'], total_amount=row['total'],
+            token_amount=row['token'], amount_due=row['due'],
+        )
+        for row in grouped
+    ]
+
+
+class RollupSource:
+    """A source table, the rollup it feeds and the column that marks a row as changed"""
+
+    def __init__(self, name: str, model, rollup_model, changed_field: str, build_rows: Callable):
+        self.name = name
+        self.model = model
+        self.rollup_model = rollup_model
+        self.changed_field = changed_field
+        self.build_rows = build_rows
+
+    def dirty_hours(self, since: Optional[datetime], until: datetime) -> List[datetime]:
+        """Creation hours of rows changed in [since, until)"""
+        changed = self.model.objects.filter(**{f'{self.changed_field}__lt': until})
+        if since is not None:
+            changed = changed.filter(**{f'{self.changed_field}__gte': since})
+        return sorted(
+            changed.annotate(rollup_hour=_hour_expr('created_at'))
+            .values_list('rollup_hour', flat=True)
+            .order_by()
+            .distinct()
+        )
+
+    def rebuild_hours(self, hours: List[datetime]) -> int:
+        """Replace the rollup rows for the given hours. Caller holds a transaction."""
+        queryset = self.model.objects.filter(
+            created_at__gte=hours[0], created_at__lt=hours[-1] + HOUR
+        ).annotate(dirty_hour=_hour_expr('created_at')).filter(dirty_hour__in=hours)
+        rows = self.build_rows(queryset)
+        self.rollup_model.objects.filter(hour__in=hours).delete()
+        self.rollup_model.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+    def rebuild_range(self, start: datetime, end: datetime) -> int:
+        """Replace every rollup row in [start, end), dropping hours whose source rows are gone"""
+        rows = self.build_rows(self.model.objects.filter(created_at__gte=start, created_at__lt=end))
+        self.rollup_model.objects.filter(hour__gte=start, hour__lt=end).delete()
+        self.rollup_model.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+
+# Events are immutable, so creation time marks them; bookings change status later
+ROLLUP_SOURCES = {
+    'event': RollupSource('event', AnalyticsEvent, EventHourlyRollup, 'created_at', _event_rows),
+    'booking': RollupSource('booking', Booking, BookingHourlyRollup, 'updated_at', _booking_rows),
+}
+
+
+def refresh_rollup(name: str) -> Dict:
+    """
+    Fold rows changed since the watermark into one rollup table
+
+    Re-reads ANALYTICS_ROLLUP_LATENESS seconds behind the watermark so rows
+    from transactions that committed late are not missed. The watermark row
+    is locked for the run, so concurrent runners queue instead of racing.
+    """
+    source = ROLLUP_SOURCES[name]
+    RollupWatermark.objects.get_or_create(name=name)
+    with transaction.atomic():
+        watermark = RollupWatermark.objects.select_for_update().get(name=name)
+        until = timezone.now()
+        since = watermark.position - timedelta(seconds=ANALYTICS_ROLLUP_LATENESS) if watermark.position else None
+        hours = source.dirty_hours(since, until)
+
+        rows_written = 0
+        for start in range(0, len(hours), ANALYTICS_ROLLUP_HOURS_PER_BATCH):
+            rows_written += source.rebuild_hours(hours[start:start + ANALYTICS_ROLLUP_HOURS_PER_BATCH])
+
+        if name == 'event':
+            # Distinct-count sketches are add-only, so re-reading the lateness window is harmless
+            from .sketch_service import update_sketches
+            update_sketches(since, until)
+
+        watermark.position = until
+        watermark.hours_refreshed += len(hours)
+        watermark.last_run_at = timezone.now()
+        watermark.save(update_fields=['position', 'hours_refreshed', 'last_run_at', 'updated_at'])
+
+    return {'source': name, 'hours': len(hours), 'rows': rows_written, 'watermark': until}
+
+
+def refresh_rollups() -> List[Dict]:
+    """Refresh every rollup table"""
+    return [refresh_rollup(name) for name in ROLLUP_SOURCES]
+
+
+def rebuild_rollups(start: datetime, end: datetime) -> List[Dict]:
+    """
+    Recompute all rollups in [start, end) from the raw tables
+
+    Use after bulk deletes or direct UPDATEs that bypass updated_at. Months
+    whose events were archived out of the database cannot be rebuilt.
+    """
+    from .archive_service import archived_months_between
+    start, end = floor_hour(start), floor_hour(end - timedelta(microseconds=1)) + HOUR
+    archived = archived_months_between(start, end)
+    if archived:
+        raise ValueError(
+            f"Cannot rebuild rollups over archived months: {', '.join(f'{m:%Y-%m}' for m in archived)}"
+        )
+    from .sketch_service import rebuild_sketches
+    results = []
+    for name, source in ROLLUP_SOURCES.items():
+        with transaction.atomic():
+            rows = source.rebuild_range(start, end)
+            if name == 'event':
+                rebuild_sketches(start, end)
+        results.append({'source': name, 'rows': rows})
+    return results
+
+
+def rollup_cutoff(name: str) -> Optional[datetime]:
+    """Rollups are complete before this hour; later rows must be read raw"""
+    position = RollupWatermark.objects.filter(name=name).values_list('position', flat=True).first()
+    return floor_hour(position) if position else None
+
+
+def rollup_scope(user) -> Optional[Q]:
+    """Filter on rollup rows for a user, or None if rollups cannot answer for them"""
+    if user is None or user.is_staff:
+        return Q()
+    if user.role == 'builder':
+        return Q(developer__user=user)
+    # Rollups are not keyed by buyer
+    return None
+
+
+def _accumulate(results: Dict, queryset, field: str, aggregates: Dict, bucket: Optional[Callable]) -> None:
+    if bucket is None:
+        rows = [{'bucket': None, **queryset.aggregate(**aggregates)}]
+    else:
+        rows = queryset.annotate(bucket=bucket(field)).values('bucket').order_by('bucket').annotate(**aggregates)
+    for row in rows:
+        totals = results.setdefault(row['bucket'], {})
+        for name in aggregates:
+            totals[name] = totals.get(name, 0) + (row[name] or 0)
+
+
+def aggregate_with_rollups(
+    name: str,
+    raw_queryset,
+    rollup_queryset,
+    aggregates: Dict[str, tuple],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bucket: Optional[Callable] = None
+) -> Dict:
+    """
+    Additive aggregates over [start, end) from rollups plus a raw tail
+
+    Args:
+        name: Rollup source ('event' or 'booking')
+        raw_queryset / rollup_queryset: Source and rollup querysets, already scoped;
+            pass rollup_queryset=None to read the raw table only
+        aggregates: {name: (raw aggregate, rollup aggregate)}
+        start / end: Hour-aligned bounds (None for open-ended)
+        bucket: Callable taking a field name and returning a Trunc expression
+
+    Returns:
+        {bucket (None without bucketing): {name: value}}
+    """
+    results: Dict = {}
+    cutoff = rollup_cutoff(name) if rollup_queryset is not None else None
+    tail_start = start
+    if cutoff is not None and (start is None or cutoff > start):
+        rollup_end = min(cutoff, end) if end else cutoff
+        rollups = rollup_queryset.filter(hour__lt=rollup_end)
+        if start is not None:
+            rollups = rollups.filter(hour__gte=start)
+        _accumulate(results, rollups, 'hour', {key: agg[1] for key, agg in aggregates.items()}, bucket)
+        tail_start = rollup_end
+
+    if end is None or tail_start is None or tail_start < end:
+        raw = raw_queryset
+        if tail_start is not None:
+            raw = raw.filter(created_at__gte=tail_start)
+        if end is not None:
+            raw = raw.filter(created_at__lt=end)
+        _accumulate(results, raw, 'created_at', {key: agg[0] for key, agg in aggregates.items()}, bucket)
+
+    return results
@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import AnalyticsEvent, AnalyticsMetric, AnalyticsReport
 
@@ -16,6 +17,26 @@ class AnalyticsEventSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user_email', 'created_at']
 
 
+class AnalyticsEventIngestSerializer(serializers.ModelSerializer):
+    """One client-submitted event; user, IP and user agent come from the request"""
+
+    class Meta:
+        model = AnalyticsEvent
+        fields = [
+            'event_type', 'session_id', 'related_object_type', 'related_object_id',
+            'metadata', 'properties', 'country', 'region', 'city'
+        ]
+
+
+class AnalyticsEventBatchSerializer(serializers.Serializer):
+    """Batch of events posted to /events/batch/"""
+    events = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=getattr(settings, 'ANALYTICS_INGEST_MAX_BATCH', 1000)
+    )
+
+
 class AnalyticsMetricSerializer(serializers.ModelSerializer):
     """Serializer for AnalyticsMetric model"""
     
@@ -44,7 +65,11 @@ class AnalyticsReportSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'report_type', 'name', 'description', 'date_from', 'date_to',
             'filters', 'generated_by', 'generated_by_email', 'data',
-            'is_archived', 'created_at', 'updated_at'
+            'is_archived', 'status', 'progress', 'export_format', 'file_size',
+            'row_count', 'error', 'started_at', 'completed_at', 'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'generated_by_email', 'status', 'progress', 'file_size', 'row_count',
+            'error', 'started_at', 'completed_at', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'generated_by_email', 'created_at', 'updated_at']
 
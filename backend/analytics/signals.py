@@ -0,0 +1,92 @@
+"""
+Django signals keeping builder dashboard snapshots current
+Each save or delete of a project, property, booking or payment reads the
+row's old and new state and applies the difference to its developer's
+snapshot once the transaction commits. Booking balances moved by the payment
+ledger arrive through booking_balance_changed instead.
+"""
+from functools import partial
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from projects.models import Booking, Project, Property
+from payments.models import Payment
+from payments.signals import booking_balance_changed
+from .snapshot_service import ANALYTICS_DASHBOARD_SNAPSHOTS, STATE_FIELDS, apply_change, load_state
+import logging
+
+logger = logging.getLogger(__name__)
+
+TRACKED_MODELS = (Booking, Payment, Property, Project)
+
+
+def _tracks(update_fields, model) -> bool:
+    """False when a save only touches columns the snapshot does not use"""
+    if update_fields is None:
+        return True
+    columns = {field.split('__')[0] for field in STATE_FIELDS[model]}
+    columns |= {f"{column}_id" for column in columns}
+    return bool(columns & set(update_fields))
+
+
+def _apply(model, before, pk):
+    try:
+        apply_change(model, before, load_state(model, pk) if pk is not None else None)
+    except Exception as e:
+        logger.error(f"Error updating dashboard snapshot for {model.__name__} {pk}: {str(e)}")
+
+
+def capture_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not ANALYTICS_DASHBOARD_SNAPSHOTS or raw or not _tracks(update_fields, sender):
+        instance._snapshot_state = None
+        return
+    instance._snapshot_state = {} if instance._state.adding else load_state(sender, instance.pk)
+
+
+def apply_saved_state(sender, instance, raw=False, **kwargs):
+    before = getattr(instance, '_snapshot_state', None)
+    if before is None:
+        return
+    instance._snapshot_state = None
+    transaction.on_commit(partial(_apply, sender, before or None, instance.pk))
+
+
+def capture_deleted_state(sender, instance, **kwargs):
+    instance._snapshot_state = load_state(sender, instance.pk) if ANALYTICS_DASHBOARD_SNAPSHOTS else None
+
+
+def apply_deleted_state(sender, instance, **kwargs):
+    before = getattr(instance, '_snapshot_state', None)
+    if before:
+        transaction.on_commit(partial(_apply, sender, before, None))
+
+
+def _apply_balance(booking_id, before, after):
+    try:
+        apply_change(Booking, before, after)
+    except Exception as e:
+        logger.error(f"Error updating dashboard snapshot for Booking {booking_id}: {str(e)}")
+
+
+def apply_balance_change(sender, booking_id, amount_due_delta, **kwargs):
+    """
+    Ledger postings update booking balances without save signals
+
+    The state is read when the signal is sent, right after the balance
+    update and before the ledger moves the booking's status; that status
+    change is applied by its own save on top of this state.
+    """
+    if not ANALYTICS_DASHBOARD_SNAPSHOTS or not amount_due_delta:
+        return
+    after = load_state(Booking, booking_id)
+    if after is not None:
+        before = dict(after, amount_due=after['amount_due'] - amount_due_delta)
+        transaction.on_commit(partial(_apply_balance, booking_id, before, after))
+
+
+booking_balance_changed.connect(apply_balance_change, dispatch_uid='snapshot_booking_balance')
+
+for model in TRACKED_MODELS:
+    pre_save.connect(capture_state, sender=model, dispatch_uid=f'snapshot_pre_save_{model.__name__}')
+    post_save.connect(apply_saved_state, sender=model, dispatch_uid=f'snapshot_post_save_{model.__name__}')
+    pre_delete.connect(capture_deleted_state, sender=model, dispatch_uid=f'snapshot_pre_delete_{model.__name__}')
+    post_delete.connect(apply_deleted_state, sender=model, dispatch_uid=f'snapshot_post_delete_{model.__name__}')
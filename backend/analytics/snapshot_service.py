@@ -0,0 +1,338 @@
+"""
+Builder Dashboard Snapshot Service for ApnaGhar analytics
+Keeps one DeveloperDashboardSnapshot row per developer with the figures the
+builder dashboard shows: totals, per-project breakdowns and per-day counts.
+Saves and deletes of projects, properties, bookings and payments apply their
+delta to the row (see analytics/signals.py); refresh_dashboard_snapshots
+recomputes every row from scratch nightly to correct drift from bulk updates.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from projects.models import Booking, Developer, Project, Property
+from payments.models import Payment
+from .models import DeveloperDashboardSnapshot
+from .sketch_service import estimate_distinct
+from .timeseries_service import PENDING_STATUSES, REVENUE_STATUSES
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_DASHBOARD_SNAPSHOTS = getattr(settings, 'ANALYTICS_DASHBOARD_SNAPSHOTS', True)
+# Days of per-day counts kept on each snapshot
+ANALYTICS_SNAPSHOT_DAYS = getattr(settings, 'ANALYTICS_SNAPSHOT_DAYS', 120)
+ANALYTICS_SNAPSHOT_ACTIVE_DAYS = 30
+
+PROPERTY_STATUSES = ('available', 'booked', 'sold')
+
+# A state is the handful of columns a row contributes to its developer's snapshot
+STATE_FIELDS = {
+    Booking: ['status', 'total_amount', 'amount_due', 'created_at',
+              'property__project_id', 'property__project__developer_id'],
+    Payment: ['status', 'created_at', 'booking__property__project__developer_id'],
+    Property: ['status', 'project_id', 'project__developer_id'],
+    Project: ['id', 'name', 'created_at', 'developer_id'],
+}
+DEVELOPER_FIELD = {
+    Booking: 'property__project__developer_id',
+    Payment: 'booking__property__project__developer_id',
+    Property: 'project__developer_id',
+    Project: 'developer_id',
+}
+
+# Effects map a counter path to the amount a row adds to it
+Path = Tuple
+Effects = Dict[Path, object]
+
+
+def load_state(model, pk) -> Optional[Dict]:
+    return model.objects.filter(pk=pk).values(*STATE_FIELDS[model]).first()
+
+
+def _day(value: datetime) -> str:
+    return timezone.localtime(value).date().isoformat()
+
+
+def state_effects(model, state: Optional[Dict]) -> Tuple[Optional[int], Effects]:
+    """(developer id, effects) of one row's state; (None, {}) when it counts for nobody"""
+    if not state or not state.get(DEVELOPER_FIELD[model]):
+        return None, {}
+    developer_id = state[DEVELOPER_FIELD[model]]
+    effects: Effects = {}
+
+    if model is Booking:
+        project = str(state['property__project_id'])
+        day = _day(state['created_at'])
+        effects[('bookings_total',)] = 1
+        effects[('projects', project, 'bookings')] = 1
+        effects[('daily', day, 'bookings')] = 1
+        if state['status'] == 'confirmed':
+            effects[('daily', day, 'confirmed')] = 1
+        if state['status'] in REVENUE_STATUSES:
+            effects[('revenue_total',)] = state['total_amount'] or Decimal('0')
+            effects[('projects', project, 'revenue')] = state['total_amount'] or Decimal('0')
+        if state['status'] in PENDING_STATUSES:
+            effects[('pending_total',)] = state['amount_due'] or Decimal('0')
+            effects[('projects', project, 'pending')] = state['amount_due'] or Decimal('0')
+    elif model is Payment:
+        day = _day(state['created_at'])
+        effects[('daily', day, 'payments')] = 1
+        if state['status'] == 'completed':
+            effects[('daily', day, 'payments_completed')] = 1
+    elif model is Property:
+        project = str(state['project_id'])
+        effects[('properties_total',)] = 1
+        effects[('projects', project, 'properties', 'total')] = 1
+        if state['status'] in PROPERTY_STATUSES:
+            effects[(f"properties_{state['status']}",)] = 1
+            effects[('projects', project, 'properties', state['status'])] = 1
+    elif model is Project:
+        effects[('projects_total',)] = 1
+        effects[('daily', _day(state['created_at']), 'projects')] = 1
+
+    return developer_id, effects
+
+
+def _add(container: Dict, keys: Tuple, value) -> None:
+    for key in keys[:-1]:
+        container = container.setdefault(key, {})
+    current = container.get(keys[-1])
+    if isinstance(value, Decimal):
+        # Amounts are stored as strings to keep them exact in JSON
+        container[keys[-1]] = str(Decimal(current or '0') + value)
+    else:
+        container[keys[-1]] = (current or 0) + value
+
+
+def _prune_daily(snapshot: DeveloperDashboardSnapshot) -> None:
+    cutoff = timezone.localdate() - timedelta(days=ANALYTICS_SNAPSHOT_DAYS)
+    if snapshot.daily_from is None or snapshot.daily_from < cutoff:
+        snapshot.daily_from = cutoff
+    cutoff = cutoff.isoformat()
+    snapshot.daily = {day: counts for day, counts in snapshot.daily.items() if day >= cutoff}
+
+
+def apply_effects(developer_id: int, removed: Effects, added: Effects, project: Optional[Dict] = None,
+                  drop_project: Optional[str] = None) -> None:
+    """
+    Apply a row change (old effects out, new effects in) to one developer's snapshot
+
+    Developers without a snapshot yet are skipped; their first dashboard read
+    computes one from scratch.
+    """
+    with transaction.atomic():
+        snapshot = DeveloperDashboardSnapshot.objects.select_for_update().filter(developer_id=developer_id).first()
+        if snapshot is None:
+            return
+        for sign, effects in ((-1, removed), (1, added)):
+            for path, value in effects.items():
+                value = value * sign
+                if len(path) == 1:
+                    setattr(snapshot, path[0], getattr(snapshot, path[0]) + value)
+                elif path[0] == 'daily':
+                    _add(snapshot.daily, path[1:], value)
+                else:
+                    entry = snapshot.projects.setdefault(path[1], _empty_project(''))
+                    _add(entry, path[2:], value)
+        if project is not None:
+            snapshot.projects.setdefault(str(project['id']), _empty_project(''))['name'] = project['name']
+        if drop_project is not None:
+            snapshot.projects.pop(drop_project, None)
+        _prune_daily(snapshot)
+        snapshot.save()
+
+
+def apply_change(model, before: Optional[Dict], after: Optional[Dict]) -> None:
+    """Move a row's contribution from its old state to its new one (either may be None)"""
+    old_developer, old_effects = state_effects(model, before)
+    new_developer, new_effects = state_effects(model, after)
+    renamed = model is Project and after is not None and (before is None or before['name'] != after['name'])
+    if old_developer == new_developer and old_effects == new_effects and not renamed:
+        return
+
+    if old_developer is not None and old_developer != new_developer:
+        drop = str(before['id']) if model is Project else None
+        apply_effects(old_developer, old_effects, {}, drop_project=drop)
+        old_effects = {}
+    if new_developer is not None:
+        apply_effects(new_developer, old_effects, new_effects, project=after if model is Project else None)
+
+
+def _empty_project(name: str) -> Dict:
+    return {
+        'name': name,
+        'properties': {'total': 0, **{status: 0 for status in PROPERTY_STATUSES}},
+        'bookings': 0,
+        'revenue': '0',
+        'pending': '0',
+    }
+
+
+def recompute_snapshot(developer: Developer) -> DeveloperDashboardSnapshot:
+    """Rebuild one developer's snapshot from the source tables"""
+    today = timezone.localdate()
+    daily_from = today - timedelta(days=ANALYTICS_SNAPSHOT_DAYS)
+    daily_start = timezone.make_aware(datetime.combine(daily_from, datetime.min.time()))
+    active_from = today - timedelta(days=ANALYTICS_SNAPSHOT_ACTIVE_DAYS)
+
+    with transaction.atomic():
+        snapshot, _ = DeveloperDashboardSnapshot.objects.get_or_create(
+            developer=developer, defaults={'user_id': developer.user_id}
+        )
+        snapshot = DeveloperDashboardSnapshot.objects.select_for_update().get(pk=snapshot.pk)
+
+        projects = {}
+        daily: Dict[str, Dict[str, int]] = defaultdict(dict)
+        for project_id, name, created_at in Project.objects.filter(developer=developer).values_list('id', 'name', 'created_at'):
+            projects[str(project_id)] = _empty_project(name)
+            if created_at >= daily_start:
+                _add(daily, (_day(created_at), 'projects'), 1)
+
+        properties = {'total': 0, **{status: 0 for status in PROPERTY_STATUSES}}
+        for row in (Property.objects.filter(project__developer=developer)
+                    .values('project_id', 'status').order_by().annotate(n=Count('id'))):
+            entry = projects.setdefault(str(row['project_id']), _empty_project(''))['properties']
+            entry['total'] += row['n']
+            properties['total'] += row['n']
+            if row['status'] in PROPERTY_STATUSES:
+                entry[row['status']] += row['n']
+                properties[row['status']] += row['n']
+
+        zero = Decimal('0')
+        bookings_total, revenue_total, pending_total = 0, zero, zero
+        for row in (Booking.objects.filter(property__project__developer=developer)
+                    .values('property__project_id').order_by()
+                    .annotate(
+                        n=Count('id'),
+                        revenue=Sum('total_amount', default=zero, filter=Q(status__in=REVENUE_STATUSES)),
+                        pending=Sum('amount_due', default=zero, filter=Q(status__in=PENDING_STATUSES)),
+                    )):
+            entry = projects.setdefault(str(row['property__project_id']), _empty_project(''))
+            entry['bookings'] = row['n']
+            entry['revenue'] = str(row['revenue'])
+            entry['pending'] = str(row['pending'])
+            bookings_total += row['n']
+            revenue_total += row['revenue']
+            pending_total += row['pending']
+
+        for row in (Booking.objects.filter(property__project__developer=developer, created_at__gte=daily_start)
+                    .annotate(day=TruncDate('created_at')).values('day').order_by()
+                    .annotate(n=Count('id'), confirmed=Count('id', filter=Q(status='confirmed')))):
+            daily[row['day'].isoformat()].update(bookings=row['n'], confirmed=row['confirmed'])
+
+        for row in (Payment.objects.filter(booking__property__project__developer=developer, created_at__gte=daily_start)
+                    .annotate(day=TruncDate('created_at')).values('day').order_by()
+                    .annotate(n=Count('id'), completed=Count('id', filter=Q(status='completed')))):
+            daily[row['day'].isoformat()].update(payments=row['n'], payments_completed=row['completed'])
+
+        snapshot.user_id = developer.user_id
+        snapshot.projects_total = len(projects)
+        snapshot.properties_total = properties['total']
+        snapshot.properties_available = properties['available']
+        snapshot.properties_booked = properties['booked']
+        snapshot.properties_sold = properties['sold']
+        snapshot.bookings_total = bookings_total
+        snapshot.revenue_total = revenue_total
+        snapshot.pending_total = pending_total
+        snapshot.projects = projects
+        snapshot.daily = dict(daily)
+        snapshot.daily_from = daily_from
+        snapshot.active_users = estimate_distinct('users', active_from, today, project_ids=list(projects)) if projects else 0
+        snapshot.active_from = active_from
+        snapshot.active_to = today
+        snapshot.computed_at = timezone.now()
+        snapshot.save()
+    return snapshot
+
+
+def recompute_all_snapshots(developer_ids: Optional[List[int]] = None) -> int:
+    """Recompute the snapshots of the given developers (default: all); returns how many"""
+    developers = Developer.objects.all()
+    if developer_ids:
+        developers = developers.filter(id__in=developer_ids)
+    count = 0
+    for developer in developers.iterator():
+        try:
+            recompute_snapshot(developer)
+            count += 1
+        except Exception as e:
+            logger.error(f"Error recomputing dashboard snapshot for developer {developer.id}: {str(e)}")
+    return count
+
+
+def _sum_daily(snapshot: DeveloperDashboardSnapshot, date_from: date, date_to: date, *keys: str) -> Dict[str, int]:
+    low, high = date_from.isoformat(), date_to.isoformat()
+    totals = {key: 0 for key in keys}
+    for day, counts in snapshot.daily.items():
+        if low <= day <= high:
+            for key in keys:
+                totals[key] += counts.get(key, 0)
+    return totals
+
+
+def get_builder_dashboard(user, date_from: date, date_to: date) -> Optional[Dict]:
+    """
+    Builder dashboard stats from the snapshot, in get_dashboard_stats' shape
+
+    Returns None when the range starts before the snapshot's per-day window,
+    in which case the caller queries the source tables. A missing snapshot is
+    computed on first use.
+    """
+    if not ANALYTICS_DASHBOARD_SNAPSHOTS:
+        return None
+    snapshot = DeveloperDashboardSnapshot.objects.filter(user_id=user.pk).first()
+    if snapshot is None:
+        developer = Developer.objects.filter(user=user).first()
+        if developer is None:
+            return None
+        snapshot = recompute_snapshot(developer)
+    if snapshot.daily_from is None or date_from < snapshot.daily_from:
+        return None
+
+    period = _sum_daily(snapshot, date_from, date_to,
+                        'bookings', 'confirmed', 'payments', 'payments_completed', 'projects')
+    if (snapshot.active_from, snapshot.active_to) == (date_from, date_to):
+        active = snapshot.active_users
+    else:
+        active = estimate_distinct('users', date_from, date_to, project_ids=list(snapshot.projects)) if snapshot.projects else 0
+
+    return {
+        'users': {'total': 1, 'new': 0, 'active': active},
+        'projects': {'total': snapshot.projects_total, 'new': period['projects']},
+        'properties': {
+            'total': snapshot.properties_total,
+            'available': snapshot.properties_available,
+            'booked': snapshot.properties_booked,
+            'sold': snapshot.properties_sold,
+        },
+        'bookings': {
+            'total': snapshot.bookings_total,
+            'new': period['bookings'],
+            'confirmed': period['confirmed'],
+        },
+        'revenue': {
+            'total': float(snapshot.revenue_total),
+            'pending': float(snapshot.pending_total),
+        },
+        'payments': {'total': period['payments'], 'completed': period['payments_completed']},
+        'project_breakdown': [
+            {
+                'id': project_id,
+                'name': entry.get('name', ''),
+                'properties': entry.get('properties', {}),
+                'bookings': entry.get('bookings', 0),
+                'revenue': float(Decimal(entry.get('revenue', '0'))),
+                'pending': float(Decimal(entry.get('pending', '0'))),
+            }
+            for project_id, entry in snapshot.projects.items()
+        ],
+        'snapshot_updated_at': snapshot.updated_at.isoformat(),
+    }
@@ -0,0 +1,287 @@
+"""
+Time-Series Service for ApnaGhar analytics charts
+Builds day/week/month series with one GROUP BY per source table, fills empty
+buckets in Python and caches closed buckets so only the current one is
+recomputed on repeat requests
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DateField, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from projects.models import Booking
+from payments.models import Payment
+from users.models import CustomUser
+from .models import AnalyticsEvent
+from .rollup_service import ROLLUP_SOURCES, aggregate_with_rollups, rollup_scope
+
+logger = logging.getLogger(__name__)
+
+# Closed buckets can still move if a booking changes status later, so they expire
+ANALYTICS_TIMESERIES_CACHE_TTL = getattr(settings, 'ANALYTICS_TIMESERIES_CACHE_TTL', 3600)  # seconds
+ANALYTICS_TIMESERIES_MAX_BUCKETS = getattr(settings, 'ANALYTICS_TIMESERIES_MAX_BUCKETS', 1000)
+
+REVENUE_STATUSES = ['confirmed', 'token_paid', 'payment_in_progress', 'completed']
+PENDING_STATUSES = ['pending', 'token_paid', 'confirmed']
+
+# Bucket expressions, all yielding a date in the current time zone
+GRANULARITIES = {
+    'day': lambda field: TruncDate(field),
+    'week': lambda field: TruncWeek(field, output_field=DateField()),
+    'month': lambda field: TruncMonth(field, output_field=DateField()),
+}
+
+
+def booking_scope(user) -> Q:
+    if user.role == 'builder':
+        return Q(property__project__developer__user=user)
+    if user.role == 'buyer':
+        return Q(buyer=user)
+    return Q()
+
+
+def payment_scope(user) -> Q:
+    if user.role == 'builder':
+        return Q(booking__property__project__developer__user=user)
+    if user.role == 'buyer':
+        return Q(user=user)
+    return Q()
+
+
+# Source tables: (model, scope for a builder/buyer or None if admin only)
+SOURCES = {
+    'booking': (Booking, booking_scope),
+    'payment': (Payment, payment_scope),
+    'user': (CustomUser, None),
+    'event': (AnalyticsEvent, None),
+}
+
+# Series name -> (source, raw aggregate, hourly rollup aggregate or None);
+# series on the same source share one query
+SERIES = {
+    'revenue': ('booking',
+                lambda: Sum('total_amount', filter=Q(status__in=REVENUE_STATUSES)),
+                lambda: Sum('total_amount', filter=Q(status__in=REVENUE_STATUSES))),
+    'token_revenue': ('booking',
+                      lambda: Sum('token_amount', filter=Q(status__in=REVENUE_STATUSES)),
+                      lambda: Sum('token_amount', filter=Q(status__in=REVENUE_STATUSES))),
+    'bookings': ('booking', lambda: Count('id'), lambda: Sum('booking_count')),
+    'confirmed_bookings': ('booking',
+                           lambda: Count('id', filter=Q(status='confirmed')),
+                           lambda: Sum('booking_count', filter=Q(status='confirmed'))),
+    'cancelled_bookings': ('booking',
+                           lambda: Count('id', filter=Q(status='cancelled')),
+                           lambda: Sum('booking_count', filter=Q(status='cancelled'))),
+    'payments': ('payment', lambda: Count('id'), None),
+    'completed_payments': ('payment', lambda: Count('id', filter=Q(status='completed')), None),
+    'payment_amount': ('payment', lambda: Sum('amount', filter=Q(status='completed')), None),
+    'new_users': ('user', lambda: Count('id'), None),
+    'page_views': ('event',
+                   lambda: Count('id', filter=Q(event_type='page_view')),
+                   lambda: Sum('event_count', filter=Q(event_type='page_view'))),
+    'project_views': ('event',
+                      lambda: Count('id', filter=Q(event_type='project_view')),
+                      lambda: Sum('event_count', filter=Q(event_type='project_view'))),
+    'property_views': ('event',
+                       lambda: Count('id', filter=Q(event_type='property_view')),
+                       lambda: Sum('event_count', filter=Q(event_type='property_view'))),
+}
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    """First day of the bucket containing day (weeks start on Monday, like TruncWeek)"""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(start: date, granularity: str) -> date:
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    if granularity == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def bucket_range(date_from: date, date_to: date, granularity: str) -> List[date]:
+    """Bucket start dates covering [date_from, date_to]"""
+    buckets = []
+    current = bucket_start(date_from, granularity)
+    while current <= date_to:
+        buckets.append(current)
+        current = next_bucket(current, granularity)
+    return buckets
+
+
+def _scope_key(user) -> str:
+    if user is None or user.is_staff:
+        return 'all'
+    return f"{user.role}:{user.pk}"
+
+
+def _cache_key(scope: str, granularity: str, name: str, bucket: date) -> str:
+    return f"analytics:ts:{scope}:{granularity}:{name}:{bucket.isoformat()}"
+
+
+def _to_datetime(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def _query_source(
+    source: str,
+    names: List[str],
+    granularity: str,
+    start: date,
+    end: date,
+    user
+) -> Dict[date, Dict[str, object]]:
+    """
+    One GROUP BY over [start, end) for all requested series on one source table
+
+    Booking and event series read the hourly rollups up to the rollup
+    watermark and only the hours after it from the raw table.
+    """
+    model, scope = SOURCES[source]
+    queryset = model.objects.all()
+    if scope is not None and _scope_key(user) != 'all':
+        queryset = queryset.filter(scope(user))
+
+    rollup_queryset = None
+    rollup_filter = rollup_scope(user)
+    if source in ROLLUP_SOURCES and rollup_filter is not None and all(SERIES[name][2] for name in names):
+        rollup_queryset = ROLLUP_SOURCES[source].rollup_model.objects.filter(rollup_filter)
+
+    return aggregate_with_rollups(
+        source,
+        queryset,
+        rollup_queryset,
+        {name: (SERIES[name][1](), SERIES[name][2]() if rollup_queryset is not None else None) for name in names},
+        start=_to_datetime(start),
+        end=_to_datetime(end),
+        bucket=GRANULARITIES[granularity],
+    )
+
+
+def _normalize(value) -> object:
+    if value is None:
+        return 0
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def get_time_series(
+    series: List[str],
+    granularity: str = 'day',
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    user=None,
+    use_cache: bool = True
+) -> Dict:
+    """
+    Build one or more series over [date_from, date_to]
+
+    Args:
+        series: Names from SERIES
+        granularity: 'day', 'week' or 'month'; the range is widened to whole buckets
+        user: Scope to a builder's or buyer's own data (None or staff for all)
+
+    Returns:
+        {'granularity': ..., 'dates': [bucket start ISO dates], 'series': {name: [values]}}
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity '{granularity}', use one of: {', '.join(GRANULARITIES)}")
+    unknown = [name for name in series if name not in SERIES]
+    if unknown or not series:
+        raise ValueError(f"Unknown series: {', '.join(unknown) or '(none)'}")
+
+    scope = _scope_key(user)
+    if scope != 'all':
+        restricted = [name for name in series if SOURCES[SERIES[name][0]][1] is None]
+        if restricted:
+            raise ValueError(f"Series not available for your account: {', '.join(restricted)}")
+
+    today = timezone.localdate()
+    date_to = date_to or today
+    date_from = date_from or date_to - timedelta(days=30)
+    if date_from > date_to:
+        raise ValueError('date_from must not be after date_to')
+    buckets = bucket_range(date_from, date_to, granularity)
+    if len(buckets) > ANALYTICS_TIMESERIES_MAX_BUCKETS:
+        raise ValueError(f"Too many buckets ({len(buckets)}); use a coarser granularity or a shorter range")
+
+    # A bucket is closed once it ends before the current one starts
+    current_bucket = bucket_start(today, granularity)
+    closed = [bucket for bucket in buckets if bucket < current_bucket]
+
+    values: Dict[str, Dict[date, object]] = {name: {} for name in series}
+    if use_cache and closed:
+        keys = {_cache_key(scope, granularity, name, bucket): (name, bucket) for name in series for bucket in closed}
+        for key, value in cache.get_many(list(keys)).items():
+            name, bucket = keys[key]
+            values[name][bucket] = value
+
+    by_source: Dict[str, List[str]] = {}
+    for name in series:
+        by_source.setdefault(SERIES[name][0], []).append(name)
+
+    to_cache = {}
+    for source, names in by_source.items():
+        missing = [bucket for bucket in buckets if any(bucket not in values[name] for name in names)]
+        if not missing:
+            continue
+        start, end = missing[0], next_bucket(missing[-1], granularity)
+        rows = _query_source(source, names, granularity, start, end, user)
+        for bucket in missing:
+            row = rows.get(bucket, {})
+            for name in names:
+                value = _normalize(row.get(name))
+                values[name][bucket] = value
+                if bucket < current_bucket:
+                    to_cache[_cache_key(scope, granularity, name, bucket)] = value
+
+    if use_cache and to_cache:
+        cache.set_many(to_cache, ANALYTICS_TIMESERIES_CACHE_TTL)
+
+    return {
+        'granularity': granularity,
+        'dates': [bucket.isoformat() for bucket in buckets],
+        'series': {name: [values[name][bucket] for bucket in buckets] for name in series},
+    }
+
+
+def parse_series_params(params, default_series: Tuple[str, ...] = ('revenue', 'bookings')) -> Dict:
+    """Read series/granularity/date_from/date_to/days query params into get_time_series kwargs"""
+    def parse_date(key):
+        value = params.get(key)
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError(f"Invalid {key} '{value}', expected YYYY-MM-DD")
+
+    date_to = parse_date('date_to')
+    date_from = parse_date('date_from')
+    if date_from is None:
+        try:
+            days = int(params.get('days', 30))
+        except ValueError:
+            raise ValueError('days must be an integer')
+        date_from = (date_to or timezone.localdate()) - timedelta(days=days)
+
+    series = params.get('series')
+    return {
+        'series': [name.strip() for name in series.split(',') if name.strip()] if series else list(default_series),
+        'granularity': params.get('granularity', 'day'),
+        'date_from': date_from,
+        'date_to': date_to,
+    }
@@ -4,14 +4,21 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
 from django_filters.rest_framework import DjangoFilterBackend
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils import timezone
 from datetime import timedelta, datetime
 from .models import AnalyticsEvent, AnalyticsMetric, AnalyticsReport
 from .serializers import (
-    AnalyticsEventSerializer, AnalyticsMetricSerializer, AnalyticsReportSerializer
+    AnalyticsEventSerializer, AnalyticsMetricSerializer, AnalyticsReportSerializer,
+    AnalyticsEventIngestSerializer, AnalyticsEventBatchSerializer
 )
 from .analytics_service import AnalyticsService
+from .ingestion_service import get_ingestion_buffer
+from .timeseries_service import get_time_series, parse_series_params
+from .funnel_service import run_report
+from .report_service import delete_report_file, enqueue_report, file_etag, parse_range, read_file
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
@@ -57,6 +64,52 @@ class AnalyticsEventViewSet(viewsets.ReadOnlyModelViewSet):
             return Response(AnalyticsEventSerializer(event).data, status=status.HTTP_201_CREATED)
         return Response({'error': 'Failed to track event'}, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Track many events in one request
+
+        Body is a list of events or {"events": [...]}. Valid events are queued on
+        the ingestion buffer and written in bulk; invalid ones are reported by index.
+        """
+        payload = {'events': request.data} if isinstance(request.data, list) else request.data
+        batch_serializer = AnalyticsEventBatchSerializer(data=payload)
+        batch_serializer.is_valid(raise_exception=True)
+
+        user = request.user if request.user.is_authenticated else None
+        session_id = request.META.get('HTTP_X_SESSION_ID')
+        ip_address = self._get_client_ip(request)
+        user_agent = request.META.get('HTTP_USER_AGENT')
+
+        events, rejected = [], []
+        for index, item in enumerate(batch_serializer.validated_data['events']):
+            serializer = AnalyticsEventIngestSerializer(data=item)
+            if not serializer.is_valid():
+                rejected.append({'index': index, 'errors': serializer.errors})
+                continue
+            data = serializer.validated_data
+            events.append({
+                **data,
+                'user': user,
+                'session_id': data.get('session_id') or session_id,
+                'ip_address': ip_address,
+                'user_agent': user_agent,
+                'metadata': data.get('metadata') or {},
+                'properties': data.get('properties') or {},
+            })
+
+        result = get_ingestion_buffer().submit(events) if events else {
+            'accepted': 0, 'sampled_out': 0, 'dropped': 0
+        }
+        return Response({**result, 'rejected': rejected}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'])
+    def ingestion_stats(self, request):
+        """Ingestion buffer counters for this worker process (admin only)"""
+        if not request.user.is_staff:
+            raise PermissionDenied("Only admins can view ingestion stats")
+        return Response(get_ingestion_buffer().stats())
+
     def _get_client_ip(self, request):
         """Get client IP address"""
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -104,7 +157,7 @@ class AnalyticsReportViewSet(viewsets.ModelViewSet):
     serializer_class = AnalyticsReportSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['report_type', 'is_archived']
+    filterset_fields = ['report_type', 'is_archived', 'status']
     
     def get_queryset(self):
         """Filter reports based on user role"""
@@ -118,8 +171,114 @@ class AnalyticsReportViewSet(viewsets.ModelViewSet):
         return super().get_queryset().filter(generated_by=user)
     
     def perform_create(self, serializer):
-        """Set generated_by to current user"""
-        serializer.save(generated_by=self.request.user)
+        """Set generated_by to current user; the report is queued for the report worker"""
+        serializer.save(generated_by=self.request.user, status='pending')
+    
+    def perform_destroy(self, instance):
+        delete_report_file(instance)
+        instance.delete()
+    
+    @action(detail=True, methods=['post'])
+    def regenerate(self, request, pk=None):
+        """Queue the report for generation again"""
+        report = self.get_object()
+        if report.status == 'running':
+            return Response({'error': 'Report is already being generated'}, status=status.HTTP_409_CONFLICT)
+        enqueue_report(report)
+        return Response(self.get_serializer(report).data, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """
+        Download the gzipped export, honouring single byte-range requests and If-Range
+
+        Returns 409 while the report is not ready.
+        """
+        report = self.get_object()
+        if report.status != 'completed' or not report.file_path:
+            return Response(
+                {'error': f"Report is {report.status}", 'progress': report.progress},
+                status=status.HTTP_409_CONFLICT
+            )
+        try:
+            # Stat the open file, so the ETag describes the bytes actually served
+            file = open(report.file_path, 'rb')
+        except OSError:
+            return Response({'error': 'Report file is missing, regenerate it'}, status=status.HTTP_410_GONE)
+        stat_result = os.fstat(file.fileno())
+        size, etag = stat_result.st_size, file_etag(stat_result)
+        
+        # A Range is only honoured for the file the client started on (If-Range); otherwise send it whole
+        if_range = request.META.get('HTTP_IF_RANGE')
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size) if not if_range or if_range == etag else None
+        except ValueError:
+            file.close()
+            response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = f"bytes */{size}"
+            return response
+        
+        first, last = byte_range or (0, size - 1)
+        response = StreamingHttpResponse(
+            read_file(file, first, last),
+            status=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK,
+            content_type='application/gzip'
+        )
+        response['Content-Length'] = str(max(0, last - first + 1))
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = etag
+        if byte_range:
+            response['Content-Range'] = f"bytes {first}-{last}/{size}"
+        filename = os.path.basename(report.file_path)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    def _run_report(self, request, kind, options):
+        report = self.get_object()
+        refresh = request.query_params.get('refresh', '').lower() in ('1', 'true', 'yes')
+        try:
+            data = run_report(
+                report, kind,
+                user=None if request.user.is_staff else request.user,
+                refresh=refresh, **options
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+    
+    @action(detail=True, methods=['get'])
+    def funnel(self, request, pk=None):
+        """
+        View -> booking -> payment funnel over the report's date range
+
+        Query params: window_days (default from filters.funnel or settings), refresh=1
+        """
+        options = {}
+        if 'window_days' in request.query_params:
+            try:
+                options['window_days'] = int(request.query_params['window_days'])
+            except ValueError:
+                return Response({'error': 'window_days must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        return self._run_report(request, 'funnel', options)
+    
+    @action(detail=True, methods=['get'])
+    def cohorts(self, request, pk=None):
+        """
+        Weekly signup cohorts over the report's date range (staff only)
+
+        Query params: activity=event|booking|payment, weeks, refresh=1
+        """
+        if not request.user.is_staff:
+            raise PermissionDenied("Only staff members can view cohort reports")
+        options = {}
+        if 'activity' in request.query_params:
+            options['activity'] = request.query_params['activity']
+        if 'weeks' in request.query_params:
+            try:
+                options['weeks'] = int(request.query_params['weeks'])
+            except ValueError:
+                return Response({'error': 'weeks must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        return self._run_report(request, 'cohorts', options)
 
 
 class AnalyticsDashboardViewSet(viewsets.ViewSet):
@@ -158,13 +317,37 @@ class AnalyticsDashboardViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
     def revenue_chart(self, request):
         """Get revenue chart data"""
-        days = int(request.query_params.get('days', 30))
-        data = AnalyticsService.get_revenue_chart_data(user=request.user, days=days)
+        try:
+            days = int(request.query_params.get('days', 30))
+            data = AnalyticsService.get_revenue_chart_data(
+                user=request.user, days=days, granularity=request.query_params.get('granularity', 'day')
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         return Response(data)
     
     @action(detail=False, methods=['get'])
     def booking_chart(self, request):
         """Get booking chart data"""
-        days = int(request.query_params.get('days', 30))
-        data = AnalyticsService.get_booking_chart_data(user=request.user, days=days)
+        try:
+            days = int(request.query_params.get('days', 30))
+            data = AnalyticsService.get_booking_chart_data(
+                user=request.user, days=days, granularity=request.query_params.get('granularity', 'day')
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+    
+    @action(detail=False, methods=['get'])
+    def timeseries(self, request):
+        """
+        Get several series in one call
+
+        Query params: series=revenue,bookings,... granularity=day|week|month,
+        date_from/date_to (YYYY-MM-DD) or days
+        """
+        try:
+            data = get_time_series(user=request.user, **parse_series_params(request.query_params))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         return Response(data)
@@ -0,0 +1,279 @@
+"""
+Outbound HTTP client shared by external integrations
+Each service (blockchain middleware, Pinata, the chatbot RAG service,
+Razorpay) gets one pooled keep-alive session whose requests carry a default
+timeout, retry idempotent calls within a retry budget, go through a circuit
+breaker and are timed into a latency histogram. The session is a
+requests.Session, so SDKs that accept one (razorpay.Client) use it as is.
+
+When a service keeps failing its breaker opens and calls fail immediately
+with CircuitOpenError (a requests ConnectionError, so existing
+`except RequestException` fallbacks apply) instead of tying up a worker until
+the timeout. After reset_timeout seconds one probe call is let through
+(half-open); it closes the breaker on success and reopens it on failure.
+
+State is per process. Per-service options come from the defaults the
+integration passes to get_client(), overridden by settings.OUTBOUND_HTTP,
+e.g. {'rag': {'timeout': (3.05, 10), 'failure_threshold': 3}}.
+"""
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+OUTBOUND_HTTP = getattr(settings, 'OUTBOUND_HTTP', {})
+
+DEFAULT_OPTIONS = {
+    'pool_size': 10,
+    'timeout': (3.05, 30),  # (connect, read) seconds, unless the call passes its own
+    'max_retries': 2,  # Per call, idempotent methods only
+    'retry_statuses': (502, 503, 504),
+    'backoff': 0.2,  # Seconds before retry n: backoff * 2^(n-1), with jitter
+    'retry_budget_ratio': 0.2,  # Sustained retries allowed per request made
+    'retry_budget_min': 10,  # Retries available in a burst
+    'failure_threshold': 5,  # Consecutive failures that open the breaker
+    'reset_timeout': 30,  # Seconds open before a half-open probe
+}
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+# Histogram bucket upper bounds in milliseconds (last bucket is unbounded)
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of calling a service whose circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Closed -> open after failure_threshold consecutive failures -> half-open probe after reset_timeout"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now (claims the probe when half-open)"""
+        with self._lock:
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+            if self.state == 'closed':
+                return True
+            if self.state == 'half_open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def release(self) -> None:
+        """Give back a probe whose call ended without a verdict on the service"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            self.state = 'closed'
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True when it opened the breaker"""
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or (self.state == 'closed' and self.failures >= self.failure_threshold):
+                self._probing = False
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+                return True
+            return False
+
+
+class RetryBudget:
+    """Token bucket: each request adds ratio tokens, each retry spends one"""
+
+    def __init__(self, ratio: float, minimum: int):
+        self.ratio = ratio
+        self.capacity = minimum
+        self.tokens = float(minimum)
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms: float) -> None:
+        with self._lock:
+            self.counts[bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+            self.total_ms += ms
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Upper bound of the bucket holding the p-th observation (None past the last bound)"""
+        total = sum(self.counts)
+        if not total:
+            return None
+        rank, seen = p * total, 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self) -> Dict:
+        total = sum(self.counts)
+        return {
+            'count': total,
+            'mean_ms': round(self.total_ms / total, 1) if total else None,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'buckets': {
+                f"le_{bound}" if bound is not None else 'inf': count
+                for bound, count in zip(LATENCY_BUCKETS_MS + (None,), self.counts)
+            },
+        }
+
+
+class ResilientSession(requests.Session):
+    """requests.Session whose requests go through its ServiceClient"""
+
+    def __init__(self, client: 'ServiceClient'):
+        super().__init__()
+        self.client = client
+
+    def request(self, method, url, *args, **kwargs):
+        return self.client.call(super().request, method, url, *args, **kwargs)
+
+
+class ServiceClient:
+    """Pooled session, timeouts, retries, circuit breaker and latency stats for one service"""
+
+    def __init__(self, name: str, **options):
+        self.name = name
+        self.options = {**DEFAULT_OPTIONS, **options}
+        self.breaker = CircuitBreaker(self.options['failure_threshold'], self.options['reset_timeout'])
+        self.budget = RetryBudget(self.options['retry_budget_ratio'], self.options['retry_budget_min'])
+        self.latency = LatencyHistogram()
+        self.counters = {'requests': 0, 'failures': 0, 'retries': 0, 'retries_denied': 0, 'rejected': 0}
+        self._lock = threading.Lock()
+
+        self.session = ResilientSession(self)
+        # Retries happen in call(), where they are budgeted and seen by the breaker
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.options['pool_size'], max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self.counters[counter] += 1
+
+    def _failed(self, reason) -> None:
+        self._count('failures')
+        if self.breaker.record_failure():
+            logger.warning(f"Circuit breaker for {self.name} opened after {reason}")
+
+    def _may_retry(self, method: str, attempt: int) -> bool:
+        if method.upper() not in IDEMPOTENT_METHODS or attempt >= self.options['max_retries']:
+            return False
+        if not self.budget.withdraw():
+            self._count('retries_denied')
+            return False
+        self._count('retries')
+        time.sleep(self.options['backoff'] * 2 ** attempt * random.uniform(0.5, 1.0))
+        return True
+
+    def call(self, send, method: str, url: str, *args, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.options['timeout'])
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self._count('rejected')
+                raise CircuitOpenError(f"{self.name} circuit breaker is open; not calling {url}")
+            self._count('requests')
+            started = time.perf_counter()
+            try:
+                response = send(method, url, *args, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                self.latency.observe((time.perf_counter() - started) * 1000)
+                self._failed(e.__class__.__name__)
+                if self._may_retry(method, attempt):
+                    attempt += 1
+                    continue
+                raise
+            except Exception:
+                self.breaker.release()
+                raise
+            self.latency.observe((time.perf_counter() - started) * 1000)
+
+            if response.status_code < 500:
+                # 4xx means the service is up and answering
+                self.breaker.record_success()
+                return response
+            self._failed(f"HTTP {response.status_code}")
+            if response.status_code in self.options['retry_statuses'] and self._may_retry(method, attempt):
+                response.close()
+                attempt += 1
+                continue
+            return response
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            **counters,
+            'breaker': self.breaker.state,
+            'consecutive_failures': self.breaker.failures,
+            'times_opened': self.breaker.times_opened,
+            'retry_tokens': round(self.budget.tokens, 1),
+            'latency': self.latency.snapshot(),
+        }
+
+
+_clients: Dict[str, ServiceClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name: str, **defaults) -> ServiceClient:
+    """The process-wide client for a service; defaults apply on first use, settings.OUTBOUND_HTTP wins"""
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = ServiceClient(name, **{**defaults, **OUTBOUND_HTTP.get(name, {})})
+    return client
+
+
+def get_session(name: str, **defaults) -> requests.Session:
+    return get_client(name, **defaults).session
+
+
+def client_stats() -> Dict[str, Dict]:
+    """Stats of every client created in this process"""
+    return {name: client.stats() for name, client in list(_clients.items())}
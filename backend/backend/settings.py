@@ -291,6 +291,39 @@ CLOUDINARY_API_SECRET = os.getenv('CLOUDINARY_API_SECRET')
 PINATA_API_KEY = os.getenv('PINATA_API_KEY')
 PINATA_API_SECRET = os.getenv('PINATA_API_SECRET')
 PINATA_GATEWAY_URL = os.getenv('PINATA_GATEWAY_URL', 'https://gateway.pinata.cloud/ipfs/')
+PINATA_CID_VERSION = int(os.getenv('PINATA_CID_VERSION', '0'))
+PINATA_MAX_CONCURRENT_UPLOADS = int(os.getenv('PINATA_MAX_CONCURRENT_UPLOADS', '4'))
+PINATA_VERIFY_PIN_TTL = int(os.getenv('PINATA_VERIFY_PIN_TTL', '3600'))  # seconds
+
+# Blockchain middleware & outbox configuration
+BLOCKCHAIN_API_URL = os.getenv('BLOCKCHAIN_API_URL', 'http://localhost:3000/api/v1')
+BLOCKCHAIN_API_TIMEOUT = (
+    float(os.getenv('BLOCKCHAIN_API_CONNECT_TIMEOUT', '3.05')),
+    float(os.getenv('BLOCKCHAIN_API_READ_TIMEOUT', '15')),
+)
+BLOCKCHAIN_OUTBOX_BATCH_SIZE = int(os.getenv('BLOCKCHAIN_OUTBOX_BATCH_SIZE', '50'))
+BLOCKCHAIN_OUTBOX_MAX_ATTEMPTS = int(os.getenv('BLOCKCHAIN_OUTBOX_MAX_ATTEMPTS', '8'))
+BLOCKCHAIN_ANCHOR_MAX_LEAVES = int(os.getenv('BLOCKCHAIN_ANCHOR_MAX_LEAVES', '4096'))
+
+# Analytics event ingestion buffer
+ANALYTICS_INGEST_BATCH_SIZE = int(os.getenv('ANALYTICS_INGEST_BATCH_SIZE', '500'))
+ANALYTICS_INGEST_FLUSH_INTERVAL = float(os.getenv('ANALYTICS_INGEST_FLUSH_INTERVAL', '2'))  # seconds
+ANALYTICS_INGEST_MAX_BUFFER = int(os.getenv('ANALYTICS_INGEST_MAX_BUFFER', '20000'))
+ANALYTICS_INGEST_MAX_BATCH = int(os.getenv('ANALYTICS_INGEST_MAX_BATCH', '1000'))
+ANALYTICS_INGEST_BACKPRESSURE = os.getenv('ANALYTICS_INGEST_BACKPRESSURE', 'sample')  # 'sample' or 'drop'
+ANALYTICS_INGEST_SAMPLE_RATE = float(os.getenv('ANALYTICS_INGEST_SAMPLE_RATE', '0.1'))
+ANALYTICS_TIMESERIES_CACHE_TTL = int(os.getenv('ANALYTICS_TIMESERIES_CACHE_TTL', '3600'))  # seconds, closed chart buckets
+ANALYTICS_ROLLUP_LATENESS = int(os.getenv('ANALYTICS_ROLLUP_LATENESS', '600'))  # seconds re-read behind the rollup watermark
+ANALYTICS_HLL_PRECISION = int(os.getenv('ANALYTICS_HLL_PRECISION', '12'))  # HyperLogLog registers = 2^p
+ANALYTICS_EVENT_RETENTION_MONTHS = int(os.getenv('ANALYTICS_EVENT_RETENTION_MONTHS', '13'))
+ANALYTICS_ARCHIVE_DIR = os.getenv('ANALYTICS_ARCHIVE_DIR', os.path.join(BASE_DIR, 'analytics_archive'))
+ANALYTICS_ARCHIVE_FORMAT = os.getenv('ANALYTICS_ARCHIVE_FORMAT', 'auto')  # 'parquet' (needs pyarrow), 'ndjson' or 'auto'
+ANALYTICS_FUNNEL_WINDOW_DAYS = int(os.getenv('ANALYTICS_FUNNEL_WINDOW_DAYS', '30'))  # max days between funnel steps
+ANALYTICS_FUNNEL_CACHE_TTL = int(os.getenv('ANALYTICS_FUNNEL_CACHE_TTL', '900'))  # seconds, reports reaching today
+ANALYTICS_REPORT_DIR = os.getenv('ANALYTICS_REPORT_DIR', os.path.join(BASE_DIR, 'analytics_reports'))
+ANALYTICS_REPORT_STALE_AFTER = int(os.getenv('ANALYTICS_REPORT_STALE_AFTER', '1800'))  # seconds before a stuck job is requeued
+ANALYTICS_DASHBOARD_SNAPSHOTS = os.getenv('ANALYTICS_DASHBOARD_SNAPSHOTS', 'True') == 'True'
+ANALYTICS_SNAPSHOT_DAYS = int(os.getenv('ANALYTICS_SNAPSHOT_DAYS', '120'))  # per-day counts kept on builder snapshots
 
 CLOUDINARY_STORAGE = {
     'CLOUD_NAME': CLOUDINARY_CLOUD_NAME,
@@ -322,12 +355,27 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 RAZORPAY_KEY_ID = os.getenv('RAZORPAY_KEY_ID')
 RAZORPAY_KEY_SECRET = os.getenv('RAZORPAY_KEY_SECRET')
 RAZORPAY_WEBHOOK_SECRET = os.getenv('RAZORPAY_WEBHOOK_SECRET')
+PAYMENT_WEBHOOK_MAX_ATTEMPTS = int(os.getenv('PAYMENT_WEBHOOK_MAX_ATTEMPTS', '8'))  # before a stored event is marked failed
+PAYMENT_WEBHOOK_RETRY_BASE = int(os.getenv('PAYMENT_WEBHOOK_RETRY_BASE', '30'))  # seconds, doubled per failed attempt
+RAZORPAY_API_URL = os.getenv('RAZORPAY_API_URL', 'https://api.razorpay.com')  # fake_razorpay_server for offline runs
+PAYMENT_RECONCILE_WINDOW = int(os.getenv('PAYMENT_RECONCILE_WINDOW', '3600'))  # seconds of gateway history per page run
+PAYMENT_RECONCILE_WORKERS = int(os.getenv('PAYMENT_RECONCILE_WORKERS', '4'))  # gateway windows fetched concurrently
+
+# Outbound HTTP (backend/http_client.py): per-service overrides of pool_size, timeout,
+# max_retries, failure_threshold, reset_timeout, ... keyed by blockchain/pinata/rag/razorpay
+OUTBOUND_HTTP = {
+    'razorpay': {'pool_size': int(os.getenv('RAZORPAY_HTTP_POOL_SIZE', '10'))},
+    'rag': {'failure_threshold': int(os.getenv('RAG_SERVICE_FAILURE_THRESHOLD', '3'))},
+}
 
 if RAZORPAY_KEY_ID and RAZORPAY_KEY_SECRET:
     logger.info(f"Razorpay configured - Key ID: {RAZORPAY_KEY_ID[:10]}...")
 else:
     logger.warning("Razorpay credentials not set. Payment gateway will not work.")
 
+# Investments: holdings streamed / dividend payments bulk-written per batch
+DIVIDEND_BATCH_SIZE = int(os.getenv('DIVIDEND_BATCH_SIZE', '5000'))
+
 # Email Configuration
 EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
 EMAIL_HOST = os.getenv('EMAIL_HOST')
@@ -341,3 +389,15 @@ if EMAIL_HOST_USER and EMAIL_HOST_PASSWORD:
     logger.info(f"Email configured - From: {DEFAULT_FROM_EMAIL}")
 else:
     logger.warning("Email credentials not set. Email notifications will use console backend.")
+
+# Notification delivery (deliver_notifications worker)
+NOTIFICATION_BULK_BATCH_SIZE = int(os.getenv('NOTIFICATION_BULK_BATCH_SIZE', '500'))
+NOTIFICATION_DELIVERY_BATCH_SIZE = int(os.getenv('NOTIFICATION_DELIVERY_BATCH_SIZE', '100'))  # emails per SMTP session
+NOTIFICATION_DELIVERY_MAX_ATTEMPTS = int(os.getenv('NOTIFICATION_DELIVERY_MAX_ATTEMPTS', '5'))
+NOTIFICATION_RETRY_BASE = int(os.getenv('NOTIFICATION_RETRY_BASE', '60'))  # seconds, doubled per failed attempt
+NOTIFICATION_RETRY_MAX = int(os.getenv('NOTIFICATION_RETRY_MAX', '3600'))
+NOTIFICATION_DIGEST_HOUR = int(os.getenv('NOTIFICATION_DIGEST_HOUR', '8'))  # daily digests (weekly on Mondays)
+NOTIFICATION_UNREAD_CACHE_TTL = int(os.getenv('NOTIFICATION_UNREAD_CACHE_TTL', '3600'))  # seconds before unread counters are recounted
+NOTIFICATION_PUBSUB_BACKEND = os.getenv('NOTIFICATION_PUBSUB_BACKEND', 'memory')  # 'memory' (single process) or 'redis'
+NOTIFICATION_PUBSUB_URL = os.getenv('NOTIFICATION_PUBSUB_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+NOTIFICATION_SSE_HEARTBEAT = int(os.getenv('NOTIFICATION_SSE_HEARTBEAT', '15'))  # seconds between keep-alive comments
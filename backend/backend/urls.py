@@ -17,6 +17,8 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from .views import outbound_http_stats
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('users.urls')),
@@ -28,5 +30,6 @@ urlpatterns = [
     path('api/analytics/', include('analytics.urls')),
     path('api/investments/', include('investments.urls')),
     path('api/chatbot/', include('chatbot.urls')),
+    path('api/outbound-http/stats/', outbound_http_stats, name='outbound-http-stats'),
     path('accounts/', include('allauth.urls')),  # For allauth
 ]
@@ -0,0 +1,18 @@
+"""
+Project-level API views
+"""
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .http_client import client_stats
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def outbound_http_stats(request):
+    """Breaker state, retries and latency of this worker's outbound HTTP clients (staff only)"""
+    if not request.user.is_staff:
+        raise PermissionDenied("Only staff members can view outbound HTTP stats")
+    return Response(client_stats())
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import BlockchainProgressUpdate, BlockchainDocument
+from .models import BlockchainProgressUpdate, BlockchainDocument, BlockchainOutbox, BlockchainAnchorBatch, BlockchainLedgerEntry, BlockchainSyncCursor, IPFSPin
 
 
 @admin.register(BlockchainProgressUpdate)
@@ -7,7 +7,7 @@ class BlockchainProgressUpdateAdmin(admin.ModelAdmin):
     list_display = ['progress_id', 'project', 'property', 'ipfs_hash', 'blockchain_tx_id', 'created_at', 'uploaded_by']
     list_filter = ['created_at', 'project']
     search_fields = ['progress_id', 'description', 'ipfs_hash', 'blockchain_tx_id']
-    readonly_fields = ['id', 'progress_id', 'ipfs_hash', 'blockchain_tx_id', 'blockchain_timestamp', 'created_at', 'updated_at']
+    readonly_fields = ['id', 'progress_id', 'ipfs_hash', 'blockchain_tx_id', 'blockchain_timestamp', 'anchor_batch', 'merkle_leaf_hash', 'merkle_proof', 'created_at', 'updated_at']
     fieldsets = (
         ('Basic Information', {
             'fields': ('progress_id', 'project', 'property', 'milestone_id')
@@ -18,6 +18,10 @@ class BlockchainProgressUpdateAdmin(admin.ModelAdmin):
         ('Blockchain Data', {
             'fields': ('ipfs_hash', 'blockchain_tx_id', 'blockchain_timestamp')
         }),
+        ('Merkle Anchoring', {
+            'fields': ('anchor_batch', 'merkle_leaf_hash', 'merkle_proof'),
+            'classes': ('collapse',)
+        }),
         ('Metadata', {
             'fields': ('metadata',)
         }),
@@ -32,7 +36,7 @@ class BlockchainDocumentAdmin(admin.ModelAdmin):
     list_display = ['document_id', 'document_name', 'document_type', 'project', 'ipfs_hash', 'blockchain_tx_id', 'created_at', 'uploaded_by']
     list_filter = ['document_type', 'created_at', 'project']
     search_fields = ['document_id', 'document_name', 'ipfs_hash', 'blockchain_tx_id']
-    readonly_fields = ['id', 'document_id', 'ipfs_hash', 'blockchain_tx_id', 'blockchain_timestamp', 'created_at', 'updated_at']
+    readonly_fields = ['id', 'document_id', 'ipfs_hash', 'blockchain_tx_id', 'blockchain_timestamp', 'anchor_batch', 'merkle_leaf_hash', 'merkle_proof', 'created_at', 'updated_at']
     fieldsets = (
         ('Basic Information', {
             'fields': ('document_id', 'project', 'property')
@@ -43,6 +47,10 @@ class BlockchainDocumentAdmin(admin.ModelAdmin):
         ('Blockchain Data', {
             'fields': ('ipfs_hash', 'blockchain_tx_id', 'blockchain_timestamp')
         }),
+        ('Merkle Anchoring', {
+            'fields': ('anchor_batch', 'merkle_leaf_hash', 'merkle_proof'),
+            'classes': ('collapse',)
+        }),
         ('Metadata', {
             'fields': ('metadata',)
         }),
@@ -50,3 +58,66 @@ class BlockchainDocumentAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at')
         }),
     )
+
+
+@admin.register(BlockchainOutbox)
+class BlockchainOutboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'method', 'endpoint', 'record_type', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status', 'endpoint', 'record_type', 'created_at']
+    search_fields = ['record_key', 'blockchain_tx_id', 'last_error']
+    readonly_fields = ['id', 'created_at', 'updated_at', 'sent_at']
+    fieldsets = (
+        ('Request', {
+            'fields': ('id', 'method', 'endpoint', 'payload')
+        }),
+        ('Local Record', {
+            'fields': ('record_type', 'record_key')
+        }),
+        ('Delivery', {
+            'fields': ('status', 'attempts', 'next_attempt_at', 'last_error', 'blockchain_tx_id', 'response')
+        }),
+        ('Timestamps', {
+            'fields': ('created_at', 'updated_at', 'sent_at')
+        }),
+    )
+
+
+@admin.register(BlockchainAnchorBatch)
+class BlockchainAnchorBatchAdmin(admin.ModelAdmin):
+    list_display = ['batch_id', 'merkle_root', 'leaf_count', 'status', 'blockchain_tx_id', 'interval_end', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['batch_id', 'merkle_root', 'blockchain_tx_id']
+    readonly_fields = ['id', 'batch_id', 'merkle_root', 'leaf_count', 'interval_start', 'interval_end', 'created_at', 'updated_at']
+    fieldsets = (
+        ('Batch', {
+            'fields': ('id', 'batch_id', 'merkle_root', 'leaf_count', 'interval_start', 'interval_end')
+        }),
+        ('Blockchain Data', {
+            'fields': ('status', 'blockchain_tx_id', 'blockchain_timestamp')
+        }),
+        ('Timestamps', {
+            'fields': ('created_at', 'updated_at')
+        }),
+    )
+
+
+@admin.register(BlockchainLedgerEntry)
+class BlockchainLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ['record_key', 'record_type', 'project', 'ledger_key', 'blockchain_tx_id', 'block_timestamp', 'synced_at']
+    list_filter = ['record_type', 'block_timestamp']
+    search_fields = ['record_key', 'ledger_key', 'data_hash', 'blockchain_tx_id']
+    readonly_fields = [f.name for f in BlockchainLedgerEntry._meta.fields]
+
+
+@admin.register(BlockchainSyncCursor)
+class BlockchainSyncCursorAdmin(admin.ModelAdmin):
+    list_display = ['name', 'position_at', 'records_synced', 'last_run_at', 'updated_at']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(IPFSPin)
+class IPFSPinAdmin(admin.ModelAdmin):
+    list_display = ['cid', 'filename', 'size', 'is_pinned', 'verified_at', 'pinned_at']
+    list_filter = ['is_pinned', 'cid_version', 'pinned_at']
+    search_fields = ['cid', 'local_cid', 'filename']
+    readonly_fields = ['id', 'created_at', 'updated_at']
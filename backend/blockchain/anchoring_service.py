@@ -0,0 +1,200 @@
+"""
+Merkle Anchoring Service for ApnaGhar
+Batches pending progress-update and document hashes into one Merkle tree
+per interval and anchors only the root on the ledger
+"""
+
+import uuid
+import logging
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import merkle
+from .models import BlockchainAnchorBatch, BlockchainProgressUpdate, BlockchainDocument
+
+logger = logging.getLogger(__name__)
+
+ANCHOR_MAX_LEAVES = getattr(settings, 'BLOCKCHAIN_ANCHOR_MAX_LEAVES', 4096)
+
+# record_type -> (model, ledger key field)
+ANCHORED_MODELS = {
+    'progress': (BlockchainProgressUpdate, 'progress_id'),
+    'document': (BlockchainDocument, 'document_id'),
+}
+
+
+def record_leaf_hash(record_type: str, record) -> str:
+    """Recompute a record's Merkle leaf from its current local data"""
+    if record_type == 'property':
+        from .blockchain_service import compute_data_hash
+        return merkle.leaf_hash('property', str(record.id), compute_data_hash(record.get_blockchain_data()))
+    _, key_field = ANCHORED_MODELS[record_type]
+    return merkle.leaf_hash(record_type, getattr(record, key_field), record.ipfs_hash)
+
+
+def _anchor_rows(pending: List[Tuple[str, object]], interval_start, project_id: str = 'merkle_batch') -> BlockchainAnchorBatch:
+    """
+    Build the tree over `pending` (record_type, row) pairs, store each row's proof
+    and queue the root. Must run inside the caller's transaction.
+    """
+    leaves = [record_leaf_hash(record_type, row) for record_type, row in pending]
+    levels = merkle.build_tree(leaves)
+    root = levels[-1][0]
+
+    batch = BlockchainAnchorBatch.objects.create(
+        batch_id=f"anchor_{uuid.uuid4().hex}",
+        merkle_root=root,
+        leaf_count=len(leaves),
+        interval_start=interval_start,
+        interval_end=timezone.now(),
+    )
+
+    by_model: Dict[type, List] = {}
+    for index, (record_type, row) in enumerate(pending):
+        row.anchor_batch = batch
+        row.merkle_leaf_hash = leaves[index]
+        row.merkle_proof = merkle.get_proof(levels, index)
+        by_model.setdefault(type(row), []).append(row)
+
+    for model, rows in by_model.items():
+        model.objects.bulk_update(rows, ['anchor_batch', 'merkle_leaf_hash', 'merkle_proof'], batch_size=500)
+
+    # One ledger write for the whole batch
+    from .outbox_service import enqueue_submission
+    enqueue_submission(
+        endpoint='/document',
+        payload={
+            'documentId': batch.batch_id,
+            'projectId': project_id,
+            'docType': 'merkle_root',
+            'ipfsHash': root,
+            'owner': 'apnaghar',
+        },
+        record_type='anchor_batch',
+        record_key=batch.batch_id,
+    )
+
+    logger.info(f"Anchored {batch.leaf_count} hashes under Merkle root {root} ({batch.batch_id})")
+    return batch
+
+
+def anchor_pending_hashes(max_leaves: Optional[int] = None) -> Optional[BlockchainAnchorBatch]:
+    """
+    Build one Merkle batch from records not yet anchored and queue its root
+
+    Returns:
+        The created BlockchainAnchorBatch, or None if nothing was pending
+    """
+    max_leaves = max_leaves or ANCHOR_MAX_LEAVES
+
+    with transaction.atomic():
+        # Lock the pending rows so concurrent anchoring runs never share a leaf
+        pending = []
+        for record_type, (model, _) in ANCHORED_MODELS.items():
+            remaining = max_leaves - len(pending)
+            if remaining <= 0:
+                break
+            rows = list(
+                model.objects.select_for_update(skip_locked=True)
+                .filter(anchor_batch__isnull=True)
+                .order_by('created_at')[:remaining]
+            )
+            pending.extend((record_type, row) for row in rows)
+
+        if not pending:
+            return None
+
+        return _anchor_rows(pending, interval_start=min(row.created_at for _, row in pending))
+
+
+def anchor_properties(properties: List, project_id: str) -> Optional[BlockchainAnchorBatch]:
+    """
+    Anchor a set of newly created units (e.g. one bulk import) under a single Merkle root
+
+    Returns:
+        The created BlockchainAnchorBatch, or None if there was nothing to anchor
+    """
+    if not properties:
+        return None
+    with transaction.atomic():
+        return _anchor_rows(
+            [('property', prop) for prop in properties],
+            interval_start=timezone.now(),
+            project_id=project_id,
+        )
+
+
+def anchor_all_pending(max_leaves: Optional[int] = None) -> List[BlockchainAnchorBatch]:
+    """Keep cutting batches until nothing is left to anchor"""
+    batches = []
+    while True:
+        batch = anchor_pending_hashes(max_leaves=max_leaves)
+        if batch is None:
+            break
+        batches.append(batch)
+    return batches
+
+
+def mark_batch_anchored(batch_id: str, tx_id: Optional[str], anchored_at) -> None:
+    """Outbox callback: the root is on the ledger, propagate to the batch and its records"""
+    batch_qs = BlockchainAnchorBatch.objects.filter(batch_id=batch_id)
+    batch_qs.update(status='anchored', blockchain_tx_id=tx_id, blockchain_timestamp=anchored_at)
+    BlockchainProgressUpdate.objects.filter(anchor_batch__batch_id=batch_id).update(
+        blockchain_tx_id=tx_id,
+        blockchain_timestamp=anchored_at
+    )
+    BlockchainDocument.objects.filter(anchor_batch__batch_id=batch_id).update(
+        blockchain_tx_id=tx_id,
+        blockchain_timestamp=anchored_at
+    )
+    # Imported units carry no tx fields of their own; their batch holds the tx id
+
+
+def mark_batches_failed(batch_ids: List[str]) -> None:
+    """
+    Outbox callback: these roots were dead-lettered, so release their records
+
+    Progress updates and documents lose their batch and proof and are picked up
+    by the next anchor_pending_hashes pass. Imported units are not part of that
+    pass, so they are re-anchored in a new batch per project straight away.
+    """
+    with transaction.atomic():
+        BlockchainAnchorBatch.objects.filter(batch_id__in=batch_ids).update(status='failed')
+        for model, _ in ANCHORED_MODELS.values():
+            model.objects.filter(anchor_batch__batch_id__in=batch_ids).update(
+                anchor_batch=None, merkle_leaf_hash=None, merkle_proof=[]
+            )
+
+        from projects.models import Property
+        by_project: Dict[str, List] = {}
+        for prop in Property.objects.filter(anchor_batch__batch_id__in=batch_ids).order_by('created_at'):
+            by_project.setdefault(str(prop.project_id), []).append(prop)
+        for project_id, properties in by_project.items():
+            _anchor_rows([('property', prop) for prop in properties], interval_start=timezone.now(), project_id=project_id)
+
+
+def verify_record(record_type: str, record) -> Dict:
+    """
+    Verify a local record against its stored proof and batch root
+
+    The leaf is recomputed from current data, so a record edited after
+    anchoring fails verification.
+    """
+    batch = record.anchor_batch
+    if batch is None:
+        return {'verified': False, 'anchored': False, 'reason': 'Record has not been anchored yet'}
+
+    leaf = record_leaf_hash(record_type, record)
+    verified = merkle.verify_proof(leaf, record.merkle_proof, batch.merkle_root)
+    return {
+        'verified': verified,
+        'anchored': batch.status == 'anchored',
+        'leaf_hash': leaf,
+        'merkle_root': batch.merkle_root,
+        'merkle_proof': record.merkle_proof,
+        'batch_id': batch.batch_id,
+        'blockchain_tx_id': batch.blockchain_tx_id,
+        'blockchain_timestamp': batch.blockchain_timestamp.isoformat() if batch.blockchain_timestamp else None,
+    }
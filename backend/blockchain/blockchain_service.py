@@ -10,12 +10,28 @@ import logging
 import requests
 from typing import Dict, Optional, List
 from datetime import datetime
-from django.utils import timezone
 from django.conf import settings
 
+from backend.http_client import get_session
+
 logger = logging.getLogger(__name__)
 
 BLOCKCHAIN_API_URL = getattr(settings, 'BLOCKCHAIN_API_URL', 'http://localhost:3000/api/v1')
+# (connect, read) timeouts in seconds for middleware calls
+BLOCKCHAIN_API_TIMEOUT = getattr(settings, 'BLOCKCHAIN_API_TIMEOUT', (3.05, 15))
+BLOCKCHAIN_API_POOL_SIZE = getattr(settings, 'BLOCKCHAIN_API_POOL_SIZE', 10)
+
+
+def get_blockchain_session() -> requests.Session:
+    """The pooled, circuit-broken HTTP session used for middleware calls"""
+    # Writes are retried by the outbox submitter; only reads are retried here
+    return get_session('blockchain', pool_size=BLOCKCHAIN_API_POOL_SIZE, timeout=BLOCKCHAIN_API_TIMEOUT)
+
+
+def compute_data_hash(data: Dict) -> str:
+    """SHA-256 of a dict as written to the ledger (canonical JSON, sorted keys)"""
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
 
 class BlockchainService:
     """
@@ -40,24 +56,53 @@ class BlockchainService:
         
         self._initialized = True
     
+    def _request_blockchain_api(self, method: str, endpoint: str, data: Dict = None) -> Dict:
+        """Call Node.js Middleware API over the pooled session, raising on failure"""
+        if method not in ('POST', 'PUT', 'GET'):
+            raise ValueError(f"Unsupported method: {method}")
+        
+        url = f"{BLOCKCHAIN_API_URL}{endpoint}"
+        response = get_blockchain_session().request(
+            method,
+            url,
+            json=data if method != 'GET' else None,
+            timeout=BLOCKCHAIN_API_TIMEOUT
+        )
+        response.raise_for_status()
+        try:
+            return response.json()
+        except ValueError:
+            return {'success': True, 'raw': response.text}
+    
     def _call_blockchain_api(self, method: str, endpoint: str, data: Dict = None) -> Dict:
         """Helper to call Node.js Middleware API"""
         try:
-            url = f"{BLOCKCHAIN_API_URL}{endpoint}"
-            if method == 'POST':
-                response = requests.post(url, json=data)
-            elif method == 'PUT':
-                response = requests.put(url, json=data)
-            elif method == 'GET':
-                response = requests.get(url)
-            else:
-                raise ValueError(f"Unsupported method: {method}")
-            
-            response.raise_for_status()
-            return response.json()
+            return self._request_blockchain_api(method, endpoint, data)
         except Exception as e:
             logger.error(f"Blockchain API call failed: {str(e)}")
             return {'success': False, 'error': str(e)}
+    
+    def _enqueue_blockchain_api(
+        self,
+        method: str,
+        endpoint: str,
+        data: Dict,
+        record_type: Optional[str] = None,
+        record_key: Optional[str] = None
+    ) -> Dict:
+        """
+        Queue a middleware call in the transactional outbox instead of calling it inline.
+        The outbox row commits (or rolls back) together with the caller's transaction.
+        """
+        from .outbox_service import enqueue_submission
+        entry = enqueue_submission(
+            endpoint=endpoint,
+            payload=data,
+            method=method,
+            record_type=record_type,
+            record_key=record_key
+        )
+        return {'success': True, 'queued': True, 'outbox_id': str(entry.id)}
 
     def store_progress_update_on_blockchain(
         self,
@@ -85,17 +130,8 @@ class BlockchainService:
             }
             data_hash = hashlib.sha256(json.dumps(data_to_hash, sort_keys=True).encode()).hexdigest()
             
-            # Call Middleware API
-            blockchain_result = self._call_blockchain_api('POST', '/milestone', {
-                'milestoneId': progress_id,
-                'projectId': project_id,
-                'title': description[:50], # Short title
-                'status': 'completed',
-                'ipfsHash': data_hash,
-                'verifier': uploaded_by
-            })
-            
-            # Create local record
+            # Create local record; the hash is anchored with the next Merkle batch
+            # (see anchoring_service.py) and blockchain_tx_id is filled in once the root lands
             from .models import BlockchainProgressUpdate
             progress_update = BlockchainProgressUpdate.objects.create(
                 id=uuid.uuid4(),
@@ -104,12 +140,7 @@ class BlockchainService:
                 property_id=property_id,
                 milestone_id=milestone_id,
                 ipfs_hash=data_hash,
-                blockchain_tx_id=blockchain_result.get('result', {}).get('txId'), # Assuming middleware returns txId in result? No, middleware returns object. 
-                # Wait, middleware returns the object. Fabric doesn't return txId in the object unless we add it.
-                # The contract returns the object. The submitTransaction result is the object.
-                # We might not get the TxID easily unless we modify middleware to return it.
-                # For now, we'll store 'success' or null.
-                blockchain_timestamp=timezone.now(),
+                blockchain_timestamp=None,
                 description=description,
                 uploaded_by_id=uploaded_by,
                 metadata={
@@ -118,8 +149,9 @@ class BlockchainService:
                     'data_hash': data_hash
                 }
             )
+            blockchain_result = {'success': True, 'queued': True, 'anchoring': 'merkle_batch'}
             
-            logger.info(f"Progress update stored on blockchain: {progress_id}")
+            logger.info(f"Progress update queued for Merkle anchoring: {progress_id}")
             
             return {
                 'success': True,
@@ -168,16 +200,8 @@ class BlockchainService:
             
             document_id = f"doc_{uuid.uuid4().hex}"
             
-            # Call Middleware API
-            blockchain_result = self._call_blockchain_api('POST', '/document', {
-                'documentId': document_id,
-                'projectId': project_id,
-                'docType': document_type,
-                'ipfsHash': ipfs_hash,
-                'owner': uploaded_by
-            })
-            
-            # Create local record
+            # Create local record; the hash is anchored with the next Merkle batch
+            # (see anchoring_service.py) and blockchain_tx_id is filled in once the root lands
             from .models import BlockchainDocument
             document = BlockchainDocument.objects.create(
                 id=uuid.uuid4(),
@@ -187,12 +211,13 @@ class BlockchainService:
                 document_name=document_name,
                 document_type=document_type,
                 ipfs_hash=ipfs_hash,
-                blockchain_timestamp=timezone.now(),
+                blockchain_timestamp=None,
                 uploaded_by_id=uploaded_by,
                 metadata=metadata or {}
             )
+            blockchain_result = {'success': True, 'queued': True, 'anchoring': 'merkle_batch'}
             
-            logger.info(f"Document stored on blockchain: {document_id}")
+            logger.info(f"Document queued for Merkle anchoring: {document_id}")
             
             return {
                 'success': True,
@@ -217,19 +242,18 @@ class BlockchainService:
         """Store property creation on blockchain"""
         self._ensure_initialized()
         try:
-            data_json = json.dumps(property_data, sort_keys=True)
-            data_hash = hashlib.sha256(data_json.encode()).hexdigest()
+            data_hash = compute_data_hash(property_data)
             
-            # Call Middleware API
-            blockchain_result = self._call_blockchain_api('POST', '/property', {
+            # Queue Middleware API call
+            blockchain_result = self._enqueue_blockchain_api('POST', '/property', {
                 'propertyId': property_id,
                 'projectId': project_id,
                 'unitNumber': unit_number,
                 'owner': created_by,
                 'dataHash': data_hash
-            })
+            }, record_type='property', record_key=property_id)
             
-            logger.info(f"Property creation stored on blockchain: {property_id}")
+            logger.info(f"Property creation queued for blockchain: {property_id}")
             
             return {
                 'success': True,
@@ -242,6 +266,10 @@ class BlockchainService:
             logger.error(f"Failed to store property creation: {str(e)}", exc_info=True)
             raise
 
+    def get_asset_history(self, ledger_key: str) -> Dict:
+        """Read a key's history straight from the ledger (one middleware round trip)"""
+        return self._call_blockchain_api('GET', f'/history/{ledger_key}')
+
 # Singleton instance
 _blockchain_service = None
 
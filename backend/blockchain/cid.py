@@ -0,0 +1,159 @@
+"""
+Local IPFS CID computation for ApnaGhar
+
+Reproduces the DAG that Pinata (kubo defaults) builds for a pinned file so the
+CID is known before upload: 256 KiB fixed-size chunks, balanced layout with up
+to 174 links per node, UnixFS dag-pb nodes. CIDv0 uses dag-pb leaves; CIDv1
+uses raw leaves and base32. Reads the stream once, chunk by chunk.
+"""
+
+import base64
+import hashlib
+from typing import BinaryIO, List, Optional, Tuple
+
+CHUNK_SIZE = 262144
+MAX_LINKS = 174
+
+# UnixFS Data.DataType
+UNIXFS_RAW = 0
+UNIXFS_FILE = 2
+
+# Multicodec codes
+CODEC_DAG_PB = 0x70
+CODEC_RAW = 0x55
+SHA2_256 = 0x12
+
+BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+# A DAG node as (cid_bytes, file_size, cumulative_size)
+DagNode = Tuple[bytes, int, int]
+
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = n & 0x7f
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _field_varint(field: int, value: int) -> bytes:
+    return _varint(field << 3) + _varint(value)
+
+
+def _field_bytes(field: int, value: bytes) -> bytes:
+    return _varint((field << 3) | 2) + _varint(len(value)) + value
+
+
+def _multihash(data: bytes) -> bytes:
+    return bytes([SHA2_256, 32]) + hashlib.sha256(data).digest()
+
+
+def _unixfs_data(data_type: int, data: Optional[bytes], filesize: int, blocksizes: List[int] = ()) -> bytes:
+    out = _field_varint(1, data_type)
+    if data:
+        out += _field_bytes(2, data)
+    out += _field_varint(3, filesize)
+    for size in blocksizes:
+        out += _field_varint(4, size)
+    return out
+
+
+def _pb_node(links: List[DagNode], data: bytes) -> bytes:
+    # dag-pb canonical form: Links (field 2) before Data (field 1)
+    out = b''
+    for cid_bytes, _, tsize in links:
+        link = _field_bytes(1, cid_bytes) + _field_bytes(2, b'') + _field_varint(3, tsize)
+        out += _field_bytes(2, link)
+    return out + _field_bytes(1, data)
+
+
+class _DagBuilder:
+    """Balanced DAG builder mirroring go-unixfs importer/balanced"""
+
+    def __init__(self, stream: BinaryIO, version: int, chunk_size: int):
+        self.stream = stream
+        self.version = version
+        self.chunk_size = chunk_size
+        self._next = self._read_chunk()
+
+    def _read_chunk(self) -> Optional[bytes]:
+        buf = bytearray()
+        while len(buf) < self.chunk_size:
+            piece = self.stream.read(self.chunk_size - len(buf))
+            if not piece:
+                break
+            buf.extend(piece)
+        return bytes(buf) if buf else None
+
+    def done(self) -> bool:
+        return self._next is None
+
+    def _cid_bytes(self, codec: int, block: bytes) -> bytes:
+        if self.version == 0:
+            return _multihash(block)
+        return _varint(1) + _varint(codec) + _multihash(block)
+
+    def leaf(self, data_type: int) -> DagNode:
+        chunk = self._next or b''
+        self._next = self._read_chunk() if self._next is not None else None
+        if self.version == 1:
+            return self._cid_bytes(CODEC_RAW, chunk), len(chunk), len(chunk)
+        block = _pb_node([], _unixfs_data(data_type, chunk, len(chunk)))
+        return self._cid_bytes(CODEC_DAG_PB, block), len(chunk), len(block)
+
+    def internal(self, children: List[DagNode]) -> DagNode:
+        filesize = sum(child[1] for child in children)
+        block = _pb_node(children, _unixfs_data(UNIXFS_FILE, None, filesize, [child[1] for child in children]))
+        return self._cid_bytes(CODEC_DAG_PB, block), filesize, len(block) + sum(child[2] for child in children)
+
+    def fill(self, children: List[DagNode], depth: int) -> DagNode:
+        while len(children) < MAX_LINKS and not self.done():
+            if depth == 1:
+                children.append(self.leaf(UNIXFS_RAW))
+            else:
+                children.append(self.fill([], depth - 1))
+        return self.internal(children)
+
+    def build(self) -> DagNode:
+        # The first leaf is a File node; it becomes the root when the file fits in one chunk
+        root = self.leaf(UNIXFS_FILE)
+        depth = 1
+        while not self.done():
+            root = self.fill([root], depth)
+            depth += 1
+        return root
+
+
+def encode_cid(cid_bytes: bytes, version: int) -> str:
+    """String form: base58btc for CIDv0, multibase base32 ('b' prefix) for CIDv1"""
+    if version == 0:
+        num = int.from_bytes(cid_bytes, 'big')
+        out = ''
+        while num:
+            num, rem = divmod(num, 58)
+            out = BASE58_ALPHABET[rem] + out
+        pad = len(cid_bytes) - len(cid_bytes.lstrip(b'\x00'))
+        return '1' * pad + out
+    return 'b' + base64.b32encode(cid_bytes).decode().lower().rstrip('=')
+
+
+def compute_cid(stream: BinaryIO, version: int = 0, chunk_size: int = CHUNK_SIZE) -> Tuple[str, int]:
+    """
+    Compute the CID a file will get when pinned
+
+    Args:
+        stream: Binary stream positioned at the start of the content
+        version: 0 (Qm..., Pinata default) or 1 (bafy.../bafk...)
+
+    Returns:
+        (cid string, file size in bytes)
+    """
+    if version not in (0, 1):
+        raise ValueError(f"Unsupported CID version: {version}")
+    cid_bytes, size, _ = _DagBuilder(stream, version, chunk_size).build()
+    return encode_cid(cid_bytes, version), size
@@ -4,14 +4,71 @@ This module handles file uploads to IPFS via Pinata
 """
 
 import os
+import io
 import json
+import uuid
+import threading
 import requests
 import logging
-from typing import Optional, Dict, BinaryIO
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Optional, Dict, BinaryIO, List
 from django.core.files.uploadedfile import UploadedFile
 
+from backend.http_client import get_session
+
 logger = logging.getLogger(__name__)
 
+PINATA_API_URL = 'https://api.pinata.cloud'
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+class _MultipartStream:
+    """
+    File-like multipart/form-data body that streams the file part from its source
+    
+    requests sends objects with read() and a known length chunk by chunk, so the
+    file is never held in memory as a whole.
+    """
+
+    def __init__(self, fields: Dict[str, str], file_field: str, filename: str,
+                 stream: BinaryIO, size: int, content_type: str):
+        self.boundary = uuid.uuid4().hex
+        preamble = b''
+        for name, value in fields.items():
+            preamble += (
+                f'--{self.boundary}\r\n'
+                f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                f'{value}\r\n'
+            ).encode()
+        safe_name = filename.replace('"', '')
+        preamble += (
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{file_field}"; filename="{safe_name}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'
+        ).encode()
+        self._parts = [io.BytesIO(preamble), stream, io.BytesIO(f'\r\n--{self.boundary}--\r\n'.encode())]
+        self._length = len(preamble) + size + len(self._parts[2].getvalue())
+
+    @property
+    def content_type(self) -> str:
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = STREAM_BLOCK_SIZE
+        out = b''
+        while self._parts and len(out) < size:
+            piece = self._parts[0].read(size - len(out))
+            if piece:
+                out += piece
+            else:
+                self._parts.pop(0)
+        return out
+
 
 class PinataService:
     """
@@ -24,56 +81,100 @@ class PinataService:
         self.api_key = os.getenv('PINATA_API_KEY', getattr(settings, 'PINATA_API_KEY', None))
         self.api_secret = os.getenv('PINATA_API_SECRET', getattr(settings, 'PINATA_API_SECRET', None))
         self.gateway_url = os.getenv('PINATA_GATEWAY_URL', getattr(settings, 'PINATA_GATEWAY_URL', 'https://gateway.pinata.cloud/ipfs/'))
+        self.api_url = getattr(settings, 'PINATA_API_URL', PINATA_API_URL)
+        # (connect, read) timeouts in seconds
+        self.upload_timeout = getattr(settings, 'PINATA_UPLOAD_TIMEOUT', (3.05, 120))
+        self.api_timeout = getattr(settings, 'PINATA_API_TIMEOUT', (3.05, 30))
+        self.pool_size = getattr(settings, 'PINATA_POOL_SIZE', 10)
+        self.max_concurrent_uploads = getattr(settings, 'PINATA_MAX_CONCURRENT_UPLOADS', 4)
+        self.cid_version = getattr(settings, 'PINATA_CID_VERSION', 0)
+        self.verify_pin_ttl = getattr(settings, 'PINATA_VERIFY_PIN_TTL', 3600)  # seconds
+        self._session = None
+        self._session_lock = threading.Lock()
         
         if not self.api_key or not self.api_secret:
             logger.warning("Pinata credentials not configured. Set PINATA_API_KEY and PINATA_API_SECRET environment variables.")
-    
-    def upload_file(
+
+    @property
+    def session(self) -> requests.Session:
+        """Pooled, circuit-broken session shared by all Pinata calls"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = get_session('pinata', pool_size=self.pool_size, timeout=self.api_timeout)
+                    session.headers.update({
+                        'pinata_api_key': self.api_key or '',
+                        'pinata_secret_api_key': self.api_secret or '',
+                    })
+                    self._session = session
+        return self._session
+
+    def _result(self, ipfs_hash: str, pinata_id=None, size=0, timestamp=None, deduplicated=False) -> Dict:
+        return {
+            'success': True,
+            'ipfs_hash': ipfs_hash,
+            'ipfs_url': f"{self.gateway_url}{ipfs_hash}",
+            'pinata_id': pinata_id,
+            'size': size,
+            'timestamp': timestamp,
+            'deduplicated': deduplicated,
+        }
+
+    def upload_stream(
         self,
-        file: UploadedFile,
+        stream: BinaryIO,
+        filename: str,
+        content_type: str = 'application/octet-stream',
         metadata: Optional[Dict] = None,
         pinata_metadata: Optional[Dict] = None
     ) -> Dict:
         """
-        Upload a file to IPFS via Pinata
+        Upload a seekable binary stream to IPFS via Pinata
+        
+        The CID is computed locally first; content already in the local pin
+        index (and still pinned per verify_pin) is not uploaded again.
+        Otherwise the stream is sent as a streaming multipart body over the
+        pooled session.
         
-        Args:
-            file: Django UploadedFile object
-            metadata: Optional metadata to attach to the file
-            pinata_metadata: Optional Pinata-specific metadata
-            
         Returns:
             Dictionary with IPFS hash and other details
         """
         if not self.api_key or not self.api_secret:
             raise ValueError("Pinata credentials not configured")
         
+        from django.db.models import Q
+        from django.utils import timezone
+        from .cid import compute_cid
+        from .models import IPFSPin
+        
+        options = dict(pinata_metadata or {})
+        cid_version = int(options.setdefault('cidVersion', self.cid_version))
+        
         try:
-            # Prepare headers
-            headers = {
-                'pinata_api_key': self.api_key,
-                'pinata_secret_api_key': self.api_secret,
-            }
-            
-            # Prepare form data
-            files = {
-                'file': (file.name, file.read(), file.content_type)
-            }
-            
-            # Add metadata if provided
-            data = {}
+            stream.seek(0)
+            local_cid, size = compute_cid(stream, version=cid_version)
+            stream.seek(0)
+            
+            existing = IPFSPin.objects.filter(Q(local_cid=local_cid) | Q(cid=local_cid)).first()
+            # Re-checked on Pinata once the cached status is older than PINATA_VERIFY_PIN_TTL;
+            # a pin removed there, or a failed lookup, falls through to a fresh upload
+            if existing and existing.is_pinned and self.verify_pin(existing.cid):
+                logger.info(f"Skipping upload, content already pinned: {existing.cid}")
+                pinned_at = existing.pinned_at.isoformat() if existing.pinned_at else None
+                return self._result(existing.cid, existing.pinata_id, existing.size or size,
+                                    pinned_at, deduplicated=True)
+            
+            fields = {'pinataOptions': json.dumps(options)}
             if metadata:
-                data['pinataMetadata'] = json.dumps(metadata)
-            if pinata_metadata:
-                data['pinataOptions'] = json.dumps(pinata_metadata)
+                fields['pinataMetadata'] = json.dumps(metadata)
+            body = _MultipartStream(fields, 'file', filename, stream, size, content_type)
             
             # Upload to Pinata
-            response = requests.post(
-                'https://api.pinata.cloud/pinning/pinFileToIPFS',
-                headers=headers,
-                files=files,
-                data=data,
-                timeout=60
+            response = self.session.post(
+                f'{self.api_url}/pinning/pinFileToIPFS',
+                data=body,
+                headers={'Content-Type': body.content_type},
+                timeout=self.upload_timeout
             )
             
             response.raise_for_status()
@@ -83,18 +184,29 @@ class PinataService:
             
             if not ipfs_hash:
                 raise ValueError("Pinata did not return IPFS hash")
+            if ipfs_hash != local_cid:
+                logger.warning(f"Pinata CID {ipfs_hash} differs from local CID {local_cid}; indexing both")
             
-            logger.info(f"File uploaded to IPFS: {ipfs_hash}")
+            now = timezone.now()
+            IPFSPin.objects.update_or_create(
+                cid=ipfs_hash,
+                defaults={
+                    'local_cid': local_cid,
+                    'cid_version': cid_version,
+                    'size': result.get('PinSize', size),
+                    'pinata_id': result.get('id'),
+                    'filename': filename[:255],
+                    'content_type': (content_type or '')[:100],
+                    'pinned_at': now,
+                    'is_pinned': True,
+                    'verified_at': now,
+                }
+            )
             
-            return {
-                'success': True,
-                'ipfs_hash': ipfs_hash,
-                'ipfs_url': f"{self.gateway_url}{ipfs_hash}",
-                'pinata_id': result.get('id'),
-                'size': result.get('pinSize', 0),
-                'timestamp': result.get('timestamp')
-            }
+            logger.info(f"File uploaded to IPFS: {ipfs_hash}")
             
+            return self._result(ipfs_hash, result.get('id'), result.get('PinSize', size), result.get('Timestamp'))
+        
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to upload file to Pinata: {str(e)}")
             raise
@@ -102,6 +214,49 @@ class PinataService:
             logger.error(f"Unexpected error uploading to Pinata: {str(e)}")
             raise
     
+    def upload_file(
+        self,
+        file: UploadedFile,
+        metadata: Optional[Dict] = None,
+        pinata_metadata: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Upload a file to IPFS via Pinata
+        
+        Args:
+            file: Django UploadedFile object (streamed from its temp file when on disk)
+            metadata: Optional metadata to attach to the file
+            pinata_metadata: Optional Pinata-specific metadata
+            
+        Returns:
+            Dictionary with IPFS hash and other details
+        """
+        file.open('rb')
+        return self.upload_stream(
+            file,
+            filename=file.name,
+            content_type=file.content_type or 'application/octet-stream',
+            metadata=metadata,
+            pinata_metadata=pinata_metadata
+            )
+            
+    def upload_path(
+        self,
+        path: str,
+        content_type: str = 'application/octet-stream',
+        metadata: Optional[Dict] = None,
+        pinata_metadata: Optional[Dict] = None
+    ) -> Dict:
+        """Upload a file from disk without reading it into memory"""
+        with open(path, 'rb') as f:
+            return self.upload_stream(
+                f,
+                filename=os.path.basename(path),
+                content_type=content_type,
+                metadata=metadata,
+                pinata_metadata=pinata_metadata
+            )
+    
     def upload_bytes(
         self,
         file_bytes: bytes,
@@ -121,60 +276,48 @@ class PinataService:
         Returns:
             Dictionary with IPFS hash and other details
         """
-        if not self.api_key or not self.api_secret:
-            raise ValueError("Pinata credentials not configured")
-        
-        try:
-            # Prepare headers
-            headers = {
-                'pinata_api_key': self.api_key,
-                'pinata_secret_api_key': self.api_secret,
-            }
-            
-            # Prepare form data
-            files = {
-                'file': (filename, file_bytes, content_type)
-            }
-            
-            # Add metadata if provided
-            data = {}
-            if metadata:
-                data['pinataMetadata'] = json.dumps(metadata)
-            
-            # Upload to Pinata
-            response = requests.post(
-                'https://api.pinata.cloud/pinning/pinFileToIPFS',
-                headers=headers,
-                files=files,
-                data=data,
-                timeout=60
+        return self.upload_stream(
+            io.BytesIO(file_bytes),
+            filename=filename,
+            content_type=content_type,
+            metadata=metadata
             )
             
-            response.raise_for_status()
-            result = response.json()
-            
-            ipfs_hash = result.get('IpfsHash')
-            
-            if not ipfs_hash:
-                raise ValueError("Pinata did not return IPFS hash")
-            
-            logger.info(f"File uploaded to IPFS: {ipfs_hash}")
-            
-            return {
-                'success': True,
-                'ipfs_hash': ipfs_hash,
-                'ipfs_url': f"{self.gateway_url}{ipfs_hash}",
-                'pinata_id': result.get('id'),
-                'size': result.get('pinSize', 0),
-                'timestamp': result.get('timestamp')
-            }
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to upload file to Pinata: {str(e)}")
-            raise
-        except Exception as e:
-            logger.error(f"Unexpected error uploading to Pinata: {str(e)}")
-            raise
+    def upload_many(self, files: List[Dict], max_workers: Optional[int] = None) -> List[Dict]:
+        """
+        Upload several files concurrently with a bounded worker pool
+        
+        Args:
+            files: [{'file': UploadedFile, 'metadata': {...}}, ...]
+            max_workers: Upper bound on parallel uploads (default PINATA_MAX_CONCURRENT_UPLOADS)
+        
+        Returns:
+            One result per input, in order; failed uploads are
+            {'success': False, 'error': ...} rather than raising
+        """
+        from django.db import connection
+        
+        def upload_one(item):
+            try:
+                return self.upload_file(item['file'], metadata=item.get('metadata'),
+                                        pinata_metadata=item.get('pinata_metadata'))
+            except Exception as e:
+                return {'success': False, 'error': str(e), 'filename': getattr(item['file'], 'name', None)}
+        
+        def upload_in_worker(item):
+            try:
+                return upload_one(item)
+            finally:
+                # Worker threads open their own DB connections for the pin index
+                connection.close()
+        
+        if not files:
+            return []
+        workers = max(1, min(max_workers or self.max_concurrent_uploads, len(files)))
+        if workers == 1:
+            return [upload_one(item) for item in files]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pinata-upload') as pool:
+            return list(pool.map(upload_in_worker, files))
     
     def get_file_url(self, ipfs_hash: str) -> str:
         """
@@ -188,12 +331,15 @@ class PinataService:
         """
         return f"{self.gateway_url}{ipfs_hash}"
     
-    def verify_pin(self, ipfs_hash: str) -> bool:
+    def verify_pin(self, ipfs_hash: str, use_cache: bool = True) -> bool:
         """
         Verify that a file is pinned on Pinata
         
+        Results are cached in the local pin index for PINATA_VERIFY_PIN_TTL seconds.
+        
         Args:
             ipfs_hash: IPFS hash to verify
+            use_cache: Set False to force a fresh check
             
         Returns:
             True if pinned, False otherwise
@@ -201,28 +347,34 @@ class PinataService:
         if not self.api_key or not self.api_secret:
             return False
         
+        from django.utils import timezone
+        from .models import IPFSPin
+        
+        pin = IPFSPin.objects.filter(cid=ipfs_hash).first()
+        if (
+            use_cache and pin and pin.is_pinned is not None and pin.verified_at
+            and pin.verified_at > timezone.now() - timedelta(seconds=self.verify_pin_ttl)
+        ):
+            return pin.is_pinned
+        
         try:
-            headers = {
-                'pinata_api_key': self.api_key,
-                'pinata_secret_api_key': self.api_secret,
-            }
-            
-            response = requests.get(
-                f'https://api.pinata.cloud/data/pinList?hashContains={ipfs_hash}',
-                headers=headers,
-                timeout=30
+            response = self.session.get(
+                f'{self.api_url}/data/pinList',
+                params={'hashContains': ipfs_hash, 'status': 'pinned'},
+                timeout=self.api_timeout
             )
             
             response.raise_for_status()
             result = response.json()
             
             # Check if hash exists in results
-            if result.get('count', 0) > 0:
-                for item in result.get('rows', []):
-                    if item.get('ipfs_pin_hash') == ipfs_hash:
-                        return True
+            is_pinned = any(item.get('ipfs_pin_hash') == ipfs_hash for item in result.get('rows', []))
             
-            return False
+            IPFSPin.objects.update_or_create(
+                cid=ipfs_hash,
+                defaults={'is_pinned': is_pinned, 'verified_at': timezone.now()}
+            )
+            return is_pinned
             
         except Exception as e:
             logger.error(f"Failed to verify pin: {str(e)}")
@@ -238,4 +390,3 @@ def get_pinata_service() -> PinataService:
     if _pinata_service is None:
         _pinata_service = PinataService()
     return _pinata_service
-
@@ -0,0 +1,345 @@
+"""
+Ledger Mirror Service for ApnaGhar
+Keeps a local, incrementally synced index of what the ledger holds
+(key, data hash, tx id, block time) so reads and verification never
+need a middleware round trip per record
+"""
+
+import logging
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import merkle
+from .outbox_service import OUTBOX_CLAIM_TIMEOUT
+from .models import (
+    BlockchainOutbox, BlockchainLedgerEntry, BlockchainSyncCursor,
+    BlockchainProgressUpdate, BlockchainDocument
+)
+from projects.models import Property
+
+logger = logging.getLogger(__name__)
+
+LEDGER_SYNC_CURSOR = 'ledger_mirror'
+LEDGER_SYNC_BATCH_SIZE = getattr(settings, 'BLOCKCHAIN_LEDGER_SYNC_BATCH_SIZE', 200)
+# Rows are re-scanned this far behind the cursor: with several submitters, rows
+# commit out of sent_at order. Each is saved right after its request, so none lands
+# later than a claim can last; the overlap never drops below OUTBOX_CLAIM_TIMEOUT
+LEDGER_SYNC_OVERLAP = max(getattr(settings, 'BLOCKCHAIN_LEDGER_SYNC_OVERLAP', 0), OUTBOX_CLAIM_TIMEOUT)  # seconds
+LEDGER_VERIFY_MAX_RECORDS = getattr(settings, 'BLOCKCHAIN_LEDGER_VERIFY_MAX_RECORDS', 1000)
+
+# record_type -> (model, local key field) for records with a local counterpart
+LOCAL_MODELS = {
+    'progress': (BlockchainProgressUpdate, 'progress_id'),
+    'document': (BlockchainDocument, 'document_id'),
+}
+
+
+def _mirror_rows_for_entries(entries: List[BlockchainOutbox]) -> List[BlockchainLedgerEntry]:
+    """Translate sent outbox rows into mirror rows (batched lookups, no per-row queries)"""
+    rows = []
+    batch_entries = [e for e in entries if e.record_type == 'anchor_batch']
+    direct_entries = {
+        record_type: [e for e in entries if e.record_type == record_type]
+        for record_type in LOCAL_MODELS
+    }
+
+    # Properties: the ledger holds the property data hash under the property id
+    property_entries = [e for e in entries if e.record_type == 'property']
+    if property_entries:
+        known_properties = dict(
+            Property.objects.filter(id__in=[e.record_key for e in property_entries])
+            .values_list('id', 'project_id')
+        )
+        known_properties = {str(k): v for k, v in known_properties.items()}
+        for entry in property_entries:
+            rows.append(BlockchainLedgerEntry(
+                record_type='property',
+                record_key=entry.record_key,
+                ledger_key=entry.record_key,
+                project_id=known_properties.get(entry.record_key),
+                property_id=entry.record_key if entry.record_key in known_properties else None,
+                data_hash=entry.payload.get('dataHash', ''),
+                blockchain_tx_id=entry.blockchain_tx_id,
+                block_timestamp=entry.sent_at,
+            ))
+
+    # Progress updates / documents written directly (before Merkle batching)
+    for record_type, typed_entries in direct_entries.items():
+        if not typed_entries:
+            continue
+        model, key_field = LOCAL_MODELS[record_type]
+        locals_by_key = {
+            getattr(record, key_field): record
+            for record in model.objects.filter(**{f'{key_field}__in': [e.record_key for e in typed_entries]})
+            .only(key_field, 'project', 'property')
+        }
+        for entry in typed_entries:
+            record = locals_by_key.get(entry.record_key)
+            rows.append(BlockchainLedgerEntry(
+                record_type=record_type,
+                record_key=entry.record_key,
+                ledger_key=entry.record_key,
+                project_id=record.project_id if record else None,
+                property_id=record.property_id if record else None,
+                data_hash=entry.payload.get('ipfsHash', ''),
+                blockchain_tx_id=entry.blockchain_tx_id,
+                block_timestamp=entry.sent_at,
+            ))
+
+    # Merkle batches: one row for the root plus one per leaf it commits to
+    if batch_entries:
+        by_batch = {e.record_key: e for e in batch_entries}
+        for entry in batch_entries:
+            rows.append(BlockchainLedgerEntry(
+                record_type='anchor_batch',
+                record_key=entry.record_key,
+                ledger_key=entry.record_key,
+                data_hash=entry.payload.get('ipfsHash', ''),
+                merkle_root=entry.payload.get('ipfsHash'),
+                blockchain_tx_id=entry.blockchain_tx_id,
+                block_timestamp=entry.sent_at,
+            ))
+        for record_type, (model, key_field) in LOCAL_MODELS.items():
+            leaves = (
+                model.objects.filter(anchor_batch__batch_id__in=list(by_batch))
+                .values_list(key_field, 'project_id', 'property_id', 'ipfs_hash',
+                             'merkle_leaf_hash', 'anchor_batch__batch_id')
+            )
+            for record_key, project_id, property_id, ipfs_hash, leaf, batch_id in leaves.iterator(chunk_size=2000):
+                entry = by_batch[batch_id]
+                rows.append(BlockchainLedgerEntry(
+                    record_type=record_type,
+                    record_key=record_key,
+                    ledger_key=batch_id,
+                    project_id=project_id,
+                    property_id=property_id,
+                    data_hash=ipfs_hash,
+                    leaf_hash=leaf,
+                    merkle_root=entry.payload.get('ipfsHash'),
+                    blockchain_tx_id=entry.blockchain_tx_id,
+                    block_timestamp=entry.sent_at,
+                ))
+        # Units anchored by a bulk import
+        units = (
+            Property.objects.filter(anchor_batch__batch_id__in=list(by_batch))
+            .values_list('id', 'project_id', 'merkle_leaf_hash', 'anchor_batch__batch_id')
+        )
+        for property_id, project_id, leaf, batch_id in units.iterator(chunk_size=2000):
+            entry = by_batch[batch_id]
+            rows.append(BlockchainLedgerEntry(
+                record_type='property',
+                record_key=str(property_id),
+                ledger_key=batch_id,
+                project_id=project_id,
+                property_id=property_id,
+                data_hash=leaf,
+                leaf_hash=leaf,
+                merkle_root=entry.payload.get('ipfsHash'),
+                blockchain_tx_id=entry.blockchain_tx_id,
+                block_timestamp=entry.sent_at,
+            ))
+
+    return rows
+
+
+def _upsert_mirror_rows(rows: List[BlockchainLedgerEntry]) -> int:
+    """Insert or refresh mirror rows in bulk (idempotent on record_key/record_type)"""
+    if not rows:
+        return 0
+    BlockchainLedgerEntry.objects.bulk_create(
+        rows,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['record_key', 'record_type'],
+        update_fields=[
+            'project', 'property', 'data_hash', 'leaf_hash', 'merkle_root',
+            'ledger_key', 'blockchain_tx_id', 'block_timestamp', 'synced_at'
+        ],
+    )
+    return len(rows)
+
+
+def sync_ledger_mirror(batch_size: Optional[int] = None, max_pages: Optional[int] = None) -> Dict:
+    """
+    Advance the sync cursor over the outbox's sent log and upsert the mirror
+
+    Each page is keyset-paginated on (sent_at, id) and written in one transaction
+    together with the cursor, so a crash mid-run resumes where it stopped.
+    """
+    batch_size = batch_size or LEDGER_SYNC_BATCH_SIZE
+    cursor, _ = BlockchainSyncCursor.objects.get_or_create(name=LEDGER_SYNC_CURSOR)
+
+    sent = BlockchainOutbox.objects.filter(status='sent', sent_at__isnull=False, record_type__isnull=False)
+    last_at = cursor.position_at - timedelta(seconds=LEDGER_SYNC_OVERLAP) if cursor.position_at else None
+    last_id = None
+    stats = {'pages': 0, 'entries': 0, 'rows_written': 0, 'skipped': 0}
+
+    while max_pages is None or stats['pages'] < max_pages:
+        page = sent
+        if last_at is not None and last_id is not None:
+            page = page.filter(Q(sent_at__gt=last_at) | Q(sent_at=last_at, id__gt=last_id))
+        elif last_at is not None:
+            page = page.filter(sent_at__gte=last_at)
+        entries = list(page.order_by('sent_at', 'id')[:batch_size])
+        if not entries:
+            break
+
+        # Rows re-read from the overlap window are skipped if already mirrored with the same tx
+        mirrored = set(
+            BlockchainLedgerEntry.objects.filter(
+                record_key__in=[e.record_key for e in entries]
+            ).values_list('record_type', 'record_key', 'blockchain_tx_id')
+        )
+        fresh = [e for e in entries if (e.record_type, e.record_key, e.blockchain_tx_id) not in mirrored]
+
+        with transaction.atomic():
+            written = _upsert_mirror_rows(_mirror_rows_for_entries(fresh))
+            last_at, last_id = entries[-1].sent_at, entries[-1].id
+            if cursor.position_at is None or last_at >= cursor.position_at:
+                cursor.position_at, cursor.position_id = last_at, last_id
+            cursor.records_synced += written
+            cursor.last_run_at = timezone.now()
+            cursor.save()
+
+        stats['pages'] += 1
+        stats['entries'] += len(entries)
+        stats['rows_written'] += written
+        stats['skipped'] += len(entries) - len(fresh)
+        if len(entries) < batch_size:
+            break
+
+    if stats['pages'] == 0:
+        BlockchainSyncCursor.objects.filter(pk=cursor.pk).update(last_run_at=timezone.now())
+
+    logger.info(f"Ledger mirror sync: {stats}")
+    return stats
+
+
+def reset_ledger_mirror() -> None:
+    """Drop the mirror and rewind the cursor so the next sync rebuilds from scratch"""
+    with transaction.atomic():
+        BlockchainLedgerEntry.objects.all().delete()
+        BlockchainSyncCursor.objects.filter(name=LEDGER_SYNC_CURSOR).delete()
+
+
+def get_mirror_entry(record_type: str, record_key: str) -> Optional[BlockchainLedgerEntry]:
+    return BlockchainLedgerEntry.objects.filter(record_type=record_type, record_key=record_key).first()
+
+
+def serialize_mirror_entry(entry: Optional[BlockchainLedgerEntry]) -> Dict:
+    """Shape a mirror row like the ledger read response the views return"""
+    if entry is None:
+        return {'synced': False}
+    return {
+        'synced': True,
+        'ledger_key': entry.ledger_key,
+        'data_hash': entry.data_hash,
+        'leaf_hash': entry.leaf_hash,
+        'merkle_root': entry.merkle_root,
+        'blockchain_tx_id': entry.blockchain_tx_id,
+        'block_timestamp': entry.block_timestamp.isoformat() if entry.block_timestamp else None,
+        'synced_at': entry.synced_at.isoformat() if entry.synced_at else None,
+    }
+
+
+def _check_record(record_type: str, record, entry: BlockchainLedgerEntry) -> Tuple[bool, Optional[str]]:
+    """Compare a local record against its mirror row (pure computation)"""
+    if entry.leaf_hash:
+        from .anchoring_service import record_leaf_hash
+        if record_leaf_hash(record_type, record) != entry.leaf_hash:
+            return False, 'Local data differs from the anchored Merkle leaf'
+        if not merkle.verify_proof(entry.leaf_hash, record.merkle_proof, entry.merkle_root):
+            return False, 'Merkle proof does not lead to the anchored root'
+        return True, None
+
+    if record_type == 'property':
+        from .blockchain_service import compute_data_hash
+        if compute_data_hash(record.get_blockchain_data()) != entry.data_hash:
+            return False, 'Local property data differs from the hash on the ledger'
+        return True, None
+
+    if record.ipfs_hash != entry.data_hash:
+        return False, 'Local hash differs from the hash on the ledger'
+    return True, None
+
+
+def bulk_verify(records: Iterable[Dict]) -> Dict:
+    """
+    Verify many records against the mirror
+
+    Args:
+        records: [{'record_type': ..., 'record_key': ...}, ...]
+
+    Mirror rows come back in one query and local rows in one query per record
+    type, so cost does not grow with round trips.
+    """
+    requested = [(r['record_type'], str(r['record_key'])) for r in records]
+    entries = {
+        (e.record_type, e.record_key): e
+        for e in BlockchainLedgerEntry.objects.filter(record_key__in={key for _, key in requested})
+    }
+
+    local = {}
+    for record_type in {record_type for record_type, _ in requested}:
+        keys = [key for t, key in requested if t == record_type]
+        if record_type == 'property':
+            for prop in Property.objects.filter(id__in=keys):
+                local[('property', str(prop.id))] = prop
+        elif record_type in LOCAL_MODELS:
+            model, key_field = LOCAL_MODELS[record_type]
+            for record in model.objects.filter(**{f'{key_field}__in': keys}):
+                local[(record_type, getattr(record, key_field))] = record
+
+    results = []
+    summary = {'verified': 0, 'mismatch': 0, 'not_synced': 0, 'not_found': 0}
+    for record_type, record_key in requested:
+        entry = entries.get((record_type, record_key))
+        record = local.get((record_type, record_key))
+        result = {'record_type': record_type, 'record_key': record_key}
+        if record is None:
+            result['status'] = 'not_found'
+        elif entry is None:
+            result['status'] = 'not_synced'
+        else:
+            ok, reason = _check_record(record_type, record, entry)
+            result['status'] = 'verified' if ok else 'mismatch'
+            if reason:
+                result['reason'] = reason
+            result['blockchain_tx_id'] = entry.blockchain_tx_id
+            result['block_timestamp'] = entry.block_timestamp.isoformat() if entry.block_timestamp else None
+        summary[result['status']] += 1
+        results.append(result)
+
+    return {'total': len(results), 'summary': summary, 'results': results}
+
+
+def records_for_scope(project_id=None, property_id=None, record_type: Optional[str] = None,
+                      limit: Optional[int] = None) -> List[Dict]:
+    """Mirror keys for a project or property, for verifying a whole scope in one call"""
+    limit = limit or LEDGER_VERIFY_MAX_RECORDS
+    qs = BlockchainLedgerEntry.objects.exclude(record_type='anchor_batch')
+    if property_id:
+        qs = qs.filter(property_id=property_id)
+    elif project_id:
+        qs = qs.filter(project_id=project_id)
+    if record_type:
+        qs = qs.filter(record_type=record_type)
+    return list(qs.order_by('-block_timestamp').values('record_type', 'record_key')[:limit])
+
+
+def get_sync_status() -> Dict:
+    cursor = BlockchainSyncCursor.objects.filter(name=LEDGER_SYNC_CURSOR).first()
+    pending = BlockchainOutbox.objects.filter(status='sent', record_type__isnull=False)
+    if cursor and cursor.position_at:
+        pending = pending.filter(sent_at__gt=cursor.position_at)
+    return {
+        'cursor_position': cursor.position_at.isoformat() if cursor and cursor.position_at else None,
+        'last_run_at': cursor.last_run_at.isoformat() if cursor and cursor.last_run_at else None,
+        'records_synced': cursor.records_synced if cursor else 0,
+        'mirror_size': BlockchainLedgerEntry.objects.count(),
+        'sent_entries_behind': pending.count(),
+    }
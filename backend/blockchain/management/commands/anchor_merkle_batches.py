@@ -0,0 +1,56 @@
+"""
+Management command to anchor pending progress-update and document hashes
+Builds one Merkle tree per interval and queues only its root for the ledger.
+Run from cron every interval, or with --loop as a long-running worker.
+"""
+import time
+from django.core.management.base import BaseCommand
+from blockchain.anchoring_service import anchor_all_pending
+
+
+class Command(BaseCommand):
+    help = 'Batch pending blockchain hashes into Merkle trees and anchor their roots'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-leaves',
+            type=int,
+            default=None,
+            help='Maximum hashes per Merkle batch (default: BLOCKCHAIN_ANCHOR_MAX_LEAVES)'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and anchor once per --interval'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=300,
+            help='Seconds between anchoring runs when --loop is set (default: 300)'
+        )
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self._anchor_once(options['max_leaves'])
+            return
+
+        self.stdout.write(self.style.WARNING(f"Anchoring every {options['interval']}s (Ctrl+C to stop)..."))
+        try:
+            while True:
+                self._anchor_once(options['max_leaves'])
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\nAnchoring worker stopped'))
+
+    def _anchor_once(self, max_leaves):
+        batches = anchor_all_pending(max_leaves=max_leaves)
+        if not batches:
+            self.stdout.write('No pending hashes to anchor')
+            return
+        for batch in batches:
+            self.stdout.write(f'  {batch.batch_id}: {batch.leaf_count} hashes, root {batch.merkle_root}')
+        total = sum(batch.leaf_count for batch in batches)
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Anchored {total} hashes with {len(batches)} ledger write(s)'
+        ))
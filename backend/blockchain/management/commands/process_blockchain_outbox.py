@@ -0,0 +1,69 @@
+"""
+Management command to drain the blockchain outbox
+Submits queued ledger writes to the Fabric middleware in batches.
+Run once (e.g. from cron) or with --loop as a long-running worker.
+"""
+from django.core.management.base import BaseCommand
+from blockchain.outbox_service import get_outbox_metrics, get_outbox_submitter
+
+
+class Command(BaseCommand):
+    help = 'Submit pending blockchain outbox entries to the middleware'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Number of outbox rows to claim per batch (default: BLOCKCHAIN_OUTBOX_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and poll for new entries'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=None,
+            help='Seconds to wait between polls when --loop is set'
+        )
+        parser.add_argument(
+            '--metrics',
+            action='store_true',
+            help='Only print backlog depth and submission lag, then exit'
+        )
+
+    def handle(self, *args, **options):
+        if options['metrics']:
+            self._print_metrics()
+            return
+
+        # The shared submitter, so on_commit wake-ups from this process reach the loop
+        submitter = get_outbox_submitter()
+        if options['batch_size']:
+            submitter.batch_size = options['batch_size']
+
+        if options['loop']:
+            self.stdout.write(self.style.WARNING('Starting blockchain outbox worker (Ctrl+C to stop)...'))
+            try:
+                submitter.run_forever(poll_interval=options['poll_interval'])
+            except KeyboardInterrupt:
+                self.stdout.write(self.style.WARNING('\nOutbox worker stopped'))
+            return
+
+        totals = submitter.drain()
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Outbox drained: {totals['sent']} sent, {totals['retried']} scheduled for retry, "
+            f"{totals['dead']} dead-lettered"
+        ))
+        self._print_metrics()
+
+    def _print_metrics(self):
+        metrics = get_outbox_metrics()
+        lag = metrics['submission_lag_seconds']
+        self.stdout.write(self.style.WARNING('\nOutbox metrics:'))
+        self.stdout.write(f"  Backlog depth: {metrics['backlog_depth']}")
+        self.stdout.write(f"  Dead-lettered: {metrics['dead_lettered']}")
+        self.stdout.write(f"  Oldest pending age: {metrics['oldest_pending_age_seconds']:.1f}s")
+        self.stdout.write(f"  Submission lag (avg/p95): {lag['avg']:.2f}s / {lag['p95']:.2f}s over {lag['samples']} sends")
@@ -0,0 +1,62 @@
+"""
+Management command to sync the local ledger mirror
+Advances the sync cursor over ledger writes accepted through the outbox.
+Run once (e.g. from cron) or with --loop as a long-running worker.
+"""
+import time
+from django.core.management.base import BaseCommand
+from blockchain.ledger_mirror_service import sync_ledger_mirror, reset_ledger_mirror, get_sync_status
+
+
+class Command(BaseCommand):
+    help = 'Sync the local ledger mirror from accepted blockchain writes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Outbox rows per sync page (default: BLOCKCHAIN_LEDGER_SYNC_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and sync once per --interval'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=30,
+            help='Seconds between syncs when --loop is set (default: 30)'
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Drop the mirror and rebuild it from the start of the outbox log'
+        )
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            reset_ledger_mirror()
+            self.stdout.write(self.style.WARNING('Ledger mirror reset, rebuilding from scratch'))
+
+        if not options['loop']:
+            self._sync_once(options['batch_size'])
+            return
+
+        self.stdout.write(self.style.WARNING(f"Syncing ledger mirror every {options['interval']}s (Ctrl+C to stop)..."))
+        try:
+            while True:
+                self._sync_once(options['batch_size'])
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\nLedger mirror sync stopped'))
+
+    def _sync_once(self, batch_size):
+        stats = sync_ledger_mirror(batch_size=batch_size)
+        status = get_sync_status()
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Synced {stats['entries']} ledger writes into {stats['rows_written']} mirror rows "
+            f"({stats['skipped']} already mirrored)"
+        ))
+        self.stdout.write(f"  Mirror size: {status['mirror_size']}, cursor at {status['cursor_position']}")
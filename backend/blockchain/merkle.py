@@ -0,0 +1,88 @@
+"""
+Merkle tree helpers for batched blockchain anchoring
+
+Leaves and interior nodes are domain-separated (RFC 6962 style) so a leaf
+can never be passed off as an interior node. An odd node at the end of a
+level is promoted unchanged to the next level.
+"""
+
+import hashlib
+from typing import Dict, List
+
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+def leaf_hash(record_type: str, record_key: str, content_hash: str) -> str:
+    """Hash of a single anchored record (hex)"""
+    data = f"{record_type}:{record_key}:{content_hash}".encode()
+    return hashlib.sha256(LEAF_PREFIX + data).hexdigest()
+
+
+def node_hash(left: str, right: str) -> str:
+    """Hash of an interior node from two hex child hashes"""
+    return hashlib.sha256(NODE_PREFIX + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def build_tree(leaves: List[str]) -> List[List[str]]:
+    """
+    Build all levels of the tree, leaves first and root last
+
+    Args:
+        leaves: Leaf hashes (hex) in tree order
+
+    Returns:
+        List of levels; levels[-1][0] is the root
+    """
+    if not leaves:
+        raise ValueError("Cannot build a Merkle tree with no leaves")
+
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        current = levels[-1]
+        parent = []
+        for i in range(0, len(current), 2):
+            if i + 1 < len(current):
+                parent.append(node_hash(current[i], current[i + 1]))
+            else:
+                parent.append(current[i])
+        levels.append(parent)
+    return levels
+
+
+def get_proof(levels: List[List[str]], index: int) -> List[Dict[str, str]]:
+    """
+    Inclusion proof for the leaf at `index`
+
+    Returns:
+        List of {'hash': sibling, 'position': 'left'|'right'} from leaf to root
+    """
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append({
+                'hash': level[sibling],
+                'position': 'left' if sibling < index else 'right',
+            })
+        index //= 2
+    return proof
+
+
+def compute_root(leaf: str, proof: List[Dict[str, str]]) -> str:
+    """Fold a proof over a leaf hash to get the implied root"""
+    current = leaf
+    for step in proof:
+        if step['position'] == 'left':
+            current = node_hash(step['hash'], current)
+        else:
+            current = node_hash(current, step['hash'])
+    return current
+
+
+def verify_proof(leaf: str, proof: List[Dict[str, str]], root: str) -> bool:
+    """Check that `leaf` is included under `root` (pure computation, no I/O)"""
+    try:
+        return compute_root(leaf, proof) == root
+    except (KeyError, TypeError, ValueError):
+        return False
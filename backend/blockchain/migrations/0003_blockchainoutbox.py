@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-18 23:37
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0002_alter_blockchaindocument_id_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlockchainOutbox',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('method', models.CharField(choices=[('POST', 'POST'), ('PUT', 'PUT')], default='POST', max_length=10)),
+                ('endpoint', models.CharField(max_length=255)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('record_type', models.CharField(blank=True, max_length=50, null=True)),
+                ('record_key', models.CharField(blank=True, max_length=255, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('in_flight', 'In Flight'), ('sent', 'Sent'), ('dead', 'Dead Letter')], default='pending', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('response', models.JSONField(blank=True, default=dict)),
+                ('blockchain_tx_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Blockchain Outbox Entry',
+                'verbose_name_plural': 'Blockchain Outbox',
+                'db_table': 'blockchain_outbox',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='blockchain__status_c609fb_idx'), models.Index(fields=['record_type', 'record_key'], name='blockchain__record__d99245_idx'), models.Index(fields=['status', 'sent_at'], name='blockchain__status_aea4e8_idx')],
+            },
+        ),
+    ]
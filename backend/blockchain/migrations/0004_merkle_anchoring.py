@@ -0,0 +1,68 @@
+# Generated by Django 5.2.6 on 2026-10-18 23:39
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0003_blockchainoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blockchaindocument',
+            name='merkle_leaf_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='blockchaindocument',
+            name='merkle_proof',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='blockchainprogressupdate',
+            name='merkle_leaf_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='blockchainprogressupdate',
+            name='merkle_proof',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.CreateModel(
+            name='BlockchainAnchorBatch',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('batch_id', models.CharField(max_length=255, unique=True)),
+                ('merkle_root', models.CharField(max_length=64)),
+                ('leaf_count', models.IntegerField(default=0)),
+                ('interval_start', models.DateTimeField()),
+                ('interval_end', models.DateTimeField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('anchored', 'Anchored'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('blockchain_tx_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('blockchain_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Blockchain Anchor Batch',
+                'verbose_name_plural': 'Blockchain Anchor Batches',
+                'db_table': 'blockchain_anchor_batches',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['merkle_root'], name='blockchain__merkle__9c916b_idx'), models.Index(fields=['status', 'created_at'], name='blockchain__status_38a682_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='blockchaindocument',
+            name='anchor_batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='documents', to='blockchain.blockchainanchorbatch'),
+        ),
+        migrations.AddField(
+            model_name='blockchainprogressupdate',
+            name='anchor_batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='progress_updates', to='blockchain.blockchainanchorbatch'),
+        ),
+    ]
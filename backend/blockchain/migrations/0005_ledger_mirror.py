@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-18 23:42
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0004_merkle_anchoring'),
+        ('projects', '0011_add_booking_model'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlockchainSyncCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('position_at', models.DateTimeField(blank=True, null=True)),
+                ('position_id', models.UUIDField(blank=True, null=True)),
+                ('records_synced', models.BigIntegerField(default=0)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Blockchain Sync Cursor',
+                'verbose_name_plural': 'Blockchain Sync Cursors',
+                'db_table': 'blockchain_sync_cursors',
+            },
+        ),
+        migrations.CreateModel(
+            name='BlockchainLedgerEntry',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('record_type', models.CharField(choices=[('property', 'Property'), ('progress', 'Progress Update'), ('document', 'Document'), ('anchor_batch', 'Anchor Batch')], max_length=20)),
+                ('record_key', models.CharField(max_length=255)),
+                ('data_hash', models.CharField(max_length=255)),
+                ('leaf_hash', models.CharField(blank=True, max_length=64, null=True)),
+                ('merkle_root', models.CharField(blank=True, max_length=64, null=True)),
+                ('ledger_key', models.CharField(max_length=255)),
+                ('blockchain_tx_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('block_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='projects.project')),
+                ('property', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='projects.property')),
+            ],
+            options={
+                'verbose_name': 'Blockchain Ledger Entry',
+                'verbose_name_plural': 'Blockchain Ledger Entries',
+                'db_table': 'blockchain_ledger_entries',
+                'ordering': ['-block_timestamp'],
+                'indexes': [models.Index(fields=['project', 'record_type'], name='blockchain__project_9f0ae1_idx'), models.Index(fields=['property', 'record_type'], name='blockchain__propert_d7bc6a_idx'), models.Index(fields=['blockchain_tx_id'], name='blockchain__blockch_e5e843_idx')],
+                'unique_together': {('record_key', 'record_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 23:48
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0005_ledger_mirror'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IPFSPin',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('cid', models.CharField(max_length=255, unique=True)),
+                ('local_cid', models.CharField(blank=True, db_index=True, max_length=255, null=True)),
+                ('cid_version', models.IntegerField(default=0)),
+                ('size', models.BigIntegerField(default=0)),
+                ('pinata_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('filename', models.CharField(blank=True, max_length=255, null=True)),
+                ('content_type', models.CharField(blank=True, max_length=100, null=True)),
+                ('pinned_at', models.DateTimeField(blank=True, null=True)),
+                ('is_pinned', models.BooleanField(blank=True, null=True)),
+                ('verified_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'IPFS Pin',
+                'verbose_name_plural': 'IPFS Pins',
+                'db_table': 'ipfs_pins',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 import uuid
 from projects.models import Project, Property
@@ -6,6 +7,48 @@ from projects.models import Project, Property
 User = get_user_model()
 
 
+class BlockchainAnchorBatch(models.Model):
+    """
+    A Merkle root anchoring a batch of progress-update and document hashes
+    Only the root is written to the ledger; each record keeps its own inclusion proof
+    """
+    STATUS = [
+        ('pending', 'Pending'),
+        ('anchored', 'Anchored'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    batch_id = models.CharField(max_length=255, unique=True)  # Same as blockchain key
+    merkle_root = models.CharField(max_length=64)
+    leaf_count = models.IntegerField(default=0)
+    
+    # Interval covered by this batch
+    interval_start = models.DateTimeField()
+    interval_end = models.DateTimeField()
+    
+    # Blockchain data
+    status = models.CharField(max_length=20, choices=STATUS, default='pending')
+    blockchain_tx_id = models.CharField(max_length=255, blank=True, null=True)
+    blockchain_timestamp = models.DateTimeField(blank=True, null=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'blockchain_anchor_batches'
+        verbose_name = 'Blockchain Anchor Batch'
+        verbose_name_plural = 'Blockchain Anchor Batches'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['merkle_root']),
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Anchor {self.batch_id} - {self.leaf_count} leaves"
+
+
 class BlockchainProgressUpdate(models.Model):
     """
     Django model to track progress updates stored on blockchain
@@ -22,6 +65,11 @@ class BlockchainProgressUpdate(models.Model):
     blockchain_tx_id = models.CharField(max_length=255, blank=True, null=True)  # Transaction ID
     blockchain_timestamp = models.DateTimeField(blank=True, null=True)
     
+    # Merkle anchoring (null batch = waiting for the next anchoring interval)
+    anchor_batch = models.ForeignKey(BlockchainAnchorBatch, on_delete=models.SET_NULL, null=True, blank=True, related_name='progress_updates')
+    merkle_leaf_hash = models.CharField(max_length=64, blank=True, null=True)
+    merkle_proof = models.JSONField(default=list, blank=True)  # [{"hash": "...", "position": "left|right"}]
+    
     # Content
     description = models.TextField()
     uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='blockchain_uploads')
@@ -69,6 +117,11 @@ class BlockchainDocument(models.Model):
     blockchain_tx_id = models.CharField(max_length=255, blank=True, null=True)  # Transaction ID
     blockchain_timestamp = models.DateTimeField(blank=True, null=True)
     
+    # Merkle anchoring (null batch = waiting for the next anchoring interval)
+    anchor_batch = models.ForeignKey(BlockchainAnchorBatch, on_delete=models.SET_NULL, null=True, blank=True, related_name='documents')
+    merkle_leaf_hash = models.CharField(max_length=64, blank=True, null=True)
+    merkle_proof = models.JSONField(default=list, blank=True)  # [{"hash": "...", "position": "left|right"}]
+    
     # Metadata
     uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='blockchain_documents_uploaded')
     metadata = models.JSONField(default=dict, blank=True)
@@ -83,3 +136,159 @@ class BlockchainDocument(models.Model):
     
     def __str__(self):
         return f"{self.document_name} - {self.project.name}"
+
+
+class BlockchainOutbox(models.Model):
+    """
+    Transactional outbox for ledger submissions
+    Rows are written in the same DB transaction as the business record and
+    drained in batches by the outbox submitter (see outbox_service.py)
+    """
+    STATUS = [
+        ('pending', 'Pending'),
+        ('in_flight', 'In Flight'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead Letter'),
+    ]
+    
+    METHODS = [
+        ('POST', 'POST'),
+        ('PUT', 'PUT'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    
+    # Middleware request
+    method = models.CharField(max_length=10, choices=METHODS, default='POST')
+    endpoint = models.CharField(max_length=255)  # e.g. '/milestone', '/document', '/property'
+    payload = models.JSONField(default=dict, blank=True)
+    
+    # Local record to update once the ledger accepts the submission
+    record_type = models.CharField(max_length=50, blank=True, null=True)  # 'progress', 'document', 'property'
+    record_key = models.CharField(max_length=255, blank=True, null=True)  # progress_id / document_id / property id
+    
+    # Delivery state
+    status = models.CharField(max_length=20, choices=STATUS, default='pending')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    response = models.JSONField(default=dict, blank=True)
+    blockchain_tx_id = models.CharField(max_length=255, blank=True, null=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'blockchain_outbox'
+        verbose_name = 'Blockchain Outbox Entry'
+        verbose_name_plural = 'Blockchain Outbox'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['record_type', 'record_key']),
+            models.Index(fields=['status', 'sent_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.method} {self.endpoint} - {self.status} ({self.attempts} attempts)"
+
+
+class BlockchainLedgerEntry(models.Model):
+    """
+    Local mirror of a record accepted by the ledger
+    Kept in sync from the outbox by the ledger sync cursor so read and
+    verification endpoints never need a middleware round trip per record
+    """
+    RECORD_TYPES = [
+        ('property', 'Property'),
+        ('progress', 'Progress Update'),
+        ('document', 'Document'),
+        ('anchor_batch', 'Anchor Batch'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    record_type = models.CharField(max_length=20, choices=RECORD_TYPES)
+    record_key = models.CharField(max_length=255)  # Same as blockchain key (or local key for Merkle leaves)
+    project = models.ForeignKey(Project, on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries')
+    property = models.ForeignKey(Property, on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries')
+    
+    # What the ledger holds for this record
+    data_hash = models.CharField(max_length=255)
+    leaf_hash = models.CharField(max_length=64, blank=True, null=True)  # Merkle leaf, for batch-anchored records
+    merkle_root = models.CharField(max_length=64, blank=True, null=True)
+    ledger_key = models.CharField(max_length=255)  # Key written on chain (batch_id for Merkle leaves)
+    blockchain_tx_id = models.CharField(max_length=255, blank=True, null=True)
+    block_timestamp = models.DateTimeField(blank=True, null=True)
+    
+    synced_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'blockchain_ledger_entries'
+        verbose_name = 'Blockchain Ledger Entry'
+        verbose_name_plural = 'Blockchain Ledger Entries'
+        ordering = ['-block_timestamp']
+        unique_together = ['record_key', 'record_type']
+        indexes = [
+            models.Index(fields=['project', 'record_type']),
+            models.Index(fields=['property', 'record_type']),
+            models.Index(fields=['blockchain_tx_id']),
+        ]
+    
+    def __str__(self):
+        return f"Ledger {self.record_type} {self.record_key}"
+
+
+class BlockchainSyncCursor(models.Model):
+    """
+    Position of an incremental sync job over the outbox's sent log
+    Ordered by (sent_at, id) so a page boundary never skips or repeats rows
+    """
+    name = models.CharField(max_length=100, unique=True)
+    position_at = models.DateTimeField(blank=True, null=True)
+    position_id = models.UUIDField(blank=True, null=True)
+    records_synced = models.BigIntegerField(default=0)
+    last_run_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'blockchain_sync_cursors'
+        verbose_name = 'Blockchain Sync Cursor'
+        verbose_name_plural = 'Blockchain Sync Cursors'
+    
+    def __str__(self):
+        return f"{self.name} @ {self.position_at}"
+
+
+class IPFSPin(models.Model):
+    """
+    Local index of content pinned on Pinata, keyed by CID
+    Lets uploads skip content that is already pinned and caches pin checks
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    cid = models.CharField(max_length=255, unique=True)  # CID returned by Pinata
+    local_cid = models.CharField(max_length=255, blank=True, null=True, db_index=True)  # CID computed before upload
+    cid_version = models.IntegerField(default=0)
+    size = models.BigIntegerField(default=0)
+    
+    # Pinata data
+    pinata_id = models.CharField(max_length=255, blank=True, null=True)
+    filename = models.CharField(max_length=255, blank=True, null=True)
+    content_type = models.CharField(max_length=100, blank=True, null=True)
+    pinned_at = models.DateTimeField(blank=True, null=True)
+    
+    # verify_pin cache
+    is_pinned = models.BooleanField(null=True, blank=True)
+    verified_at = models.DateTimeField(blank=True, null=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'ipfs_pins'
+        verbose_name = 'IPFS Pin'
+        verbose_name_plural = 'IPFS Pins'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.cid} ({self.filename or 'unnamed'})"
@@ -0,0 +1,263 @@
+"""
+Blockchain Outbox Service for ApnaGhar
+Queues ledger submissions transactionally and drains them in batches
+over a pooled HTTP session, with exponential backoff and dead-lettering
+"""
+
+import random
+import threading
+import logging
+import requests
+from datetime import timedelta
+from typing import Dict, List, Optional
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .models import BlockchainOutbox, BlockchainProgressUpdate, BlockchainDocument
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = getattr(settings, 'BLOCKCHAIN_OUTBOX_BATCH_SIZE', 50)
+OUTBOX_MAX_ATTEMPTS = getattr(settings, 'BLOCKCHAIN_OUTBOX_MAX_ATTEMPTS', 8)
+OUTBOX_BACKOFF_BASE = getattr(settings, 'BLOCKCHAIN_OUTBOX_BACKOFF_BASE', 2)  # seconds
+OUTBOX_BACKOFF_MAX = getattr(settings, 'BLOCKCHAIN_OUTBOX_BACKOFF_MAX', 600)  # seconds
+# Seconds without progress before an in-flight claim is released; the claim is
+# renewed after every submission, so this only has to outlast one request
+OUTBOX_CLAIM_TIMEOUT = getattr(settings, 'BLOCKCHAIN_OUTBOX_CLAIM_TIMEOUT', 300)
+OUTBOX_POLL_INTERVAL = getattr(settings, 'BLOCKCHAIN_OUTBOX_POLL_INTERVAL', 5)  # seconds
+
+# HTTP statuses worth retrying; any other 4xx is dead-lettered immediately
+RETRYABLE_STATUS_CODES = {408, 425, 429}
+
+
+def enqueue_submission(
+    endpoint: str,
+    payload: Dict,
+    method: str = 'POST',
+    record_type: Optional[str] = None,
+    record_key: Optional[str] = None
+) -> BlockchainOutbox:
+    """
+    Write a ledger submission to the outbox.
+
+    Must be called inside the caller's transaction so the outbox row commits
+    together with the business record; the submitter is woken once it commits.
+    """
+    entry = BlockchainOutbox.objects.create(
+        method=method,
+        endpoint=endpoint,
+        payload=payload,
+        record_type=record_type,
+        record_key=record_key,
+    )
+    transaction.on_commit(notify_submitter)
+    return entry
+
+
+def compute_backoff(attempts: int) -> float:
+    """Exponential backoff with full jitter, capped at OUTBOX_BACKOFF_MAX"""
+    ceiling = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * (2 ** max(attempts - 1, 0)))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def _extract_tx_id(result: Dict) -> Optional[str]:
+    """Pull a transaction ID out of a middleware response, if it returned one"""
+    if not isinstance(result, dict):
+        return None
+    nested = result.get('result') if isinstance(result.get('result'), dict) else {}
+    return result.get('txId') or result.get('tx_id') or nested.get('txId') or nested.get('tx_id')
+
+
+class OutboxSubmitter:
+    """
+    Drains pending outbox rows in batches.
+
+    Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED (where supported),
+    so several submitters can run side by side without double-submitting.
+    """
+
+    def __init__(self, batch_size: int = None):
+        self.batch_size = batch_size or OUTBOX_BATCH_SIZE
+        self._wakeup = threading.Event()
+
+    def wake(self):
+        """Signal a waiting run_forever loop that new work was committed"""
+        self._wakeup.set()
+
+    def release_stale_claims(self) -> int:
+        """Return rows stuck in_flight (e.g. after a worker crash) to the queue"""
+        cutoff = timezone.now() - timedelta(seconds=OUTBOX_CLAIM_TIMEOUT)
+        return BlockchainOutbox.objects.filter(
+            status='in_flight',
+            updated_at__lt=cutoff
+        ).update(status='pending', next_attempt_at=timezone.now())
+
+    def claim_batch(self) -> List[BlockchainOutbox]:
+        """Atomically claim up to batch_size due rows"""
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                BlockchainOutbox.objects.select_for_update(skip_locked=True)
+                .filter(status='pending', next_attempt_at__lte=now)
+                .order_by('next_attempt_at')
+                .values_list('id', flat=True)[:self.batch_size]
+            )
+            if ids:
+                BlockchainOutbox.objects.filter(id__in=ids).update(status='in_flight', updated_at=now)
+        if not ids:
+            return []
+        return list(BlockchainOutbox.objects.filter(id__in=ids).order_by('created_at'))
+
+    def drain_once(self) -> Dict:
+        """Claim and submit one batch. Returns per-outcome counts."""
+        from .blockchain_service import get_blockchain_service
+        blockchain_service = get_blockchain_service()
+
+        entries = self.claim_batch()
+        stats = {'claimed': len(entries), 'sent': 0, 'retried': 0, 'dead': 0}
+        if not entries:
+            return stats
+
+        for index, entry in enumerate(entries):
+            entry.attempts += 1
+            try:
+                result = blockchain_service._request_blockchain_api(entry.method, entry.endpoint, entry.payload)
+                entry.status = 'sent'
+                entry.sent_at = timezone.now()
+                entry.response = result if isinstance(result, dict) else {'result': result}
+                entry.blockchain_tx_id = _extract_tx_id(result)
+                entry.last_error = None
+                stats['sent'] += 1
+            except Exception as e:
+                entry.last_error = str(e)[:2000]
+                status_code = getattr(getattr(e, 'response', None), 'status_code', None)
+                permanent = (
+                    isinstance(e, (ValueError, requests.exceptions.InvalidURL, requests.exceptions.MissingSchema))
+                    or (status_code is not None and 400 <= status_code < 500 and status_code not in RETRYABLE_STATUS_CODES)
+                )
+                if permanent or entry.attempts >= OUTBOX_MAX_ATTEMPTS:
+                    entry.status = 'dead'
+                    stats['dead'] += 1
+                    logger.error(f"Outbox entry {entry.id} dead-lettered after {entry.attempts} attempts: {entry.last_error}")
+                else:
+                    entry.status = 'pending'
+                    entry.next_attempt_at = timezone.now() + timedelta(seconds=compute_backoff(entry.attempts))
+                    stats['retried'] += 1
+                    logger.warning(f"Outbox entry {entry.id} failed (attempt {entry.attempts}), retrying: {entry.last_error}")
+
+            # Each outcome is saved as it completes and the claim on the rest of the
+            # batch renewed, so a slow batch is never released by release_stale_claims
+            # while still in flight
+            entry.save(update_fields=[
+                'status', 'attempts', 'next_attempt_at', 'last_error', 'response',
+                'blockchain_tx_id', 'sent_at', 'updated_at'
+            ])
+            remaining = [e.id for e in entries[index + 1:]]
+            if remaining:
+                BlockchainOutbox.objects.filter(id__in=remaining, status='in_flight').update(updated_at=entry.updated_at)
+
+        self._apply_to_records([e for e in entries if e.status == 'sent'])
+        dead_anchors = [e.record_key for e in entries if e.status == 'dead' and e.record_type == 'anchor_batch']
+        if dead_anchors:
+            from .anchoring_service import mark_batches_failed
+            mark_batches_failed(dead_anchors)
+
+        logger.info(f"Outbox batch processed: {stats}")
+        return stats
+
+    def _apply_to_records(self, sent_entries: List[BlockchainOutbox]):
+        """Copy tx id / anchoring time back onto the local records"""
+        for entry in sent_entries:
+            if entry.record_type == 'anchor_batch':
+                from .anchoring_service import mark_batch_anchored
+                mark_batch_anchored(entry.record_key, entry.blockchain_tx_id, entry.sent_at)
+                continue
+            if entry.record_type == 'progress':
+                model, key_field = BlockchainProgressUpdate, 'progress_id'
+            elif entry.record_type == 'document':
+                model, key_field = BlockchainDocument, 'document_id'
+            else:
+                continue
+            model.objects.filter(**{key_field: entry.record_key}).update(
+                blockchain_tx_id=entry.blockchain_tx_id,
+                blockchain_timestamp=entry.sent_at
+            )
+
+    def drain(self, max_batches: Optional[int] = None) -> Dict:
+        """Drain batches until the queue has no due rows (or max_batches is hit)"""
+        totals = {'claimed': 0, 'sent': 0, 'retried': 0, 'dead': 0}
+        batches = 0
+        self.release_stale_claims()
+        while max_batches is None or batches < max_batches:
+            stats = self.drain_once()
+            batches += 1
+            for key in totals:
+                totals[key] += stats[key]
+            if stats['claimed'] < self.batch_size:
+                break
+        return totals
+
+    def run_forever(self, poll_interval: float = None, stop_event: Optional[threading.Event] = None):
+        """Worker loop: drain, then sleep until woken or the poll interval elapses"""
+        poll_interval = poll_interval or OUTBOX_POLL_INTERVAL
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            try:
+                self.drain()
+            except Exception as e:
+                logger.error(f"Outbox drain failed: {str(e)}", exc_info=True)
+            self._wakeup.wait(poll_interval)
+            self._wakeup.clear()
+
+
+def get_outbox_metrics() -> Dict:
+    """Backlog depth and submission lag for the outbox"""
+    now = timezone.now()
+    counts = dict(
+        BlockchainOutbox.objects.values_list('status').annotate(total=Count('id')).order_by()
+    )
+    oldest_pending = BlockchainOutbox.objects.filter(
+        status__in=['pending', 'in_flight']
+    ).aggregate(oldest=Min('created_at'))['oldest']
+
+    # Submission lag (created -> accepted by ledger) over the most recent sends
+    recent = list(
+        BlockchainOutbox.objects.filter(status='sent', sent_at__isnull=False)
+        .order_by('-sent_at')
+        .values_list('created_at', 'sent_at')[:500]
+    )
+    lags = sorted((sent_at - created_at).total_seconds() for created_at, sent_at in recent)
+
+    return {
+        'backlog_depth': counts.get('pending', 0) + counts.get('in_flight', 0),
+        'pending': counts.get('pending', 0),
+        'in_flight': counts.get('in_flight', 0),
+        'sent': counts.get('sent', 0),
+        'dead_lettered': counts.get('dead', 0),
+        'oldest_pending_age_seconds': (now - oldest_pending).total_seconds() if oldest_pending else 0,
+        'submission_lag_seconds': {
+            'samples': len(lags),
+            'avg': sum(lags) / len(lags) if lags else 0,
+            'p50': lags[len(lags) // 2] if lags else 0,
+            'p95': lags[min(len(lags) - 1, int(len(lags) * 0.95))] if lags else 0,
+        },
+    }
+
+
+# Singleton instance
+_outbox_submitter = None
+
+
+def get_outbox_submitter() -> OutboxSubmitter:
+    global _outbox_submitter
+    if _outbox_submitter is None:
+        _outbox_submitter = OutboxSubmitter()
+    return _outbox_submitter
+
+
+def notify_submitter():
+    """on_commit hook: wake the in-process submitter, if one is running"""
+    if _outbox_submitter is not None:
+        _outbox_submitter.wake()
@@ -2,8 +2,9 @@
 Serializers for blockchain models
 """
 
+import uuid
 from rest_framework import serializers
-from .models import BlockchainProgressUpdate, BlockchainDocument
+from .models import BlockchainProgressUpdate, BlockchainDocument, BlockchainAnchorBatch, BlockchainLedgerEntry
 from projects.serializers import ProjectListSerializer, PropertySerializer
 
 
@@ -20,9 +21,10 @@ class BlockchainProgressUpdateSerializer(serializers.ModelSerializer):
             'id', 'progress_id', 'project', 'property', 'milestone_id',
             'ipfs_hash', 'ipfs_url', 'blockchain_tx_id', 'blockchain_timestamp',
             'description', 'uploaded_by', 'uploaded_by_username',
+            'anchor_batch', 'merkle_leaf_hash',
             'metadata', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'anchor_batch', 'merkle_leaf_hash', 'created_at', 'updated_at']
     
     def get_ipfs_url(self, obj):
         """Get IPFS gateway URL"""
@@ -44,12 +46,103 @@ class BlockchainDocumentSerializer(serializers.ModelSerializer):
             'document_name', 'document_type',
             'ipfs_hash', 'ipfs_url', 'blockchain_tx_id', 'blockchain_timestamp',
             'uploaded_by', 'uploaded_by_username',
+            'anchor_batch', 'merkle_leaf_hash',
             'metadata', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'anchor_batch', 'merkle_leaf_hash', 'created_at', 'updated_at']
     
     def get_ipfs_url(self, obj):
         """Get IPFS gateway URL"""
         from .ipfs_service import get_pinata_service
         return get_pinata_service().get_file_url(obj.ipfs_hash)
 
+
+class BlockchainAnchorBatchSerializer(serializers.ModelSerializer):
+    """Serializer for Merkle anchor batches"""
+    
+    class Meta:
+        model = BlockchainAnchorBatch
+        fields = [
+            'id', 'batch_id', 'merkle_root', 'leaf_count',
+            'interval_start', 'interval_end', 'status',
+            'blockchain_tx_id', 'blockchain_timestamp',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
+class MerkleProofVerifySerializer(serializers.Serializer):
+    """
+    Input for offline proof verification: either an explicit
+    (leaf_hash, merkle_proof, merkle_root) triple, or a local record reference
+    """
+    RECORD_TYPES = [('progress', 'Progress Update'), ('document', 'Document')]
+    
+    leaf_hash = serializers.RegexField(r'^[0-9a-f]{64}$', required=False)
+    merkle_proof = serializers.ListField(child=serializers.DictField(), required=False)
+    merkle_root = serializers.RegexField(r'^[0-9a-f]{64}$', required=False)
+    record_type = serializers.ChoiceField(choices=RECORD_TYPES, required=False)
+    record_id = serializers.CharField(required=False)
+    
+    def validate(self, attrs):
+        explicit = all(attrs.get(f) is not None for f in ('leaf_hash', 'merkle_proof', 'merkle_root'))
+        by_record = attrs.get('record_type') and attrs.get('record_id')
+        if not explicit and not by_record:
+            raise serializers.ValidationError(
+                'Provide leaf_hash, merkle_proof and merkle_root, or record_type and record_id'
+            )
+        for step in attrs.get('merkle_proof') or []:
+            if step.get('position') not in ('left', 'right') or not isinstance(step.get('hash'), str):
+                raise serializers.ValidationError('Each proof step needs a hash and a position of left or right')
+        return attrs
+
+
+class BlockchainLedgerEntrySerializer(serializers.ModelSerializer):
+    """Serializer for ledger mirror entries"""
+    
+    class Meta:
+        model = BlockchainLedgerEntry
+        fields = [
+            'id', 'record_type', 'record_key', 'project', 'property',
+            'data_hash', 'leaf_hash', 'merkle_root', 'ledger_key',
+            'blockchain_tx_id', 'block_timestamp', 'synced_at'
+        ]
+        read_only_fields = fields
+
+
+class LedgerRecordRefSerializer(serializers.Serializer):
+    """A single record to verify against the ledger mirror"""
+    RECORD_TYPES = [('property', 'Property'), ('progress', 'Progress Update'), ('document', 'Document')]
+    
+    record_type = serializers.ChoiceField(choices=RECORD_TYPES)
+    record_key = serializers.CharField(max_length=255)
+    
+    def validate(self, attrs):
+        if attrs['record_type'] == 'property':
+            try:
+                attrs['record_key'] = str(uuid.UUID(attrs['record_key']))
+            except ValueError:
+                raise serializers.ValidationError({'record_key': 'Property keys must be UUIDs'})
+        return attrs
+
+
+class LedgerBulkVerifySerializer(serializers.Serializer):
+    """
+    Input for bulk verification: an explicit list of records, or a
+    project/property scope whose mirrored records are all checked
+    """
+    records = LedgerRecordRefSerializer(many=True, required=False)
+    project_id = serializers.UUIDField(required=False)
+    property_id = serializers.UUIDField(required=False)
+    record_type = serializers.ChoiceField(choices=LedgerRecordRefSerializer.RECORD_TYPES, required=False)
+    
+    def validate(self, attrs):
+        from .ledger_mirror_service import LEDGER_VERIFY_MAX_RECORDS
+        records = attrs.get('records')
+        if not records and not attrs.get('project_id') and not attrs.get('property_id'):
+            raise serializers.ValidationError('Provide records, or a project_id or property_id scope')
+        if records and len(records) > LEDGER_VERIFY_MAX_RECORDS:
+            raise serializers.ValidationError(
+                f'At most {LEDGER_VERIFY_MAX_RECORDS} records can be verified per request'
+            )
+        return attrs
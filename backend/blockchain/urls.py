@@ -4,13 +4,19 @@ URL configuration for blockchain app
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import BlockchainProgressUpdateViewSet, BlockchainDocumentViewSet
+from .views import (
+    BlockchainProgressUpdateViewSet, BlockchainDocumentViewSet,
+    BlockchainAnchorBatchViewSet, BlockchainLedgerEntryViewSet, outbox_metrics
+)
 
 router = DefaultRouter()
 router.register(r'progress', BlockchainProgressUpdateViewSet, basename='blockchain-progress')
 router.register(r'documents', BlockchainDocumentViewSet, basename='blockchain-documents')
+router.register(r'anchors', BlockchainAnchorBatchViewSet, basename='blockchain-anchors')
+router.register(r'ledger', BlockchainLedgerEntryViewSet, basename='blockchain-ledger')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('outbox/metrics/', outbox_metrics, name='blockchain-outbox-metrics'),
 ]
 
@@ -3,17 +3,21 @@ Django REST API views for blockchain operations
 """
 
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.utils import timezone
 from django.core.files.uploadedfile import InMemoryUploadedFile
 import uuid
 import logging
 import asyncio
 
-from .models import BlockchainProgressUpdate, BlockchainDocument
-from .serializers import BlockchainProgressUpdateSerializer, BlockchainDocumentSerializer
+from .models import BlockchainProgressUpdate, BlockchainDocument, BlockchainAnchorBatch, BlockchainLedgerEntry
+from .serializers import (
+    BlockchainProgressUpdateSerializer, BlockchainDocumentSerializer,
+    BlockchainAnchorBatchSerializer, MerkleProofVerifySerializer,
+    BlockchainLedgerEntrySerializer, LedgerBulkVerifySerializer
+)
 from .ipfs_service import get_pinata_service
 # from .fabric_client import get_fabric_service
 from projects.models import Project, Property
@@ -171,11 +175,13 @@ class BlockchainProgressUpdateViewSet(viewsets.ModelViewSet):
         try:
             progress_update = self.get_object()
             
-            # Query from blockchain
-            # Fabric integration removed for fresh start
-            blockchain_data = {}
-            # fabric_service = get_fabric_service()
-            # ...
+            # Served from the local ledger mirror; ?refresh=true also reads the ledger directly
+            from .ledger_mirror_service import get_mirror_entry, serialize_mirror_entry
+            entry = get_mirror_entry('progress', progress_update.progress_id)
+            blockchain_data = serialize_mirror_entry(entry)
+            if request.query_params.get('refresh') == 'true' and entry:
+                from .blockchain_service import get_blockchain_service
+                blockchain_data['ledger_history'] = get_blockchain_service().get_asset_history(entry.ledger_key)
             
             return Response({
                 'local_data': {
@@ -198,6 +204,17 @@ class BlockchainProgressUpdateViewSet(viewsets.ModelViewSet):
             )
 
 
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def proof(self, request, pk=None):
+        """Get the Merkle inclusion proof for a progress update and check it against its batch root"""
+        from .anchoring_service import verify_record
+        progress_update = self.get_object()
+        return Response({
+            'progress_id': progress_update.progress_id,
+            **verify_record('progress', progress_update)
+        })
+
+
 class BlockchainDocumentViewSet(viewsets.ModelViewSet):
     """
     ViewSet for blockchain documents
@@ -340,17 +357,109 @@ class BlockchainDocumentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def upload_documents(self, request):
+        """
+        Upload several documents in one submission; files are pinned concurrently
+        
+        Expected request data:
+        - project_id: Project ID
+        - property_id: Property ID (optional)
+        - document_type: Type applied to every file (default: other)
+        - files: Document files (repeat the field for each file)
+        
+        Content that is already pinned is not uploaded again.
+        """
+        project_id = request.data.get('project_id')
+        property_id = request.data.get('property_id')
+        document_type = request.data.get('document_type', 'other')
+        files = request.FILES.getlist('files')
+        
+        if not project_id or not files:
+            return Response(
+                {'detail': 'Missing required fields: project_id and files are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            project = Project.objects.get(id=project_id)
+        except Project.DoesNotExist:
+            return Response({'detail': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        property_obj = None
+        if property_id:
+            try:
+                property_obj = Property.objects.get(id=property_id, project=project)
+            except Property.DoesNotExist:
+                return Response({'detail': 'Property not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        uploads = []
+        for file in files:
+            pinata_metadata = {
+                'name': file.name,
+                'document_type': document_type,
+                'project_id': str(project.id),
+            }
+            if property_obj:
+                pinata_metadata['property_id'] = str(property_obj.id)
+            uploads.append({'file': file, 'metadata': pinata_metadata})
+        
+        try:
+            ipfs_results = get_pinata_service().upload_many(uploads)
+        except Exception as e:
+            logger.error(f"Failed to upload documents: {str(e)}", exc_info=True)
+            return Response(
+                {'detail': f'Failed to upload documents: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        
+        from .blockchain_service import get_blockchain_service
+        blockchain_service = get_blockchain_service()
+        documents = []
+        for file, ipfs_result in zip(files, ipfs_results):
+            if not ipfs_result.get('success'):
+                documents.append({'document_name': file.name, 'success': False, 'error': ipfs_result.get('error')})
+                continue
+            stored = blockchain_service.store_document_on_blockchain(
+                project_id=str(project.id),
+                property_id=str(property_obj.id) if property_obj else None,
+                document_name=file.name,
+                document_type=document_type,
+                file_bytes=b'',  # Already pinned
+                uploaded_by=str(request.user.id),
+                metadata={'content_type': file.content_type},
+                ipfs_hash=ipfs_result['ipfs_hash']
+            )
+            documents.append({
+                'document_name': file.name,
+                'success': True,
+                'document_id': stored['document_id'],
+                'ipfs_hash': ipfs_result['ipfs_hash'],
+                'ipfs_url': ipfs_result['ipfs_url'],
+                'deduplicated': ipfs_result.get('deduplicated', False),
+            })
+        
+        uploaded = sum(1 for d in documents if d['success'])
+        return Response({
+            'success': uploaded == len(documents),
+            'uploaded': uploaded,
+            'failed': len(documents) - uploaded,
+            'documents': documents,
+        }, status=status.HTTP_201_CREATED if uploaded else status.HTTP_502_BAD_GATEWAY)
+    
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
     def get_blockchain_data(self, request, pk=None):
         """Get blockchain data for a document"""
         try:
             document = self.get_object()
             
-            # Query from blockchain
-            # Fabric integration removed for fresh start
-            blockchain_data = {}
-            # fabric_service = get_fabric_service()
-            # ...
+            # Served from the local ledger mirror; ?refresh=true also reads the ledger directly
+            from .ledger_mirror_service import get_mirror_entry, serialize_mirror_entry
+            entry = get_mirror_entry('document', document.document_id)
+            blockchain_data = serialize_mirror_entry(entry)
+            if request.query_params.get('refresh') == 'true' and entry:
+                from .blockchain_service import get_blockchain_service
+                blockchain_data['ledger_history'] = get_blockchain_service().get_asset_history(entry.ledger_key)
             
             return Response({
                 'local_data': {
@@ -372,3 +481,130 @@ class BlockchainDocumentViewSet(viewsets.ModelViewSet):
                 {'detail': f'Failed to get blockchain data: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def proof(self, request, pk=None):
+        """Get the Merkle inclusion proof for a document and check it against its batch root"""
+        from .anchoring_service import verify_record
+        document = self.get_object()
+        return Response({
+            'document_id': document.document_id,
+            **verify_record('document', document)
+        })
+
+
+class BlockchainAnchorBatchViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet for Merkle anchor batches
+    """
+    queryset = BlockchainAnchorBatch.objects.all()
+    serializer_class = BlockchainAnchorBatchSerializer
+    permission_classes = [IsAuthenticated]
+    lookup_field = 'batch_id'
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def verify(self, request):
+        """
+        Verify a Merkle inclusion proof offline (no ledger round trip)
+        
+        Expected request data, either:
+        - leaf_hash, merkle_proof, merkle_root: verify an explicit proof
+        - record_type ('progress' or 'document'), record_id: verify a local record
+          against its stored proof, recomputing the leaf from current data
+        """
+        import time
+        from . import merkle
+        from .anchoring_service import ANCHORED_MODELS, verify_record
+        
+        serializer = MerkleProofVerifySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        if data.get('record_type'):
+            model, key_field = ANCHORED_MODELS[data['record_type']]
+            record = model.objects.select_related('anchor_batch').filter(**{key_field: data['record_id']}).first()
+            if record is None:
+                return Response({'detail': 'Record not found'}, status=status.HTTP_404_NOT_FOUND)
+            started = time.perf_counter()
+            result = verify_record(data['record_type'], record)
+            result['verification_time_us'] = round((time.perf_counter() - started) * 1e6, 1)
+            return Response(result)
+        
+        started = time.perf_counter()
+        verified = merkle.verify_proof(data['leaf_hash'], data['merkle_proof'], data['merkle_root'])
+        elapsed_us = round((time.perf_counter() - started) * 1e6, 1)
+        
+        batch = BlockchainAnchorBatch.objects.filter(merkle_root=data['merkle_root']).first()
+        return Response({
+            'verified': verified,
+            'anchored': bool(batch and batch.status == 'anchored'),
+            'batch_id': batch.batch_id if batch else None,
+            'blockchain_tx_id': batch.blockchain_tx_id if batch else None,
+            'verification_time_us': elapsed_us,
+        })
+
+
+class BlockchainLedgerEntryViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet for the local ledger mirror
+    """
+    queryset = BlockchainLedgerEntry.objects.all()
+    serializer_class = BlockchainLedgerEntrySerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        """Filter mirror entries by project_id, property_id or record_type if provided"""
+        queryset = super().get_queryset()
+        project_id = self.request.query_params.get('project_id')
+        property_id = self.request.query_params.get('property_id')
+        record_type = self.request.query_params.get('record_type')
+        
+        if property_id:
+            queryset = queryset.filter(property__id=property_id)
+        elif project_id:
+            queryset = queryset.filter(project__id=project_id)
+        if record_type:
+            queryset = queryset.filter(record_type=record_type)
+        
+        return queryset.order_by('-block_timestamp')
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def verify(self, request):
+        """
+        Verify many records against the ledger mirror in one call
+        
+        Expected request data, either:
+        - records: [{record_type, record_key}, ...]
+        - project_id or property_id (optionally record_type): every mirrored record in scope
+        """
+        from .ledger_mirror_service import bulk_verify, records_for_scope
+        
+        serializer = LedgerBulkVerifySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        records = data.get('records') or records_for_scope(
+            project_id=data.get('project_id'),
+            property_id=data.get('property_id'),
+            record_type=data.get('record_type'),
+        )
+        return Response(bulk_verify(records))
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def sync_status(self, request):
+        """Ledger mirror cursor position and how far it trails the outbox"""
+        from .ledger_mirror_service import get_sync_status
+        return Response(get_sync_status())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def outbox_metrics(request):
+    """
+    Blockchain outbox backlog depth and submission lag
+    
+    GET /api/blockchain/outbox/metrics/
+    """
+    from .outbox_service import get_outbox_metrics
+    return Response(get_outbox_metrics())
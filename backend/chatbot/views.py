@@ -9,12 +9,19 @@ import requests
 import os
 import logging
 
+from backend.http_client import get_client
+
 logger = logging.getLogger(__name__)
 
 # Local RAG service URL (set via environment variable)
 RAG_SERVICE_URL = os.getenv('RAG_SERVICE_URL', 'http://localhost:8000')
 
 
+def _rag_client():
+    # Pooled and circuit-broken: while the tunnel is down, queries get the fallback at once
+    return get_client('rag', timeout=(3.05, 30))
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])  # Allow unauthenticated users to ask questions
 def chatbot_query(request):
@@ -41,10 +48,9 @@ def chatbot_query(request):
     
     try:
         # Forward to local RAG service
-        response = requests.post(
+        response = _rag_client().session.post(
             f"{RAG_SERVICE_URL}/query",
-            json={"query": query_text, "format": format_type},
-            timeout=30
+            json={"query": query_text, "format": format_type}
         )
         response.raise_for_status()
         return Response(response.json(), status=status.HTTP_200_OK)
@@ -89,10 +95,9 @@ def search_properties(request):
     }
     """
     try:
-        response = requests.post(
+        response = _rag_client().session.post(
             f"{RAG_SERVICE_URL}/search",
-            json=request.data,
-            timeout=30
+            json=request.data
         )
         response.raise_for_status()
         return Response(response.json(), status=status.HTTP_200_OK)
@@ -113,14 +118,15 @@ def chatbot_health(request):
     GET /api/chatbot/health/
     """
     try:
-        response = requests.get(f"{RAG_SERVICE_URL}/health", timeout=5)
+        response = _rag_client().session.get(f"{RAG_SERVICE_URL}/health", timeout=(3.05, 5))
         response.raise_for_status()
         data = response.json()
         return Response({
             'rag_available': data.get('status') == 'healthy',
             'status': data.get('status', 'unknown'),
             'message': data.get('message', 'RAG service is operational'),
-            'service_url': RAG_SERVICE_URL
+            'service_url': RAG_SERVICE_URL,
+            'circuit': _rag_client().breaker.state
         }, status=status.HTTP_200_OK)
     except requests.exceptions.RequestException as e:
         logger.warning(f"RAG service unavailable: {e}")
@@ -128,5 +134,6 @@ def chatbot_health(request):
             'rag_available': False,
             'status': 'unavailable',
             'message': 'RAG service is not reachable. Make sure local service is running and ngrok is active.',
-            'service_url': RAG_SERVICE_URL
+            'service_url': RAG_SERVICE_URL,
+            'circuit': _rag_client().breaker.state
         }, status=status.HTTP_200_OK)
@@ -1,15 +1,37 @@
 """
 Investment service for token management and revenue sharing
 """
-from django.db.models import Sum, Count, Q
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Sum, Count, Q, F, OuterRef, Subquery, Value
 from django.utils import timezone
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
+from itertools import islice
 from .models import InvestmentProperty, Investment, InvestmentTransaction, Dividend, DividendPayment
 from payments.models import Payment
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Holdings streamed and dividend payments written per batch
+DIVIDEND_BATCH_SIZE = getattr(settings, 'DIVIDEND_BATCH_SIZE', 5000)
+OUTSTANDING_DIVIDEND_STATUSES = ['pending', 'processing']
+
+
+def _to_paise(amount) -> int:
+    """Rupee amount as whole paise (rounded half up to the 2 places the models store)"""
+    return int(Decimal(str(amount)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) * 100)
+
+
+def _from_paise(paise: int) -> Decimal:
+    return Decimal(paise).scaleb(-2)
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
 
 class InvestmentService:
     """Service for investment operations"""
@@ -135,7 +157,13 @@ class InvestmentService:
     
     @staticmethod
     def create_dividend(investment_property, amount_per_token, period_start, period_end, payment_date, description=''):
-        """Create a dividend for an investment property"""
+        """
+        Create a dividend for an investment property
+
+        Eligible holdings are streamed in batches and their payments
+        bulk-created. Amounts are tokens x paise per token in integer paise, so
+        the payments add up exactly to the dividend total.
+        """
         try:
             # Get all active investments
             investments = Investment.objects.filter(
@@ -149,30 +177,40 @@ class InvestmentService:
             if total_tokens == 0:
                 raise ValueError("No eligible tokens for dividend")
             
-            # Create dividend
-            dividend = Dividend.objects.create(
-                investment_property=investment_property,
-                amount_per_token=amount_per_token,
-                tokens_eligible=total_tokens,
-                period_start=period_start,
-                period_end=period_end,
-                payment_date=payment_date,
-                description=description,
-                status='pending',
-            )
-            
-            # Create dividend payments for each investment
-            for investment in investments:
-                dividend_amount = Decimal(str(amount_per_token)) * Decimal(str(investment.tokens))
-                
-                DividendPayment.objects.create(
-                    dividend=dividend,
-                    investment=investment,
-                    user=investment.user,
-                    tokens=investment.tokens,
-                    amount=dividend_amount,
+            paise_per_token = _to_paise(amount_per_token)
+            with db_transaction.atomic():
+                dividend = Dividend.objects.create(
+                    investment_property=investment_property,
+                    amount_per_token=_from_paise(paise_per_token),
+                    tokens_eligible=total_tokens,
+                    period_start=period_start,
+                    period_end=period_end,
+                    payment_date=payment_date,
+                    description=description,
                     status='pending',
                 )
+                
+                # Create dividend payments for each investment
+                holdings = investments.order_by().values_list('id', 'user_id', 'tokens')
+                streamed_tokens = 0
+                for batch in _batches(holdings.iterator(chunk_size=DIVIDEND_BATCH_SIZE), DIVIDEND_BATCH_SIZE):
+                    DividendPayment.objects.bulk_create([
+                        DividendPayment(
+                            dividend_id=dividend.pk,
+                            investment_id=investment_id,
+                            user_id=user_id,
+                            tokens=tokens,
+                            amount=_from_paise(paise_per_token * tokens),
+                            status='pending',
+                        )
+                        for investment_id, user_id, tokens in batch
+                    ])
+                    streamed_tokens += sum(tokens for _, _, tokens in batch)
+                
+                if streamed_tokens != total_tokens:
+                    # Holdings changed between the aggregate and the stream
+                    dividend.tokens_eligible = streamed_tokens
+                    dividend.save(update_fields=['tokens_eligible', 'total_amount', 'updated_at'])
             
             return dividend
         except Exception as e:
@@ -181,7 +219,7 @@ class InvestmentService:
     
     @staticmethod
     def process_dividend_payment(dividend_payment, payment=None):
-        """Process a dividend payment"""
+        """Process a single dividend payment (use process_dividend_payouts for a whole dividend)"""
         try:
             if payment:
                 dividend_payment.payment = payment
@@ -202,6 +240,67 @@ class InvestmentService:
             logger.error(f"Error processing dividend payment: {str(e)}")
             raise
     
+    @staticmethod
+    def process_dividend_payouts(dividend, payment):
+        """
+        Process every outstanding payment of a dividend against one payout
+        
+        Bulk equivalent of process_dividend_payment: outstanding payments are
+        linked to the payout and, once it is completed, marked paid with their
+        amounts credited to the investments (returns refreshed as
+        Investment.save() would). Works in locked batches, so concurrent runs
+        never credit a payment twice. The dividend is marked paid when no
+        payment is left unpaid.
+        """
+        try:
+            paid = payment.status == 'completed'
+            outstanding = DividendPayment.objects.filter(dividend=dividend, status__in=OUTSTANDING_DIVIDEND_STATUSES)
+            ids = list(outstanding.values_list('id', flat=True))
+            result = {'processed': 0, 'paid': 0, 'amount': Decimal('0')}
+            
+            for batch in _batches(ids, DIVIDEND_BATCH_SIZE):
+                with db_transaction.atomic():
+                    # Rows another run processed since we listed them drop out here
+                    rows = list(outstanding.filter(id__in=batch).select_for_update().values_list('id', 'investment_id', 'amount'))
+                    if not rows:
+                        continue
+                    now = timezone.now()
+                    locked_ids = [row[0] for row in rows]
+                    updates = {
+                        'payment': payment,
+                        'payment_reference': payment.transaction_id,
+                        'updated_at': now,
+                    }
+                    
+                    if paid:
+                        investment_ids = [row[1] for row in rows]
+                        amount = DividendPayment.objects.filter(dividend=dividend, investment=OuterRef('pk')).values('amount')[:1]
+                        Investment.objects.filter(pk__in=investment_ids).update(
+                            total_dividends_received=F('total_dividends_received') + Subquery(amount),
+                            updated_at=now,
+                        )
+                        # Same rule as Investment.save(): only when value and cost are known
+                        total_return = F('total_dividends_received') + F('current_value') - F('total_amount')
+                        Investment.objects.filter(pk__in=investment_ids, current_value__gt=0, total_amount__gt=0).update(
+                            total_return=total_return,
+                            return_percentage=total_return * Value(Decimal('100')) / F('total_amount'),
+                        )
+                        updates.update(status='paid', paid_at=now)
+                        result['paid'] += len(rows)
+                        result['amount'] += sum(row[2] for row in rows)
+                    
+                    DividendPayment.objects.filter(id__in=locked_ids).update(**updates)
+                    result['processed'] += len(rows)
+            
+            if paid and dividend.status != 'paid' and not dividend.payments.exclude(status='paid').exists():
+                dividend.status = 'paid'
+                dividend.save()
+            
+            return result
+        except Exception as e:
+            logger.error(f"Error processing dividend payouts: {str(e)}")
+            raise
+    
     @staticmethod
     def get_user_portfolio(user):
         """Get user's investment portfolio"""
@@ -0,0 +1,195 @@
+"""
+Management command to benchmark dividend distribution
+Bulk-inserts a tokenized property with --holders fake token holders (on a
+property that is not tokenized yet), then times create_dividend and
+process_dividend_payouts and checks the amounts add up to the paise. With
+--baseline N the old per-row path (create + process_dividend_payment per
+holder) is timed on N holders in a rolled-back transaction for comparison.
+Generated data is removed afterwards unless --keep is set.
+"""
+import random
+import time
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from investments.investment_service import DIVIDEND_BATCH_SIZE, InvestmentService
+from investments.models import DividendPayment, Investment, InvestmentProperty
+from payments.models import Payment
+from projects.models import Property
+
+User = get_user_model()
+
+EMAIL_DOMAIN = 'dividend-benchmark.example'
+PAISE = Decimal('0.01')
+
+
+class Command(BaseCommand):
+    help = 'Benchmark bulk dividend creation and payout on generated token holders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--holders', type=int, default=100000, help='Token holders to generate (default: 100000)')
+        parser.add_argument(
+            '--amount-per-token',
+            type=str,
+            default='12.37',
+            help='Dividend per token in rupees (default: 12.37)'
+        )
+        parser.add_argument(
+            '--baseline',
+            type=int,
+            default=0,
+            help='Also time the per-row path on this many holders (rolled back)'
+        )
+        parser.add_argument('--keep', action='store_true', help='Keep the generated data')
+        parser.add_argument('--reset', action='store_true', help='Delete previously generated benchmark data and exit')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for generated holdings')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            self._reset()
+            return
+        if options['holders'] < 1:
+            raise CommandError('--holders must be at least 1')
+
+        investment_property, treasury = self._generate(options['holders'], random.Random(options['seed']))
+        try:
+            self._benchmark(investment_property, treasury, Decimal(options['amount_per_token']), options)
+        finally:
+            if not options['keep']:
+                self._reset()
+
+    def _generate(self, holders, rng):
+        property_obj = Property.objects.filter(investment_property__isnull=True).first()
+        if property_obj is None:
+            raise CommandError('No property without an investment property to tokenize (seed projects first)')
+
+        started = time.perf_counter()
+        password = make_password(None)
+        treasury = User.objects.create(
+            email=f'treasury@{EMAIL_DOMAIN}', username='dividend-benchmark-treasury',
+            first_name='Dividend', last_name='Treasury', password=password,
+        )
+        users = User.objects.bulk_create([
+            User(
+                email=f'holder-{i}@{EMAIL_DOMAIN}', username=f'dividend-benchmark-{i}',
+                first_name='Holder', last_name=str(i), password=password,
+            )
+            for i in range(holders)
+        ], batch_size=DIVIDEND_BATCH_SIZE)
+
+        holdings = [rng.randint(1, 100) for _ in users]
+        sold = sum(holdings)
+        token_price = Decimal('100.00')
+        investment_property = InvestmentProperty.objects.create(
+            property=property_obj,
+            total_tokens=sold * 2,
+            sold_tokens=sold,
+            token_price=token_price,
+            minimum_investment=token_price,
+            status='active',
+            metadata={'dividend_benchmark': True},
+        )
+        # bulk_create skips Investment.save(), so amounts are filled in here
+        Investment.objects.bulk_create([
+            Investment(
+                investment_property=investment_property,
+                user=user,
+                tokens=tokens,
+                token_price=token_price,
+                total_amount=token_price * tokens,
+                current_token_price=token_price,
+                current_value=token_price * tokens,
+                status=rng.choice(['confirmed', 'active', 'active', 'active', 'pending']),
+            )
+            for user, tokens in zip(users, holdings)
+        ], batch_size=DIVIDEND_BATCH_SIZE)
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Generated {holders} token holders ({sold} tokens) on {property_obj.unit_number} "
+            f"in {time.perf_counter() - started:.1f}s"
+        ))
+        return investment_property, treasury
+
+    def _benchmark(self, investment_property, treasury, amount_per_token, options):
+        today = timezone.localdate()
+        eligible = Investment.objects.filter(investment_property=investment_property, status__in=['confirmed', 'active'])
+
+        started = time.perf_counter()
+        dividend = InvestmentService.create_dividend(
+            investment_property, amount_per_token, today.replace(day=1), today, today, 'Dividend benchmark'
+        )
+        create_seconds = time.perf_counter() - started
+        payments = DividendPayment.objects.filter(dividend=dividend)
+        count = payments.count()
+        # SQLite sums decimals as floats; rounding back to paise is exact at these totals
+        total = (payments.aggregate(total=Sum('amount'))['total'] or Decimal('0')).quantize(PAISE)
+        self._check(total == dividend.total_amount, f"payments total {total} vs dividend {dividend.total_amount}")
+        self._check(count == eligible.count(), f"{count} payments for {eligible.count()} eligible holdings")
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ create_dividend: {count} payments, ₹{total:,.2f} in {create_seconds:.2f}s ({count / create_seconds:,.0f}/s)"
+        ))
+
+        payout = Payment.objects.create(
+            user=treasury,
+            amount=dividend.total_amount,
+            status='completed',
+            payment_method='bank_transfer',
+            payment_type='other',
+            description='Dividend benchmark payout',
+        )
+        started = time.perf_counter()
+        result = InvestmentService.process_dividend_payouts(dividend, payout)
+        payout_seconds = time.perf_counter() - started
+        credited = (eligible.aggregate(total=Sum('total_dividends_received'))['total'] or Decimal('0')).quantize(PAISE)
+        dividend.refresh_from_db()
+        self._check(result['paid'] == count, f"{result['paid']} of {count} payments paid")
+        self._check(credited == total, f"investments credited {credited} vs {total} paid")
+        self._check(dividend.status == 'paid', f"dividend left {dividend.status}")
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ process_dividend_payouts: {result['paid']} paid, ₹{result['amount']:,.2f} in {payout_seconds:.2f}s "
+            f"({result['paid'] / payout_seconds:,.0f}/s)"
+        ))
+
+        if options['baseline']:
+            self._baseline(dividend, eligible, payout, options['baseline'], count, create_seconds + payout_seconds)
+
+    def _baseline(self, dividend, eligible, payout, sample, holders, bulk_seconds):
+        """The per-row path this replaced, on a sample, rolled back"""
+        investments = list(eligible.select_related('user')[:sample])
+        started = time.perf_counter()
+        with transaction.atomic():
+            DividendPayment.objects.filter(dividend=dividend).delete()
+            for investment in investments:
+                dividend_payment = DividendPayment.objects.create(
+                    dividend=dividend,
+                    investment=investment,
+                    user=investment.user,
+                    tokens=investment.tokens,
+                    amount=Decimal(str(dividend.amount_per_token)) * Decimal(str(investment.tokens)),
+                    status='pending',
+                )
+                InvestmentService.process_dividend_payment(dividend_payment, payout)
+            transaction.set_rollback(True)
+        seconds = time.perf_counter() - started
+        estimate = seconds / len(investments) * holders
+        self.stdout.write(
+            f"  Per-row path: {len(investments)} holders in {seconds:.2f}s ({len(investments) / seconds:,.0f}/s); "
+            f"~{estimate:.0f}s for {holders} vs {bulk_seconds:.1f}s bulk ({estimate / bulk_seconds:.0f}x)"
+        )
+
+    def _check(self, ok, message):
+        if not ok:
+            raise CommandError(f"Mismatch: {message}")
+
+    def _reset(self):
+        started = time.perf_counter()
+        # Dividends, their payments and the investments cascade from the property
+        InvestmentProperty.objects.filter(metadata__dividend_benchmark=True).delete()
+        Payment.objects.filter(user__email__endswith=f'@{EMAIL_DOMAIN}').delete()
+        User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').delete()
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Removed generated benchmark data in {time.perf_counter() - started:.1f}s"
+        ))
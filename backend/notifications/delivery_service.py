@@ -0,0 +1,221 @@
+"""
+Notification Delivery Service
+Background delivery of queued notifications. Notifications created for the
+email, SMS or push channels carry next_attempt_at and are claimed in batches
+by the deliver_notifications worker, so request threads never talk to SMTP or
+other providers. Each batch's emails share one SMTP session; failed sends are
+retried with exponential backoff.
+"""
+import logging
+import random
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import Avg, Count, F, Min, Q
+from django.utils import timezone
+
+from .models import Notification
+from .notification_service import NotificationService
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_DELIVERY_BATCH_SIZE = getattr(settings, 'NOTIFICATION_DELIVERY_BATCH_SIZE', 100)
+# A claimed notification not finished within this many seconds is picked up again
+NOTIFICATION_DELIVERY_LEASE = getattr(settings, 'NOTIFICATION_DELIVERY_LEASE', 300)
+NOTIFICATION_DELIVERY_MAX_ATTEMPTS = getattr(settings, 'NOTIFICATION_DELIVERY_MAX_ATTEMPTS', 5)
+# Retry n waits base * 2^(n-1) seconds (+/-20% jitter), capped at max
+NOTIFICATION_RETRY_BASE = getattr(settings, 'NOTIFICATION_RETRY_BASE', 60)
+NOTIFICATION_RETRY_MAX = getattr(settings, 'NOTIFICATION_RETRY_MAX', 3600)
+
+
+def claim_batch(limit: int = NOTIFICATION_DELIVERY_BATCH_SIZE) -> List[Notification]:
+    """
+    Lease up to limit due notifications to this worker
+
+    Rows locked by another worker are skipped, and the lease pushes
+    next_attempt_at forward so a crashed worker's batch is retried later.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Notification.objects
+            .select_for_update(skip_locked=True)
+            .filter(next_attempt_at__lte=now)
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        Notification.objects.filter(id__in=ids).update(next_attempt_at=now + timedelta(seconds=NOTIFICATION_DELIVERY_LEASE))
+    return list(Notification.objects.filter(id__in=ids).select_related('user').order_by('created_at'))
+
+
+def retry_delay(attempts: int) -> float:
+    delay = min(NOTIFICATION_RETRY_MAX, NOTIFICATION_RETRY_BASE * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _schedule_retry(notification: Notification, error: Exception, now) -> bool:
+    """Record a failed attempt; returns False once the notification has given up"""
+    notification.delivery_attempts += 1
+    notification.last_error = str(error)[:1000]
+    if notification.delivery_attempts >= NOTIFICATION_DELIVERY_MAX_ATTEMPTS:
+        notification.status = 'failed'
+        notification.next_attempt_at = None
+        return False
+    notification.next_attempt_at = now + timedelta(seconds=retry_delay(notification.delivery_attempts))
+    return True
+
+
+def mark_emails_sent(ids: List, sent_at) -> None:
+    """Bulk-mark notifications as emailed and take them off the delivery and digest queues"""
+    Notification.objects.filter(id__in=ids).update(email_sent=True, next_attempt_at=None, digest_at=None, last_error=None)
+    Notification.objects.filter(id__in=ids, sent_at__isnull=True).update(sent_at=sent_at)
+    Notification.objects.filter(id__in=ids, status='pending').update(status='sent')
+
+
+def _deliver_emails(notifications: List[Notification], result: Dict) -> List[Notification]:
+    """
+    Send a batch of emails over one SMTP session
+
+    Returns the notifications that were sent. Failures are rescheduled on the
+    instances; when the connection itself cannot be opened the whole batch is.
+    """
+    sent = []
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        logger.error(f"Could not open email connection for {len(notifications)} notifications: {str(e)}")
+        now = timezone.now()
+        for notification in notifications:
+            result['retried' if _schedule_retry(notification, e, now) else 'failed'] += 1
+        return sent
+
+    try:
+        for notification in notifications:
+            try:
+                message = NotificationService.build_email_message(notification, connection=connection)
+                if connection.send_messages([message]) != 1:
+                    raise RuntimeError('Message was not accepted')
+                sent.append(notification)
+            except Exception as e:
+                logger.warning(f"Email to {notification.user.email} failed (attempt {notification.delivery_attempts + 1}): {str(e)}")
+                result['retried' if _schedule_retry(notification, e, timezone.now()) else 'failed'] += 1
+    finally:
+        connection.close()
+    return sent
+
+
+def deliver_batch(notifications: List[Notification]) -> Dict:
+    """
+    Send a claimed batch and take finished notifications off the queue
+
+    Returns counts (sent, retried, failed, skipped, deferred for quiet hours), elapsed seconds and the
+    queue latency (created -> sent) of the sent notifications.
+    """
+    started = time.perf_counter()
+    result = {'sent': 0, 'retried': 0, 'failed': 0, 'skipped': 0, 'deferred': 0, 'latencies': []}
+    preferences = NotificationService.get_preferences_for({notification.user_id for notification in notifications})
+
+    now = timezone.now()
+    emails, done, deferred = [], [], []
+    for notification in notifications:
+        user_preferences = preferences[notification.user_id]
+        release = user_preferences.quiet_hours_end_at(now) if notification.channel != 'in_app' else None
+        if release:
+            # Hold until the user's quiet hours end
+            notification.next_attempt_at = release
+            deferred.append(notification)
+            continue
+        channels = NotificationService.delivery_channels(user_preferences, notification.type, [notification.channel])
+        if channels == ['email']:
+            emails.append(notification)
+            continue
+        if not channels:
+            result['skipped'] += 1
+        else:
+            NotificationService.send_notification(notification, preferences=user_preferences)
+            result['failed' if notification.status == 'failed' else 'sent'] += 1
+        done.append(notification)
+
+    sent_emails = _deliver_emails(emails, result) if emails else []
+    if sent_emails:
+        sent_at = timezone.now()
+        mark_emails_sent([notification.id for notification in sent_emails], sent_at)
+        result['sent'] += len(sent_emails)
+        result['latencies'] = [(sent_at - notification.created_at).total_seconds() for notification in sent_emails]
+
+    sent_ids = {notification.id for notification in sent_emails}
+    unsent = [notification for notification in emails if notification.id not in sent_ids]
+    if unsent:
+        Notification.objects.bulk_update(unsent, ['delivery_attempts', 'next_attempt_at', 'last_error', 'status'])
+    if done:
+        Notification.objects.filter(id__in=[notification.id for notification in done]).update(next_attempt_at=None)
+    if deferred:
+        Notification.objects.bulk_update(deferred, ['next_attempt_at'])
+        result['deferred'] = len(deferred)
+
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+
+def _percentile(values: List[float], percent: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+def deliver_pending(max_batches: Optional[int] = None) -> Dict:
+    """
+    Deliver due notifications until the queue is empty (or max_batches batches are done)
+
+    Returns totals plus throughput (sent per second) and p50/p95 queue latency.
+    """
+    totals = {'sent': 0, 'retried': 0, 'failed': 0, 'skipped': 0, 'deferred': 0, 'batches': 0, 'seconds': 0.0}
+    latencies: List[float] = []
+    while max_batches is None or totals['batches'] < max_batches:
+        batch = claim_batch()
+        if not batch:
+            break
+        result = deliver_batch(batch)
+        for key in ('sent', 'retried', 'failed', 'skipped', 'deferred', 'seconds'):
+            totals[key] += result[key]
+        latencies.extend(result['latencies'])
+        totals['batches'] += 1
+
+    totals['per_second'] = round(totals['sent'] / totals['seconds'], 1) if totals['seconds'] else 0.0
+    totals['latency_p50'] = _percentile(latencies, 50)
+    totals['latency_p95'] = _percentile(latencies, 95)
+    return totals
+
+
+def delivery_stats(hours: int = 24) -> Dict:
+    """Queue depth and delivery latency across all workers, read from the notification table"""
+    now = timezone.now()
+    since = now - timedelta(hours=hours)
+    queue = Notification.objects.filter(next_attempt_at__isnull=False).aggregate(
+        queued=Count('id'),
+        due=Count('id', filter=Q(next_attempt_at__lte=now)),
+        retrying=Count('id', filter=Q(delivery_attempts__gt=0)),
+        oldest=Min('created_at'),
+    )
+    recent = Notification.objects.filter(channel='email', created_at__gte=since).aggregate(
+        sent=Count('id', filter=Q(email_sent=True)),
+        failed=Count('id', filter=Q(status='failed')),
+        avg_latency=Avg(F('sent_at') - F('created_at'), filter=Q(email_sent=True)),
+    )
+    return {
+        'queued': queue['queued'],
+        'due': queue['due'],
+        'retrying': queue['retrying'],
+        'oldest_queued_seconds': (now - queue['oldest']).total_seconds() if queue['oldest'] else 0,
+        'email_sent': recent['sent'],
+        'email_failed': recent['failed'],
+        'email_avg_latency_seconds': recent['avg_latency'].total_seconds() if recent['avg_latency'] else None,
+        'window_hours': hours,
+    }
@@ -0,0 +1,168 @@
+"""
+Notification Digest Service
+Emails for users with digest_enabled are held (Notification.digest_at) until
+their next daily or weekly digest instead of being sent one by one. The
+send_notification_digests command leases every due notification, sends one
+email per user and marks the notifications in bulk.
+"""
+import logging
+from datetime import timedelta
+from itertools import groupby
+from typing import Dict, List
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .models import Notification
+from .delivery_service import (
+    NOTIFICATION_DELIVERY_LEASE, NOTIFICATION_DELIVERY_MAX_ATTEMPTS, mark_emails_sent, retry_delay
+)
+
+logger = logging.getLogger(__name__)
+
+# Notifications listed in full in one digest; the rest are summarised as a count
+DIGEST_MAX_ITEMS = 50
+DIGEST_FETCH_CHUNK = 2000
+
+
+def build_digest_message(user, notifications: List[Notification], frequency: str, connection=None) -> EmailMultiAlternatives:
+    """Render one user's held notifications into a single email"""
+    listed = notifications[:DIGEST_MAX_ITEMS]
+    context = {
+        'user': user,
+        'frequency': frequency,
+        'notifications': listed,
+        'remaining': len(notifications) - len(listed),
+    }
+    try:
+        html_message = render_to_string('notifications/digest_template.html', context)
+        plain_message = strip_tags(html_message)
+    except Exception:
+        html_message = None
+        plain_message = '\n\n'.join(f"{notification.title}\n{notification.message}" for notification in listed)
+
+    message = EmailMultiAlternatives(
+        subject=f"Your {frequency} ApnaGhar digest: {len(notifications)} update{'s' if len(notifications) != 1 else ''}",
+        body=plain_message,
+        from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', None) or 'noreply@apnaghar.com',
+        to=[user.email],
+        connection=connection,
+    )
+    if html_message:
+        message.attach_alternative(html_message, 'text/html')
+    return message
+
+
+def _reschedule_failed(notifications: List[Notification], error: Exception, now) -> bool:
+    """Push a failed digest back with backoff; returns False once it has given up"""
+    ids = [notification.id for notification in notifications]
+    attempts = max(notification.delivery_attempts for notification in notifications) + 1
+    if attempts >= NOTIFICATION_DELIVERY_MAX_ATTEMPTS:
+        Notification.objects.filter(id__in=ids).update(
+            status='failed', digest_at=None, last_error=str(error)[:1000], delivery_attempts=F('delivery_attempts') + 1
+        )
+        return False
+    Notification.objects.filter(id__in=ids).update(
+        digest_at=now + timedelta(seconds=retry_delay(attempts)),
+        last_error=str(error)[:1000],
+        delivery_attempts=F('delivery_attempts') + 1,
+    )
+    return True
+
+
+def claim_due_digests(now) -> List:
+    """
+    Lease every due digest notification to this run; returns their ids by user
+
+    Rows locked by another run are skipped, and the lease pushes digest_at
+    forward so overlapping runs never send the same digest twice while a
+    crashed run's notifications come due again later.
+    """
+    with transaction.atomic():
+        ids = list(
+            Notification.objects
+            .select_for_update(skip_locked=True)
+            .filter(digest_at__lte=now)
+            .order_by('user_id', 'created_at')
+            .values_list('id', flat=True)
+        )
+        lease_until = now + timedelta(seconds=NOTIFICATION_DELIVERY_LEASE)
+        for start in range(0, len(ids), DIGEST_FETCH_CHUNK):
+            Notification.objects.filter(id__in=ids[start:start + DIGEST_FETCH_CHUNK]).update(digest_at=lease_until)
+    return ids
+
+
+def _claimed_notifications(ids: List):
+    """Claimed notifications in user order, fetched a chunk at a time"""
+    for start in range(0, len(ids), DIGEST_FETCH_CHUNK):
+        yield from (
+            Notification.objects
+            .filter(id__in=ids[start:start + DIGEST_FETCH_CHUNK])
+            .select_related('user', 'user__notification_preferences')
+            .order_by('user_id', 'created_at')
+        )
+
+
+def send_digests(now=None) -> Dict:
+    """
+    Send every digest that is due
+
+    Returns counts of users emailed, notifications included, users held for
+    quiet hours and users whose digest failed.
+    """
+    now = now or timezone.now()
+    result = {'users': 0, 'notifications': 0, 'deferred': 0, 'retried': 0, 'failed': 0}
+    rows = _claimed_notifications(claim_due_digests(now))
+
+    sent_ids, deferred = [], {}
+    # Opened on the first digest to send; if that fails every digest is rescheduled
+    connection, connection_error = None, None
+    try:
+        for _, group in groupby(rows, key=lambda notification: notification.user_id):
+            notifications = list(group)
+            user = notifications[0].user
+            preferences = getattr(user, 'notification_preferences', None)
+            release = preferences.quiet_hours_end_at(now) if preferences else None
+            if release:
+                deferred.setdefault(release, []).extend(notification.id for notification in notifications)
+                result['deferred'] += 1
+                continue
+
+            if connection is None and connection_error is None:
+                try:
+                    connection = get_connection(fail_silently=False)
+                    connection.open()
+                except Exception as e:
+                    logger.warning(f"Could not open the mail connection for digests: {str(e)}")
+                    connection, connection_error = None, e
+            if connection_error is not None:
+                result['retried' if _reschedule_failed(notifications, connection_error, now) else 'failed'] += 1
+                continue
+
+            frequency = preferences.digest_frequency if preferences and preferences.wants_digest else 'daily'
+            try:
+                connection.send_messages([build_digest_message(user, notifications, frequency, connection)])
+            except Exception as e:
+                logger.warning(f"Digest for {user.email} failed: {str(e)}")
+                result['retried' if _reschedule_failed(notifications, e, now) else 'failed'] += 1
+                continue
+
+            sent_ids.extend(notification.id for notification in notifications)
+            result['users'] += 1
+            result['notifications'] += len(notifications)
+            if len(sent_ids) >= DIGEST_FETCH_CHUNK:
+                mark_emails_sent(sent_ids, timezone.now())
+                sent_ids = []
+    finally:
+        if connection is not None:
+            connection.close()
+
+    if sent_ids:
+        mark_emails_sent(sent_ids, timezone.now())
+    for release, ids in deferred.items():
+        Notification.objects.filter(id__in=ids).update(digest_at=release)
+    return result
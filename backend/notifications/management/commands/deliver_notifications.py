@@ -0,0 +1,53 @@
+"""
+Management command to deliver queued notifications
+Sends queued email, SMS and push notifications; each batch's emails share
+one SMTP session. Run once (e.g. from cron) or with --loop as a long-running
+worker.
+"""
+import time
+from django.core.management.base import BaseCommand
+from notifications.delivery_service import deliver_pending
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued notifications over their channels'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and poll the queue every --interval'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=5,
+            help='Seconds between polls when --loop is set (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self._deliver_once()
+            return
+
+        self.stdout.write(self.style.WARNING(f"Delivering notifications every {options['interval']}s (Ctrl+C to stop)..."))
+        try:
+            while True:
+                self._deliver_once()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\nNotification delivery stopped'))
+
+    def _deliver_once(self):
+        result = deliver_pending()
+        if not result['batches']:
+            return
+        latency = ''
+        if result['latency_p50'] is not None:
+            latency = f", latency p50 {result['latency_p50']:.1f}s p95 {result['latency_p95']:.1f}s"
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Sent {result['sent']} notifications in {result['batches']} batches "
+            f"({result['per_second']}/s{latency}); {result['retried']} to retry, "
+            f"{result['failed']} failed, {result['skipped']} skipped by preferences, "
+            f"{result['deferred']} held for quiet hours"
+        ))
@@ -0,0 +1,158 @@
+"""
+Management command to load test the notification event stream
+Opens many concurrent SSE connections against the ASGI application in this
+process, publishes events to every connected user and reports connection
+setup time and fan-out latency (publish -> event written to the client).
+"""
+import asyncio
+import time
+from django.contrib.auth import get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+from notifications.pubsub import get_broker, user_channel
+
+User = get_user_model()
+
+STREAM_PATH = '/api/notifications/stream/'
+
+
+class StreamClient:
+    """One fake EventSource talking to the ASGI app directly"""
+
+    def __init__(self, token: str):
+        self.token = token
+        self.connected = asyncio.Event()
+        self.received = {}
+        self.status = None
+        self._requested = False
+        self._disconnect = asyncio.Event()
+        self._buffer = ''
+
+    async def receive(self):
+        if not self._requested:
+            self._requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self._disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+            if self.status != 200:
+                self.connected.set()
+            return
+        if message['type'] != 'http.response.body':
+            return
+        now = time.perf_counter()
+        self._buffer += message.get('body', b'').decode()
+        while '\n\n' in self._buffer:
+            block, self._buffer = self._buffer.split('\n\n', 1)
+            fields = dict(line.split(': ', 1) for line in block.split('\n') if ': ' in line and not line.startswith(':'))
+            if fields.get('event') == 'unread_count':
+                self.connected.set()
+            elif fields.get('event') == 'load_test':
+                self.received[fields['data']] = now
+
+    async def run(self, application):
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': STREAM_PATH,
+            'raw_path': STREAM_PATH.encode(),
+            'query_string': f'token={self.token}'.encode(),
+            'headers': [(b'host', b'localhost'), (b'accept', b'text/event-stream')],
+            'client': ('127.0.0.1', 0),
+            'server': ('localhost', 80),
+        }
+        await application(scope, self.receive, self.send)
+
+    def close(self):
+        self._disconnect.set()
+
+
+class Command(BaseCommand):
+    help = 'Load test the notification event stream with many concurrent connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--connections',
+            type=int,
+            default=500,
+            help='Concurrent stream connections to open (default: 500)'
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=100,
+            help='Distinct users to spread connections over (default: 100)'
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=5,
+            help='Events published to every user (default: 5)'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=30,
+            help='Seconds to wait for connections and events (default: 30)'
+        )
+
+    def handle(self, *args, **options):
+        users = list(User.objects.filter(is_active=True).order_by('date_joined')[:options['users']])
+        if not users:
+            raise CommandError('No active users to connect as')
+        tokens = [str(AccessToken.for_user(user)) for user in users]
+        user_ids = [user.pk for user in users]
+        asyncio.run(self._run(tokens, user_ids, options))
+
+    async def _run(self, tokens, user_ids, options):
+        application = get_asgi_application()
+        broker = get_broker()
+        clients = [StreamClient(tokens[i % len(tokens)]) for i in range(options['connections'])]
+        self.stdout.write(f"Opening {len(clients)} connections for {len(tokens)} users ({broker.__class__.__name__})...")
+
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(client.run(application)) for client in clients]
+        try:
+            await asyncio.wait_for(asyncio.gather(*(client.connected.wait() for client in clients)), options['timeout'])
+        except asyncio.TimeoutError:
+            pass
+        connect_seconds = time.perf_counter() - started
+        connected = [client for client in clients if client.status == 200 and client.connected.is_set()]
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {len(connected)}/{len(clients)} connected in {connect_seconds:.2f}s "
+            f"({broker.stats()['connections']} open subscriptions)"
+        ))
+
+        for round_number in range(options['rounds']):
+            marker = f'"{round_number}"'
+            published = time.perf_counter()
+            messages = [(user_channel(user_id), {'event': 'load_test', 'data': str(round_number), 'published_at': time.time()}) for user_id in user_ids]
+            await asyncio.to_thread(broker.publish_many, messages)
+            deadline = published + options['timeout']
+            while time.perf_counter() < deadline and any(marker not in client.received for client in connected):
+                await asyncio.sleep(0.005)
+            latencies = sorted((client.received[marker] - published) * 1000 for client in connected if marker in client.received)
+            if not latencies:
+                self.stdout.write(self.style.ERROR(f"Round {round_number + 1}: no events received"))
+                continue
+            self.stdout.write(
+                f"Round {round_number + 1}: {len(latencies)}/{len(connected)} received, "
+                f"p50 {latencies[len(latencies) // 2]:.1f}ms, p95 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]:.1f}ms, "
+                f"max {latencies[-1]:.1f}ms"
+            )
+
+        for client in clients:
+            client.close()
+        await asyncio.wait(tasks, timeout=options['timeout'])
+        stats = broker.stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Done: {stats['delivered']} events written, server-side p50 {stats['latency_ms_p50']}ms "
+            f"p95 {stats['latency_ms_p95']}ms, {stats['connections']} subscriptions left open"
+        ))
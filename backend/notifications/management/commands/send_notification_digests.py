@@ -0,0 +1,46 @@
+"""
+Management command to send notification digests
+Emails each user on a daily or weekly digest one summary of their held
+notifications. Run hourly (e.g. from cron) or with --loop as a worker.
+"""
+import time
+from django.core.management.base import BaseCommand
+from notifications.digest_service import send_digests
+
+
+class Command(BaseCommand):
+    help = 'Send due daily and weekly notification digests'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and check for due digests every --interval'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=300,
+            help='Seconds between checks when --loop is set (default: 300)'
+        )
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self._send_once()
+            return
+
+        self.stdout.write(self.style.WARNING(f"Sending digests every {options['interval']}s (Ctrl+C to stop)..."))
+        try:
+            while True:
+                self._send_once()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\nDigest sending stopped'))
+
+    def _send_once(self):
+        result = send_digests()
+        if result['users'] or result['deferred'] or result['retried'] or result['failed']:
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ Sent {result['users']} digests covering {result['notifications']} notifications; "
+                f"{result['deferred']} held for quiet hours, {result['retried']} to retry, {result['failed']} failed"
+            ))
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from datetime import timedelta
 import uuid
 
 User = get_user_model()
@@ -68,6 +69,12 @@ class Notification(models.Model):
     sms_sent = models.BooleanField(default=False)
     push_sent = models.BooleanField(default=False)
     
+    # Background delivery (set while queued for the delivery worker)
+    next_attempt_at = models.DateTimeField(blank=True, null=True)
+    delivery_attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+    digest_at = models.DateTimeField(blank=True, null=True)  # Held for the user's email digest due at this time
+    
     class Meta:
         db_table = 'notifications'
         verbose_name = 'Notification'
@@ -78,6 +85,8 @@ class Notification(models.Model):
             models.Index(fields=['user', 'read_at']),
             models.Index(fields=['type', 'created_at']),
             models.Index(fields=['related_object_type', 'related_object_id']),
+            models.Index(fields=['next_attempt_at']),
+            models.Index(fields=['digest_at', 'user']),
         ]
     
     def __str__(self):
@@ -164,18 +173,33 @@ class NotificationPreference(models.Model):
         }
         return channel_map.get(channel, False)
     
-    def is_quiet_hours(self):
-        """Check if current time is within quiet hours"""
+    def is_quiet_hours(self, now=None):
+        """Check if the current (or given) time is within quiet hours"""
         if not self.quiet_hours_start or not self.quiet_hours_end:
             return False
         
-        now = timezone.now().time()
+        now = (now or timezone.now()).time()
         start = self.quiet_hours_start
         end = self.quiet_hours_end
         
-        # Handle quiet hours that span midnight
+        # Handle quiet hours that span midnight (the end time itself is outside the window)
         if start <= end:
-            return start <= now <= end
+            return start <= now < end
         else:
-            return now >= start or now <= end
-
+            return now >= start or now < end
+    
+    def quiet_hours_end_at(self, now=None):
+        """When the current quiet hours end, or None outside quiet hours"""
+        now = now or timezone.now()
+        if not self.is_quiet_hours(now):
+            return None
+        end = now.replace(
+            hour=self.quiet_hours_end.hour, minute=self.quiet_hours_end.minute,
+            second=self.quiet_hours_end.second, microsecond=0
+        )
+        return end if end > now else end + timedelta(days=1)
+    
+    @property
+    def wants_digest(self):
+        """Whether emails should be collected into a periodic digest"""
+        return self.digest_enabled and self.digest_frequency != 'never'
@@ -2,18 +2,26 @@
 Notification Service
 Handles sending notifications via various channels (email, SMS, push, in-app)
 """
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives
 from django.conf import settings
 from django.template.loader import render_to_string
+from django.utils import timezone
 from django.utils.html import strip_tags
 from .models import Notification, NotificationPreference
+from .unread_service import notifications_created
+from .pubsub import publish_notifications
 from django.contrib.auth import get_user_model
 import logging
-from typing import Optional, Dict, Any, List
+from datetime import timedelta
+from typing import Optional, Dict, Any, List, Iterable
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
+NOTIFICATION_BULK_BATCH_SIZE = getattr(settings, 'NOTIFICATION_BULK_BATCH_SIZE', 500)
+# Hour of day (server time) digests go out; weekly digests go out on Mondays
+NOTIFICATION_DIGEST_HOUR = getattr(settings, 'NOTIFICATION_DIGEST_HOUR', 8)
+
 
 class NotificationService:
     """Service for creating and sending notifications"""
@@ -55,7 +63,7 @@ class NotificationService:
         Returns:
             Notification instance
         """
-        notification = Notification.objects.create(
+        notification = Notification(
             user=user,
             type=notification_type,
             title=title,
@@ -67,40 +75,157 @@ class NotificationService:
             action_url=action_url,
             action_text=action_text,
         )
-        
-        # Auto-send based on user preferences
-        NotificationService.send_notification(notification)
+        # Email, SMS and push go through the delivery worker, never the request thread
+        NotificationService.schedule_delivery(notification, NotificationService.get_or_create_preferences(user))
+        notification.save()
+        notifications_created([user.pk])
+        publish_notifications([notification])
         
         return notification
     
     @staticmethod
-    def send_notification(notification: Notification, channels: Optional[List[str]] = None):
+    def get_preferences_for(user_ids: Iterable) -> Dict[Any, NotificationPreference]:
+        """Preferences for many users keyed by user id, creating missing rows in one insert"""
+        user_ids = list(user_ids)
+        preferences = {
+            preference.user_id: preference
+            for preference in NotificationPreference.objects.filter(user_id__in=user_ids)
+        }
+        missing = [user_id for user_id in user_ids if user_id not in preferences]
+        if missing:
+            NotificationPreference.objects.bulk_create(
+                [NotificationPreference(user_id=user_id) for user_id in missing],
+                batch_size=NOTIFICATION_BULK_BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+            for preference in NotificationPreference.objects.filter(user_id__in=missing):
+                preferences[preference.user_id] = preference
+        return preferences
+    
+    @staticmethod
+    def delivery_channels(preferences: NotificationPreference, notification_type: str, channels: List[str]) -> List[str]:
+        """Channels a notification should go out on under the user's preferences (empty if none)"""
+        if not preferences.is_type_enabled(notification_type):
+            return []
+        if preferences.is_quiet_hours():
+            # During quiet hours, only send in-app notifications
+            return ['in_app'] if 'in_app' in channels else []
+        return [ch for ch in channels if preferences.is_channel_enabled(ch)]
+    
+    @staticmethod
+    def next_digest_at(frequency: str, now=None):
+        """When the next daily (or, for weekly, Monday) digest goes out after now"""
+        now = now or timezone.now()
+        due = now.replace(hour=NOTIFICATION_DIGEST_HOUR, minute=0, second=0, microsecond=0)
+        step = 1
+        if frequency == 'weekly':
+            due -= timedelta(days=due.weekday())
+            step = 7
+        while due <= now:
+            due += timedelta(days=step)
+        return due
+    
+    @staticmethod
+    def schedule_delivery(notification: Notification, preferences: NotificationPreference, now=None):
+        """
+        Decide how a new, unsaved notification is delivered
+        
+        In-app notifications are marked sent; emails for users on a digest are
+        held for their next digest; other channels are queued for the delivery
+        worker, deferred to the end of quiet hours when they are in effect.
+        Notifications the user has switched off are left unqueued.
+        """
+        now = now or timezone.now()
+        channel = notification.channel
+        if not preferences.is_type_enabled(notification.type) or not preferences.is_channel_enabled(channel):
+            return
+        if channel == 'in_app':
+            notification.status = 'sent'
+            notification.sent_at = now
+        elif channel == 'email' and preferences.wants_digest:
+            notification.digest_at = NotificationService.next_digest_at(preferences.digest_frequency, now)
+        else:
+            notification.next_attempt_at = preferences.quiet_hours_end_at(now) or now
+    
+    @staticmethod
+    def create_bulk_notifications(
+        user_ids: Iterable,
+        notification_type: str,
+        title: str,
+        message: str,
+        channel: str = 'in_app',
+        related_object_type: Optional[str] = None,
+        related_object_id: Optional[str] = None,
+        data: Optional[Dict[str, Any]] = None,
+        action_url: Optional[str] = None,
+        action_text: Optional[str] = None,
+    ) -> List[Notification]:
+        """
+        Create the same notification for many users with a fixed number of queries
+        
+        Preferences are loaded in one query and notifications inserted with
+        bulk_create, each scheduled as in schedule_delivery.
+        
+        Returns:
+            The created Notification instances
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return []
+        preferences = NotificationService.get_preferences_for(user_ids)
+        now = timezone.now()
+        
+        notifications = []
+        for user_id in user_ids:
+            notification = Notification(
+                user_id=user_id,
+                type=notification_type,
+                title=title,
+                message=message,
+                channel=channel,
+                related_object_type=related_object_type,
+                related_object_id=related_object_id,
+                data=data or {},
+                action_url=action_url,
+                action_text=action_text,
+            )
+            NotificationService.schedule_delivery(notification, preferences[user_id], now)
+            notifications.append(notification)
+        
+        Notification.objects.bulk_create(notifications, batch_size=NOTIFICATION_BULK_BATCH_SIZE)
+        notifications_created(notification.user_id for notification in notifications)
+        publish_notifications(notifications)
+        return notifications
+    
+    @staticmethod
+    def send_notification(
+        notification: Notification,
+        channels: Optional[List[str]] = None,
+        preferences: Optional[NotificationPreference] = None
+    ):
         """
         Send notification via specified channels
         
         Args:
             notification: Notification instance
             channels: List of channels to send to (if None, uses notification.channel and preferences)
+            preferences: The user's preferences, if already loaded
         """
-        preferences = NotificationService.get_or_create_preferences(notification.user)
+        if preferences is None:
+            preferences = NotificationService.get_or_create_preferences(notification.user)
         
         # Determine which channels to use
         if channels is None:
             channels = [notification.channel]
         
-        # Filter channels based on user preferences and quiet hours
-        if preferences.is_quiet_hours():
-            # During quiet hours, only send in-app notifications
-            channels = ['in_app'] if 'in_app' in channels else []
-        else:
-            # Filter out disabled channels
-            channels = [ch for ch in channels if preferences.is_channel_enabled(ch)]
-        
         # Check if notification type is enabled
         if not preferences.is_type_enabled(notification.type):
             logger.info(f"Notification type {notification.type} disabled for user {notification.user.email}")
             return
         
+        # Filter channels based on user preferences and quiet hours
+        channels = NotificationService.delivery_channels(preferences, notification.type, channels)
+        
         # Send via each enabled channel
         for channel in channels:
             try:
@@ -119,38 +244,40 @@ class NotificationService:
                 notification.save(update_fields=['status'])
     
     @staticmethod
-    def _send_email(notification: Notification):
-        """Send email notification"""
+    def build_email_message(notification: Notification, connection=None) -> EmailMultiAlternatives:
+        """Render a notification into an email message (HTML with a plain-text part)"""
         try:
-            subject = notification.title
-            message = notification.message
-            
-            # Try to render HTML email template
-            try:
-                html_message = render_to_string(
-                    'notifications/email_template.html',
-                    {
-                        'notification': notification,
-                        'user': notification.user,
-                        'action_url': notification.action_url,
-                        'action_text': notification.action_text,
-                    }
-                )
-                plain_message = strip_tags(html_message)
-            except Exception:
-                # If template doesn't exist, use plain text
-                html_message = None
-                plain_message = message
-            
-            send_mail(
-                subject=subject,
-                message=plain_message,
-                from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@apnaghar.com'),
-                recipient_list=[notification.user.email],
-                html_message=html_message,
-                fail_silently=False,
+            html_message = render_to_string(
+                'notifications/email_template.html',
+                {
+                    'notification': notification,
+                    'user': notification.user,
+                    'action_url': notification.action_url,
+                    'action_text': notification.action_text,
+                }
             )
-            
+            plain_message = strip_tags(html_message)
+        except Exception:
+            # If template doesn't exist, use plain text
+            html_message = None
+            plain_message = notification.message
+        
+        message = EmailMultiAlternatives(
+            subject=notification.title,
+            body=plain_message,
+            from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', None) or 'noreply@apnaghar.com',
+            to=[notification.user.email],
+            connection=connection,
+        )
+        if html_message:
+            message.attach_alternative(html_message, 'text/html')
+        return message
+    
+    @staticmethod
+    def _send_email(notification: Notification):
+        """Send email notification over its own SMTP connection (the delivery worker batches instead)"""
+        try:
+            NotificationService.build_email_message(notification).send(fail_silently=False)
             notification.mark_as_sent('email')
             logger.info(f"Email notification sent to {notification.user.email}")
         
@@ -0,0 +1,251 @@
+"""
+Notification Pub/Sub
+Per-user channels behind the notification event stream (SSE). Publishing is
+synchronous and safe from any thread (request threads, workers, signals);
+subscribing happens inside the ASGI event loop.
+
+Backends (NOTIFICATION_PUBSUB_BACKEND):
+- 'memory': in-process fan-out. Only events published by the same process
+  reach its streams, so use it for a single ASGI process or local testing.
+- 'redis': Redis (or any server speaking its PUBLISH/SUBSCRIBE protocol) at
+  NOTIFICATION_PUBSUB_URL, so events from workers and other web processes
+  reach every stream. Each process keeps one subscriber connection and
+  subscribes only to the channels of users connected to it. Needs the
+  redis package.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_PUBSUB_BACKEND = getattr(settings, 'NOTIFICATION_PUBSUB_BACKEND', 'memory')
+NOTIFICATION_PUBSUB_URL = getattr(settings, 'NOTIFICATION_PUBSUB_URL', 'redis://localhost:6379/0')
+# Events buffered per connection; a slow client loses the oldest ones
+NOTIFICATION_SSE_QUEUE_SIZE = getattr(settings, 'NOTIFICATION_SSE_QUEUE_SIZE', 100)
+
+
+def user_channel(user_id) -> str:
+    return f'notifications:user:{user_id}'
+
+
+class Subscription:
+    """One stream's queue of messages for a channel"""
+
+    def __init__(self, broker: 'InProcessBroker', channel: str):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=NOTIFICATION_SSE_QUEUE_SIZE)
+        self.dropped = 0
+
+    def put(self, message: Dict) -> None:
+        # Runs on the subscriber's loop
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    async def get(self) -> Dict:
+        return await self.queue.get()
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Fan messages out to subscriptions in this process"""
+
+    def __init__(self):
+        self._subscriptions: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self.delivered = 0
+        self._latencies = deque(maxlen=1000)
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(self, channel)
+        with self._lock:
+            subscribers = self._subscriptions.setdefault(channel, set())
+            first = not subscribers
+            subscribers.add(subscription)
+        if first:
+            self._channel_added(channel)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.channel)
+            if not subscribers or subscription not in subscribers:
+                return
+            subscribers.discard(subscription)
+            last = not subscribers
+            if last:
+                del self._subscriptions[subscription.channel]
+        if last:
+            self._channel_removed(subscription.channel)
+
+    def _channel_added(self, channel: str) -> None:
+        pass
+
+    def _channel_removed(self, channel: str) -> None:
+        pass
+
+    def dispatch(self, channel: str, message: Dict) -> None:
+        """Hand a message to every local subscription of channel"""
+        with self._lock:
+            subscribers = list(self._subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            subscription.loop.call_soon_threadsafe(subscription.put, message)
+
+    def publish_many(self, messages: Iterable[Tuple[str, Dict]]) -> None:
+        for channel, message in messages:
+            self.dispatch(channel, message)
+
+    def publish(self, channel: str, message: Dict) -> None:
+        self.publish_many([(channel, message)])
+
+    def record_delivery(self, message: Dict) -> None:
+        """Called by a stream after writing message, to track fan-out latency"""
+        self.delivered += 1
+        if message.get('published_at'):
+            self._latencies.append(time.time() - message['published_at'])
+
+    def stats(self) -> Dict:
+        with self._lock:
+            connections = sum(len(subscribers) for subscribers in self._subscriptions.values())
+            channels = len(self._subscriptions)
+        latencies = sorted(self._latencies)
+        percentile = lambda p: round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2) if latencies else None
+        return {
+            'backend': NOTIFICATION_PUBSUB_BACKEND,
+            'connections': connections,
+            'channels': channels,
+            'delivered': self.delivered,
+            'latency_ms_p50': percentile(0.5),
+            'latency_ms_p95': percentile(0.95),
+            'latency_ms_max': round(latencies[-1] * 1000, 2) if latencies else None,
+        }
+
+
+class RedisBroker(InProcessBroker):
+    """Publish through Redis; local subscriptions share one subscriber connection per process"""
+
+    def __init__(self, url: str):
+        super().__init__()
+        try:
+            import redis
+            import redis.asyncio
+        except ImportError:
+            raise ImproperlyConfigured("NOTIFICATION_PUBSUB_BACKEND='redis' requires the redis package")
+        self._redis = redis
+        self._client = redis.Redis.from_url(url)
+        self.url = url
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+
+    def publish_many(self, messages: Iterable[Tuple[str, Dict]]) -> None:
+        pipeline = self._client.pipeline(transaction=False)
+        for channel, message in messages:
+            pipeline.publish(channel, json.dumps(message, default=str))
+        pipeline.execute()
+
+    def _channel_added(self, channel: str) -> None:
+        if self._reader is None or self._reader.done():
+            self._pubsub = self._redis.asyncio.Redis.from_url(self.url).pubsub(ignore_subscribe_messages=True)
+            self._reader = asyncio.get_running_loop().create_task(self._read())
+        asyncio.get_running_loop().create_task(self._pubsub.subscribe(channel))
+
+    def _channel_removed(self, channel: str) -> None:
+        if self._pubsub is not None:
+            asyncio.get_running_loop().create_task(self._pubsub.unsubscribe(channel))
+
+    async def _read(self) -> None:
+        while True:
+            try:
+                if not self._pubsub.subscribed:
+                    await asyncio.sleep(0.05)
+                    continue
+                message = await self._pubsub.get_message(timeout=1.0)
+                if message and message['type'] == 'message':
+                    self.dispatch(message['channel'].decode(), json.loads(message['data']))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Notification pub/sub reader error: {str(e)}")
+                await asyncio.sleep(1)
+
+
+BROKERS = {
+    'memory': lambda: InProcessBroker(),
+    'redis': lambda: RedisBroker(NOTIFICATION_PUBSUB_URL),
+}
+
+_broker: Optional[InProcessBroker] = None
+_broker_lock = threading.Lock()
+
+
+def get_broker() -> InProcessBroker:
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                if NOTIFICATION_PUBSUB_BACKEND not in BROKERS:
+                    raise ImproperlyConfigured(f"Unknown NOTIFICATION_PUBSUB_BACKEND {NOTIFICATION_PUBSUB_BACKEND!r}")
+                _broker = BROKERS[NOTIFICATION_PUBSUB_BACKEND]()
+    return _broker
+
+
+def _publish(messages: List[Tuple[str, Dict]]) -> None:
+    published_at = time.time()
+    for _, message in messages:
+        message['published_at'] = published_at
+    try:
+        get_broker().publish_many(messages)
+    except Exception as e:
+        # Streams are best effort; clients still see the rows on their next fetch
+        logger.error(f"Error publishing {len(messages)} notification events: {str(e)}")
+
+
+def publish_event(user_ids: Iterable, event: str, data: Dict) -> None:
+    """Send one event to each user's stream once the current transaction commits"""
+    messages = [
+        (user_channel(user_id), {'event': event, 'data': data})
+        for user_id in user_ids
+    ]
+    if messages:
+        transaction.on_commit(lambda: _publish(messages))
+
+
+def notification_payload(notification) -> Dict:
+    return {
+        'id': str(notification.id),
+        'type': notification.type,
+        'title': notification.title,
+        'message': notification.message,
+        'channel': notification.channel,
+        'data': notification.data,
+        'action_url': notification.action_url,
+        'action_text': notification.action_text,
+        'created_at': notification.created_at.isoformat() if notification.created_at else None,
+    }
+
+
+def publish_notifications(notifications: Iterable) -> None:
+    """Stream newly created notifications to their users once the transaction commits"""
+    messages = [
+        (user_channel(notification.user_id), {
+            'event': 'notification',
+            'id': str(notification.id),
+            'data': notification_payload(notification),
+        })
+        for notification in notifications
+    ]
+    if messages:
+        transaction.on_commit(lambda: _publish(messages))
@@ -7,6 +7,7 @@ from projects.models import Booking, ConstructionUpdate, Property
 from payments.models import Payment
 from blockchain.models import BlockchainProgressUpdate, BlockchainDocument
 from .notification_service import NotificationService
+from .pubsub import publish_event
 import logging
 
 logger = logging.getLogger(__name__)
@@ -29,9 +30,8 @@ def notify_booking_created(sender, instance, created, **kwargs):
 @receiver(post_save, sender=Booking)
 def notify_booking_confirmed(sender, instance, created, **kwargs):
     """Notify user when booking is confirmed"""
-    # Check if status changed to confirmed
-    if not created and instance.status == 'confirmed':
-        # Check if it was just confirmed (could use a field to track previous status)
+    # Only on the transition to confirmed, not on later saves of a confirmed booking
+    if not created and instance.status == 'confirmed' and instance.has_changed('status'):
         try:
             NotificationService.notify_booking_confirmed(
                 user=instance.buyer,
@@ -45,18 +45,14 @@ def notify_booking_confirmed(sender, instance, created, **kwargs):
 @receiver(post_save, sender=Payment)
 def notify_payment_received(sender, instance, created, **kwargs):
     """Notify user when payment is received"""
-    # Only notify on status change to completed (not on creation)
-    if not created and instance.status == 'completed':
+    # Only notify on status change to completed (not on creation or re-saves)
+    if not created and instance.status == 'completed' and instance.has_changed('status'):
         try:
-            # Check if this is the first time it's being marked as completed
-            # (to avoid sending duplicate notifications)
-            previous = Payment.objects.filter(id=instance.id).first()
-            if previous and previous.status != 'completed':
-                NotificationService.notify_payment_received(
-                    user=instance.user,
-                    payment=instance
-                )
-                logger.info(f"Payment received notification sent to {instance.user.email}")
+            NotificationService.notify_payment_received(
+                user=instance.user,
+                payment=instance
+            )
+            logger.info(f"Payment received notification sent to {instance.user.email}")
         except Exception as e:
             logger.error(f"Error sending payment received notification: {str(e)}")
 
@@ -64,17 +60,14 @@ def notify_payment_received(sender, instance, created, **kwargs):
 @receiver(post_save, sender=Payment)
 def notify_payment_failed(sender, instance, created, **kwargs):
     """Notify user when payment fails"""
-    # Only notify on status change to failed (not on creation)
-    if not created and instance.status == 'failed':
+    # Only notify on status change to failed (not on creation or re-saves)
+    if not created and instance.status == 'failed' and instance.has_changed('status'):
         try:
-            # Check if this is the first time it's being marked as failed
-            previous = Payment.objects.filter(id=instance.id).first()
-            if previous and previous.status != 'failed':
-                NotificationService.notify_payment_failed(
-                    user=instance.user,
-                    payment=instance
-                )
-                logger.info(f"Payment failed notification sent to {instance.user.email}")
+            NotificationService.notify_payment_failed(
+                user=instance.user,
+                payment=instance
+            )
+            logger.info(f"Payment failed notification sent to {instance.user.email}")
         except Exception as e:
             logger.error(f"Error sending payment failed notification: {str(e)}")
 
@@ -86,27 +79,31 @@ def notify_construction_update(sender, instance, created, **kwargs):
         try:
             # Get all buyers who have properties in this project
             project = instance.project
-            buyers = Property.objects.filter(
+            buyers = list(Property.objects.filter(
                 project=project,
                 buyer__isnull=False
-            ).values_list('buyer', flat=True).distinct()
+            ).values_list('buyer', flat=True).distinct())
             
-            # Create notification for each buyer
-            for buyer_id in buyers:
-                from users.models import CustomUser
-                buyer = CustomUser.objects.get(id=buyer_id)
-                
-                NotificationService.create_notification(
-                    user=buyer,
-                    notification_type='construction_update',
-                    title=f'New Construction Update: {project.name}',
-                    message=f'A new construction update has been posted for {project.name}. {instance.title}',
-                    data={
-                        'project_id': str(project.id),
-                        'update_id': str(instance.id),
-                        'update_type': instance.update_type,
-                    }
-                )
+            # One bulk insert for all buyers; channel delivery is queued
+            NotificationService.create_bulk_notifications(
+                user_ids=buyers,
+                notification_type='construction_update',
+                title=f'New Construction Update: {project.name}',
+                message=f'A new construction update has been posted for {project.name}. {instance.title}',
+                data={
+                    'project_id': str(project.id),
+                    'update_id': str(instance.id),
+                    'update_type': instance.update_type,
+                }
+            )
+            
+            # Live construction feed for buyers with an open event stream
+            publish_event(buyers, 'construction_update', {
+                'project_id': str(project.id),
+                'update_id': str(instance.id),
+                'update_type': instance.update_type,
+                'title': instance.title,
+            })
             
             logger.info(f"Construction update notifications sent for project {project.name}")
         except Exception as e:
@@ -140,21 +137,17 @@ def notify_progress_update(sender, instance, created, **kwargs):
                     buyer__isnull=False
                 ).values_list('buyer', flat=True).distinct()
                 
-                for buyer_id in buyers:
-                    from users.models import CustomUser
-                    buyer = CustomUser.objects.get(id=buyer_id)
-                    
-                    NotificationService.create_notification(
-                        user=buyer,
-                        notification_type='progress_update',
-                        title=f'New Progress Update: {instance.project.name}',
-                        message=f'A new progress update has been uploaded for {instance.project.name}.',
-                        data={
-                            'project_id': str(instance.project.id),
-                            'progress_id': str(instance.progress_id),
-                            'ipfs_hash': instance.ipfs_hash,
-                        }
-                    )
+                NotificationService.create_bulk_notifications(
+                    user_ids=buyers,
+                    notification_type='progress_update',
+                    title=f'New Progress Update: {instance.project.name}',
+                    message=f'A new progress update has been uploaded for {instance.project.name}.',
+                    data={
+                        'project_id': str(instance.project.id),
+                        'progress_id': str(instance.progress_id),
+                        'ipfs_hash': instance.ipfs_hash,
+                    }
+                )
             
             logger.info(f"Progress update notifications sent")
         except Exception as e:
@@ -189,22 +182,18 @@ def notify_document_upload(sender, instance, created, **kwargs):
                     buyer__isnull=False
                 ).values_list('buyer', flat=True).distinct()
                 
-                for buyer_id in buyers:
-                    from users.models import CustomUser
-                    buyer = CustomUser.objects.get(id=buyer_id)
-                    
-                    NotificationService.create_notification(
-                        user=buyer,
-                        notification_type='document_upload',
-                        title=f'New Document: {instance.document_name}',
-                        message=f'A new {instance.document_type} document has been uploaded for {instance.project.name}.',
-                        data={
-                            'project_id': str(instance.project.id),
-                            'document_id': str(instance.document_id),
-                            'document_type': instance.document_type,
-                            'ipfs_hash': instance.ipfs_hash,
-                        }
-                    )
+                NotificationService.create_bulk_notifications(
+                    user_ids=buyers,
+                    notification_type='document_upload',
+                    title=f'New Document: {instance.document_name}',
+                    message=f'A new {instance.document_type} document has been uploaded for {instance.project.name}.',
+                    data={
+                        'project_id': str(instance.project.id),
+                        'document_id': str(instance.document_id),
+                        'document_type': instance.document_type,
+                        'ipfs_hash': instance.ipfs_hash,
+                    }
+                )
             
             logger.info(f"Document upload notifications sent")
         except Exception as e:
@@ -0,0 +1,49 @@
+"""
+Unread Notification Counters
+Per-user unread counts kept in the cache so polling unread_count is a single
+cache read. Counters are adjusted where notifications are created or read and
+rebuilt from the database on a cache miss; the TTL bounds any drift.
+"""
+from collections import Counter
+from typing import Iterable
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Notification
+
+NOTIFICATION_UNREAD_CACHE_TTL = getattr(settings, 'NOTIFICATION_UNREAD_CACHE_TTL', 3600)
+
+
+def _key(user_id) -> str:
+    return f'notifications:unread:{user_id}'
+
+
+def get_unread_count(user_id) -> int:
+    """Unread notifications for a user, counted from the database only on a cache miss"""
+    count = cache.get(_key(user_id))
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id, read_at__isnull=True).count()
+        cache.add(_key(user_id), count, NOTIFICATION_UNREAD_CACHE_TTL)
+    return count
+
+
+def adjust_unread(user_id, delta: int) -> None:
+    """Add delta to a cached counter; a missing counter is left to be rebuilt on read"""
+    if not delta:
+        return
+    try:
+        value = cache.incr(_key(user_id), delta)
+    except ValueError:
+        return
+    if value < 0:
+        cache.delete(_key(user_id))
+
+
+def notifications_created(user_ids: Iterable) -> None:
+    """Count new (unread) notifications, one entry per notification"""
+    for user_id, created in Counter(user_ids).items():
+        adjust_unread(user_id, created)
+
+
+def notifications_read(user_id, count: int) -> None:
+    adjust_unread(user_id, -count)
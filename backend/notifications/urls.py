@@ -1,12 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import NotificationViewSet, NotificationPreferenceViewSet
+from .views import NotificationViewSet, NotificationPreferenceViewSet, notification_stream
 
 router = DefaultRouter()
 router.register(r'notifications', NotificationViewSet, basename='notification')
 router.register(r'preferences', NotificationPreferenceViewSet, basename='notification-preference')
 
 urlpatterns = [
+    path('stream/', notification_stream, name='notification-stream'),
     path('', include(router.urls)),
 ]
 
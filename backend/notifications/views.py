@@ -5,6 +5,13 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from asgiref.sync import sync_to_async
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework.exceptions import AuthenticationFailed
 from .models import Notification, NotificationPreference
 from .serializers import (
     NotificationSerializer,
@@ -12,11 +19,18 @@ from .serializers import (
     NotificationMarkReadSerializer
 )
 from .notification_service import NotificationService
+from .delivery_service import delivery_stats
+from .unread_service import get_unread_count, notifications_created, notifications_read
+from .pubsub import get_broker, publish_notifications, user_channel
 from django.utils import timezone
+import asyncio
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+NOTIFICATION_SSE_HEARTBEAT = getattr(settings, 'NOTIFICATION_SSE_HEARTBEAT', 15)
+
 
 class NotificationViewSet(viewsets.ModelViewSet):
     """ViewSet for Notification management"""
@@ -40,7 +54,17 @@ class NotificationViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         """Set user to current user when creating notification"""
-        serializer.save(user=self.request.user)
+        notification = serializer.save(user=self.request.user)
+        if notification.read_at is None:
+            notifications_created([notification.user_id])
+        publish_notifications([notification])
+    
+    def perform_destroy(self, instance):
+        """Keep the unread counter in step when an unread notification is deleted"""
+        unread = instance.read_at is None
+        instance.delete()
+        if unread:
+            notifications_read(self.request.user.pk, 1)
     
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
@@ -51,7 +75,9 @@ class NotificationViewSet(viewsets.ModelViewSet):
         if notification.user != request.user:
             raise PermissionDenied("You can only mark your own notifications as read")
         
-        notification.mark_as_read()
+        if notification.read_at is None:
+            notification.mark_as_read()
+            notifications_read(request.user.pk, 1)
         serializer = self.get_serializer(notification)
         return Response({
             'message': 'Notification marked as read',
@@ -65,6 +91,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
             user=request.user,
             read_at__isnull=True
         ).update(read_at=timezone.now(), status='read')
+        notifications_read(request.user.pk, count)
         
         return Response({
             'message': f'{count} notifications marked as read'
@@ -82,6 +109,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
             id__in=notification_ids,
             read_at__isnull=True
         ).update(read_at=timezone.now(), status='read')
+        notifications_read(request.user.pk, count)
         
         return Response({
             'message': f'{count} notifications marked as read'
@@ -89,13 +117,22 @@ class NotificationViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
-        """Get count of unread notifications"""
-        count = Notification.objects.filter(
-            user=request.user,
-            read_at__isnull=True
-        ).count()
-        
-        return Response({'count': count})
+        """Get count of unread notifications (served from the cached counter)"""
+        return Response({'count': get_unread_count(request.user.pk)})
+    
+    @action(detail=False, methods=['get'])
+    def delivery_stats(self, request):
+        """Delivery queue depth and email latency (staff only)"""
+        if not request.user.is_staff:
+            raise PermissionDenied("Only staff members can view delivery stats")
+        return Response(delivery_stats())
+    
+    @action(detail=False, methods=['get'])
+    def stream_stats(self, request):
+        """Open event streams and fan-out latency in this process (staff only)"""
+        if not request.user.is_staff:
+            raise PermissionDenied("Only staff members can view stream stats")
+        return Response(get_broker().stats())
     
     @action(detail=False, methods=['get'])
     def recent(self, request):
@@ -105,6 +142,69 @@ class NotificationViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
+def _stream_user(request):
+    """Authenticate an event stream by JWT header or ?token= (EventSource cannot set headers)"""
+    authentication = JWTAuthentication()
+    try:
+        token = request.GET.get('token')
+        if token:
+            return authentication.get_user(authentication.get_validated_token(token))
+        result = authentication.authenticate(request)
+        return result[0] if result else None
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+def _sse(event: str, data, event_id=None) -> str:
+    lines = [f'event: {event}']
+    if event_id:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {json.dumps(data, default=str)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+async def notification_stream(request):
+    """
+    Server-Sent Events stream of the user's new notifications and construction updates
+    
+    Sends the unread count on connect, then each event as published, with a
+    comment line every NOTIFICATION_SSE_HEARTBEAT seconds to keep proxies from
+    closing the connection. Must be served by an ASGI server: under WSGI
+    Django buffers an async stream to the end, so the endless stream would
+    hold a worker until it times out and 501 is returned instead.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'Event streams require an ASGI server.'}, status=501)
+    
+    user = await sync_to_async(_stream_user)(request)
+    if user is None or not user.is_active:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    
+    broker = get_broker()
+    subscription = broker.subscribe(user_channel(user.pk))
+    unread = await sync_to_async(get_unread_count)(user.pk)
+    
+    async def events():
+        try:
+            yield 'retry: 5000\n\n'
+            yield _sse('unread_count', {'count': unread})
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.get(), NOTIFICATION_SSE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield _sse(message['event'], message['data'], message.get('id'))
+                broker.record_delivery(message)
+        finally:
+            subscription.close()
+    
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 class NotificationPreferenceViewSet(viewsets.ModelViewSet):
     """ViewSet for Notification Preference management"""
     queryset = NotificationPreference.objects.select_related('user')
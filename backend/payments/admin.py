@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Payment, PaymentRefund
+from .models import BookingLedgerEntry, Payment, PaymentDiscrepancy, PaymentRefund, WebhookEvent
 
 
 @admin.register(Payment)
@@ -60,3 +60,37 @@ class PaymentRefundAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ['event_id', 'event_type', 'entity_id', 'status', 'attempts', 'event_created_at', 'received_at']
+    list_filter = ['status', 'event_type', 'gateway', 'received_at']
+    search_fields = ['event_id', 'entity_id']
+    readonly_fields = ['id', 'gateway', 'event_id', 'event_type', 'entity_id', 'payload', 'event_created_at', 'received_at', 'processed_at']
+
+
+@admin.register(PaymentDiscrepancy)
+class PaymentDiscrepancyAdmin(admin.ModelAdmin):
+    list_display = ['gateway_payment_id', 'kind', 'local_value', 'gateway_value', 'status', 'payment', 'last_seen_at']
+    list_filter = ['status', 'kind', 'gateway', 'last_seen_at']
+    search_fields = ['gateway_payment_id', 'payment__transaction_id']
+    readonly_fields = ['id', 'gateway', 'gateway_payment_id', 'payment', 'kind', 'local_value', 'gateway_value', 'detected_at', 'last_seen_at']
+
+
+@admin.register(BookingLedgerEntry)
+class BookingLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ['booking', 'entry_type', 'amount', 'payment', 'refund', 'created_at']
+    list_filter = ['entry_type', 'created_at']
+    search_fields = ['booking__booking_number', 'payment__transaction_id', 'refund__refund_id']
+    readonly_fields = ['id', 'booking', 'entry_type', 'amount', 'payment', 'refund', 'note', 'created_by', 'created_at']
+    
+    # Append-only, and entries must be posted through the ledger service to move balances
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return obj is None and super().has_change_permission(request, obj)
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
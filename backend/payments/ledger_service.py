@@ -0,0 +1,170 @@
+"""
+Booking Ledger Service
+Every payment, refund and manual adjustment applied to a booking is appended
+to BookingLedgerEntry, and the booking's amount_paid/amount_due move by the
+entry's amount in one UPDATE with F() expressions. Saving a payment costs the
+same however many installments the booking already has; reconcile_balances
+checks the stored balances against the ledger in bulk.
+"""
+import logging
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from projects.models import Booking
+from .models import BookingLedgerEntry, Payment, PaymentRefund
+from .signals import booking_balance_changed
+
+logger = logging.getLogger(__name__)
+
+
+def post_entry(booking_id, entry_type: str, amount: Decimal, payment: Optional[Payment] = None,
+               refund: Optional[PaymentRefund] = None, note: str = '', created_by=None) -> Optional[BookingLedgerEntry]:
+    """
+    Append a ledger entry and apply it to the booking's balances
+
+    Returns None (and changes nothing) when the payment or refund has already
+    been posted.
+    """
+    if payment is not None and entry_type == 'payment' and \
+            BookingLedgerEntry.objects.filter(payment=payment, entry_type='payment').exists():
+        return None
+    if refund is not None and BookingLedgerEntry.objects.filter(refund=refund).exists():
+        return None
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                entry = BookingLedgerEntry.objects.create(
+                    booking_id=booking_id, entry_type=entry_type, amount=amount,
+                    payment=payment, refund=refund, note=note, created_by=created_by,
+                )
+        except IntegrityError:
+            # Posted concurrently by another process
+            return None
+        Booking.objects.filter(pk=booking_id).update(
+            amount_paid=F('amount_paid') + amount,
+            amount_due=F('total_amount') - F('amount_paid') - amount,
+            # update() skips auto_now; booking rollups find changed bookings by updated_at
+            updated_at=timezone.now(),
+        )
+        booking_balance_changed.send(sender=Booking, booking_id=booking_id, amount_due_delta=-amount)
+    return entry
+
+
+def update_booking_progress(booking_id, payment: Optional[Payment] = None) -> None:
+    """Move the booking's status along after its balance changed (same rules as before the ledger)"""
+    booking = Booking.objects.select_related('property__project').get(pk=booking_id)
+    fields = []
+    
+    # Update booking payment method if not set
+    if payment is not None and not booking.payment_method:
+        booking.payment_method = payment.payment_method
+        fields.append('payment_method')
+    if payment is not None and not booking.payment_reference:
+        booking.payment_reference = payment.transaction_id
+        fields.append('payment_reference')
+
+    if booking.amount_paid >= booking.token_amount and booking.status == 'pending':
+        booking.status = 'token_paid'
+        fields.append('status')
+        if not booking.token_payment_date:
+            booking.token_payment_date = timezone.now()
+            fields.append('token_payment_date')
+    elif booking.amount_paid >= booking.total_amount and booking.status != 'completed':
+        booking.status = 'completed'
+        fields.append('status')
+        if not booking.completion_date:
+            booking.completion_date = timezone.now()
+            fields.append('completion_date')
+    elif booking.amount_paid > 0 and booking.status == 'confirmed':
+        booking.status = 'payment_in_progress'
+        fields.append('status')
+
+    if fields:
+        booking.save(update_fields=fields + ['updated_at'])
+
+
+def post_payment(payment: Payment) -> Optional[BookingLedgerEntry]:
+    """Credit a completed payment to its booking (once)"""
+    entry = post_entry(payment.booking_id, 'payment', payment.amount, payment=payment)
+    if entry is not None:
+        update_booking_progress(payment.booking_id, payment)
+    return entry
+
+
+def post_refund(refund: PaymentRefund) -> None:
+    """Apply a processed refund to its payment and debit it from the booking (once)"""
+    with transaction.atomic():
+        payment = Payment.objects.select_for_update().get(pk=refund.payment_id)
+        if payment.booking_id and post_entry(payment.booking_id, 'refund', -refund.amount, payment=payment, refund=refund) is None:
+            return
+
+        payment.refund_amount = (payment.refund_amount or Decimal('0')) + refund.amount
+        if payment.refund_amount >= payment.amount:
+            payment.status = 'refunded'
+        elif payment.refund_amount > 0:
+            payment.status = 'partially_refunded'
+        if not payment.refund_id:
+            payment.refund_id = refund.refund_id
+        payment.save(update_fields=['refund_amount', 'status', 'refund_id'])
+
+
+def post_adjustment(booking: Booking, amount: Decimal, note: str = '', created_by=None) -> Optional[BookingLedgerEntry]:
+    """Record a manual correction to what has been paid on a booking"""
+    if not amount:
+        return None
+    return post_entry(booking.pk, 'adjustment', amount, note=note, created_by=created_by)
+
+
+def reconcile_balances(fix: bool = False, open_balances: bool = False) -> Dict:
+    """
+    Compare every booking's stored balances with its ledger in one query
+
+    open_balances posts an opening adjustment for bookings paid before the
+    ledger existed (no entries yet); fix then rewrites amount_paid/amount_due
+    from the ledger for the rest. Returns counts and the first mismatches.
+    """
+    zero = Value(Decimal('0'), output_field=DecimalField(max_digits=12, decimal_places=2))
+    bookings = Booking.objects.annotate(
+        ledger_total=Coalesce(Sum('ledger_entries__amount'), zero),
+        ledger_count=Count('ledger_entries'),
+    ).filter(
+        ~Q(amount_paid=F('ledger_total')) | ~Q(amount_due=F('total_amount') - F('ledger_total'))
+    ).values('id', 'booking_number', 'amount_paid', 'amount_due', 'total_amount', 'ledger_total', 'ledger_count')
+
+    result = {'mismatched': 0, 'opened': 0, 'fixed': 0, 'examples': []}
+    to_fix: List[Tuple[Booking, Decimal]] = []
+    for row in bookings.iterator(chunk_size=2000):
+        result['mismatched'] += 1
+        if len(result['examples']) < 20:
+            result['examples'].append(row)
+        if open_balances and not row['ledger_count']:
+            # Opening balance: record what was already paid without moving it
+            if row['amount_paid']:
+                BookingLedgerEntry.objects.create(
+                    booking_id=row['id'], entry_type='adjustment', amount=row['amount_paid'], note='Opening balance'
+                )
+            row['ledger_total'] = row['amount_paid']
+            result['opened'] += 1
+        if fix and (row['amount_paid'] != row['ledger_total'] or row['amount_due'] != row['total_amount'] - row['ledger_total']):
+            to_fix.append((
+                Booking(id=row['id'], amount_paid=row['ledger_total'], amount_due=row['total_amount'] - row['ledger_total']),
+                row['amount_due'],
+            ))
+
+    if to_fix:
+        now = timezone.now()
+        for booking, _ in to_fix:
+            booking.updated_at = now
+        with transaction.atomic():
+            Booking.objects.bulk_update(
+                [booking for booking, _ in to_fix], ['amount_paid', 'amount_due', 'updated_at'], batch_size=500
+            )
+            for booking, old_due in to_fix:
+                booking_balance_changed.send(sender=Booking, booking_id=booking.id, amount_due_delta=booking.amount_due - old_due)
+        result['fixed'] = len(to_fix)
+    return result
@@ -0,0 +1,262 @@
+"""
+Management command to run a local stand-in for the Razorpay payments API
+Serves GET /v1/payments (from/to/count/skip paging) and GET /v1/payments/<id>
+from memory, mirroring the local Razorpay payments in the chosen range with a
+fraction of them deliberately drifted, so reconcile_payments can be tested
+and benchmarked offline. Point RAZORPAY_API_URL at it, e.g.
+http://127.0.0.1:8765 (any RAZORPAY_KEY_ID/SECRET will do).
+
+--generate first bulk-inserts that many fake local payments (removed again
+with --reset) to benchmark against, e.g. --generate 100000.
+"""
+import bisect
+import json
+import random
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from payments.models import Payment
+
+User = get_user_model()
+
+FAKE_MARKER = 'fake_razorpay'
+# Local status -> status the gateway reports for it
+MIRRORED_STATUS = {
+    'pending': 'created',
+    'processing': 'created',
+    'completed': 'captured',
+    'failed': 'failed',
+    'cancelled': 'failed',
+    'refunded': 'refunded',
+    'partially_refunded': 'captured',
+}
+DRIFT_KINDS = ('status', 'amount', 'missing', 'extra')
+
+
+def _entity(payment_id, order_id, amount_paise, status, created_at, amount_refunded=0):
+    return {
+        'id': payment_id,
+        'entity': 'payment',
+        'amount': amount_paise,
+        'currency': 'INR',
+        'status': status,
+        'order_id': order_id,
+        'method': 'upi',
+        'amount_refunded': amount_refunded,
+        'refund_status': ('full' if amount_refunded >= amount_paise else 'partial') if amount_refunded else None,
+        'captured': status in ('captured', 'refunded'),
+        'error_code': 'BAD_REQUEST_ERROR' if status == 'failed' else None,
+        'error_description': 'Payment failed' if status == 'failed' else None,
+        'created_at': created_at,
+    }
+
+
+class FakeGateway:
+    """Gateway payments kept sorted by created_at for window paging"""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0):
+        self.payments = []
+        self.by_id = {}
+        self._created = []
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+
+    def load(self, payments):
+        self.payments = sorted(payments, key=lambda item: item['created_at'])
+        self._created = [item['created_at'] for item in self.payments]
+        self.by_id = {item['id']: item for item in self.payments}
+
+    def list(self, from_ts: int, to_ts: int, count: int, skip: int):
+        # Newest first, like Razorpay
+        lo = bisect.bisect_left(self._created, from_ts)
+        hi = bisect.bisect_right(self._created, to_ts)
+        end = max(lo, hi - skip)
+        return self.payments[max(lo, end - count):end][::-1]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, so client connection pooling shows
+    gateway: FakeGateway = None
+
+    def do_GET(self):
+        gateway = self.gateway
+        gateway.requests += 1
+        if gateway.latency:
+            time.sleep(gateway.latency)
+        if gateway.error_rate and random.random() < gateway.error_rate:
+            return self._send(500, {'error': {'code': 'SERVER_ERROR', 'description': 'Injected failure'}})
+
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        if parts[:2] != ['v1', 'payments']:
+            return self._send(404, {'error': {'code': 'BAD_REQUEST_ERROR', 'description': 'The requested URL was not found on the server.'}})
+        if len(parts) == 3:
+            item = gateway.by_id.get(parts[2])
+            if item is None:
+                return self._send(400, {'error': {'code': 'BAD_REQUEST_ERROR', 'description': 'The id provided does not exist'}})
+            return self._send(200, item)
+
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        try:
+            count = min(int(query.get('count', 10)), 100)
+            items = gateway.list(int(query.get('from', 0)), int(query.get('to', 2 ** 40)), count, int(query.get('skip', 0)))
+        except ValueError:
+            return self._send(400, {'error': {'code': 'BAD_REQUEST_ERROR', 'description': 'Invalid query parameters'}})
+        self._send(200, {'entity': 'collection', 'count': len(items), 'items': items})
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Run a local fake Razorpay payments API mirroring (and drifting from) local payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=7,
+            help='Mirror local payments initiated in the last N days (default: 7)'
+        )
+        parser.add_argument(
+            '--drift',
+            type=float,
+            default=0.01,
+            help='Fraction of mirrored payments made to differ from the local row (default: 0.01)'
+        )
+        parser.add_argument(
+            '--generate',
+            type=int,
+            default=0,
+            help='Bulk-insert this many fake local payments spread over --days first'
+        )
+        parser.add_argument('--reset', action='store_true', help='Delete previously generated fake payments and exit')
+        parser.add_argument('--latency', type=float, default=0.0, help='Milliseconds added to every response')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with a 500')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for generated data and drift')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            deleted, _ = Payment.objects.filter(**{f'notes__{FAKE_MARKER}': True}).delete()
+            self.stdout.write(self.style.SUCCESS(f"✓ Deleted {deleted} generated payments and their discrepancies"))
+            return
+
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+        since = now - timedelta(days=options['days'])
+        if options['generate']:
+            self._generate(options['generate'], since, now, rng)
+
+        gateway = FakeGateway(latency=options['latency'] / 1000, error_rate=options['error_rate'])
+        started = time.perf_counter()
+        payments, drifted = self._mirror(since, options['drift'], rng)
+        gateway.load(payments)
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Mirrored {len(payments)} gateway payments in {time.perf_counter() - started:.1f}s "
+            f"(drift: {', '.join(f'{kind} {count}' for kind, count in drifted.items()) or 'none'})"
+        ))
+
+        Handler.gateway = gateway
+        server = ThreadingHTTPServer(('127.0.0.1', options['port']), Handler)
+        server.daemon_threads = True
+        self.stdout.write(self.style.WARNING(
+            f"Fake Razorpay listening on http://127.0.0.1:{options['port']} (Ctrl+C to stop)..."
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING(f"\nFake Razorpay stopped after {gateway.requests} requests"))
+        finally:
+            server.server_close()
+
+    def _generate(self, count, since, now, rng):
+        user, _ = User.objects.get_or_create(
+            email='fake-razorpay@example.com',
+            defaults={'username': 'fake-razorpay', 'first_name': 'Fake', 'last_name': 'Razorpay'},
+        )
+        statuses = ['completed'] * 90 + ['failed'] * 5 + ['pending'] * 5
+        span = (now - since).total_seconds()
+        batch = []
+        # initiated_at is auto_now_add; generated rows need it spread over the range
+        initiated_at = Payment._meta.get_field('initiated_at')
+        initiated_at.auto_now_add = False
+        try:
+            for _ in range(count):
+                status = rng.choice(statuses)
+                key = uuid.uuid4().hex
+                initiated = since + timedelta(seconds=rng.random() * span)
+                batch.append(Payment(
+                    transaction_id=f"TXN-FAKE-{key[:16].upper()}",
+                    user=user,
+                    amount=Decimal(rng.randrange(1000, 5000000)) / 100,
+                    status=status,
+                    payment_method='razorpay',
+                    gateway='razorpay',
+                    gateway_order_id=f"order_{key[:14]}",
+                    gateway_payment_id=f"pay_{key[14:28]}" if status != 'pending' else None,
+                    initiated_at=initiated,
+                    completed_at=initiated if status == 'completed' else None,
+                    failed_at=initiated if status == 'failed' else None,
+                    notes={FAKE_MARKER: True},
+                ))
+                if len(batch) == 5000:
+                    Payment.objects.bulk_create(batch)
+                    batch = []
+            Payment.objects.bulk_create(batch)
+        finally:
+            initiated_at.auto_now_add = True
+        self.stdout.write(self.style.SUCCESS(f"✓ Generated {count} local payments"))
+
+    def _mirror(self, since, drift, rng):
+        rows = Payment.objects.filter(gateway='razorpay', initiated_at__gte=since).values_list(
+            'gateway_payment_id', 'gateway_order_id', 'amount', 'status', 'refund_amount', 'initiated_at'
+        )
+        payments, drifted = [], dict.fromkeys(DRIFT_KINDS, 0)
+        for gateway_payment_id, order_id, amount, status, refund_amount, initiated in rows.iterator(chunk_size=5000):
+            kind = rng.choice(DRIFT_KINDS) if drift and rng.random() < drift else None
+            if kind == 'missing' and status != 'completed':
+                kind = None
+            if not gateway_payment_id and kind != 'status':
+                # Never attempted at the gateway (drifted ones were captured without verify reaching us)
+                continue
+            if kind:
+                drifted[kind] += 1
+            if kind == 'missing':
+                continue
+
+            amount_paise = int(amount * 100)
+            item = _entity(
+                gateway_payment_id or f"pay_{uuid.uuid4().hex[:14]}",
+                order_id,
+                amount_paise,
+                MIRRORED_STATUS.get(status, 'created'),
+                int(initiated.timestamp()),
+                int((refund_amount or 0) * 100),
+            )
+            if kind == 'status':
+                item['status'] = 'failed' if item['status'] == 'captured' else 'captured'
+            elif kind == 'amount':
+                item['amount'] += 100
+            elif kind == 'extra':
+                payments.append(_entity(
+                    f"pay_{uuid.uuid4().hex[:14]}", f"order_{uuid.uuid4().hex[:14]}",
+                    amount_paise, 'captured', item['created_at'],
+                ))
+            payments.append(item)
+        return payments, {kind: count for kind, count in drifted.items() if count}
@@ -0,0 +1,46 @@
+"""
+Management command to apply stored payment webhooks
+Applies Razorpay events saved by the webhook endpoint in gateway event order.
+Run once (e.g. from cron) or with --loop as a long-running worker.
+"""
+import time
+from django.core.management.base import BaseCommand
+from payments.webhook_service import process_pending_events
+
+
+class Command(BaseCommand):
+    help = 'Apply pending payment gateway webhook events'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and poll for events every --interval'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=2,
+            help='Seconds between polls when --loop is set (default: 2)'
+        )
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self._process_once()
+            return
+
+        self.stdout.write(self.style.WARNING(f"Processing webhooks every {options['interval']}s (Ctrl+C to stop)..."))
+        try:
+            while True:
+                self._process_once()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\nWebhook processing stopped'))
+
+    def _process_once(self):
+        result = process_pending_events()
+        if result['batches']:
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ Applied {result['processed']} webhook events ({result['skipped']} skipped, "
+                f"{result['retried']} to retry, {result['failed']} failed)"
+            ))
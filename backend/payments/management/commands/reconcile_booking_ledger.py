@@ -0,0 +1,40 @@
+"""
+Management command to reconcile booking balances with the payment ledger
+Reports bookings whose amount_paid/amount_due disagree with the sum of their
+ledger entries (one aggregate query), and optionally repairs them.
+"""
+from django.core.management.base import BaseCommand
+from payments.ledger_service import reconcile_balances
+
+
+class Command(BaseCommand):
+    help = 'Verify booking balances against the booking ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--open-balances',
+            action='store_true',
+            help='Post an opening adjustment for bookings with payments recorded before the ledger'
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Rewrite mismatched booking balances from the ledger'
+        )
+
+    def handle(self, *args, **options):
+        result = reconcile_balances(fix=options['fix'], open_balances=options['open_balances'])
+        if not result['mismatched']:
+            self.stdout.write(self.style.SUCCESS('✓ All booking balances match the ledger'))
+            return
+
+        for row in result['examples']:
+            self.stdout.write(
+                f"  {row['booking_number']}: paid {row['amount_paid']} / due {row['amount_due']}, "
+                f"ledger {row['ledger_total']} ({row['ledger_count']} entries)"
+            )
+        style = self.style.SUCCESS if options['fix'] else self.style.WARNING
+        self.stdout.write(style(
+            f"{'✓ ' if options['fix'] else ''}{result['mismatched']} bookings out of balance; "
+            f"{result['opened']} opening balances posted, {result['fixed']} balances fixed"
+        ))
@@ -0,0 +1,93 @@
+"""
+Management command to reconcile payments with Razorpay
+Pages through gateway payments created in the range, diffs them against local
+Payment rows and records differences as PaymentDiscrepancy rows (see the
+admin). With --fix, captured/failed payments we missed are moved to the
+gateway's status and missing gateway payment ids are filled in; amount,
+refund and missing-payment differences are only flagged.
+"""
+import time
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from payments.reconciliation_service import PAYMENT_RECONCILE_WORKERS, reconcile_payments
+
+
+class Command(BaseCommand):
+    help = 'Reconcile local payments with the Razorpay gateway'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=1,
+            help='Reconcile payments created in the last N days (default: 1)'
+        )
+        parser.add_argument('--start', type=str, help='Range start (ISO date/datetime) instead of --days')
+        parser.add_argument('--end', type=str, help='Range end (ISO date/datetime, default: now)')
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Apply status changes the gateway has settled and link missing gateway payment ids'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=PAYMENT_RECONCILE_WORKERS,
+            help=f'Gateway windows fetched concurrently (default: {PAYMENT_RECONCILE_WORKERS})'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and reconcile the last --days every --interval'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=3600,
+            help='Seconds between runs when --loop is set (default: 3600)'
+        )
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self._reconcile_once(options)
+            return
+
+        self.stdout.write(self.style.WARNING(f"Reconciling payments every {options['interval']}s (Ctrl+C to stop)..."))
+        try:
+            while True:
+                self._reconcile_once(options)
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\nPayment reconciliation stopped'))
+
+    def _parse(self, value):
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f"Invalid date: {value}")
+        return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+    def _reconcile_once(self, options):
+        end = self._parse(options['end']) if options['end'] else timezone.now()
+        start = self._parse(options['start']) if options['start'] else end - timedelta(days=options['days'])
+        if start >= end:
+            raise CommandError('--start must be before --end')
+
+        self.stdout.write(f"Reconciling Razorpay payments from {start:%Y-%m-%d %H:%M} to {end:%Y-%m-%d %H:%M}...")
+        try:
+            result = reconcile_payments(start, end, fix=options['fix'], workers=options['workers'])
+        except Exception as e:
+            raise CommandError(str(e))
+
+        for window_start, window_end in result['failed_windows']:
+            self.stdout.write(self.style.ERROR(f"  Could not fetch {window_start:%Y-%m-%d %H:%M} - {window_end:%H:%M}"))
+        discrepancies = result['discrepancies']
+        summary = ', '.join(f"{kind} {count}" for kind, count in sorted(discrepancies.items())) or 'none'
+        style = self.style.SUCCESS if not result['failed_windows'] else self.style.WARNING
+        self.stdout.write(style(
+            f"✓ Checked {result['gateway_payments']} gateway payments in {result['windows']} windows "
+            f"({result['matched']} matched, {result['other_attempts']} extra attempts) in {result['seconds']}s "
+            f"({result['per_second']}/s, {result['fetch_wait_seconds']}s waiting on the gateway)"
+        ))
+        self.stdout.write(f"  Discrepancies: {summary}; {result['fixed']} fixed")
@@ -0,0 +1,79 @@
+"""
+Management command to replay stored payment webhooks
+Puts selected events back on the queue (and optionally applies them now).
+Handlers are idempotent, so replaying already-applied events is safe.
+"""
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from payments.models import WebhookEvent
+from payments.webhook_service import process_pending_events, requeue_events
+
+
+class Command(BaseCommand):
+    help = 'Replay stored payment gateway webhook events'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--event-id',
+            action='append',
+            help='Gateway event id to replay (repeatable)'
+        )
+        parser.add_argument(
+            '--status',
+            choices=['failed', 'skipped', 'processed', 'all'],
+            default='failed',
+            help='Replay events in this state (default: failed)'
+        )
+        parser.add_argument(
+            '--type',
+            help='Only events of this type (e.g. payment.captured)'
+        )
+        parser.add_argument(
+            '--payment',
+            help='Only events for this gateway payment id'
+        )
+        parser.add_argument(
+            '--since',
+            help='Only events received on or after this date (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--process',
+            action='store_true',
+            help='Apply the replayed events now instead of leaving them for the worker'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the matching events'
+        )
+
+    def handle(self, *args, **options):
+        events = WebhookEvent.objects.exclude(status='pending')
+        if options['event_id']:
+            events = events.filter(event_id__in=options['event_id'])
+        elif options['status'] != 'all':
+            events = events.filter(status=options['status'])
+        if options['type']:
+            events = events.filter(event_type=options['type'])
+        if options['payment']:
+            events = events.filter(entity_id=options['payment'])
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d')
+            except ValueError:
+                raise CommandError('--since must be YYYY-MM-DD')
+            events = events.filter(received_at__gte=timezone.make_aware(since))
+
+        if options['dry_run']:
+            self.stdout.write(f"{events.count()} events would be replayed")
+            return
+
+        count = requeue_events(events)
+        self.stdout.write(self.style.SUCCESS(f"✓ Requeued {count} webhook events"))
+        if options['process'] and count:
+            result = process_pending_events()
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ Applied {result['processed']} events ({result['skipped']} skipped, "
+                f"{result['retried']} to retry, {result['failed']} failed)"
+            ))
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:18
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0001_create_payment_models'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='webhook_event_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('gateway', models.CharField(default='razorpay', max_length=50)),
+                ('event_id', models.CharField(max_length=255)),
+                ('event_type', models.CharField(max_length=100)),
+                ('entity_id', models.CharField(blank=True, default='', max_length=255)),
+                ('payload', models.JSONField(default=dict)),
+                ('event_created_at', models.DateTimeField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('skipped', 'Skipped'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Webhook Event',
+                'verbose_name_plural': 'Webhook Events',
+                'db_table': 'payment_webhook_events',
+                'ordering': ['-received_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='payment_web_status_3b94c0_idx'), models.Index(fields=['entity_id', 'event_created_at'], name='payment_web_entity__1d9d6f_idx')],
+                'constraints': [models.UniqueConstraint(fields=('gateway', 'event_id'), name='unique_gateway_webhook_event')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:20
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_webhook_events'),
+        ('projects', '0013_booking_updated_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingLedgerEntry',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('entry_type', models.CharField(choices=[('payment', 'Payment'), ('refund', 'Refund'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('note', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to='projects.booking')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='booking_ledger_entries', to=settings.AUTH_USER_MODEL)),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to='payments.payment')),
+                ('refund', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='ledger_entries', to='payments.paymentrefund')),
+            ],
+            options={
+                'verbose_name': 'Booking Ledger Entry',
+                'verbose_name_plural': 'Booking Ledger Entries',
+                'db_table': 'booking_ledger_entries',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['booking', 'created_at'], name='booking_led_booking_1d22ce_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('entry_type', 'payment')), fields=('payment',), name='unique_ledger_payment'), models.UniqueConstraint(condition=models.Q(('refund__isnull', False)), fields=('refund',), name='unique_ledger_refund')],
+            },
+        ),
+    ]
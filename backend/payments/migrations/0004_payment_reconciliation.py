@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-19 00:24
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_booking_ledger'),
+        ('projects', '0013_booking_updated_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentDiscrepancy',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('gateway', models.CharField(default='razorpay', max_length=50)),
+                ('gateway_payment_id', models.CharField(max_length=255)),
+                ('kind', models.CharField(choices=[('missing_local', 'Missing Locally'), ('missing_gateway', 'Missing at Gateway'), ('status', 'Status'), ('amount', 'Amount'), ('refund', 'Refund'), ('link', 'Gateway Payment ID')], max_length=20)),
+                ('local_value', models.CharField(blank=True, default='', max_length=255)),
+                ('gateway_value', models.CharField(blank=True, default='', max_length=255)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('fixed', 'Fixed'), ('resolved', 'Resolved')], default='open', max_length=20)),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('last_seen_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Payment Discrepancy',
+                'verbose_name_plural': 'Payment Discrepancies',
+                'db_table': 'payment_discrepancies',
+                'ordering': ['-last_seen_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['gateway_order_id'], name='payments_gateway_191166_idx'),
+        ),
+        migrations.AddField(
+            model_name='paymentdiscrepancy',
+            name='payment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='discrepancies', to='payments.payment'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentdiscrepancy',
+            index=models.Index(fields=['status', 'kind'], name='payment_dis_status_eb30d0_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='paymentdiscrepancy',
+            constraint=models.UniqueConstraint(fields=('gateway', 'gateway_payment_id', 'kind'), name='unique_payment_discrepancy'),
+        ),
+    ]
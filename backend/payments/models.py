@@ -1,15 +1,17 @@
 from django.db import models
-from django.db.models import Sum
+from django.db.models import Q
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 import uuid
 from django.utils import timezone
 
+from projects.tracking import TrackedFieldsMixin
+
 User = get_user_model()
 
 
-class Payment(models.Model):
+class Payment(TrackedFieldsMixin, models.Model):
     """Payment transaction model for tracking all payments"""
     PAYMENT_STATUS = [
         ('pending', 'Pending'),  # Payment initiated, waiting for user action
@@ -86,10 +88,13 @@ class Payment(models.Model):
     # Webhook Information
     webhook_received = models.BooleanField(default=False)
     webhook_payload = models.JSONField(default=dict, blank=True)  # Store webhook payload for debugging
+    webhook_event_at = models.DateTimeField(null=True, blank=True)  # Gateway time of the latest webhook event applied
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    tracked_fields = ('status',)
+    
     def save(self, *args, **kwargs):
         # Auto-generate transaction_id if not set
         if not self.transaction_id:
@@ -104,48 +109,16 @@ class Payment(models.Model):
         elif self.status == 'failed' and not self.failed_at:
             self.failed_at = timezone.now()
         
+        completed_now = self.status == 'completed' and self.has_changed('status')
+        
         # Save the payment first
         super().save(*args, **kwargs)
         
-        # Update booking payment status if linked to a booking
-        # Only update if status changed to completed to avoid infinite loops
-        if self.booking and self.status == 'completed':
+        # Credit a completed payment to its booking once (ledger entries are unique per payment)
+        if self.booking_id and completed_now:
             try:
-                from projects.models import Booking
-                booking = Booking.objects.get(id=self.booking.id)
-                
-                # Calculate total paid amount from all completed payments
-                total_paid = Payment.objects.filter(
-                    booking=booking,
-                    status='completed'
-                ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-                
-                booking.amount_paid = total_paid
-                booking.amount_due = booking.total_amount - total_paid
-                
-                # Update booking payment method if not set
-                if not booking.payment_method:
-                    booking.payment_method = self.payment_method
-                if not booking.payment_reference:
-                    booking.payment_reference = self.transaction_id
-                
-                # Update booking status based on payment progress
-                if total_paid >= booking.token_amount and booking.status == 'pending':
-                    booking.status = 'token_paid'
-                    if not booking.token_payment_date:
-                        booking.token_payment_date = timezone.now()
-                elif total_paid >= booking.total_amount and booking.status != 'completed':
-                    booking.status = 'completed'
-                    if not booking.completion_date:
-                        booking.completion_date = timezone.now()
-                elif total_paid > 0 and booking.status == 'confirmed':
-                    booking.status = 'payment_in_progress'
-                
-                # Save booking with updated fields
-                booking.save(update_fields=[
-                    'amount_paid', 'amount_due', 'payment_method', 'payment_reference',
-                    'status', 'token_payment_date', 'completion_date'
-                ])
+                from .ledger_service import post_payment
+                post_payment(self)
             except Exception as e:
                 # Log error but don't fail payment save
                 import logging
@@ -162,6 +135,7 @@ class Payment(models.Model):
             models.Index(fields=['booking', 'status']),
             models.Index(fields=['transaction_id']),
             models.Index(fields=['gateway_payment_id']),
+            models.Index(fields=['gateway_order_id']),
             models.Index(fields=['status', 'created_at']),
         ]
     
@@ -169,7 +143,7 @@ class Payment(models.Model):
         return f"Payment {self.transaction_id} - {self.amount} {self.currency} - {self.status}"
 
 
-class PaymentRefund(models.Model):
+class PaymentRefund(TrackedFieldsMixin, models.Model):
     """Track refunds for payments"""
     REFUND_STATUS = [
         ('pending', 'Pending'),
@@ -203,6 +177,8 @@ class PaymentRefund(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    tracked_fields = ('status',)
+    
     def save(self, *args, **kwargs):
         # Auto-generate refund_id if not set
         if not self.refund_id:
@@ -213,26 +189,14 @@ class PaymentRefund(models.Model):
         if self.status == 'processed' and not self.processed_at:
             self.processed_at = timezone.now()
         
+        processed_now = self.status == 'processed' and self.has_changed('status')
+        
         super().save(*args, **kwargs)
         
-        # Update payment refund information
-        if self.payment:
-            total_refunded = PaymentRefund.objects.filter(
-                payment=self.payment,
-                status='processed'
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-            
-            self.payment.refund_amount = total_refunded
-            
-            if total_refunded >= self.payment.amount:
-                self.payment.status = 'refunded'
-            elif total_refunded > 0:
-                self.payment.status = 'partially_refunded'
-            
-            if not self.payment.refund_id:
-                self.payment.refund_id = self.refund_id
-            
-            self.payment.save(update_fields=['refund_amount', 'status', 'refund_id'])
+        # Apply the refund to the payment and booking once, when it is first processed
+        if self.payment_id and processed_now:
+            from .ledger_service import post_refund
+            post_refund(self)
     
     class Meta:
         db_table = 'payment_refunds'
@@ -246,3 +210,133 @@ class PaymentRefund(models.Model):
     
     def __str__(self):
         return f"Refund {self.refund_id} - {self.amount} {self.currency} - {self.status}"
+
+
+class WebhookEvent(models.Model):
+    """Raw payment gateway webhook, stored on receipt and applied by the process_payment_webhooks worker"""
+    STATUS = [
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('skipped', 'Skipped'),  # Unhandled type, or older than what the payment already reflects
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    gateway = models.CharField(max_length=50, default='razorpay')
+    event_id = models.CharField(max_length=255)  # Gateway event id (deduplicates retried deliveries)
+    event_type = models.CharField(max_length=100)
+    entity_id = models.CharField(max_length=255, blank=True, default='')  # Gateway payment id the event is about
+    payload = models.JSONField(default=dict)
+    
+    # Gateway time of the event; events for a payment are applied in this order
+    event_created_at = models.DateTimeField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    
+    status = models.CharField(max_length=20, choices=STATUS, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, null=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'payment_webhook_events'
+        verbose_name = 'Webhook Event'
+        verbose_name_plural = 'Webhook Events'
+        ordering = ['-received_at']
+        constraints = [
+            models.UniqueConstraint(fields=['gateway', 'event_id'], name='unique_gateway_webhook_event'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['entity_id', 'event_created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.gateway} {self.event_type} {self.event_id} - {self.status}"
+
+
+class PaymentDiscrepancy(models.Model):
+    """A difference between a payment and the gateway's record of it, found by reconciliation"""
+    KIND = [
+        ('missing_local', 'Missing Locally'),  # Gateway payment with no matching Payment row
+        ('missing_gateway', 'Missing at Gateway'),  # Completed Payment the gateway did not return
+        ('status', 'Status'),
+        ('amount', 'Amount'),
+        ('refund', 'Refund'),  # Refunded amount differs; refunds must go through PaymentRefund
+        ('link', 'Gateway Payment ID'),  # Payment matched by order id had no gateway payment id
+    ]
+    STATUS = [
+        ('open', 'Open'),
+        ('fixed', 'Fixed'),  # Corrected by reconciliation
+        ('resolved', 'Resolved'),  # No longer differs on a later run
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    gateway = models.CharField(max_length=50, default='razorpay')
+    gateway_payment_id = models.CharField(max_length=255)
+    payment = models.ForeignKey(Payment, on_delete=models.CASCADE, related_name='discrepancies', null=True, blank=True)
+    kind = models.CharField(max_length=20, choices=KIND)
+    local_value = models.CharField(max_length=255, blank=True, default='')
+    gateway_value = models.CharField(max_length=255, blank=True, default='')
+    status = models.CharField(max_length=20, choices=STATUS, default='open')
+    
+    detected_at = models.DateTimeField(auto_now_add=True)
+    last_seen_at = models.DateTimeField(default=timezone.now)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'payment_discrepancies'
+        verbose_name = 'Payment Discrepancy'
+        verbose_name_plural = 'Payment Discrepancies'
+        ordering = ['-last_seen_at']
+        constraints = [
+            models.UniqueConstraint(fields=['gateway', 'gateway_payment_id', 'kind'], name='unique_payment_discrepancy'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'kind']),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.gateway_payment_id}: {self.local_value} != {self.gateway_value} ({self.status})"
+
+
+class BookingLedgerEntry(models.Model):
+    """Append-only record of money applied to a booking; its amount_paid is the sum of these"""
+    ENTRY_TYPE = [
+        ('payment', 'Payment'),
+        ('refund', 'Refund'),
+        ('adjustment', 'Adjustment'),  # Manual corrections and opening balances
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    booking = models.ForeignKey('projects.Booking', on_delete=models.PROTECT, related_name='ledger_entries')
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPE)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)  # Signed: refunds are negative
+    
+    payment = models.ForeignKey(Payment, on_delete=models.PROTECT, related_name='ledger_entries', null=True, blank=True)
+    refund = models.ForeignKey(PaymentRefund, on_delete=models.PROTECT, related_name='ledger_entries', null=True, blank=True)
+    note = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='booking_ledger_entries', null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Booking ledger entries are append-only; post an adjustment instead")
+        super().save(*args, **kwargs)
+    
+    class Meta:
+        db_table = 'booking_ledger_entries'
+        verbose_name = 'Booking Ledger Entry'
+        verbose_name_plural = 'Booking Ledger Entries'
+        ordering = ['created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['payment'], condition=Q(entry_type='payment'), name='unique_ledger_payment'),
+            models.UniqueConstraint(fields=['refund'], condition=Q(refund__isnull=False), name='unique_ledger_refund'),
+        ]
+        indexes = [
+            models.Index(fields=['booking', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.entry_type} {self.amount} - booking {self.booking_id}"
@@ -10,8 +10,14 @@ import logging
 from django.conf import settings
 from decimal import Decimal
 
+from backend.http_client import get_session
+
 logger = logging.getLogger(__name__)
 
+# Point at a stand-in (e.g. the fake_razorpay_server command) for offline runs
+RAZORPAY_API_URL = getattr(settings, 'RAZORPAY_API_URL', 'https://api.razorpay.com')
+RAZORPAY_API_TIMEOUT = getattr(settings, 'RAZORPAY_API_TIMEOUT', (3.05, 30))
+
 
 class RazorpayService:
     """Service for interacting with Razorpay payment gateway"""
@@ -26,7 +32,11 @@ class RazorpayService:
             self.client = None
             self.available = False
         else:
-            self.client = razorpay.Client(auth=(self.key_id, self.key_secret))
+            self.client = razorpay.Client(
+                session=get_session('razorpay', timeout=RAZORPAY_API_TIMEOUT),
+                auth=(self.key_id, self.key_secret),
+                base_url=RAZORPAY_API_URL,
+            )
             self.available = True
     
     def create_order(self, amount, currency='INR', receipt=None, notes=None):
@@ -138,6 +148,25 @@ class RazorpayService:
             logger.error(f"Unexpected error fetching payment: {str(e)}")
             raise
     
+    def list_payments(self, from_ts, to_ts, count=100, skip=0):
+        """
+        Fetch one page of payments created in a time window
+        
+        Args:
+            from_ts: Window start (unix timestamp, inclusive)
+            to_ts: Window end (unix timestamp, inclusive)
+            count: Page size (Razorpay allows at most 100)
+            skip: Payments to skip within the window
+            
+        Returns:
+            list: Payment entities from Razorpay
+        """
+        if not self.available:
+            raise Exception("Razorpay is not configured.")
+        
+        response = self.client.payment.all({'from': int(from_ts), 'to': int(to_ts), 'count': count, 'skip': skip})
+        return response.get('items', [])
+    
     def fetch_order(self, order_id):
         """
         Fetch order details from Razorpay
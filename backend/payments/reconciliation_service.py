@@ -0,0 +1,306 @@
+"""
+Payment Reconciliation Service
+Compares Payment rows with Razorpay's own records. Gateway payments are paged
+by creation-time window (several windows fetched at once over the pooled
+Razorpay session) and diffed a chunk at a time against local rows, looked up
+by gateway_payment_id (order id as fallback) in one query per chunk.
+Differences are upserted as PaymentDiscrepancy rows in bulk; with fix set,
+payments the gateway has captured or failed are moved to that status and
+missing gateway payment ids are filled in.
+"""
+import logging
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Payment, PaymentDiscrepancy
+from .razorpay_service import get_razorpay_service
+from .webhook_service import SETTLED_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Seconds of gateway history fetched per window (windows are fetched in parallel)
+PAYMENT_RECONCILE_WINDOW = getattr(settings, 'PAYMENT_RECONCILE_WINDOW', 3600)
+PAYMENT_RECONCILE_WORKERS = getattr(settings, 'PAYMENT_RECONCILE_WORKERS', 4)
+# Gateway payments diffed per local lookup
+PAYMENT_RECONCILE_CHUNK = getattr(settings, 'PAYMENT_RECONCILE_CHUNK', 1000)
+
+GATEWAY_PAGE_SIZE = 100  # Razorpay's maximum
+FETCH_ATTEMPTS = 3
+# Payments initiated this close to the end of the range may not be at the gateway yet
+MISSING_GRACE = timedelta(minutes=10)
+
+# Razorpay payment status -> Payment status (refunds are compared by amount)
+GATEWAY_STATUS = {
+    'created': 'pending',
+    'authorized': 'completed',  # As the webhook handler treats payment.authorized
+    'captured': 'completed',
+    'refunded': 'completed',
+    'failed': 'failed',
+}
+# Which of several attempts on one order its Payment row stands for
+ATTEMPT_RANK = {'captured': 0, 'refunded': 0, 'authorized': 1, 'failed': 2, 'created': 3}
+# Local statuses compared as the gateway status they correspond to
+LOCAL_STATUS = {
+    'processing': 'pending',
+    'refunded': 'completed',
+    'partially_refunded': 'completed',
+}
+# Gateway statuses an abandoned local payment may legitimately show
+CANCELLED_EQUIVALENT = ('pending', 'failed')
+# Status corrections reconciliation may apply, with the local statuses they replace
+FIXABLE = {
+    'completed': ('pending', 'processing', 'failed', 'cancelled'),
+    'failed': ('pending', 'processing'),
+}
+
+LOCAL_FIELDS = ('id', 'status', 'amount', 'currency', 'refund_amount', 'gateway_payment_id', 'gateway_order_id')
+
+
+def _paise(amount: Optional[Decimal]) -> int:
+    return int(((amount or Decimal('0')) * 100).to_integral_value())
+
+
+def _windows(start: datetime, end: datetime, size: int) -> List[Tuple[int, int]]:
+    """Inclusive (from, to) unix second ranges covering [start, end)"""
+    first, last = int(start.timestamp()), int(end.timestamp())
+    return [(ts, min(ts + size, last) - 1) for ts in range(first, last, size)]
+
+
+def _fetch_window(service, window: Tuple[int, int]) -> Tuple[Tuple[int, int], Optional[List[Dict]]]:
+    """Every gateway payment created in window, or None if the gateway kept failing"""
+    for attempt in range(1, FETCH_ATTEMPTS + 1):
+        try:
+            items, skip = [], 0
+            while True:
+                page = service.list_payments(window[0], window[1], count=GATEWAY_PAGE_SIZE, skip=skip)
+                items.extend(page)
+                if len(page) < GATEWAY_PAGE_SIZE:
+                    return window, items
+                skip += len(page)
+        except Exception as e:
+            logger.warning(f"Fetching gateway payments {window} failed (attempt {attempt}): {str(e)}")
+            time.sleep(attempt)
+    return window, None
+
+
+def _gateway_windows(windows: List[Tuple[int, int]], workers: int) -> Iterator[Tuple[Tuple[int, int], Optional[List[Dict]]]]:
+    """Fetch windows on a thread pool, yielding them in order with at most 2 * workers in flight"""
+    service = get_razorpay_service()
+    if not service.available:
+        raise Exception("Razorpay is not configured.")
+    remaining = iter(windows)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque(pool.submit(_fetch_window, service, window) for window in islice(remaining, workers * 2))
+        while in_flight:
+            yield in_flight.popleft().result()
+            for window in islice(remaining, 1):
+                in_flight.append(pool.submit(_fetch_window, service, window))
+
+
+def gateway_status(item: Dict) -> str:
+    return GATEWAY_STATUS.get(item.get('status'), item.get('status') or '')
+
+
+def compare(payment: Dict, item: Dict) -> List[Tuple[str, str, str]]:
+    """(kind, local value, gateway value) for each way a payment row (LOCAL_FIELDS) differs from the gateway entity"""
+    differences = []
+    local_amount = f"{_paise(payment['amount'])} {payment['currency']}"
+    remote_amount = f"{item.get('amount')} {item.get('currency', 'INR')}"
+    if local_amount != remote_amount:
+        differences.append(('amount', local_amount, remote_amount))
+
+    local_status = LOCAL_STATUS.get(payment['status'], payment['status'])
+    remote_status = gateway_status(item)
+    if local_status != remote_status and not (local_status == 'cancelled' and remote_status in CANCELLED_EQUIVALENT):
+        differences.append(('status', payment['status'], item.get('status') or ''))
+
+    local_refunded = _paise(payment['refund_amount'])
+    remote_refunded = item.get('amount_refunded') or 0
+    if local_refunded != remote_refunded:
+        differences.append(('refund', str(local_refunded), str(remote_refunded)))
+    return differences
+
+
+def _apply_status(payment_id, item: Dict, status: str) -> bool:
+    """Move a payment to the gateway's status through save(), so the ledger and notifications follow"""
+    with transaction.atomic():
+        payment = Payment.objects.select_for_update().get(pk=payment_id)
+        if payment.status not in FIXABLE[status] or payment.status in SETTLED_STATUSES:
+            return False
+        payment.status = status
+        payment.gateway_payment_id = item['id']
+        payment.metadata = item
+        if status == 'failed':
+            payment.failure_reason = item.get('error_description') or 'Payment failed'
+            payment.failure_code = item.get('error_code') or ''
+        payment.save()
+    logger.info(f"Payment {payment.transaction_id} marked as {status} by reconciliation")
+    return True
+
+
+def diff_chunk(items: List[Dict], fix: bool, result: Dict, now: datetime) -> None:
+    """Diff up to PAYMENT_RECONCILE_CHUNK gateway payments against local rows and record the differences"""
+    # Plain rows: building model instances dominates the cost at this volume
+    local = {
+        payment['gateway_payment_id']: payment
+        for payment in Payment.objects.filter(gateway_payment_id__in=[item['id'] for item in items]).values(*LOCAL_FIELDS)
+    }
+    orders = [item['order_id'] for item in items if item['id'] not in local and item.get('order_id')]
+    # An order can have several gateway attempts but only one Payment row
+    by_order = {}
+    if orders:
+        by_order = {
+            payment['gateway_order_id']: payment
+            for payment in Payment.objects.filter(gateway_order_id__in=orders).values(*LOCAL_FIELDS)
+        }
+
+    discrepancies: List[PaymentDiscrepancy] = []
+    links: List[Payment] = []
+
+    def record(item, payment, kind, local_value, gateway_value, fixed=False):
+        result['discrepancies'][kind] += 1
+        result['fixed'] += fixed
+        discrepancies.append(PaymentDiscrepancy(
+            gateway_payment_id=item['id'],
+            payment_id=payment and payment['id'],
+            kind=kind,
+            local_value=local_value[:255],
+            gateway_value=gateway_value[:255],
+            status='fixed' if fixed else 'open',
+            last_seen_at=now,
+            resolved_at=now if fixed else None,
+        ))
+
+    for item in items:
+        payment = local.get(item['id'])
+        if payment is None:
+            payment = by_order.get(item.get('order_id'))
+            if payment is None:
+                record(item, None, 'missing_local', '', f"{item.get('status')} {item.get('amount')}")
+                continue
+            if payment['gateway_payment_id']:
+                # Another attempt on an order whose payment is already linked
+                result['other_attempts'] += 1
+                continue
+            # Attempts are sorted best first, so the settled one is linked
+            payment['gateway_payment_id'] = item['id']
+            if fix:
+                links.append(Payment(id=payment['id'], gateway_payment_id=item['id'], updated_at=now))
+            record(item, payment, 'link', payment['gateway_order_id'] or '', item['id'], fixed=fix)
+        result['matched'] += 1
+
+        differences = compare(payment, item)
+        kinds = {kind for kind, _, _ in differences}
+        for kind, local_value, gateway_value in differences:
+            target = gateway_status(item)
+            fixed = (
+                fix and kind == 'status' and 'amount' not in kinds
+                and payment['status'] in FIXABLE.get(target, ())
+                and _apply_status(payment['id'], item, target)
+            )
+            record(item, payment, kind, local_value, gateway_value, fixed=bool(fixed))
+
+    if links:
+        Payment.objects.bulk_update(links, ['gateway_payment_id', 'updated_at'], batch_size=500)
+    if discrepancies:
+        PaymentDiscrepancy.objects.bulk_create(
+            discrepancies,
+            update_conflicts=True,
+            unique_fields=['gateway', 'gateway_payment_id', 'kind'],
+            update_fields=['payment', 'local_value', 'gateway_value', 'status', 'last_seen_at', 'resolved_at'],
+            batch_size=500,
+        )
+    # Open discrepancies for these payments that were not seen again now match
+    PaymentDiscrepancy.objects.filter(
+        gateway='razorpay',
+        gateway_payment_id__in=[item['id'] for item in items],
+        status='open',
+        last_seen_at__lt=now,
+    ).update(status='resolved', resolved_at=now)
+
+
+def _flag_missing_at_gateway(start: datetime, end: datetime, seen: set, now: datetime, result: Dict) -> None:
+    """Completed local payments in the range that the gateway did not return"""
+    candidates = Payment.objects.filter(
+        gateway='razorpay',
+        status='completed',
+        initiated_at__gte=start,
+        initiated_at__lt=end - MISSING_GRACE,
+    ).exclude(gateway_payment_id__isnull=True).exclude(gateway_payment_id='')
+    missing = [
+        PaymentDiscrepancy(
+            gateway_payment_id=gateway_payment_id,
+            payment_id=payment_id,
+            kind='missing_gateway',
+            local_value='completed',
+            last_seen_at=now,
+        )
+        for payment_id, gateway_payment_id in candidates.values_list('id', 'gateway_payment_id').iterator(chunk_size=5000)
+        if gateway_payment_id not in seen
+    ]
+    result['discrepancies']['missing_gateway'] += len(missing)
+    PaymentDiscrepancy.objects.bulk_create(
+        missing,
+        update_conflicts=True,
+        unique_fields=['gateway', 'gateway_payment_id', 'kind'],
+        update_fields=['payment', 'local_value', 'status', 'last_seen_at', 'resolved_at'],
+        batch_size=500,
+    )
+
+
+def _chunks(items: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    items = iter(items)
+    while chunk := list(islice(items, size)):
+        yield chunk
+
+
+def reconcile_payments(start: datetime, end: datetime, fix: bool = False, workers: int = PAYMENT_RECONCILE_WORKERS) -> Dict:
+    """
+    Reconcile every gateway payment created in [start, end) with local rows
+
+    Returns counts of gateway payments, matches, discrepancies by kind and
+    fixes, plus timings. Windows the gateway kept failing on are reported in
+    failed_windows; missing_gateway is only checked when there are none.
+    """
+    started = time.perf_counter()
+    now = timezone.now()
+    result = {
+        'windows': 0, 'failed_windows': [], 'gateway_payments': 0, 'matched': 0,
+        'other_attempts': 0, 'discrepancies': Counter(), 'fixed': 0, 'fetch_wait_seconds': 0.0,
+    }
+    seen = set()
+    windows = _windows(start, end, PAYMENT_RECONCILE_WINDOW)
+    fetched = _gateway_windows(windows, workers)
+    while True:
+        waited = time.perf_counter()
+        window, items = next(fetched, (None, None))
+        result['fetch_wait_seconds'] += time.perf_counter() - waited
+        if window is None:
+            break
+        result['windows'] += 1
+        if items is None:
+            result['failed_windows'].append(tuple(datetime.fromtimestamp(ts, tz=dt_timezone.utc) for ts in window))
+            continue
+        result['gateway_payments'] += len(items)
+        # Keep an order's attempts together, most settled first, for linking by order id
+        items.sort(key=lambda item: (item.get('order_id') or '', ATTEMPT_RANK.get(item.get('status'), len(ATTEMPT_RANK))))
+        for chunk in _chunks(items, PAYMENT_RECONCILE_CHUNK):
+            seen.update(item['id'] for item in chunk)
+            diff_chunk(chunk, fix, result, now)
+
+    if not result['failed_windows']:
+        _flag_missing_at_gateway(start, end, seen, now, result)
+
+    result['seconds'] = round(time.perf_counter() - started, 2)
+    result['fetch_wait_seconds'] = round(result['fetch_wait_seconds'], 2)
+    result['per_second'] = round(result['gateway_payments'] / result['seconds']) if result['seconds'] else 0
+    result['discrepancies'] = dict(result['discrepancies'])
+    return result
@@ -0,0 +1,9 @@
+"""
+Signals sent by the payments app
+"""
+from django.dispatch import Signal
+
+# Sent after a booking's amount_paid/amount_due are changed with a queryset
+# update (which sends no save signals), inside the same transaction and before
+# any status change that follows. Arguments: booking_id, amount_due_delta.
+booking_balance_changed = Signal()
@@ -6,13 +6,13 @@ from rest_framework.exceptions import PermissionDenied, ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
-from django.db import transaction
 from .models import Payment, PaymentRefund
 from .serializers import (
     PaymentSerializer, PaymentCreateSerializer, PaymentVerifySerializer,
     PaymentRefundSerializer, PaymentRefundCreateSerializer
 )
 from .razorpay_service import get_razorpay_service
+from .webhook_service import record_event
 from django.utils import timezone
 import json
 import logging
@@ -176,7 +176,8 @@ class PaymentRefundViewSet(viewsets.ModelViewSet):
 def razorpay_webhook(request):
     """
     Handle Razorpay webhook events
-    This endpoint should be called by Razorpay when payment events occur
+    This endpoint should be called by Razorpay when payment events occur. Events
+    are verified, stored (redeliveries are ignored) and applied asynchronously.
     """
     from django.conf import settings
     
@@ -204,95 +205,14 @@ def razorpay_webhook(request):
         logger.warning("Invalid webhook signature received")
         return JsonResponse({'error': 'Invalid signature'}, status=400)
     
-    # Parse payload
+    # Store the event and acknowledge; process_payment_webhooks applies it
     try:
-        event = json.loads(payload)
-        event_type = event.get('event')
-        payload_data = event.get('payload', {}).get('payment', {}) or event.get('payload', {}).get('order', {})
-        
-        logger.info(f"Razorpay webhook received: {event_type}")
-        
-        # Handle different event types
-        if event_type in ['payment.captured', 'payment.authorized']:
-            # Payment successful
-            payment_id = payload_data.get('id')
-            order_id = payload_data.get('order_id')
-            
-            try:
-                payment = Payment.objects.get(gateway_payment_id=payment_id)
-                
-                with transaction.atomic():
-                    payment.status = 'completed'
-                    payment.completed_at = timezone.now()
-                    payment.webhook_received = True
-                    payment.webhook_payload = event
-                    payment.metadata = payload_data
-                    payment.save()
-                
-                logger.info(f"Payment {payment.transaction_id} marked as completed via webhook")
-                return JsonResponse({'status': 'success'})
-            
-            except Payment.DoesNotExist:
-                logger.warning(f"Payment not found for Razorpay payment ID: {payment_id}")
-                return JsonResponse({'error': 'Payment not found'}, status=404)
-        
-        elif event_type == 'payment.failed':
-            # Payment failed
-            payment_id = payload_data.get('id')
-            
-            try:
-                payment = Payment.objects.get(gateway_payment_id=payment_id)
-                
-                with transaction.atomic():
-                    payment.status = 'failed'
-                    payment.failed_at = timezone.now()
-                    payment.failure_reason = payload_data.get('error_description', 'Payment failed')
-                    payment.failure_code = payload_data.get('error_code', '')
-                    payment.webhook_received = True
-                    payment.webhook_payload = event
-                    payment.metadata = payload_data
-                    payment.save()
-                
-                logger.info(f"Payment {payment.transaction_id} marked as failed via webhook")
-                return JsonResponse({'status': 'success'})
-            
-            except Payment.DoesNotExist:
-                logger.warning(f"Payment not found for Razorpay payment ID: {payment_id}")
-                return JsonResponse({'error': 'Payment not found'}, status=404)
-        
-        elif event_type == 'refund.created' or event_type == 'refund.processed':
-            # Refund processed
-            refund_data = event.get('payload', {}).get('refund', {})
-            refund_id = refund_data.get('id')
-            payment_id = refund_data.get('payment_id')
-            
-            try:
-                payment = Payment.objects.get(gateway_payment_id=payment_id)
-                refund = PaymentRefund.objects.get(gateway_refund_id=refund_id)
-                
-                with transaction.atomic():
-                    refund.status = 'processed'
-                    refund.processed_at = timezone.now()
-                    refund.gateway_response = refund_data
-                    refund.save()
-                
-                logger.info(f"Refund {refund.refund_id} marked as processed via webhook")
-                return JsonResponse({'status': 'success'})
-            
-            except Payment.DoesNotExist:
-                logger.warning(f"Payment not found for Razorpay payment ID: {payment_id}")
-            except PaymentRefund.DoesNotExist:
-                logger.warning(f"Refund not found for Razorpay refund ID: {refund_id}")
-            
-            return JsonResponse({'status': 'success'})  # Return success even if not found (idempotent)
-        
-        else:
-            logger.info(f"Unhandled webhook event type: {event_type}")
-            return JsonResponse({'status': 'success'})  # Return success for unhandled events
-    
-    except json.JSONDecodeError:
+        record_event(payload, request.headers.get('X-Razorpay-Event-Id'))
+    except (json.JSONDecodeError, ValueError):
         logger.error("Invalid JSON in webhook payload")
         return JsonResponse({'error': 'Invalid JSON'}, status=400)
     except Exception as e:
-        logger.error(f"Error processing webhook: {str(e)}")
+        logger.error(f"Error storing webhook: {str(e)}")
         return JsonResponse({'error': 'Internal server error'}, status=500)
+    
+    return JsonResponse({'status': 'received'})
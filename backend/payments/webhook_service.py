@@ -0,0 +1,224 @@
+"""
+Payment Webhook Service
+Razorpay webhooks are verified and stored as WebhookEvent rows (one insert,
+duplicates ignored) and acknowledged straight away. The
+process_payment_webhooks worker applies them in gateway event order; each
+payment remembers the time of the latest event applied to it, so redelivered
+or out-of-order events never move it backwards or repeat the booking and
+notification work that Payment.save() triggers.
+"""
+import hashlib
+import json
+import logging
+import random
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, List, Optional
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Payment, PaymentRefund, WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_WEBHOOK_BATCH_SIZE = getattr(settings, 'PAYMENT_WEBHOOK_BATCH_SIZE', 100)
+# A claimed event not finished within this many seconds is picked up again
+PAYMENT_WEBHOOK_LEASE = getattr(settings, 'PAYMENT_WEBHOOK_LEASE', 300)
+PAYMENT_WEBHOOK_MAX_ATTEMPTS = getattr(settings, 'PAYMENT_WEBHOOK_MAX_ATTEMPTS', 8)
+# Retry n waits base * 2^(n-1) seconds (+/-20% jitter), capped at an hour
+PAYMENT_WEBHOOK_RETRY_BASE = getattr(settings, 'PAYMENT_WEBHOOK_RETRY_BASE', 30)
+
+# Payment states a late capture/failure event must not overwrite
+SETTLED_STATUSES = ('completed', 'refunded', 'partially_refunded')
+
+
+class PaymentNotFound(Exception):
+    """The event refers to a payment we do not have (yet); retried with backoff"""
+
+
+def _entity(event: Dict, name: str) -> Dict:
+    """payload.<name>.entity from a Razorpay event (tolerating the entity being inlined)"""
+    entity = (event.get('payload') or {}).get(name) or {}
+    return entity.get('entity', entity)
+
+
+def record_event(body: bytes, event_id: Optional[str] = None, gateway: str = 'razorpay') -> None:
+    """
+    Store a verified webhook for the worker; a redelivered event is ignored
+
+    Without an event id header the payload hash is used, so identical retries
+    still collapse. Raises ValueError for a body that is not a JSON event.
+    """
+    event = json.loads(body)
+    if not isinstance(event, dict):
+        raise ValueError('Webhook body is not a JSON object')
+    created = event.get('created_at')
+    now = timezone.now()
+    WebhookEvent.objects.bulk_create([
+        WebhookEvent(
+            gateway=gateway,
+            event_id=event_id or hashlib.sha256(body).hexdigest(),
+            event_type=event.get('event') or '',
+            entity_id=_entity(event, 'payment').get('id') or _entity(event, 'refund').get('payment_id') or '',
+            payload=event,
+            event_created_at=datetime.fromtimestamp(created, tz=dt_timezone.utc) if created else now,
+            next_attempt_at=now,
+        )
+    ], ignore_conflicts=True)
+
+
+def _locked_payment(entity: Dict) -> Payment:
+    """The payment an event is about, locked for the rest of the transaction"""
+    payment = None
+    if entity.get('id'):
+        payment = Payment.objects.select_for_update().filter(gateway_payment_id=entity['id']).first()
+    if payment is None and entity.get('order_id'):
+        # The capture can arrive before the client-side verify stored the payment id
+        payment = Payment.objects.select_for_update().filter(gateway_order_id=entity['order_id']).first()
+    if payment is None:
+        raise PaymentNotFound(f"Payment not found for Razorpay payment ID: {entity.get('id')}")
+    return payment
+
+
+def _note_event(payment: Payment, event: WebhookEvent) -> str:
+    """Record an event that changes nothing without re-running Payment.save()"""
+    fields = {'webhook_received': True}
+    if not payment.webhook_event_at or event.event_created_at > payment.webhook_event_at:
+        fields['webhook_event_at'] = event.event_created_at
+    Payment.objects.filter(pk=payment.pk).update(**fields)
+    return 'skipped'
+
+
+def _is_stale(payment: Payment, event: WebhookEvent) -> bool:
+    return bool(payment.webhook_event_at and event.event_created_at < payment.webhook_event_at)
+
+
+def _payment_captured(event: WebhookEvent) -> str:
+    entity = _entity(event.payload, 'payment')
+    payment = _locked_payment(entity)
+    if _is_stale(payment, event) or payment.status in SETTLED_STATUSES:
+        return _note_event(payment, event)
+
+    payment.status = 'completed'
+    payment.completed_at = timezone.now()
+    payment.gateway_payment_id = payment.gateway_payment_id or entity.get('id')
+    payment.webhook_received = True
+    payment.webhook_payload = event.payload
+    payment.webhook_event_at = event.event_created_at
+    payment.metadata = entity
+    payment.save()
+    logger.info(f"Payment {payment.transaction_id} marked as completed via webhook")
+    return 'processed'
+
+
+def _payment_failed(event: WebhookEvent) -> str:
+    entity = _entity(event.payload, 'payment')
+    payment = _locked_payment(entity)
+    if _is_stale(payment, event) or payment.status in SETTLED_STATUSES + ('failed',):
+        return _note_event(payment, event)
+
+    payment.status = 'failed'
+    payment.failed_at = timezone.now()
+    payment.failure_reason = entity.get('error_description', 'Payment failed')
+    payment.failure_code = entity.get('error_code', '')
+    payment.gateway_payment_id = payment.gateway_payment_id or entity.get('id')
+    payment.webhook_received = True
+    payment.webhook_payload = event.payload
+    payment.webhook_event_at = event.event_created_at
+    payment.metadata = entity
+    payment.save()
+    logger.info(f"Payment {payment.transaction_id} marked as failed via webhook")
+    return 'processed'
+
+
+def _refund_processed(event: WebhookEvent) -> str:
+    entity = _entity(event.payload, 'refund')
+    refund = PaymentRefund.objects.select_for_update().filter(gateway_refund_id=entity.get('id')).first()
+    if refund is None:
+        # Refunds issued outside the app (e.g. from the Razorpay dashboard) are not tracked
+        logger.warning(f"Refund not found for Razorpay refund ID: {entity.get('id')}")
+        return 'skipped'
+    if refund.status == 'processed':
+        return 'skipped'
+
+    refund.status = 'processed'
+    refund.processed_at = timezone.now()
+    refund.gateway_response = entity
+    refund.save()
+    logger.info(f"Refund {refund.refund_id} marked as processed via webhook")
+    return 'processed'
+
+
+EVENT_HANDLERS = {
+    'payment.authorized': _payment_captured,
+    'payment.captured': _payment_captured,
+    'payment.failed': _payment_failed,
+    'refund.created': _refund_processed,
+    'refund.processed': _refund_processed,
+}
+
+
+def apply_event(event: WebhookEvent) -> str:
+    """Apply one event; returns 'processed' or 'skipped'"""
+    handler = EVENT_HANDLERS.get(event.event_type)
+    if handler is None:
+        logger.info(f"Unhandled webhook event type: {event.event_type}")
+        return 'skipped'
+    with transaction.atomic():
+        return handler(event)
+
+
+def claim_events(limit: int = PAYMENT_WEBHOOK_BATCH_SIZE) -> List[WebhookEvent]:
+    """Lease up to limit due events to this worker, oldest gateway event first"""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            WebhookEvent.objects
+            .select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('event_created_at', 'received_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        WebhookEvent.objects.filter(id__in=ids).update(next_attempt_at=now + timedelta(seconds=PAYMENT_WEBHOOK_LEASE))
+    return list(WebhookEvent.objects.filter(id__in=ids).order_by('event_created_at', 'received_at'))
+
+
+def process_events(events: List[WebhookEvent], result: Dict) -> None:
+    for event in events:
+        try:
+            event.status = apply_event(event)
+            event.processed_at = timezone.now()
+            event.next_attempt_at = None
+            event.last_error = None
+        except Exception as e:
+            event.attempts += 1
+            event.last_error = str(e)[:1000]
+            if event.attempts >= PAYMENT_WEBHOOK_MAX_ATTEMPTS:
+                event.status = 'failed'
+                event.next_attempt_at = None
+                logger.error(f"Webhook event {event.event_id} failed permanently: {str(e)}")
+            else:
+                delay = min(3600, PAYMENT_WEBHOOK_RETRY_BASE * 2 ** (event.attempts - 1)) * random.uniform(0.8, 1.2)
+                event.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+                logger.warning(f"Webhook event {event.event_id} failed (attempt {event.attempts}): {str(e)}")
+        result[event.status if event.status != 'pending' else 'retried'] += 1
+        event.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'processed_at'])
+
+
+def process_pending_events(max_batches: Optional[int] = None) -> Dict:
+    """Apply due events until none are left (or max_batches batches are done)"""
+    result = {'processed': 0, 'skipped': 0, 'retried': 0, 'failed': 0, 'batches': 0}
+    while max_batches is None or result['batches'] < max_batches:
+        events = claim_events()
+        if not events:
+            break
+        process_events(events, result)
+        result['batches'] += 1
+    return result
+
+
+def requeue_events(queryset) -> int:
+    """Put events back on the queue to be applied again (handlers are idempotent)"""
+    return queryset.update(status='pending', attempts=0, next_attempt_at=timezone.now(), last_error=None, processed_at=None)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Developer, Project, Property, ConstructionMilestone, Review
+from .models import Developer, Project, Property, ConstructionMilestone, Review, PropertyImport
 
 
 @admin.register(Developer)
@@ -99,3 +99,11 @@ class ReviewAdmin(admin.ModelAdmin):
     search_fields = ['user__email', 'project__name', 'title']
     readonly_fields = ['id', 'created_at', 'updated_at']
 
+
+@admin.register(PropertyImport)
+class PropertyImportAdmin(admin.ModelAdmin):
+    list_display = ['id', 'project', 'source_format', 'status', 'total_rows', 'created_count', 'created_at']
+    list_filter = ['status', 'source_format', 'created_at']
+    search_fields = ['project__name', 'ledger_batch_id']
+    readonly_fields = ['id', 'started_at', 'completed_at', 'created_at', 'updated_at']
+    exclude = ['rows']
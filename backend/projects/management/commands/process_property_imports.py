@@ -0,0 +1,47 @@
+"""
+Management command to run queued bulk unit imports
+Imports too large to run inside the upload request are picked up here.
+Run once (e.g. from cron) or with --loop as a long-running worker.
+"""
+import time
+from django.core.management.base import BaseCommand
+from projects.property_import_service import process_pending_imports
+
+
+class Command(BaseCommand):
+    help = 'Process pending bulk property imports'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Maximum number of imports to process per run'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and poll for new imports'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=int,
+            default=10,
+            help='Seconds between polls when --loop is set (default: 10)'
+        )
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            processed = process_pending_imports(limit=options['limit'])
+            self.stdout.write(self.style.SUCCESS(f'✓ Processed {processed} property imports'))
+            return
+
+        self.stdout.write(self.style.WARNING('Starting property import worker (Ctrl+C to stop)...'))
+        try:
+            while True:
+                processed = process_pending_imports(limit=options['limit'])
+                if processed:
+                    self.stdout.write(f'  Processed {processed} property imports')
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\nProperty import worker stopped'))
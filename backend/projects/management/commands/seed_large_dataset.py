@@ -3,6 +3,7 @@ from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.utils.text import slugify
 from projects.models import Developer, Project, Property, ConstructionMilestone
+from projects.property_import_service import bulk_create_units
 from decimal import Decimal
 import random
 from datetime import datetime, timedelta
@@ -364,7 +365,8 @@ class Command(BaseCommand):
                 if unit_counter > project.total_units:
                     break
         
-        Property.objects.bulk_create(properties, batch_size=100)
+        # Pre-generated QR secrets, chunked inserts and one ledger anchoring per project
+        bulk_create_units(project, properties)
 
     def create_milestones(self, project):
         """Create construction milestones"""
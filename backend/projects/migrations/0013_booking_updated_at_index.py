@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 23:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0012_property_import_and_anchoring'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['updated_at'], name='bookings_updated_199695_idx'),
+        ),
+    ]
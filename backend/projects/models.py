@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
@@ -7,6 +7,8 @@ import uuid
 import hashlib
 import json
 
+from .tracking import TrackedFieldsMixin
+
 User = get_user_model()
 
 
@@ -186,47 +188,58 @@ class Property(models.Model):
     qr_code_data = models.CharField(max_length=500, blank=True, null=True, unique=True)  # Unique QR code for this unit
     qr_code_secret = models.CharField(max_length=128, blank=True, null=True)  # Hash for verification
     
+    # Merkle anchoring for units created by bulk import (one ledger write per import)
+    anchor_batch = models.ForeignKey('blockchain.BlockchainAnchorBatch', on_delete=models.SET_NULL, null=True, blank=True, related_name='properties')
+    merkle_leaf_hash = models.CharField(max_length=64, blank=True, null=True)
+    merkle_proof = models.JSONField(default=list, blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    def assign_qr_code(self):
+        """Generate QR code data and its secret in memory (no database write)"""
+        # id is assigned by the UUID default at construction, so no insert is needed first
+        self.qr_code_data = f"property:{self.project_id}:{self.id}:{uuid.uuid4().hex[:8]}"
+        # Generate secret hash for verification
+        secret_string = f"{self.id}:{self.project_id}:{self.unit_number}:{uuid.uuid4().hex}"
+        self.qr_code_secret = hashlib.sha256(secret_string.encode()).hexdigest()
+
     def save(self, *args, **kwargs):
-        # Generate QR code data if not exists
-        is_new = self.pk is None
-        if not self.qr_code_data and is_new:
-            # For new objects, save first to get ID, then update QR code
+        # pk is always set (UUID default), so use _state.adding to detect inserts
+        is_new = self._state.adding
+        if not self.qr_code_data:
+            self.assign_qr_code()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'qr_code_data', 'qr_code_secret'}
+        if not is_new:
             super().save(*args, **kwargs)
-            self.qr_code_data = f"property:{self.project.id}:{self.id}:{uuid.uuid4().hex[:8]}"
-            # Generate secret hash for verification
-            secret_string = f"{self.id}:{self.project.id}:{self.unit_number}:{uuid.uuid4().hex}"
-            self.qr_code_secret = hashlib.sha256(secret_string.encode()).hexdigest()
-            # Save again with QR code data (use update_fields to avoid recursion)
-            super().save(update_fields=['qr_code_data', 'qr_code_secret'])
-            
-            # Store property creation on blockchain (after save to get ID)
-            try:
-                from blockchain.blockchain_service import get_blockchain_service
-                blockchain_service = get_blockchain_service()
-                blockchain_service.store_property_creation_on_blockchain(
-                    property_id=str(self.id),
-                    project_id=str(self.project.id),
-                    unit_number=self.unit_number,
-                    property_data={
-                        'unit_number': self.unit_number,
-                        'property_type': self.property_type,
-                        'carpet_area': str(self.carpet_area),
-                        'price': str(self.price),
-                        'status': self.status,
-                        'floor_number': self.floor_number,
-                        'tower': self.tower or '',
-                    },
-                    created_by=str(self.project.developer.user.id) if hasattr(self.project.developer, 'user') else ''
-                )
-            except Exception as e:
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.warning(f"Blockchain storage failed (non-critical): {str(e)}")
-        else:
+            return
+
+        # The unit and its outbox row commit (or roll back) together; the
+        # submitter is only woken once the transaction commits
+        from blockchain.blockchain_service import get_blockchain_service
+        with transaction.atomic():
             super().save(*args, **kwargs)
+            get_blockchain_service().store_property_creation_on_blockchain(
+                property_id=str(self.id),
+                project_id=str(self.project_id),
+                unit_number=self.unit_number,
+                property_data=self.get_blockchain_data(),
+                created_by=str(self.project.developer.user_id) if self.project.developer.user_id else ''
+            )
+
+    def get_blockchain_data(self):
+        """Fields whose hash is written to the ledger when the unit is created"""
+        # Only what describes the unit itself: price and status change as it is
+        # repriced, booked and sold, and would fail verification afterwards.
+        # Fixed two-place formatting so in-memory and reloaded values hash the same
+        return {
+            'unit_number': self.unit_number,
+            'property_type': self.property_type,
+            'carpet_area': f"{Decimal(self.carpet_area):.2f}",
+            'floor_number': self.floor_number,
+            'tower': self.tower or '',
+        }
 
     class Meta:
         db_table = 'properties'
@@ -239,6 +252,63 @@ class Property(models.Model):
         return f"{self.project.name} - Unit {self.unit_number}"
 
 
+class PropertyImport(models.Model):
+    """Bulk unit import job (CSV/JSON) with progress reporting"""
+    
+    SOURCE_FORMATS = [
+        ('csv', 'CSV'),
+        ('json', 'JSON'),
+    ]
+    
+    STATUS = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='property_imports')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='property_imports')
+    source_format = models.CharField(max_length=10, choices=SOURCE_FORMATS)
+    
+    # Progress
+    status = models.CharField(max_length=20, choices=STATUS, default='pending')
+    total_rows = models.IntegerField(default=0)
+    processed_rows = models.IntegerField(default=0)
+    created_count = models.IntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)  # [{"row": 3, "errors": {...}}]
+    
+    # Validated rows waiting to be inserted (cleared once the import finishes)
+    rows = models.JSONField(default=list, blank=True)
+    
+    # Ledger anchoring (one Merkle batch per import)
+    ledger_batch_id = models.CharField(max_length=255, blank=True, null=True)
+    
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'property_imports'
+        verbose_name = 'Property Import'
+        verbose_name_plural = 'Property Imports'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Import {self.id} - {self.project.name} ({self.status})"
+    
+    @property
+    def progress_percentage(self):
+        if not self.total_rows:
+            return 100 if self.status == 'completed' else 0
+        return round(self.processed_rows * 100 / self.total_rows, 1)
+
+
 class ConstructionMilestone(models.Model):
     """Construction progress tracking"""
     MILESTONE_STATUS = [
@@ -408,7 +478,7 @@ class ConstructionUpdate(models.Model):
         return f"{self.project.name} - {self.title}"
 
 
-class Booking(models.Model):
+class Booking(TrackedFieldsMixin, models.Model):
     """Property booking system with full workflow tracking"""
     BOOKING_STATUS = [
         ('pending', 'Pending'),  # Booking created, payment pending
@@ -478,6 +548,8 @@ class Booking(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    tracked_fields = ('status',)
+    
     def save(self, *args, **kwargs):
         # Auto-generate booking number if not set
         if not self.booking_number:
@@ -505,8 +577,14 @@ class Booking(models.Model):
         if self.status == 'completed' and not self.completion_date:
             self.completion_date = timezone.now()
         
+        # Property/project cascades only run on a real status transition
+        status_changed = self.has_changed('status')
+        
         super().save(*args, **kwargs)
         
+        if not status_changed:
+            return
+        
         # Update property status when booking is confirmed or cancelled
         if self.status == 'confirmed' and self.property.status == 'available':
             self.property.status = 'booked'
@@ -548,6 +626,7 @@ class Booking(models.Model):
             models.Index(fields=['booking_number']),
             models.Index(fields=['booking_date']),
             models.Index(fields=['status']),
+            models.Index(fields=['updated_at']),
         ]
     
     def __str__(self):
@@ -0,0 +1,275 @@
+"""
+Bulk Property Import Service for ApnaGhar
+Creates many units in chunked bulk inserts with QR secrets generated up front,
+and anchors the whole import on the ledger under a single Merkle root
+"""
+
+import csv
+import io
+import json
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import Project, Property, PropertyImport
+
+logger = logging.getLogger(__name__)
+
+PROPERTY_IMPORT_CHUNK_SIZE = getattr(settings, 'PROPERTY_IMPORT_CHUNK_SIZE', 500)
+PROPERTY_IMPORT_MAX_ROWS = getattr(settings, 'PROPERTY_IMPORT_MAX_ROWS', 10000)
+# Imports up to this size run inside the request; larger ones go to process_property_imports
+PROPERTY_IMPORT_INLINE_MAX_ROWS = getattr(settings, 'PROPERTY_IMPORT_INLINE_MAX_ROWS', 2000)
+
+
+class PropertyImportError(Exception):
+    """Raised when an import file cannot be read at all"""
+    pass
+
+
+class PropertyImportRowSerializer(serializers.ModelSerializer):
+    """Validates one imported unit row"""
+    features = serializers.ListField(child=serializers.CharField(), required=False)
+
+    class Meta:
+        model = Property
+        fields = [
+            'unit_number', 'property_type', 'floor_number', 'tower',
+            'carpet_area', 'built_up_area', 'super_built_up_area',
+            'bedrooms', 'bathrooms', 'balconies', 'price', 'price_per_sqft',
+            'status', 'features', 'floor_plan_image'
+        ]
+        # Uniqueness per project is checked for the whole file at once
+        validators = []
+
+    def to_internal_value(self, data):
+        # CSV gives every column as a string: drop blanks and split features on "|"
+        data = {k: v for k, v in data.items() if v not in ('', None)}
+        if isinstance(data.get('features'), str):
+            data['features'] = [f.strip() for f in data['features'].split('|') if f.strip()]
+        return super().to_internal_value(data)
+
+
+def parse_import_file(uploaded_file) -> Tuple[List[Dict], str]:
+    """
+    Read an uploaded CSV or JSON file into row dicts
+
+    JSON may be a list of units or {"units": [...]}. CSV needs a header row.
+    """
+    name = (getattr(uploaded_file, 'name', '') or '').lower()
+    raw = uploaded_file.read()
+    try:
+        text = raw.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise PropertyImportError('File must be UTF-8 encoded')
+
+    if name.endswith('.json') or text.lstrip().startswith(('[', '{')):
+        try:
+            payload = json.loads(text)
+        except ValueError as e:
+            raise PropertyImportError(f'Invalid JSON: {str(e)}')
+        rows = payload.get('units') if isinstance(payload, dict) else payload
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+            raise PropertyImportError('JSON must be a list of units or {"units": [...]}')
+        return rows, 'json'
+
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or 'unit_number' not in reader.fieldnames:
+        raise PropertyImportError('CSV must have a header row including unit_number')
+    return [dict(row) for row in reader], 'csv'
+
+
+def validate_rows(project: Project, rows: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Validate every row before anything is written
+
+    Returns:
+        (valid rows as JSON-safe dicts, [{'row': n, 'errors': {...}}])
+    """
+    if len(rows) > PROPERTY_IMPORT_MAX_ROWS:
+        raise PropertyImportError(f'At most {PROPERTY_IMPORT_MAX_ROWS} units can be imported at once')
+
+    existing = set(Property.objects.filter(project=project).values_list('unit_number', flat=True))
+    seen = set()
+    valid, errors = [], []
+
+    for index, row in enumerate(rows, start=1):
+        serializer = PropertyImportRowSerializer(data=row)
+        if not serializer.is_valid():
+            errors.append({'row': index, 'errors': serializer.errors})
+            continue
+        unit_number = serializer.validated_data['unit_number']
+        if unit_number in existing:
+            errors.append({'row': index, 'errors': {'unit_number': ['Unit already exists in this project']}})
+            continue
+        if unit_number in seen:
+            errors.append({'row': index, 'errors': {'unit_number': ['Duplicate unit_number in file']}})
+            continue
+        seen.add(unit_number)
+        # Keep the row JSON-safe so it can be parked on the import record
+        valid.append(json.loads(json.dumps(serializer.validated_data, default=str)))
+
+    return valid, errors
+
+
+def bulk_create_units(
+    project: Project,
+    units: List[Property],
+    chunk_size: Optional[int] = None,
+    on_progress: Optional[Callable[[int], None]] = None,
+    anchor: bool = True
+) -> Tuple[List[Property], Optional[str]]:
+    """
+    Insert units with one INSERT per chunk and anchor them under one Merkle root
+
+    IDs and QR secrets are generated in memory first, so there is no follow-up
+    UPDATE per unit and no per-unit ledger call.
+
+    Returns:
+        (created units, anchor batch_id or None)
+    """
+    chunk_size = chunk_size or PROPERTY_IMPORT_CHUNK_SIZE
+    for unit in units:
+        unit.project = project
+        if not unit.qr_code_data:
+            unit.assign_qr_code()
+
+    created = 0
+    for start in range(0, len(units), chunk_size):
+        chunk = units[start:start + chunk_size]
+        with transaction.atomic():
+            Property.objects.bulk_create(chunk)
+            created += len(chunk)
+            # Reported inside the chunk's transaction, so saved progress never runs ahead of the rows
+            if on_progress:
+                on_progress(created)
+
+    batch_id = anchor_units(project, units) if anchor else None
+    return units, batch_id
+
+
+def anchor_units(project: Project, units: List[Property]) -> Optional[str]:
+    """Anchor created units under one Merkle root; returns the batch_id (None if skipped or failed)"""
+    if not units:
+        return None
+    try:
+        from blockchain.anchoring_service import anchor_properties
+        batch = anchor_properties(units, project_id=str(project.id))
+        return batch.batch_id if batch else None
+    except Exception as e:
+        logger.warning(f"Blockchain anchoring failed for bulk import (non-critical): {str(e)}")
+        return None
+
+
+def _unit_from_row(row: Dict) -> Property:
+    """Rebuild a unit from a parked JSON row, restoring Decimal and int types"""
+    return Property(**{
+        name: Property._meta.get_field(name).to_python(value)
+        for name, value in row.items()
+    })
+
+
+def create_import(project: Project, user, uploaded_file=None, rows: Optional[List[Dict]] = None) -> PropertyImport:
+    """
+    Parse and validate an import, then park the valid rows on a PropertyImport
+
+    Nothing is inserted if any row is invalid; the import is marked failed with
+    per-row errors so the builder can fix the file and retry.
+    """
+    source_format = 'json'
+    if uploaded_file is not None:
+        rows, source_format = parse_import_file(uploaded_file)
+    rows = rows or []
+
+    valid, errors = validate_rows(project, rows)
+    property_import = PropertyImport.objects.create(
+        project=project,
+        created_by=user,
+        source_format=source_format,
+        total_rows=len(rows),
+        errors=errors,
+        rows=[] if errors else valid,
+        status='failed' if errors else 'pending',
+        completed_at=timezone.now() if errors else None,
+    )
+    return property_import
+
+
+def run_import(property_import: PropertyImport) -> PropertyImport:
+    """
+    Insert a pending import's rows chunk by chunk, saving progress after each chunk
+
+    Each chunk commits together with processed_rows, so an import that fails
+    part way keeps its rows and can be retried (retry_import): it resumes
+    after the last committed chunk instead of colliding with it.
+    """
+    claimed = PropertyImport.objects.filter(id=property_import.id, status='pending').update(
+        status='processing', started_at=timezone.now()
+    )
+    if not claimed:
+        property_import.refresh_from_db()
+        return property_import
+    property_import.refresh_from_db()
+    project = property_import.project
+    resume_from = property_import.processed_rows
+
+    def report(done):
+        PropertyImport.objects.filter(id=property_import.id).update(
+            processed_rows=resume_from + done, created_count=resume_from + done, updated_at=timezone.now()
+        )
+
+    try:
+        units = [_unit_from_row(row) for row in property_import.rows[resume_from:]]
+        bulk_create_units(project, units, on_progress=report, anchor=False)
+        if resume_from:
+            # Units committed by the earlier attempt belong to the same import (and Merkle batch)
+            unit_numbers = [row['unit_number'] for row in property_import.rows[:resume_from]]
+            units = list(Property.objects.filter(project=project, unit_number__in=unit_numbers)) + units
+        batch_id = anchor_units(project, units)
+        property_import.refresh_from_db()
+        property_import.status = 'completed'
+        property_import.ledger_batch_id = batch_id
+        property_import.rows = []
+        logger.info(f"Property import {property_import.id}: {len(units)} units created")
+    except Exception as e:
+        logger.error(f"Property import {property_import.id} failed: {str(e)}", exc_info=True)
+        property_import.refresh_from_db()
+        property_import.status = 'failed'
+        property_import.errors = property_import.errors + [{'row': None, 'errors': {'detail': [str(e)]}}]
+
+    property_import.completed_at = timezone.now()
+    property_import.save(update_fields=['status', 'ledger_batch_id', 'errors', 'rows', 'completed_at', 'updated_at'])
+
+    _refresh_project_unit_counts(project)
+    return property_import
+
+
+def retry_import(property_import: PropertyImport) -> bool:
+    """Queue a failed import again from where it stopped; False if it has no rows left to insert"""
+    return bool(PropertyImport.objects.filter(
+        id=property_import.id, status='failed', processed_rows__lt=F('total_rows')
+    ).exclude(rows=[]).update(status='pending', completed_at=None, updated_at=timezone.now()))
+
+
+def _refresh_project_unit_counts(project: Project) -> None:
+    """Keep the project's unit counters in line after units are added in bulk"""
+    counts = Property.objects.filter(project=project).aggregate(
+        total=Count('id'),
+        available=Count('id', filter=Q(status='available'))
+    )
+    Project.objects.filter(id=project.id).update(total_units=counts['total'], available_units=counts['available'])
+
+
+def process_pending_imports(limit: Optional[int] = None) -> int:
+    """Run queued imports oldest first. Returns how many were processed."""
+    pending = PropertyImport.objects.filter(status='pending').select_related('project').order_by('created_at')
+    if limit:
+        pending = pending[:limit]
+    processed = 0
+    for property_import in pending:
+        run_import(property_import)
+        processed += 1
+    return processed
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Developer, Project, Property, ConstructionMilestone, Review, ConstructionUpdate, Booking
+from .models import Developer, Project, Property, ConstructionMilestone, Review, ConstructionUpdate, Booking, PropertyImport
 from django.contrib.auth import get_user_model
 from decimal import Decimal
 import cloudinary.utils
@@ -459,3 +459,19 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         )
         
         return booking
+
+
+class PropertyImportSerializer(serializers.ModelSerializer):
+    """Serializer for bulk unit import jobs and their progress"""
+    project_name = serializers.CharField(source='project.name', read_only=True)
+    progress_percentage = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = PropertyImport
+        fields = [
+            'id', 'project', 'project_name', 'source_format', 'status',
+            'total_rows', 'processed_rows', 'created_count', 'progress_percentage',
+            'errors', 'ledger_batch_id', 'started_at', 'completed_at',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
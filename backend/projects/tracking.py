@@ -0,0 +1,65 @@
+"""
+Field change tracking for models
+Models list tracked_fields (attnames, e.g. 'status' or 'property_id'); their
+values are remembered when an instance is loaded and after each save, so
+save() overrides and post_save signals can tell real transitions from
+re-saves without querying the previous row.
+"""
+from typing import Any, Dict, Iterable, Optional
+
+
+class TrackedFieldsMixin:
+    """
+    Remember tracked_fields as last loaded from or saved to the database
+
+    The snapshot is refreshed once save() (including its post_save signals)
+    has finished, so signal handlers still see what the save changed. New
+    instances have no previous values: every tracked field counts as changed.
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked_fields()
+        return instance
+
+    def _snapshot_tracked_fields(self, fields: Optional[Iterable[str]] = None) -> None:
+        # Deferred fields are not in __dict__ and are left out of the snapshot
+        loaded = self.__dict__.setdefault('_tracked_values', {})
+        for field in (self.tracked_fields if fields is None else fields):
+            if field in self.tracked_fields and field in self.__dict__:
+                loaded[field] = self.__dict__[field]
+
+    def has_changed(self, field: str) -> bool:
+        """Whether field differs from the database value this instance was loaded with"""
+        loaded = self.__dict__.get('_tracked_values', {})
+        if self._state.adding or field not in loaded:
+            return True
+        return getattr(self, field) != loaded[field]
+
+    def previous(self, field: str) -> Any:
+        """The database value of field when loaded (None for new instances)"""
+        if self._state.adding:
+            return None
+        return self.__dict__.get('_tracked_values', {}).get(field)
+
+    @property
+    def changed_fields(self) -> Dict[str, Any]:
+        """Tracked fields that changed, mapped to their previous values"""
+        return {field: self.previous(field) for field in self.tracked_fields if self.has_changed(field)}
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            # Model.save() accepts field names; tracked fields are attnames
+            update_fields = [self._meta.get_field(name).attname for name in update_fields]
+        self._snapshot_tracked_fields(update_fields)
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        fields = kwargs.get('fields')
+        if fields is not None:
+            fields = [self._meta.get_field(name).attname for name in fields]
+        self._snapshot_tracked_fields(fields)
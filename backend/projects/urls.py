@@ -2,7 +2,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     DeveloperViewSet, ProjectViewSet, PropertyViewSet,
-    MilestoneViewSet, ReviewViewSet, ConstructionUpdateViewSet, BookingViewSet
+    MilestoneViewSet, ReviewViewSet, ConstructionUpdateViewSet, BookingViewSet,
+    PropertyImportViewSet
 )
 from .user_views import UserPropertyViewSet, UserProjectViewSet
 
@@ -10,6 +11,7 @@ router = DefaultRouter()
 router.register(r'developers', DeveloperViewSet, basename='developer')
 router.register(r'projects', ProjectViewSet, basename='project')
 router.register(r'properties', PropertyViewSet, basename='property')
+router.register(r'property-imports', PropertyImportViewSet, basename='property-import')
 router.register(r'milestones', MilestoneViewSet, basename='milestone')
 router.register(r'reviews', ReviewViewSet, basename='review')
 router.register(r'construction-updates', ConstructionUpdateViewSet, basename='construction-update')
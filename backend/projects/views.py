@@ -5,11 +5,13 @@ from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticate
 from rest_framework.exceptions import PermissionDenied
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q, Avg
-from .models import Developer, Project, Property, ConstructionMilestone, Review, ConstructionUpdate, Booking
+from django.core.exceptions import ValidationError as DjangoValidationError
+from .models import Developer, Project, Property, ConstructionMilestone, Review, ConstructionUpdate, Booking, PropertyImport
 from .serializers import (
     DeveloperSerializer, ProjectListSerializer, ProjectDetailSerializer,
     ProjectCreateUpdateSerializer, PropertySerializer, MilestoneSerializer,
-    ReviewSerializer, ConstructionUpdateSerializer, BookingSerializer, BookingCreateSerializer
+    ReviewSerializer, ConstructionUpdateSerializer, BookingSerializer, BookingCreateSerializer,
+    PropertyImportSerializer
 )
 from .permissions import IsOwnerOrBuilderOrReadOnly, IsBuilderOrReadOnly
 import cloudinary
@@ -269,6 +271,52 @@ class PropertyViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsBuilderOrReadOnly])
+    def bulk_import(self, request):
+        """
+        Bulk-create units for a project from a CSV or JSON file. Only the project's builder may import.
+        
+        Expected request data:
+        - project_id: Project ID
+        - file: CSV (header row) or JSON (list of units, or {"units": [...]})
+          or units: list of unit objects in a JSON body
+        
+        Small imports run inside the request; larger ones are queued for
+        `process_property_imports` and can be polled at /property-imports/<id>/.
+        A failed import keeps its rows; POST /property-imports/<id>/retry/ resumes it.
+        """
+        from .property_import_service import (
+            PropertyImportError, PROPERTY_IMPORT_INLINE_MAX_ROWS, create_import, run_import
+        )
+        
+        project_id = request.data.get('project_id')
+        if not project_id:
+            return Response({'detail': 'project_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            project = Project.objects.select_related('developer').get(id=project_id)
+        except (Project.DoesNotExist, ValueError, DjangoValidationError):
+            return Response({'detail': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
+        if project.developer.user_id != request.user.id:
+            return Response({'detail': 'Only the project builder can import units'}, status=status.HTTP_403_FORBIDDEN)
+        
+        uploaded_file = request.FILES.get('file')
+        units = request.data.get('units')
+        if uploaded_file is None and not isinstance(units, list):
+            return Response({'detail': 'Provide a file or a units list'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            property_import = create_import(project, request.user, uploaded_file=uploaded_file, rows=units)
+        except PropertyImportError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if property_import.status == 'failed':
+            return Response(PropertyImportSerializer(property_import).data, status=status.HTTP_400_BAD_REQUEST)
+        if property_import.total_rows > PROPERTY_IMPORT_INLINE_MAX_ROWS:
+            return Response(PropertyImportSerializer(property_import).data, status=status.HTTP_202_ACCEPTED)
+        
+        property_import = run_import(property_import)
+        return Response(PropertyImportSerializer(property_import).data, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, IsBuilderOrReadOnly])
     def upload_media(self, request, pk=None):
         """Upload photos/videos for a specific unit/property. Only builder (developer) may upload.
@@ -1229,6 +1277,37 @@ class MilestoneViewSet(viewsets.ModelViewSet):
             return Response({'detail': f'Internal server error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class PropertyImportViewSet(viewsets.ReadOnlyModelViewSet):
+    """ViewSet for polling bulk unit imports (builder sees imports for their own projects)"""
+    serializer_class = PropertyImportSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['project', 'status']
+    
+    def get_queryset(self):
+        return PropertyImport.objects.select_related('project').filter(
+            project__developer__user=self.request.user
+        ).order_by('-created_at')
+    
+    @action(detail=True, methods=['post'])
+    def retry(self, request, pk=None):
+        """Retry a failed import from the last chunk it committed"""
+        from .property_import_service import PROPERTY_IMPORT_INLINE_MAX_ROWS, retry_import, run_import
+        
+        property_import = self.get_object()
+        if not retry_import(property_import):
+            return Response(
+                {'detail': 'Only failed imports with rows left to insert can be retried'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        property_import.refresh_from_db()
+        if property_import.total_rows - property_import.processed_rows > PROPERTY_IMPORT_INLINE_MAX_ROWS:
+            return Response(PropertyImportSerializer(property_import).data, status=status.HTTP_202_ACCEPTED)
+        
+        property_import = run_import(property_import)
+        return Response(PropertyImportSerializer(property_import).data)
+
+
 class ReviewViewSet(viewsets.ModelViewSet):
     """ViewSet for Project Reviews"""
     queryset = Review.objects.select_related('project', 'user')
@@ -1495,15 +1574,17 @@ class BookingViewSet(viewsets.ModelViewSet):
         
         if amount_paid is not None:
             try:
-                from decimal import Decimal
+                from decimal import Decimal, InvalidOperation
                 amount_paid = Decimal(str(amount_paid))
-                booking.amount_paid = amount_paid
-                booking.amount_due = booking.total_amount - amount_paid
-            except (ValueError, TypeError):
+            except (ValueError, TypeError, InvalidOperation):
                 return Response(
                     {'error': 'Invalid amount_paid value'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            # Record the correction in the booking ledger, which moves the balances
+            from payments.ledger_service import post_adjustment
+            post_adjustment(booking, amount_paid - booking.amount_paid, note='Manual payment update', created_by=request.user)
+            booking.refresh_from_db(fields=['amount_paid', 'amount_due'])
         
         if payment_method:
             booking.payment_method = payment_method